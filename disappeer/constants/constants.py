@@ -39,7 +39,8 @@ command_list_inputs = ['Check_Sanity',
                        'Tor_Proxy_Message_Server',
                        'Server_Error',
                        'Tor_Proxy_Error',
-                       'Inspect_Message']
+                       'Inspect_Message',
+                       'Network_Servers_Drained']
 command_list_tuple_obj = collections.namedtuple("Command_List", command_list_inputs)
 command_list = command_list_tuple_obj(*command_list_inputs)
 
@@ -169,6 +169,10 @@ class TestBasicConstants(unittest.TestCase):
         txt = 'Inspect_Message'
         self.assertEqual(constants.command_list.Inspect_Message, txt)
 
+    def test_command_list_network_servers_drained(self):
+        txt = 'Network_Servers_Drained'
+        self.assertEqual(constants.command_list.Network_Servers_Drained, txt)
+
 
 
 
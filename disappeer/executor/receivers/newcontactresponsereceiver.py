@@ -10,10 +10,11 @@ License: GPLv3
 
 from disappeer.constants import constants
 from disappeer.executor.receivers import abstractreceiver
-from disappeer.net.contactresponse import contactresponsevalidator
+from disappeer.net.bases import validationservice
 from disappeer.gpg.helpers import gpgpubkeyvalidator
 from disappeer.popups import popuplauncher
 from disappeer.utilities.logger import log
+import functools
 command_list = constants.command_list
 
 
@@ -38,7 +39,13 @@ class NewContactResponseReceiver(abstractreceiver.AbstractReceiver):
         return self.kwarg_keys
 
     def execute(self, payload):
-        validator = self.validate_contact_response(payload)
+        """
+        First pass submits validation, the payload comes back through the root queue with the result
+        """
+        if 'validation' not in payload:
+            self.validate_contact_response(payload)
+            return None
+        validator = payload['validation']
         if not validator.valid:
             msg = "Contact Response Validator returned FALSE: {}".format(validator.error)
             self.launch_alert_log(msg)
@@ -63,12 +70,17 @@ class NewContactResponseReceiver(abstractreceiver.AbstractReceiver):
         self.launch_blink_alert("New Peer Contact")
 
     def validate_contact_response(self, payload):
-        validator = contactresponsevalidator.ContactResponseValidator(payload,
-                                                                      self.gpg_datacontext.get_home_dir(),
-                                                                      self.database_facade.get_pending_contact_response_table(),
-                                                                      self.root_params.get_session_passphrase_observable())
-        validator.validate()
-        return validator
+        args = (payload,
+                self.gpg_datacontext.get_home_dir(),
+                self.database_facade.get_pending_contact_response_table().database,
+                self.root_params.get_session_passphrase_observable())
+        callback = functools.partial(self.put_validation_to_queue, payload)
+        future = validationservice.service.submit(validationservice.validate_contact_response, args, callback)
+        return future
+
+    def put_validation_to_queue(self, payload, validation_result):
+        target = dict(payload, validation=validation_result)
+        self.root_params.root_queue.put(target)
 
     def fetch_contact_response_pub_key_by_nonce(self, validator_data_dict):
         request_nonce = validator_data_dict['request_nonce']
@@ -9,9 +9,10 @@ License: GPLv3
 
 from disappeer.executor.receivers import abstractreceiver
 from disappeer.constants import constants
-from disappeer.net.message import messagevalidator
+from disappeer.net.bases import validationservice
 from disappeer.popups import popuplauncher
 from disappeer.utilities.logger import log
+import functools
 
 command_list = constants.command_list
 
@@ -36,8 +37,14 @@ class ReceivedNewMessageReceiver(abstractreceiver.AbstractReceiver):
         return self.kwarg_keys
 
     def execute(self, incoming_payload):
+        """
+        First pass submits validation, the payload comes back through the root queue with the result
+        """
+        if 'validation' not in incoming_payload:
+            self.validate_message(incoming_payload)
+            return None
         payload_dict = incoming_payload['payload']
-        validator = self.validate_message(payload_dict)
+        validator = incoming_payload['validation']
         if validator.valid:
             self.database_facade_insert_received_message(payload_dict)
             self.check_peer_contact_from_new_message(validator.data_dict, validator.verify_result)
@@ -53,12 +60,17 @@ class ReceivedNewMessageReceiver(abstractreceiver.AbstractReceiver):
             # - alert user
             log.error("Handle received new message payload is NOT valid.")
 
-    def validate_message(self, payload_dict):
-        validator = messagevalidator.MessageValidator(payload_dict,
-                                                      self.gpg_datacontext.get_home_dir(),
-                                                      self.root_params.get_session_passphrase_observable())
-        validator.validate()
-        return validator
+    def validate_message(self, incoming_payload):
+        args = (incoming_payload['payload'],
+                self.gpg_datacontext.get_home_dir(),
+                self.root_params.get_session_passphrase_observable())
+        callback = functools.partial(self.put_validation_to_queue, incoming_payload)
+        future = validationservice.service.submit(validationservice.validate_message, args, callback)
+        return future
+
+    def put_validation_to_queue(self, incoming_payload, validation_result):
+        payload = dict(incoming_payload, validation=validation_result)
+        self.root_params.root_queue.put(payload)
 
     def database_facade_insert_received_message(self, payload):
         self.database_facade.insert_received_message(payload)
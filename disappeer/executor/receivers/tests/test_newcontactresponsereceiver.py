@@ -13,7 +13,7 @@ from disappeer.constants import constants
 from disappeer.executor.receivers import abstractreceiver
 from disappeer.executor.receivers import newcontactresponsereceiver
 from disappeer.executor.receivers.newcontactresponsereceiver import NewContactResponseReceiver
-from disappeer.net.contactresponse import contactresponsevalidator
+from disappeer.net.bases import validationservice
 from disappeer.gpg.helpers import gpgpubkeyvalidator
 from disappeer.popups import popuplauncher
 
@@ -26,8 +26,8 @@ class TestImports(unittest.TestCase):
     def test_constants(self):
         self.assertEqual(constants, newcontactresponsereceiver.constants)
 
-    def test_contactresponsevalidator(self):
-        self.assertEqual(contactresponsevalidator, newcontactresponsereceiver.contactresponsevalidator)
+    def test_validationservice(self):
+        self.assertEqual(validationservice, newcontactresponsereceiver.validationservice)
 
     def test_gpgpubkeyvalidator(self):
         self.assertEqual(gpgpubkeyvalidator, newcontactresponsereceiver.gpgpubkeyvalidator)
@@ -66,16 +66,27 @@ class TestNewContactResponseReceiver(unittest.TestCase):
     def test_valid_kwargs_class_attr_equals_instance_attr(self):
         self.assertEqual(self.x.valid_kwarg_keys, NewContactResponseReceiver.kwarg_keys)
 
-    @patch('executor.receivers.newcontactresponsereceiver.contactresponsevalidator.ContactResponseValidator')
-    def test_validate_contact_response_method_calls_validator_with_args_calls_validate_returns_validator(self, validator):
+    @patch.object(validationservice, 'service')
+    def test_validate_contact_response_method_submits_job_with_args_returns_future(self, service):
         payload = dict()
         result = self.x.validate_contact_response(payload)
-        validator.assert_called_with(payload,
-                                     self.x.gpg_datacontext.get_home_dir(),
-                                     self.x.database_facade.get_pending_contact_response_table(),
-                                     self.x.root_params.get_session_passphrase_observable())
-        self.assertEqual(result, validator())
-        validator().validate.assert_called_with()
+        job, args, callback = service.submit.call_args[0]
+        self.assertEqual(job, validationservice.validate_contact_response)
+        self.assertEqual(args, (payload,
+                                self.x.gpg_datacontext.get_home_dir(),
+                                self.x.database_facade.get_pending_contact_response_table().database,
+                                self.x.root_params.get_session_passphrase_observable()))
+        self.assertEqual(result, service.submit.return_value)
+
+    @patch.object(validationservice, 'service')
+    def test_validate_contact_response_callback_puts_payload_with_validation_to_root_queue(self, service):
+        payload = dict(desc=constants.command_list.New_Contact_Res)
+        self.x.validate_contact_response(payload)
+        callback = service.submit.call_args[0][2]
+        validation = validationservice.ValidationResult(False, 'err msg', None, None)
+        callback(validation)
+        target = dict(payload, validation=validation)
+        self.x.root_params.root_queue.put.assert_called_with(target)
 
     def test_fetch_contact_response_pubkey_by_nonce_fetches_pubkey_by_nonce_from_validator_data_dict(self):
         payload = dict(request_nonce='xxx')
@@ -156,8 +167,9 @@ class TestNewContactResponseReceiver(unittest.TestCase):
         sub = self.x.validate_pubkey = MagicMock()
         sub_1 = self.x.launch_blink_alert = MagicMock()
         target = self.x.validate_contact_response = MagicMock()
-        self.x.execute(payload)
+        result = self.x.execute(payload)
         target.assert_called_with(payload)
+        self.assertIsNone(result)
 
     def test_execute_calls_alert_log_returns_false_if_validator_false(self):
         class MockValidator:
@@ -165,8 +177,7 @@ class TestNewContactResponseReceiver(unittest.TestCase):
             error = 'err msg'
 
         validator = MockValidator()
-        payload = dict()
-        sub = self.x.validate_contact_response = MagicMock(return_value=validator)
+        payload = dict(validation=validator)
         target = self.x.launch_alert_log = MagicMock()
         result = self.x.execute(payload)
         self.assertIs(result, False)
@@ -179,8 +190,7 @@ class TestNewContactResponseReceiver(unittest.TestCase):
             data_dict = MagicMock()
 
         validator = MockValidator()
-        payload = dict()
-        sub = self.x.validate_contact_response = MagicMock(return_value=validator)
+        payload = dict(validation=validator)
         target = self.x.handle_valid_contact_response = MagicMock()
         result = self.x.execute(payload)
         target.assert_called_with(validator.data_dict)
@@ -12,7 +12,7 @@ from unittest.mock import MagicMock, patch
 from disappeer.constants import constants
 from disappeer.executor.receivers import abstractreceiver
 from disappeer.executor.receivers import receivednewmessagereceiver
-from disappeer.net.message import messagevalidator
+from disappeer.net.bases import validationservice
 from disappeer.popups import popuplauncher
 import types
 
@@ -25,8 +25,8 @@ class TestImports(unittest.TestCase):
     def test_constants(self):
         self.assertEqual(constants, receivednewmessagereceiver.constants)
 
-    def test_messagevalidator(self):
-        self.assertEqual(messagevalidator, receivednewmessagereceiver.messagevalidator)
+    def test_validationservice(self):
+        self.assertEqual(validationservice, receivednewmessagereceiver.validationservice)
 
     def test_popuplauncher(self):
         self.assertEqual(popuplauncher, receivednewmessagereceiver.popuplauncher)
@@ -61,15 +61,26 @@ class TestReceivedNewMessageReceiver(unittest.TestCase):
     def test_valid_kwargs_class_attr_equals_instance_attr(self):
         self.assertEqual(self.x.valid_kwarg_keys, receivednewmessagereceiver.ReceivedNewMessageReceiver.kwarg_keys)
 
-    @patch('executor.receivers.receivednewmessagereceiver.messagevalidator.MessageValidator')
-    def test_validate_message_inits_validator_with_args_calls_validate_returns_validator(self, validator):
-        payload_dict = dict()
-        result = self.x.validate_message(payload_dict)
-        validator.assert_called_with(payload_dict,
-                                     self.x.gpg_datacontext.get_home_dir(),
-                                     self.x.root_params.get_session_passphrase_observable())
-        validator().validate.assert_called_with()
-        self.assertIsNotNone(result)
+    @patch.object(validationservice, 'service')
+    def test_validate_message_submits_job_with_args_returns_future(self, service):
+        incoming_payload = dict(payload=dict())
+        result = self.x.validate_message(incoming_payload)
+        job, args, callback = service.submit.call_args[0]
+        self.assertEqual(job, validationservice.validate_message)
+        self.assertEqual(args, (incoming_payload['payload'],
+                                self.x.gpg_datacontext.get_home_dir(),
+                                self.x.root_params.get_session_passphrase_observable()))
+        self.assertEqual(result, service.submit.return_value)
+
+    @patch.object(validationservice, 'service')
+    def test_validate_message_callback_puts_payload_with_validation_to_root_queue(self, service):
+        incoming_payload = dict(desc=constants.command_list.Received_New_Message, payload=dict())
+        self.x.validate_message(incoming_payload)
+        callback = service.submit.call_args[0][2]
+        validation = validationservice.ValidationResult(True, None, dict(), None)
+        callback(validation)
+        target = dict(incoming_payload, validation=validation)
+        self.x.root_params.root_queue.put.assert_called_with(target)
 
     def test_message_controller_update_received_message_calls_method_with_arg(self):
         self.x.message_controller_update_received_messages_treeview()
@@ -177,21 +188,23 @@ class TestReceivedNewMessageReceiver(unittest.TestCase):
         self.x.launch_blink_alert(msg)
         popup_func.assert_called_with(self.x.root_params.root, msg)
 
-    def test_execute_calls_validator_with_payload(self):
+    def test_execute_calls_validate_message_with_payload_without_validation(self):
         incoming_payload = dict(payload=dict())
         target = self.x.validate_message = MagicMock()
-        sub = self.x.launch_blink_alert = MagicMock()
-        self.x.execute(incoming_payload)
-        target.assert_called_with(incoming_payload['payload'])
+        sub = self.x.database_facade_insert_received_message = MagicMock()
+        result = self.x.execute(incoming_payload)
+        target.assert_called_with(incoming_payload)
+        self.assertIsNone(result)
+        self.assertFalse(sub.called)
 
     def test_execute_calls_correct_methods_if_validator_valid(self):
         class MockValidator:
             valid = True
             data_dict = dict()
             verify_result = dict()
-        incoming_payload = dict(payload=dict())
         validator = MockValidator()
-        validate_method = self.x.validate_message = MagicMock(return_value=validator)
+        incoming_payload = dict(payload=dict(), validation=validator)
+        validate_method = self.x.validate_message = MagicMock()
         target_1 = self.x.database_facade_insert_received_message = MagicMock()
         target_2 = self.x.check_peer_contact_from_new_message = MagicMock()
         target_3 = self.x.message_controller_update_received_messages_treeview = MagicMock()
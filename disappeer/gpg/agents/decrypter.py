@@ -16,5 +16,6 @@ class Decrypter(gpgagent.GPGAgent):
         super().__init__(key_dir)
 
     def execute(self, ciphertext, passphrase):
-        result = self.gpg.decrypt(ciphertext, passphrase=passphrase)
+        with self.timed('decrypt'):
+            result = self.gpg.decrypt(ciphertext, passphrase=passphrase)
         return result
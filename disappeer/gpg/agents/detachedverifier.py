@@ -8,6 +8,7 @@ License: GPLv3
 """
 
 from disappeer.gpg.agents import gpgagent
+from disappeer.gpg.helpers import memoryfile
 
 
 class DetachedVerifier(gpgagent.GPGAgent):
@@ -16,6 +17,12 @@ class DetachedVerifier(gpgagent.GPGAgent):
         super().__init__(keydir)
 
     def execute(self, path_to_sig_file, data_bytestring):
-        result = self.gpg.verify_data(path_to_sig_file, data_bytestring)
+        with self.timed('verify_detached'):
+            result = self.gpg.verify_data(path_to_sig_file, data_bytestring)
         return result
 
+    def verify_bytes(self, sig_bytestring, data_bytestring):
+        """Verify with the signature held in memory instead of a file on disk"""
+        with memoryfile.memory_file(sig_bytestring) as path_to_sig_file:
+            return self.execute(path_to_sig_file, data_bytestring)
+
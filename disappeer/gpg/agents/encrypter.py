@@ -16,6 +16,7 @@ class Encrypter(gpgagent.GPGAgent):
         super().__init__(key_dir)
 
     def execute(self, plaintext, fingerprint):
-        result = self.gpg.encrypt(plaintext, fingerprint, always_trust=True)
+        with self.timed('encrypt'):
+            result = self.gpg.encrypt(plaintext, fingerprint, always_trust=True)
         return result
 
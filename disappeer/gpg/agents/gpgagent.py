@@ -7,7 +7,13 @@ Copyright (C) 2018 Disappeer Labs
 License: GPLv3
 """
 
-import gnupg
+from disappeer.gpg.agents import gpgpool
+from disappeer.gpg.helpers import keyindex
+from disappeer.utilities import metrics
+
+
+gpg_seconds = gpgpool.gpg_seconds
+gpg_in_flight = metrics.registry.gauge('disappeer_gpg_calls_in_flight', 'gpg calls running, per operation')
 
 
 class GPGAgent:
@@ -17,11 +23,17 @@ class GPGAgent:
         self.gpg = self.get_gpg_obj()
 
     def get_gpg_obj(self):
-        """Create a new gpg obj at self,home and return it"""
-        gpg_obj = gnupg.GPG(gnupghome=self.home)
-        gpg_obj.encoding = 'utf-8'
-        return gpg_obj
+        """Return a gpg obj at self.home from the shared pool, only the first for a home dir runs gpg"""
+        return gpgpool.pool.get(self.home)
 
     def set(self, key_dir):
         self.home = key_dir
-        self.gpg = self.get_gpg_obj()
\ No newline at end of file
+        self.gpg = self.get_gpg_obj()
+
+    def timed(self, operation):
+        """Context manager reporting the gpg call in its block as operation"""
+        return metrics.timer(gpg_seconds, gpg_in_flight, operation=operation)
+
+    def keyring_changed(self):
+        """Drop the cached key lists of self.home, called after importing, creating or deleting keys"""
+        keyindex.cache.invalidate(self.home)
@@ -0,0 +1,77 @@
+"""
+gpgpool.py
+
+Module for the GPGPool class object, configured gnupg.GPG objects per home dir.
+
+Constructing gnupg.GPG runs a gpg --version subprocess. The pool constructs one object per
+home dir, then hands out shallow copies of it: a copy costs no subprocess, and attributes an
+agent sets on its copy stay with that agent.
+
+Copyright (C) 2018 Disappeer Labs
+License: GPLv3
+"""
+
+import collections
+import copy
+import threading
+import gnupg
+from disappeer import settings
+from disappeer.utilities import metrics
+
+
+gpg_seconds = metrics.registry.histogram('disappeer_gpg_seconds',
+                                         'Seconds spent in gpg calls, per operation, init is the gpg --version probe')
+
+
+class GPGPool:
+
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries or settings.gpg_pool_max_homedirs
+        self.lock = threading.Lock()
+        self.entries = collections.OrderedDict()
+        self.hit_count = 0
+        self.miss_count = 0
+
+    def get(self, home_dir):
+        """
+        Return a gnupg.GPG object for home_dir, only the first request for a home dir runs gpg
+        """
+        with self.lock:
+            gpg_obj = self.entries.get(home_dir)
+            if gpg_obj is not None:
+                self.entries.move_to_end(home_dir)
+                self.hit_count += 1
+                return copy.copy(gpg_obj)
+            self.miss_count += 1
+        gpg_obj = self.create(home_dir)
+        with self.lock:
+            self.entries[home_dir] = gpg_obj
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return copy.copy(gpg_obj)
+
+    def create(self, home_dir):
+        with metrics.timer(gpg_seconds, operation='init'):
+            gpg_obj = gnupg.GPG(gnupghome=home_dir)
+        gpg_obj.encoding = 'utf-8'
+        return gpg_obj
+
+    def invalidate(self, home_dir=None):
+        """
+        Forget the object for home_dir, or all objects without a home_dir
+        """
+        with self.lock:
+            if home_dir is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(home_dir, None)
+
+    def get_stats(self):
+        with self.lock:
+            return dict(entries=len(self.entries),
+                        hits=self.hit_count,
+                        misses=self.miss_count)
+
+
+# Shared by all gpg agents
+pool = GPGPool()
@@ -27,8 +27,10 @@ class KeyCreator(gpgagent.GPGAgent):
         t.start()
 
     def _create_new_key_worker(self, key_input_dict):
-        input_data = self.gpg.gen_key_input(**key_input_dict)
-        result = self.gpg.gen_key(input_data)
+        with self.timed('gen_key'):
+            input_data = self.gpg.gen_key_input(**key_input_dict)
+            result = self.gpg.gen_key(input_data)
+        self.keyring_changed()
         desc = command_list.Create_New_Key
         payload = {"desc": desc, "result": result}
         self.queue.put(payload)
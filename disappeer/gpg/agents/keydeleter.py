@@ -20,5 +20,7 @@ class KeyDeleter(gpgagent.GPGAgent):
         #           - True flag allows to delete secret key
         #           - but python-gnupg does not provide interface for passphrase
         # prep = self.gpg.delete_keys(key_fingerprint_list, True)
-        result = self.gpg.delete_keys(key_fingerprint_list)
+        with self.timed('delete_keys'):
+            result = self.gpg.delete_keys(key_fingerprint_list)
+        self.keyring_changed()
         return result
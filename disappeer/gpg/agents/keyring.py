@@ -7,7 +7,10 @@ Copyright (C) 2018 Disappeer Labs
 License: GPLv3
 """
 
+import copy
+import gnupg
 from disappeer.gpg.agents import gpgagent
+from disappeer.gpg.helpers import keyindex
 
 
 class KeyRing(gpgagent.GPGAgent):
@@ -16,13 +19,28 @@ class KeyRing(gpgagent.GPGAgent):
         super().__init__(key_dir)
 
     def get_raw_key_list(self, secret=False):
-        result = self.gpg.list_keys(secret=secret)
+        """Return a copy of the cached key list, so callers can change it without touching the shared index"""
+        keys = self.get_key_index(secret=secret).keys
+        result = gnupg.ListKeys(self.gpg)
+        result.extend(copy.deepcopy(key) for key in keys)
+        return result
+
+    def get_key_index(self, secret=False):
+        """Return the shared KeyIndex of self.home, gpg lists the keys only after the keyring changed"""
+        return keyindex.cache.get(self, secret=secret)
+
+    def list_keys(self, secret=False):
+        with self.timed('list_keys'):
+            result = self.gpg.list_keys(secret=secret)
         return result
 
     def export_key(self, identifier):
-        result = self.gpg.export_keys(identifier)
+        with self.timed('export_keys'):
+            result = self.gpg.export_keys(identifier)
         return result
 
     def import_key(self, pub_key):
-        result = self.gpg.import_keys(pub_key)
+        with self.timed('import_keys'):
+            result = self.gpg.import_keys(pub_key)
+        self.keyring_changed()
         return result
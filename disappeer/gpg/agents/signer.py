@@ -16,8 +16,9 @@ class Signer(gpgagent.GPGAgent):
         super().__init__(key_dir)
 
     def execute(self, message, fingerprint, passphrase, detach=False):
-        result = self.gpg.sign(message,
-                               keyid=fingerprint,
-                               passphrase=passphrase,
-                               detach=detach)
+        with self.timed('sign'):
+            result = self.gpg.sign(message,
+                                   keyid=fingerprint,
+                                   passphrase=passphrase,
+                                   detach=detach)
         return result
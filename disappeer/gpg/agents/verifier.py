@@ -16,6 +16,7 @@ class Verifier(gpgagent.GPGAgent):
         super().__init__(keydir)
 
     def execute(self, message):
-        result = self.gpg.verify(message)
+        with self.timed('verify'):
+            result = self.gpg.verify(message)
         return result
 
@@ -0,0 +1,127 @@
+"""
+armor.py
+
+Module with OpenPGP ASCII armor helper functions (RFC 4880 section 6), no gpg subprocess involved
+
+Copyright (C) 2018 Disappeer Labs
+License: GPLv3
+"""
+
+import base64
+import binascii
+import collections
+import re
+
+ArmoredBlock = collections.namedtuple('ArmoredBlock', ['block_type', 'headers', 'data', 'checksum'])
+
+line_length = 64
+crc24_init = 0xB704CE
+crc24_poly = 0x1864CFB
+
+begin_pattern = re.compile(r'-----BEGIN (?P<type>[A-Z0-9 ,/]+)-----')
+checksum_pattern = re.compile(r'[A-Za-z0-9+/]{4}')
+
+
+def _build_crc24_table():
+    table = []
+    for byte in range(256):
+        crc = byte << 16
+        for _ in range(8):
+            crc <<= 1
+            if crc & 0x1000000:
+                crc ^= crc24_poly
+        table.append(crc & 0xFFFFFF)
+    return table
+
+
+crc24_table = _build_crc24_table()
+
+
+def crc24(data):
+    crc = crc24_init
+    table = crc24_table
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFFFF) ^ table[((crc >> 16) ^ byte) & 0xFF]
+    return crc
+
+
+def armor(block_type, data, headers=(), checksum=True):
+    """
+    Take block type string, raw packet bytes and header lines, return armored text as gpg writes it
+    """
+    checksum_line = encode_checksum(data) if checksum else None
+    return format_block(block_type, headers, data, checksum_line)
+
+
+def encode_checksum(data):
+    return base64.b64encode(crc24(data).to_bytes(3, 'big')).decode('ascii')
+
+
+def format_block(block_type, headers, data, checksum_line):
+    encoded = base64.b64encode(data).decode('ascii')
+    lines = ['-----BEGIN {}-----'.format(block_type)]
+    lines.extend(headers)
+    lines.append('')
+    lines.extend(encoded[pos:pos + line_length] for pos in range(0, len(encoded), line_length))
+    if checksum_line is not None:
+        lines.append('=' + checksum_line)
+    lines.append('-----END {}-----'.format(block_type))
+    return '\n'.join(lines) + '\n'
+
+
+def dearmor(text, verify=True):
+    """
+    Take armored text, return ArmoredBlock, or None if text is not exactly one armored block
+    or, with verify set, the checksum does not match
+    """
+    lines = text.split('\n')
+    if lines[-1] == '':
+        lines.pop()
+    if len(lines) < 3:
+        return None
+    begin = begin_pattern.fullmatch(lines[0])
+    if begin is None or lines[-1] != '-----END {}-----'.format(begin.group('type')):
+        return None
+    try:
+        blank = lines.index('', 1, len(lines) - 1)
+    except ValueError:
+        return None
+    headers = tuple(lines[1:blank])
+    body = [line.strip() for line in lines[blank + 1:-1]]
+    checksum = None
+    if body and body[-1].startswith('='):
+        checksum = body.pop()[1:]
+        if not checksum_pattern.fullmatch(checksum):
+            return None
+    try:
+        data = base64.b64decode(''.join(body), validate=True)
+    except binascii.Error:
+        return None
+    if verify and checksum is not None and checksum != encode_checksum(data):
+        return None
+    return ArmoredBlock(begin.group('type'), headers, data, checksum)
+
+
+def search(text, verify=True):
+    """
+    Take text holding an armored block anywhere, such as pasted in a message with CRLF line ends,
+    return the first block as dearmor does, or None
+    """
+    lines = [line.strip() for line in text.split('\n')]
+    for start, line in enumerate(lines):
+        begin = begin_pattern.fullmatch(line)
+        if begin is None:
+            continue
+        end_line = '-----END {}-----'.format(begin.group('type'))
+        if end_line not in lines[start + 1:]:
+            return None
+        end = lines.index(end_line, start + 1)
+        return dearmor('\n'.join(lines[start:end + 1]), verify)
+    return None
+
+
+def rearmor(block):
+    """
+    Inverse of dearmor, reuses the checksum line carried in the block
+    """
+    return format_block(block.block_type, block.headers, block.data, block.checksum)
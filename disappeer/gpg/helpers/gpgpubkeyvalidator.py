@@ -2,14 +2,16 @@
 gpgpubkeyvalidator.py
 
 Module for GPGPubKeyValidator class object.
-Object takes gpg pubkey as input, imports to tempdir, validates with keyring
+Object takes gpg pubkey as input, imports to tempdir, validates with keyring.
+read_key_dict lists a pubkey with the key parser, importing it only if the parser cannot read it.
 
 Copyright (C) 2018 Disappeer Labs
 License: GPLv3
 """
 
 from disappeer.gpg.agents import keyring
-import tempfile
+from disappeer.gpg.helpers import tempkeyringpool
+from disappeer.gpg.helpers import keyparser
 
 
 class GPGPubKeyValidator:
@@ -25,6 +27,9 @@ class GPGPubKeyValidator:
         self.validate()
 
     def validate(self):
+        if not self.is_key_parsable():
+            self.valid = False
+            return
         self.import_pubkey_to_keyring()
         if self.result.count == 1:
             self.valid = True
@@ -32,12 +37,21 @@ class GPGPubKeyValidator:
         else:
             self.valid = False
 
+    def is_key_parsable(self):
+        """
+        Only malformed or oversized keys are rejected before gpg, keys the parser cannot read go on to gpg
+        """
+        try:
+            return keyparser.parse_public_key(self.target_pubkey) is not None
+        except keyparser.UnsupportedPacket:
+            return True
+
     def import_pubkey_to_keyring(self):
         self.result = self.key_ring.import_key(self.target_pubkey)
         return self.result
 
     def create_temp_dir(self):
-        temp_dir = tempfile.TemporaryDirectory()
+        temp_dir = tempkeyringpool.pool.checkout()
         return temp_dir
 
     def close_temp_dir(self):
@@ -48,3 +62,13 @@ class GPGPubKeyValidator:
             self.close_temp_dir()
         except (AttributeError, FileNotFoundError):
             pass
+
+
+def read_key_dict(gpg_pub_key):
+    """
+    Return the key dict of gpg_pub_key, or None if it is invalid
+    """
+    try:
+        return keyparser.parse_public_key(gpg_pub_key)
+    except keyparser.UnsupportedPacket:
+        return GPGPubKeyValidator(gpg_pub_key).key_dict
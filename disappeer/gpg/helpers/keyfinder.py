@@ -14,22 +14,13 @@ class KeyFinder:
         self.key_ring = key_ring
 
     def find(self, identifier):
-        key_list = self.key_ring.get_raw_key_list()
-        search = self._search_list(key_list, identifier)
-        return search
+        return self.key_ring.get_key_index().find(identifier)
 
     def find_secret(self, identifier):
-        key_list = self.key_ring.get_raw_key_list(secret=True)
-        search = self._search_list(key_list, identifier)
-        return search
-
-    def _search_list(self, key_list, identifier):
-        for key in key_list:
-            if key['fingerprint'] == identifier:
-                return key
-            elif key['keyid'] == identifier:
-                return key
-        return None
+        return self.key_ring.get_key_index(secret=True).find(identifier)
+
+    def find_by_uid(self, uid):
+        return self.key_ring.get_key_index().find_by_uid(uid)
 
     def get_fingerprint_by_keyid(self, keyid):
         key = self.find(keyid)
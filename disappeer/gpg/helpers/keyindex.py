@@ -0,0 +1,120 @@
+"""
+keyindex.py
+
+Module for key list lookups without a gpg call per lookup:
+    - KeyIndex, a key list indexed by fingerprint, keyid and uid
+    - KeyIndexCache, the KeyIndex per home dir and secret flag, kept while the keyring files are unchanged
+
+The cache compares the mtime, size and inode of the keyring files on each lookup, changes made
+through gpg agents also invalidate it directly.
+
+Copyright (C) 2018 Disappeer Labs
+License: GPLv3
+"""
+
+import collections
+import os
+import threading
+from disappeer import settings
+
+
+# Files gpg rewrites when public keys, secret keys or trust change, gpg 2.1+ and legacy formats
+keyring_file_names = ('pubring.kbx', 'pubring.gpg', 'trustdb.gpg', 'private-keys-v1.d', 'secring.gpg')
+
+
+class KeyIndex:
+    """
+    Lookups return the first key in the list with a match, as a linear search over it would
+    """
+
+    def __init__(self, key_list):
+        self.keys = key_list
+        self.by_fingerprint = {}
+        self.by_keyid = {}
+        self.by_uid = {}
+        for key in key_list:
+            self.by_fingerprint.setdefault(key['fingerprint'], key)
+            self.by_keyid.setdefault(key['keyid'], key)
+            for uid in key.get('uids', []):
+                self.by_uid.setdefault(uid, key)
+
+    def find(self, identifier):
+        """
+        Return the key dict with identifier as fingerprint or keyid, or None
+        """
+        key = self.by_fingerprint.get(identifier)
+        if key is None:
+            key = self.by_keyid.get(identifier)
+        return key
+
+    def find_by_uid(self, uid):
+        return self.by_uid.get(uid)
+
+    def __len__(self):
+        return len(self.keys)
+
+
+class KeyIndexCache:
+
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries or settings.key_index_max_homedirs
+        self.lock = threading.Lock()
+        self.entries = collections.OrderedDict()
+        self.generation = 0
+        self.hit_count = 0
+        self.miss_count = 0
+
+    def get(self, key_ring, secret=False):
+        """
+        Return the KeyIndex for key_ring, listing keys with key_ring.list_keys only if the keyring changed
+        """
+        key = (key_ring.home, secret)
+        stamp = self.stamp(key_ring.home)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self.entries.move_to_end(key)
+                self.hit_count += 1
+                return entry[1]
+            self.miss_count += 1
+            generation = self.generation
+        index = KeyIndex(key_ring.list_keys(secret=secret))
+        # Not kept if the keyring changed while listing
+        if self.stamp(key_ring.home) == stamp:
+            with self.lock:
+                if self.generation == generation:
+                    self.entries[key] = (stamp, index)
+                    while len(self.entries) > self.max_entries:
+                        self.entries.popitem(last=False)
+        return index
+
+    def stamp(self, home_dir):
+        result = []
+        for name in keyring_file_names:
+            try:
+                stat = os.stat(os.path.join(home_dir, name))
+            except OSError:
+                result.append(None)
+            else:
+                result.append((stat.st_mtime_ns, stat.st_size, stat.st_ino))
+        return tuple(result)
+
+    def invalidate(self, home_dir=None):
+        """
+        Forget the indexes of home_dir, or all indexes without a home_dir
+        """
+        with self.lock:
+            self.generation += 1
+            for key in list(self.entries):
+                if home_dir is None or key[0] == home_dir:
+                    del self.entries[key]
+
+    def get_stats(self):
+        with self.lock:
+            return dict(entries=len(self.entries),
+                        hits=self.hit_count,
+                        misses=self.miss_count)
+
+
+# Shared by all key rings
+cache = KeyIndexCache()
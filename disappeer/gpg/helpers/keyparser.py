@@ -0,0 +1,308 @@
+"""
+keyparser.py
+
+Module for reading an armored OpenPGP public key (RFC 4880 sections 4, 5.2, 5.5, 12.2), no gpg subprocess involved.
+
+parse_public_key returns the key dict gpg lists for the key just after importing it to an empty
+keyring, with the same field names and string values, or None for malformed, oversized or
+multiple keys. Keys this module does not read, such as armor it cannot find or decode, version 5
+keys, curves or algorithms missing from the tables below, or partial body lengths, raise
+UnsupportedPacket, callers leave those keys to gpg. Signatures are read for key expiry and usage but not verified,
+gpg remains the authority wherever a key is trusted.
+
+Copyright (C) 2018 Disappeer Labs
+License: GPLv3
+"""
+
+import hashlib
+import time
+from disappeer import settings
+from disappeer.gpg.helpers import armor
+
+
+tag_signature = 2
+tag_secret_key = 5
+tag_public_key = 6
+tag_secret_subkey = 7
+tag_user_id = 13
+tag_public_subkey = 14
+
+sig_type_direct_key = 0x1F
+sig_types_certification = (0x10, 0x11, 0x12, 0x13)
+sig_type_subkey_binding = 0x18
+sig_type_key_revocation = 0x20
+sig_type_subkey_revocation = 0x28
+
+subpacket_creation_time = 2
+subpacket_key_expiration = 9
+subpacket_issuer = 16
+subpacket_key_flags = 27
+subpacket_issuer_fingerprint = 33
+
+# Number of MPIs before the algorithm specific fields end, for algorithms without a curve
+mpi_counts = {1: 2, 2: 2, 3: 2, 16: 3, 17: 4}
+curve_algorithms = (18, 19, 22)
+
+# Curve OID bytes: (gpg curve name, bits gpg lists as key length)
+curves = {bytes.fromhex('2B06010401DA470F01'): ('ed25519', 255),
+          bytes.fromhex('2B060104019755010501'): ('cv25519', 255),
+          bytes.fromhex('2A8648CE3D030107'): ('nistp256', 256),
+          bytes.fromhex('2B81040022'): ('nistp384', 384),
+          bytes.fromhex('2B81040023'): ('nistp521', 521),
+          bytes.fromhex('2B2403030208010107'): ('brainpoolP256r1', 256),
+          bytes.fromhex('2B240303020801010B'): ('brainpoolP384r1', 384),
+          bytes.fromhex('2B240303020801010D'): ('brainpoolP512r1', 512),
+          bytes.fromhex('2B8104000A'): ('secp256k1', 256)}
+
+# Key usage by algorithm for keys without a key flags subpacket, as gpg derives it
+default_usage = {1: 'esca', 2: 'e', 3: 'sca', 16: 'e', 17: 'sca', 18: 'e', 19: 'sca', 22: 'sca'}
+
+
+class PacketError(ValueError):
+    pass
+
+
+class UnsupportedPacket(Exception):
+    """
+    Packet is well-formed as far as read, but uses a format or algorithm this module does not read
+    """
+
+
+def read_packets(data):
+    """
+    Take packet bytes, yield (tag, body) per packet
+    """
+    pos = 0
+    end = len(data)
+    while pos < end:
+        first = data[pos]
+        pos += 1
+        if not first & 0x80:
+            raise PacketError('Not a packet header')
+        if first & 0x40:
+            tag = first & 0x3F
+            length, pos = read_new_length(data, pos)
+        else:
+            tag = (first >> 2) & 0x0F
+            length_type = first & 0x03
+            if length_type == 3:
+                length = end - pos
+            else:
+                size = (1, 2, 4)[length_type]
+                length = int.from_bytes(read_bytes(data, pos, size), 'big')
+                pos += size
+        yield tag, read_bytes(data, pos, length)
+        pos += length
+
+
+def read_new_length(data, pos):
+    first = read_bytes(data, pos, 1)[0]
+    if first < 192:
+        return first, pos + 1
+    if first < 224:
+        return ((first - 192) << 8) + read_bytes(data, pos + 1, 1)[0] + 192, pos + 2
+    if first == 255:
+        return int.from_bytes(read_bytes(data, pos + 1, 4), 'big'), pos + 5
+    raise UnsupportedPacket('Partial body length in a key')
+
+
+def read_bytes(data, pos, size):
+    if pos + size > len(data):
+        raise PacketError('Truncated packet')
+    return data[pos:pos + size]
+
+
+def read_mpi(body, pos):
+    bits = int.from_bytes(read_bytes(body, pos, 2), 'big')
+    size = (bits + 7) // 8
+    value = int.from_bytes(read_bytes(body, pos + 2, size), 'big')
+    return value, pos + 2 + size
+
+
+def parse_key_packet(body):
+    """
+    Take a version 4 public key or subkey packet body, return a dict of its fields
+    """
+    if read_bytes(body, 0, 6)[0] != 4:
+        raise UnsupportedPacket('Unsupported key version')
+    created = int.from_bytes(body[1:5], 'big')
+    algo = body[5]
+    curve = ''
+    if algo in curve_algorithms:
+        oid_length = read_bytes(body, 6, 1)[0]
+        oid = read_bytes(body, 7, oid_length)
+        if oid not in curves:
+            raise UnsupportedPacket('Unknown curve')
+        curve, length = curves[oid]
+        read_mpi(body, 7 + oid_length)
+    elif algo in mpi_counts:
+        length, pos = read_mpi(body, 6)
+        length = length.bit_length()
+        for _ in range(mpi_counts[algo] - 1):
+            _, pos = read_mpi(body, pos)
+    else:
+        raise UnsupportedPacket('Unknown public key algorithm')
+    digest = hashlib.sha1(b'\x99' + len(body).to_bytes(2, 'big') + body).hexdigest().upper()
+    return dict(fingerprint=digest, keyid=digest[-16:], created=created, algo=algo, length=length, curve=curve)
+
+
+def read_subpackets(data):
+    pos = 0
+    while pos < len(data):
+        length, pos = read_subpacket_length(data, pos)
+        if length == 0:
+            raise PacketError('Empty subpacket')
+        body = read_bytes(data, pos, length)
+        yield body[0] & 0x7F, body[1:]
+        pos += length
+
+
+def read_subpacket_length(data, pos):
+    first = read_bytes(data, pos, 1)[0]
+    if first < 192:
+        return first, pos + 1
+    if first < 255:
+        return ((first - 192) << 8) + read_bytes(data, pos + 1, 1)[0] + 192, pos + 2
+    return int.from_bytes(read_bytes(data, pos + 1, 4), 'big'), pos + 5
+
+
+def parse_signature(body):
+    """
+    Take a signature packet body, return a dict of the fields read, or None for versions other than 4
+    """
+    if read_bytes(body, 0, 1)[0] != 4:
+        return None
+    result = dict(sig_type=read_bytes(body, 0, 6)[1], created=0, key_expires=None, flags=None, issuer=None)
+    hashed_length = int.from_bytes(read_bytes(body, 4, 2), 'big')
+    hashed = read_bytes(body, 6, hashed_length)
+    pos = 6 + hashed_length
+    unhashed_length = int.from_bytes(read_bytes(body, pos, 2), 'big')
+    unhashed = read_bytes(body, pos + 2, unhashed_length)
+    for area, data in (('hashed', hashed), ('unhashed', unhashed)):
+        for subpacket_type, value in read_subpackets(data):
+            if subpacket_type in (subpacket_issuer, subpacket_issuer_fingerprint):
+                result['issuer'] = value.hex().upper()[-16:]
+            elif area == 'hashed' and subpacket_type == subpacket_creation_time and len(value) == 4:
+                result['created'] = int.from_bytes(value, 'big')
+            elif area == 'hashed' and subpacket_type == subpacket_key_expiration and len(value) == 4:
+                result['key_expires'] = int.from_bytes(value, 'big')
+            elif area == 'hashed' and subpacket_type == subpacket_key_flags and value:
+                result['flags'] = value[0]
+    return result
+
+
+def usage(flags, algo):
+    if flags is None:
+        return default_usage[algo]
+    letters = [('e', 0x0C), ('s', 0x02), ('c', 0x01), ('a', 0x20)]
+    return ''.join(letter for letter, mask in letters if flags & mask)
+
+
+class KeyReader:
+    """
+    Collects the packets of one transferable public key
+    """
+
+    def __init__(self):
+        self.primary = None
+        self.uids = []
+        self.subkeys = []
+
+    def read(self, data):
+        current = None
+        for tag, body in read_packets(data):
+            if tag == tag_public_key:
+                if self.primary is not None:
+                    raise PacketError('More than one key')
+                self.primary = current = parse_key_packet(body)
+                current['sigs'] = []
+            elif self.primary is None:
+                raise PacketError('Key does not start with a public key packet')
+            elif tag in (tag_secret_key, tag_secret_subkey):
+                raise PacketError('Secret key material')
+            elif tag == tag_user_id:
+                self.uids.append(body.decode('utf-8', 'replace'))
+            elif tag == tag_public_subkey:
+                current = parse_key_packet(body)
+                current['sigs'] = []
+                self.subkeys.append(current)
+            elif tag == tag_signature:
+                sig = parse_signature(body)
+                if sig is not None and sig['issuer'] in (None, self.primary['keyid']):
+                    current['sigs'].append(sig)
+        if self.primary is None or not self.uids:
+            raise PacketError('No public key with a user id')
+
+    def latest(self, key, sig_types):
+        """
+        Return the newest self signature of key among sig_types, or None
+        """
+        sigs = [sig for sig in key['sigs'] if sig['sig_type'] in sig_types]
+        return max(sigs, key=lambda sig: sig['created']) if sigs else None
+
+    def key_fields(self, key, self_sig, key_type, revoked, now):
+        expires = ''
+        if self_sig is not None and self_sig['key_expires']:
+            expires = str(key['created'] + self_sig['key_expires'])
+        trust = '-'
+        if revoked:
+            trust = 'r'
+        elif expires and int(expires) < now:
+            trust = 'e'
+        return dict(type=key_type,
+                    trust=trust,
+                    length=str(key['length']),
+                    algo=str(key['algo']),
+                    keyid=key['keyid'],
+                    date=str(key['created']),
+                    expires=expires,
+                    dummy='',
+                    curve=key['curve'])
+
+    def key_dict(self, now=None):
+        now = time.time() if now is None else now
+        revoked = self.latest(self.primary, (sig_type_key_revocation,)) is not None
+        primary_sig = self.latest(self.primary, sig_types_certification + (sig_type_direct_key,))
+        result = self.key_fields(self.primary, primary_sig, 'pub', revoked, now)
+        primary_usage = usage(primary_sig['flags'] if primary_sig else None, self.primary['algo'])
+        key_usage = set(primary_usage)
+        subkeys = []
+        subkey_info = {}
+        for subkey in self.subkeys:
+            binding = self.latest(subkey, (sig_type_subkey_binding,))
+            if binding is None:
+                continue
+            subkey_revoked = revoked or self.latest(subkey, (sig_type_subkey_revocation,)) is not None
+            info = self.key_fields(subkey, binding, 'sub', subkey_revoked, now)
+            info['cap'] = usage(binding['flags'], subkey['algo']).replace('c', '')
+            key_usage.update(info['cap'])
+            subkeys.append([subkey['keyid'], info['cap'], subkey['fingerprint']])
+            subkey_info[subkey['keyid']] = info
+        result.update(ownertrust='-',
+                      sig='',
+                      cap=primary_usage + ''.join(letter for letter in 'esca' if letter in key_usage).upper(),
+                      uids=self.uids,
+                      sigs=[],
+                      subkeys=subkeys,
+                      fingerprint=self.primary['fingerprint'],
+                      subkey_info=subkey_info)
+        return result
+
+
+def parse_public_key(text):
+    """
+    Take an armored public key string, return its key dict as gpg lists it, or None if its packets are
+    malformed, it is longer than settings.max_public_key_length, or holds anything but one public key.
+    Raises UnsupportedPacket for a key this module cannot read, armor included, for the caller to hand to gpg.
+    """
+    if not isinstance(text, str) or len(text) > settings.max_public_key_length:
+        return None
+    block = armor.search(text)
+    if block is None or block.block_type != 'PGP PUBLIC KEY BLOCK':
+        raise UnsupportedPacket('No public key armor the parser reads')
+    reader = KeyReader()
+    try:
+        reader.read(block.data)
+    except PacketError:
+        return None
+    return reader.key_dict()
@@ -0,0 +1,83 @@
+"""
+memoryfile.py
+
+Module for handing bytes to a gpg subprocess by path, without writing them to persistent disk.
+
+On Linux the bytes go into an anonymous memfd, which gpg opens by its /proc/<pid>/fd path.
+Otherwise, or if the memfd path cannot be opened, the bytes go into a temporary file on tmpfs
+(/dev/shm), or in the default temporary dir if there is no tmpfs.
+
+Copyright (C) 2018 Disappeer Labs
+License: GPLv3
+"""
+
+import contextlib
+import os
+import tempfile
+
+
+tmpfs_dir = '/dev/shm'
+
+# Whether memfd paths can be opened, probed on first use
+memfd_usable = None
+
+
+def write_all(fd, data):
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+def create_memfd(data):
+    fd = os.memfd_create('disappeer', os.MFD_CLOEXEC)
+    try:
+        write_all(fd, data)
+    except OSError:
+        os.close(fd)
+        raise
+    return fd
+
+
+def memfd_path(fd):
+    return '/proc/{}/fd/{}'.format(os.getpid(), fd)
+
+
+def probe_memfd():
+    if not hasattr(os, 'memfd_create'):
+        return False
+    try:
+        fd = create_memfd(b'probe')
+        try:
+            with open(memfd_path(fd), 'rb') as f:
+                return f.read() == b'probe'
+        finally:
+            os.close(fd)
+    except OSError:
+        return False
+
+
+def get_tmpfs_dir():
+    if os.path.isdir(tmpfs_dir) and os.access(tmpfs_dir, os.W_OK | os.X_OK):
+        return tmpfs_dir
+    return None
+
+
+@contextlib.contextmanager
+def memory_file(data):
+    """
+    Yield a path that reads as data until the block exits
+    """
+    global memfd_usable
+    if memfd_usable is None:
+        memfd_usable = probe_memfd()
+    if memfd_usable:
+        fd = create_memfd(data)
+        try:
+            yield memfd_path(fd)
+        finally:
+            os.close(fd)
+    else:
+        with tempfile.NamedTemporaryFile(dir=get_tmpfs_dir()) as tmp_file:
+            tmp_file.write(data)
+            tmp_file.flush()
+            yield tmp_file.name
@@ -9,7 +9,6 @@ License: GPLv3
 
 from disappeer.gpg.helpers import tempkeyring
 from disappeer.gpg.agents import detachedverifier
-import tempfile
 
 
 class TempDetachedVerifier(tempkeyring.TempKeyRing):
@@ -36,14 +35,11 @@ class TempDetachedVerifier(tempkeyring.TempKeyRing):
         sig_bytes = bytes(self.sig_dict['sig'], 'utf-8')
         data_bytes = bytes(self.sig_dict['data'], 'utf-8')
 
-        with tempfile.NamedTemporaryFile() as tmp_file:
-            tmp_file.write(sig_bytes)
-            tmp_file.seek(0)
-            verify_detached = self.detached_verifier.execute(tmp_file.name, data_bytes)
-            if not verify_detached.valid:
-                self.set_error(verify_detached.stderr)
-            self.valid = verify_detached.valid
-            return verify_detached.valid
+        verify_detached = self.detached_verifier.verify_bytes(sig_bytes, data_bytes)
+        if not verify_detached.valid:
+            self.set_error(verify_detached.stderr)
+        self.valid = verify_detached.valid
+        return verify_detached.valid
 
     def is_sig_dict_valid(self):
         target_list = ['sig', 'data']
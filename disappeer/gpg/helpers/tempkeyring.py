@@ -8,7 +8,7 @@ License: GPLv3
 """
 
 from disappeer.gpg.agents import keyring
-import tempfile
+from disappeer.gpg.helpers import tempkeyringpool
 
 
 class TempKeyRing:
@@ -19,7 +19,7 @@ class TempKeyRing:
         self.key_ring = keyring.KeyRing(self.temp_dir_name)
 
     def create_temp_dir(self):
-        temp_dir = tempfile.TemporaryDirectory()
+        temp_dir = tempkeyringpool.pool.checkout()
         return temp_dir
 
     def close_temp_dir(self):
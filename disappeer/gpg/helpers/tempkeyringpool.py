@@ -0,0 +1,224 @@
+"""
+tempkeyringpool.py
+
+Module for the TempKeyRingPool class object, temporary gpg home dirs kept ready for reuse.
+
+A checkout is used like tempfile.TemporaryDirectory: its name is an empty gpg home dir, and
+cleanup returns it to the pool. Returned home dirs are reset to the empty keyring files gpg
+created for the first one, so gpg does not set up a home dir per use, and the gpg-agent it
+started for a home dir keeps serving it. A home dir with anything the reset does not expect,
+such as secret keys, is removed instead of reused.
+
+Copyright (C) 2018 Disappeer Labs
+License: GPLv3
+"""
+
+import multiprocessing.util
+import os
+import shutil
+import stat
+import tempfile
+import threading
+from disappeer import settings
+from disappeer.gpg.agents import keyring
+from disappeer.gpg.helpers import keyindex
+from disappeer.gpg.helpers import memoryfile
+from disappeer.utilities import metrics
+from disappeer.utilities.logger import log
+
+
+# Files of an empty gpg home dir, copied from the first home dir into the others
+template_file_names = ('pubring.kbx', 'trustdb.gpg')
+
+checkouts = metrics.registry.counter('disappeer_temp_keyring_checkouts_total',
+                                     'Temporary keyring checkouts, by result: reused or created')
+
+
+class TempKeyRingDir:
+    """
+    A checked out home dir, cleanup returns it to the pool once
+    """
+
+    def __init__(self, pool, name):
+        self.pool = pool
+        self.name = name
+        self.released = False
+
+    def cleanup(self):
+        if not self.released:
+            self.released = True
+            self.pool.release(self.name)
+
+    def __enter__(self):
+        return self.name
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.cleanup()
+
+    def __copy__(self):
+        """Copies of an object holding a checkout share it, the home dir is not duplicated"""
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+class TempKeyRingPool:
+
+    def __init__(self, max_idle=None, base_dir=None):
+        self.max_idle = settings.temp_keyring_pool_size if max_idle is None else max_idle
+        self.base_dir = base_dir
+        self.lock = threading.Lock()
+        self.idle = []
+        self.created = set()
+        self.template = None
+        self.pid = os.getpid()
+        self.discard_count = 0
+
+    def checkout(self):
+        return TempKeyRingDir(self, self.acquire())
+
+    def acquire(self):
+        """
+        Return the path of an empty gpg home dir, reused if a healthy one is idle
+        """
+        while True:
+            with self.lock:
+                self.check_pid()
+                path = self.idle.pop() if self.idle else None
+            if path is None:
+                break
+            if self.is_healthy(path):
+                checkouts.inc(result='reused')
+                return path
+            self.discard(path)
+        path = self.create()
+        checkouts.inc(result='created')
+        return path
+
+    def release(self, path):
+        """
+        Reset path and keep it for reuse, or remove it if it fails the reset or the pool is full
+        """
+        keyindex.cache.invalidate(path)
+        with self.lock:
+            self.check_pid()
+            # Already removed by close, or checked out by a parent process
+            if path not in self.created:
+                return None
+            keep = len(self.idle) < self.max_idle
+        if keep and self.reset(path):
+            with self.lock:
+                if path in self.created and len(self.idle) < self.max_idle:
+                    self.idle.append(path)
+                    return None
+        self.discard(path)
+
+    def check_pid(self):
+        """
+        In a forked child, forget the home dirs of the parent, they stay the parent's to use and remove
+        """
+        if os.getpid() != self.pid:
+            self.pid = os.getpid()
+            self.idle = []
+            self.created = set()
+
+    def create(self):
+        base_dir = self.base_dir
+        if base_dir is None and settings.temp_keyring_tmpfs:
+            base_dir = memoryfile.get_tmpfs_dir()
+        path = tempfile.mkdtemp(prefix='disappeer-keyring-', dir=base_dir)
+        with self.lock:
+            self.created.add(path)
+            template = self.template
+        if template is None:
+            template = self.create_template(path)
+        else:
+            self.write_template(path, template)
+        return path
+
+    def create_template(self, path):
+        """
+        Let gpg initialise the keyring files in path, and keep them for later home dirs
+        """
+        keyring.KeyRing(path).list_keys()
+        template = {}
+        for name in template_file_names:
+            file_path = os.path.join(path, name)
+            if os.path.isfile(file_path):
+                with open(file_path, 'rb') as f:
+                    template[name] = f.read()
+        with self.lock:
+            if self.template is None:
+                self.template = template
+        return template
+
+    def write_template(self, path, template):
+        for name, data in template.items():
+            file_path = os.path.join(path, name)
+            with open(file_path + '.tmp', 'wb') as f:
+                f.write(data)
+            os.replace(file_path + '.tmp', file_path)
+
+    def reset(self, path):
+        """
+        Remove what was added to path since checkout and rewrite the keyring files, return False if path is unfit for reuse
+        """
+        if self.template is None or not self.is_healthy(path):
+            return False
+        try:
+            for name in os.listdir(path):
+                file_path = os.path.join(path, name)
+                mode = os.lstat(file_path).st_mode
+                if name in self.template or stat.S_ISSOCK(mode):
+                    continue
+                if name == 'private-keys-v1.d' and stat.S_ISDIR(mode) and not os.listdir(file_path):
+                    continue
+                if not stat.S_ISREG(mode):
+                    return False
+                os.remove(file_path)
+            self.write_template(path, self.template)
+        except OSError as err:
+            log.warning("Temporary keyring {} could not be reset: {}".format(path, err))
+            return False
+        return True
+
+    def is_healthy(self, path):
+        try:
+            path_stat = os.lstat(path)
+        except OSError:
+            return False
+        return (stat.S_ISDIR(path_stat.st_mode)
+                and path_stat.st_uid == os.getuid()
+                and stat.S_IMODE(path_stat.st_mode) == 0o700)
+
+    def discard(self, path):
+        with self.lock:
+            self.created.discard(path)
+            self.discard_count += 1
+        shutil.rmtree(path, ignore_errors=True)
+
+    def close(self):
+        """
+        Remove every home dir this process created, idle or checked out
+        """
+        with self.lock:
+            if os.getpid() != self.pid:
+                return None
+            for path in self.created:
+                shutil.rmtree(path, ignore_errors=True)
+            self.idle = []
+            self.created = set()
+
+    def get_stats(self):
+        with self.lock:
+            return dict(idle=len(self.idle),
+                        created=len(self.created),
+                        discarded=self.discard_count)
+
+
+# Shared by all temporary keyring users
+pool = TempKeyRingPool()
+
+# Run at interpreter exit, and also at the end of multiprocessing workers, which skip atexit
+multiprocessing.util.Finalize(pool, pool.close, exitpriority=0)
@@ -8,8 +8,10 @@ License: GPLv3
 """
 
 import unittest
+from unittest.mock import MagicMock
 from disappeer.gpg.agents import detachedverifier
 from disappeer.gpg.agents import gpgagent
+from disappeer.gpg.helpers import memoryfile
 from disappeer.gpg.agents import signer
 import tempfile
 
@@ -19,6 +21,9 @@ class TestImports(unittest.TestCase):
     def test_gpgagent_import(self):
         self.assertEqual(gpgagent, detachedverifier.gpgagent)
 
+    def test_memoryfile_import(self):
+        self.assertEqual(memoryfile, detachedverifier.memoryfile)
+
 
 class TestVerifierClass(unittest.TestCase):
 
@@ -55,6 +60,27 @@ class TestVerifierClass(unittest.TestCase):
             verify_detached = self.x.execute(tmp_file.name, data)
         self.assertTrue(verify_detached.valid)
 
+    def test_verify_bytes_valid(self):
+        self.message = "Hello world."
+        self.passphrase = 'passphrase'
+        self.s = signer.Signer(self.keydir)
+        sig = self.s.execute(self.message, self.key_fingerprint, self.passphrase, detach=True)
+        verify_detached = self.x.verify_bytes(bytes(str(sig), 'utf-8'), bytes(self.message, 'utf-8'))
+        self.assertTrue(verify_detached.valid)
+
+    def test_verify_bytes_passes_readable_sig_path_to_execute(self):
+        seen = []
+
+        def execute(path_to_sig_file, data_bytestring):
+            with open(path_to_sig_file, 'rb') as f:
+                seen.append(f.read())
+            return 'result'
+        self.x.execute = MagicMock(side_effect=execute)
+        result = self.x.verify_bytes(b'sig', b'data')
+        self.assertEqual(result, 'result')
+        self.assertEqual(seen, [b'sig'])
+        self.assertEqual(self.x.execute.call_args[0][1], b'data')
+
     @unittest.skip("FAILS ON MAC")
     def test_execute_method_not_valid(self):
         self.message = "Hello world."
@@ -8,14 +8,20 @@ License: GPLv3
 """
 
 import unittest
+from unittest.mock import patch
 from gpg.agents import gpgagent
+from disappeer.gpg.agents import gpgpool
+from disappeer.gpg.helpers import keyindex
 import gnupg
 
 
 class TestImports(unittest.TestCase):
 
-    def test_gnupg(self):
-        self.assertEqual(gnupg, gpgagent.gnupg)
+    def test_gpgpool(self):
+        self.assertEqual(gpgpool, gpgagent.gpgpool)
+
+    def test_keyindex(self):
+        self.assertEqual(keyindex, gpgagent.keyindex)
 
 
 class TestAgentClass(unittest.TestCase):
@@ -52,6 +58,23 @@ class TestAgentGetGPGMethod(unittest.TestCase):
         result = self.g.get_gpg_obj()
         self.assertEqual(result.encoding, 'utf-8')
 
+    def test_get_gpg_obj_observes_init_seconds_once_per_home(self):
+        gpgpool.pool.invalidate(self.keydir)
+        before = gpgagent.gpg_seconds.get(operation='init')[1]
+        self.g.get_gpg_obj()
+        self.g.get_gpg_obj()
+        self.assertEqual(gpgagent.gpg_seconds.get(operation='init')[1], before + 1)
+
+    def test_get_gpg_obj_returns_separate_objects(self):
+        result = self.g.get_gpg_obj()
+        self.assertIsNot(result, self.g.gpg)
+
+    def test_timed_observes_operation(self):
+        with self.g.timed('test_operation'):
+            self.assertEqual(gpgagent.gpg_in_flight.get(operation='test_operation'), 1)
+        self.assertEqual(gpgagent.gpg_in_flight.get(operation='test_operation'), 0)
+        self.assertEqual(gpgagent.gpg_seconds.get(operation='test_operation')[1], 1)
+
 
 class TestAgentSetMethod(unittest.TestCase):
 
@@ -67,4 +90,16 @@ class TestAgentSetMethod(unittest.TestCase):
 
     def test_call_instance_check_new_gpg_obj(self):
         self.g.set(self.alt)
-        self.assertEqual(self.g.gpg.gnupghome, self.alt)
\ No newline at end of file
+        self.assertEqual(self.g.gpg.gnupghome, self.alt)
+
+
+class TestAgentKeyringChangedMethod(unittest.TestCase):
+
+    def setUp(self):
+        self.keydir = "tests/data/keys"
+        self.g = gpgagent.GPGAgent(self.keydir)
+
+    def test_keyring_changed_invalidates_home_dir_key_index(self):
+        with patch.object(keyindex.cache, 'invalidate') as target:
+            self.g.keyring_changed()
+        target.assert_called_with(self.keydir)
@@ -0,0 +1,81 @@
+"""
+test_gpgpool.py
+
+Test suite for gpgpool module and GPGPool class object
+
+Copyright (C) 2018 Disappeer Labs
+License: GPLv3
+"""
+
+import unittest
+from unittest.mock import patch
+import threading
+import gnupg
+from gpg.agents import gpgpool
+from disappeer import settings
+
+
+class TestImports(unittest.TestCase):
+
+    def test_gnupg(self):
+        self.assertEqual(gnupg, gpgpool.gnupg)
+
+    def test_threading(self):
+        self.assertEqual(threading, gpgpool.threading)
+
+    def test_settings(self):
+        self.assertEqual(settings, gpgpool.settings)
+
+
+class TestGPGPool(unittest.TestCase):
+
+    def setUp(self):
+        self.keydir = "tests/data/keys"
+        self.alt = "tests/data/altkeys"
+        self.x = gpgpool.GPGPool()
+
+    def test_max_entries_from_settings(self):
+        self.assertEqual(self.x.max_entries, settings.gpg_pool_max_homedirs)
+
+    def test_get_returns_configured_gpg_obj(self):
+        result = self.x.get(self.keydir)
+        self.assertIsInstance(result, gnupg.GPG)
+        self.assertEqual(result.gnupghome, self.keydir)
+        self.assertEqual(result.encoding, 'utf-8')
+
+    def test_get_creates_once_per_home_dir(self):
+        with patch.object(self.x, 'create', wraps=self.x.create) as target:
+            self.x.get(self.keydir)
+            self.x.get(self.keydir)
+            self.x.get(self.alt)
+        self.assertEqual(target.call_count, 2)
+        self.assertEqual(self.x.get_stats(), dict(entries=2, hits=1, misses=2))
+
+    def test_get_returns_copies(self):
+        first = self.x.get(self.keydir)
+        second = self.x.get(self.keydir)
+        self.assertIsNot(first, second)
+        first.encoding = 'latin-1'
+        self.assertEqual(second.encoding, 'utf-8')
+        self.assertEqual(self.x.get(self.keydir).encoding, 'utf-8')
+
+    def test_get_evicts_least_recently_used(self):
+        x = gpgpool.GPGPool(max_entries=1)
+        x.get(self.keydir)
+        x.get(self.alt)
+        self.assertEqual(list(x.entries), [self.alt])
+
+    def test_invalidate_home_dir(self):
+        self.x.get(self.keydir)
+        self.x.get(self.alt)
+        self.x.invalidate(self.keydir)
+        self.assertEqual(list(self.x.entries), [self.alt])
+
+    def test_invalidate_all(self):
+        self.x.get(self.keydir)
+        self.x.get(self.alt)
+        self.x.invalidate()
+        self.assertEqual(self.x.get_stats()['entries'], 0)
+
+    def test_module_pool(self):
+        self.assertIsInstance(gpgpool.pool, gpgpool.GPGPool)
@@ -134,3 +134,9 @@ class TestKeyCreatorClass(unittest.TestCase):
         got = self.queue.get()
         comp = dict(desc=constants.command_list.Create_New_Key, result=target)
         self.assertEqual(comp, got)
+
+    def test_create_new_key_worker_calls_keyring_changed(self):
+        self.x.gpg = MagicMock()
+        target = self.x.keyring_changed = MagicMock()
+        self.x._create_new_key_worker(dict())
+        target.assert_called_with()
@@ -8,6 +8,7 @@ License: GPLv3
 """
 
 import unittest
+from unittest.mock import MagicMock
 from disappeer.gpg.agents import keydeleter
 from disappeer.gpg.agents import gpgagent
 
@@ -40,6 +41,12 @@ class TestKeyDeleterClass(unittest.TestCase):
         check = hasattr(self.d, name)
         self.assertTrue(check)
 
+    def test_execute_calls_keyring_changed(self):
+        self.d.gpg = MagicMock()
+        target = self.d.keyring_changed = MagicMock()
+        self.d.execute(['xxx666'])
+        target.assert_called_with()
+
     @unittest.skip("Skip key deletion, requires lengthy key creation")
     def test_execute_method(self):
         before = self.d.gpg.list_keys()
@@ -8,9 +8,12 @@ License: GPLv3
 """
 
 import unittest
+import copy
+from unittest.mock import MagicMock
 from disappeer.gpg.agents import keyring
 import gnupg
 from disappeer.gpg.agents import gpgagent
+from disappeer.gpg.helpers import keyindex
 
 
 class TestImports(unittest.TestCase):
@@ -18,6 +21,9 @@ class TestImports(unittest.TestCase):
     def test_gpg_agent_import(self):
         self.assertEqual(gpgagent, keyring.gpgagent)
 
+    def test_keyindex(self):
+        self.assertEqual(keyindex, keyring.keyindex)
+
 
 class TestKeyRing(unittest.TestCase):
 
@@ -97,6 +103,37 @@ class TestKeyRingMethods(unittest.TestCase):
         final = result[0]
         self.assertEqual(final['type'], 'sec')
 
+    def test_get_key_index_returns_shared_index(self):
+        result = self.k.get_key_index()
+        self.assertIsInstance(result, keyindex.KeyIndex)
+        self.assertIs(result, keyring.KeyRing(self.keydir).get_key_index())
+        self.assertEqual(result.find(self.mal['keyid'])['fingerprint'], self.mal['fingerprint'])
+
+    def test_get_raw_key_list_does_not_list_unchanged_keyring(self):
+        self.k.get_raw_key_list()
+        target = self.k.list_keys = MagicMock()
+        self.k.get_raw_key_list()
+        self.assertFalse(target.called)
+
+    def test_mutating_get_raw_key_list_result_leaves_next_call_unchanged(self):
+        result = self.k.get_raw_key_list()
+        expected = copy.deepcopy(list(result))
+        result[0]['fingerprint'] = 'changed'
+        result[0]['uids'].append('changed')
+        result.pop()
+        self.assertEqual(self.k.get_raw_key_list(), expected)
+
+    def test_list_keys_calls_gpg(self):
+        target = self.k.gpg.list_keys = MagicMock()
+        self.k.list_keys(secret=True)
+        target.assert_called_with(secret=True)
+
+    def test_import_key_calls_keyring_changed(self):
+        self.k.gpg.import_keys = MagicMock()
+        target = self.k.keyring_changed = MagicMock()
+        self.k.import_key('xxx666')
+        target.assert_called_with()
+
     def test_attribute_export_method(self):
         name = 'export_key'
         check = hasattr(self.k, name)
@@ -0,0 +1,109 @@
+"""
+test_armor.py
+
+Test suite for the armor helper module
+
+Copyright (C) 2018 Disappeer Labs
+License: GPLv3
+"""
+
+import unittest
+import base64
+import os
+from disappeer.gpg.helpers import armor
+
+
+class TestImports(unittest.TestCase):
+
+    def test_base64(self):
+        self.assertEqual(base64, armor.base64)
+
+
+class TestCrc24(unittest.TestCase):
+
+    def test_empty_data_is_init_value(self):
+        self.assertEqual(armor.crc24(b''), armor.crc24_init)
+
+    def test_known_value(self):
+        # Checksum line written by gpg --enarmor for b'hello'
+        self.assertEqual(base64.b64encode(armor.crc24(b'hello').to_bytes(3, 'big')), b'R/WK')
+
+
+class TestArmor(unittest.TestCase):
+
+    def setUp(self):
+        self.data = os.urandom(200)
+        self.text = armor.armor('PGP MESSAGE', self.data)
+
+    def test_armor_layout(self):
+        lines = self.text.split('\n')
+        self.assertEqual(lines[0], '-----BEGIN PGP MESSAGE-----')
+        self.assertEqual(lines[1], '')
+        self.assertEqual(len(lines[2]), armor.line_length)
+        self.assertTrue(lines[-3].startswith('='))
+        self.assertEqual(lines[-2], '-----END PGP MESSAGE-----')
+        self.assertEqual(lines[-1], '')
+
+    def test_dearmor_returns_block(self):
+        result = armor.dearmor(self.text)
+        self.assertEqual(result, armor.ArmoredBlock('PGP MESSAGE', (), self.data, armor.encode_checksum(self.data)))
+
+    def test_rearmor_round_trip(self):
+        self.assertEqual(armor.rearmor(armor.dearmor(self.text)), self.text)
+
+    def test_round_trip_with_headers_and_no_checksum(self):
+        text = armor.armor('PGP PUBLIC KEY BLOCK', self.data, headers=('Version: GnuPG v2',), checksum=False)
+        result = armor.dearmor(text)
+        self.assertEqual(result.headers, ('Version: GnuPG v2',))
+        self.assertIsNone(result.checksum)
+        self.assertEqual(armor.rearmor(result), text)
+
+    def test_dearmor_gpg_output(self):
+        text = ('-----BEGIN PGP ARMORED FILE-----\n'
+                'Comment: Use "gpg --dearmor" for unpacking\n'
+                '\n'
+                'aGVsbG8=\n'
+                '=R/WK\n'
+                '-----END PGP ARMORED FILE-----\n')
+        result = armor.dearmor(text)
+        self.assertEqual(result.data, b'hello')
+        self.assertEqual(armor.rearmor(result), text)
+
+    def test_dearmor_bad_checksum_returns_none(self):
+        lines = self.text.split('\n')
+        lines[-3] = '=AAAA'
+        self.assertIsNone(armor.dearmor('\n'.join(lines)))
+
+    def test_dearmor_without_verify_keeps_checksum_line(self):
+        lines = self.text.split('\n')
+        lines[-3] = '=AAAA'
+        result = armor.dearmor('\n'.join(lines), verify=False)
+        self.assertEqual(result.checksum, 'AAAA')
+
+    def test_dearmor_not_armored_returns_none(self):
+        self.assertIsNone(armor.dearmor('hello world'))
+
+    def test_dearmor_mismatched_end_returns_none(self):
+        self.assertIsNone(armor.dearmor(self.text.replace('END PGP MESSAGE', 'END PGP SIGNATURE')))
+
+    def test_dearmor_trailing_text_returns_none(self):
+        self.assertIsNone(armor.dearmor(self.text + 'extra'))
+
+    def test_dearmor_ignores_whitespace_around_base64_lines(self):
+        lines = self.text.split('\n')
+        lines[2] = lines[2] + ' \t'
+        self.assertEqual(armor.dearmor('\n'.join(lines)).data, self.data)
+
+    def test_search_finds_block_in_text(self):
+        result = armor.search('Here is my key:\n' + self.text + 'thanks')
+        self.assertEqual(result.data, self.data)
+
+    def test_search_reads_crlf_line_ends(self):
+        result = armor.search(self.text.replace('\n', '\r\n'))
+        self.assertEqual(result.data, self.data)
+
+    def test_search_returns_none_without_block(self):
+        self.assertIsNone(armor.search('hello world'))
+
+    def test_search_returns_none_without_end_line(self):
+        self.assertIsNone(armor.search(self.text.replace('END PGP MESSAGE', 'END PGP SIGNATURE')))
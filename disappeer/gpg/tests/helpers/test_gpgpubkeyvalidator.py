@@ -12,7 +12,9 @@ import unittest
 from unittest.mock import MagicMock, patch
 from disappeer.gpg.helpers import gpgpubkeyvalidator
 from disappeer.gpg.agents import keyring
-import tempfile
+from disappeer.gpg.helpers import tempkeyringpool
+from disappeer.gpg.helpers import keyparser
+from disappeer.gpg.helpers import armor
 import copy
 
 
@@ -59,8 +61,11 @@ class TestImports(unittest.TestCase):
     def test_keyring(self):
         self.assertEqual(keyring, gpgpubkeyvalidator.keyring)
 
-    def test_tempfile(self):
-        self.assertEqual(tempfile, gpgpubkeyvalidator.tempfile)
+    def test_tempkeyringpool(self):
+        self.assertEqual(tempkeyringpool, gpgpubkeyvalidator.tempkeyringpool)
+
+    def test_keyparser(self):
+        self.assertEqual(keyparser, gpgpubkeyvalidator.keyparser)
 
 
 class TestClassBasics(unittest.TestCase):
@@ -95,11 +100,11 @@ class TestClassBasics(unittest.TestCase):
 
     def test_create_temp_dir_returns_temp_dir(self):
         result = self.x.create_temp_dir()
-        self.assertIsInstance(result, tempfile.TemporaryDirectory)
+        self.assertIsInstance(result, tempkeyringpool.TempKeyRingDir)
         result.cleanup()
 
     def test_temp_dir_attribute_is_temp_dir(self):
-        self.assertIsInstance(self.x.temp_dir, tempfile.TemporaryDirectory)
+        self.assertIsInstance(self.x.temp_dir, tempkeyringpool.TempKeyRingDir)
 
     def test_close_temp_dir_calls_close_on_temp_dir(self):
         try:
@@ -146,6 +151,39 @@ class TestClassBasics(unittest.TestCase):
         x.validate()
         self.assertIs(x.valid, False)
 
+    def test_validate_skips_import_if_key_does_not_parse(self):
+        self.x.target_pubkey = armor.armor('PGP PUBLIC KEY BLOCK', b'\xc6\x05\x04')
+        target = self.x.import_pubkey_to_keyring = MagicMock()
+        self.x.validate()
+        self.assertFalse(target.called)
+        self.assertIs(self.x.valid, False)
+
+    def test_validate_accepts_key_pasted_inside_text(self):
+        x = gpgpubkeyvalidator.GPGPubKeyValidator('Here is my key:\n' + self.valid_pubkey + '\nthanks')
+        self.assertIs(x.valid, True)
+
+    def test_validate_imports_key_the_parser_does_not_read(self):
+        target = self.x.key_ring.import_key = MagicMock()
+        target.return_value.count = 0
+        with patch.object(gpgpubkeyvalidator.keyparser, 'parse_public_key', side_effect=keyparser.UnsupportedPacket):
+            self.x.validate()
+        target.assert_called_with(self.x.target_pubkey)
+        self.assertIs(self.x.valid, False)
+
+    def test_read_key_dict_parses_key(self):
+        self.assertEqual(gpgpubkeyvalidator.read_key_dict(self.valid_pubkey),
+                         keyparser.parse_public_key(self.valid_pubkey))
+
+    def test_read_key_dict_none_on_invalid_key(self):
+        self.assertIsNone(gpgpubkeyvalidator.read_key_dict(self.invalid_pubkey))
+
+    @patch.object(gpgpubkeyvalidator, 'GPGPubKeyValidator')
+    def test_read_key_dict_imports_key_the_parser_does_not_read(self, validator):
+        with patch.object(gpgpubkeyvalidator.keyparser, 'parse_public_key', side_effect=keyparser.UnsupportedPacket):
+            result = gpgpubkeyvalidator.read_key_dict(self.valid_pubkey)
+        validator.assert_called_with(self.valid_pubkey)
+        self.assertEqual(result, validator.return_value.key_dict)
+
     def test_validate_sets_key_dict_on_valid(self):
         self.x.validate()
         target = self.x.key_ring.get_raw_key_list()[0]
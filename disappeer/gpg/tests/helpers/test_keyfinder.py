@@ -92,28 +92,13 @@ class TestKeyMakerClass(unittest.TestCase):
         result = self.key_finder.find_secret('xxx6666')
         self.assertIsNone(result)
 
-    # Key List Loop Method
-    def test_has_search_list_method(self):
-        name = '_search_list'
-        check = hasattr(self.key_finder, name)
-        self.assertTrue(check)
+    # FIND BY UID METHOD
+    def test_find_by_uid_returns_key_dict(self):
+        result = self.key_finder.find_by_uid(self.mal['uids'][0])
+        self.assertEqual(result['fingerprint'], self.mal['fingerprint'])
 
-    def test_search_list_valid_fingerprint(self):
-        key_dict = self.key_finder.find(self.valid_fingerprint)
-        key_list = [key_dict]
-        result = self.key_finder._search_list(key_list, self.valid_fingerprint)
-        self.assertEqual(key_dict, result)
-
-    def test_search_list_valid_secret_fingerprint(self):
-        key_dict = self.key_finder.find(self.valid_secret_fingerprint)
-        key_list = [key_dict]
-        result = self.key_finder._search_list(key_list, self.valid_secret_keyid)
-        self.assertEqual(key_dict, result)
-
-    def test_search_list_not_valid_returns_none(self):
-        key_dict = self.key_finder.find(self.valid_fingerprint)
-        key_list = [key_dict]
-        result = self.key_finder._search_list(key_list, 'xxxx')
+    def test_find_by_uid_returns_none_on_invalid(self):
+        result = self.key_finder.find_by_uid('xxx6666')
         self.assertIsNone(result)
 
     # Get Fingerprint By KeyID
@@ -0,0 +1,160 @@
+"""
+test_keyindex.py
+
+Test suite for keyindex module, KeyIndex and KeyIndexCache class objects
+
+Copyright (C) 2018 Disappeer Labs
+License: GPLv3
+"""
+
+import unittest
+from unittest.mock import MagicMock
+import os
+import shutil
+import tempfile
+import threading
+from disappeer.gpg.helpers import keyindex
+from disappeer import settings
+
+
+class TestImports(unittest.TestCase):
+
+    def test_os(self):
+        self.assertEqual(os, keyindex.os)
+
+    def test_threading(self):
+        self.assertEqual(threading, keyindex.threading)
+
+    def test_settings(self):
+        self.assertEqual(settings, keyindex.settings)
+
+
+class TestKeyIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.alice = {'fingerprint': 'AA74BBFE8A31ADBC0E9ED26B190DB52959AC3560',
+                      'keyid': '190DB52959AC3560',
+                      'uids': ['alice (in wonderland) <alice@email.com>']}
+        self.bob = {'fingerprint': '0AB3D6D8C1AB9E9B2A9C5E8C1E37A3C7D7C30F43',
+                    'keyid': '1E37A3C7D7C30F43',
+                    'uids': ['bob <bob@email.com>', 'bob (work) <bob@work.com>']}
+        self.x = keyindex.KeyIndex([self.alice, self.bob])
+
+    def test_keys_attribute(self):
+        self.assertEqual(self.x.keys, [self.alice, self.bob])
+
+    def test_len(self):
+        self.assertEqual(len(self.x), 2)
+
+    def test_find_by_fingerprint(self):
+        self.assertIs(self.x.find(self.bob['fingerprint']), self.bob)
+
+    def test_find_by_keyid(self):
+        self.assertIs(self.x.find(self.alice['keyid']), self.alice)
+
+    def test_find_returns_none_on_invalid(self):
+        self.assertIsNone(self.x.find('xxx666'))
+
+    def test_find_by_uid_any_uid(self):
+        self.assertIs(self.x.find_by_uid('bob (work) <bob@work.com>'), self.bob)
+
+    def test_find_by_uid_returns_none_on_invalid(self):
+        self.assertIsNone(self.x.find_by_uid('carol <carol@email.com>'))
+
+    def test_duplicate_returns_first(self):
+        duplicate = dict(self.alice)
+        x = keyindex.KeyIndex([self.alice, duplicate])
+        self.assertIs(x.find(self.alice['keyid']), self.alice)
+
+
+class TestKeyIndexCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.pubring = os.path.join(self.temp_dir, 'pubring.kbx')
+        self.write_pubring(b'one')
+        self.key = {'fingerprint': 'AA74BBFE8A31ADBC0E9ED26B190DB52959AC3560',
+                    'keyid': '190DB52959AC3560',
+                    'uids': ['alice (in wonderland) <alice@email.com>']}
+        self.key_ring = MagicMock(home=self.temp_dir)
+        self.key_ring.list_keys.return_value = [self.key]
+        self.x = keyindex.KeyIndexCache()
+
+    def write_pubring(self, data):
+        with open(self.pubring, 'wb') as f:
+            f.write(data)
+
+    def test_max_entries_from_settings(self):
+        self.assertEqual(self.x.max_entries, settings.key_index_max_homedirs)
+
+    def test_get_returns_index(self):
+        result = self.x.get(self.key_ring)
+        self.assertIsInstance(result, keyindex.KeyIndex)
+        self.assertIs(result.find(self.key['keyid']), self.key)
+        self.key_ring.list_keys.assert_called_with(secret=False)
+
+    def test_get_lists_once_while_unchanged(self):
+        first = self.x.get(self.key_ring)
+        second = self.x.get(self.key_ring)
+        self.assertIs(first, second)
+        self.assertEqual(self.key_ring.list_keys.call_count, 1)
+        self.assertEqual(self.x.get_stats(), dict(entries=1, hits=1, misses=1))
+
+    def test_get_secret_is_separate_entry(self):
+        self.x.get(self.key_ring)
+        self.x.get(self.key_ring, secret=True)
+        self.key_ring.list_keys.assert_called_with(secret=True)
+        self.assertEqual(self.key_ring.list_keys.call_count, 2)
+
+    def test_get_relists_after_keyring_file_changes(self):
+        self.x.get(self.key_ring)
+        self.write_pubring(b'one plus another key')
+        self.x.get(self.key_ring)
+        self.assertEqual(self.key_ring.list_keys.call_count, 2)
+
+    def test_get_relists_after_keyring_file_created(self):
+        os.remove(self.pubring)
+        self.x.get(self.key_ring)
+        self.write_pubring(b'one')
+        self.x.get(self.key_ring)
+        self.assertEqual(self.key_ring.list_keys.call_count, 2)
+
+    def test_get_does_not_keep_index_if_keyring_changed_while_listing(self):
+        def list_keys(secret):
+            self.write_pubring(b'changed while listing')
+            return [self.key]
+        self.key_ring.list_keys.side_effect = list_keys
+        self.x.get(self.key_ring)
+        self.assertEqual(self.x.get_stats()['entries'], 0)
+
+    def test_get_does_not_keep_index_if_invalidated_while_listing(self):
+        def list_keys(secret):
+            self.x.invalidate(self.temp_dir)
+            return [self.key]
+        self.key_ring.list_keys.side_effect = list_keys
+        self.x.get(self.key_ring)
+        self.assertEqual(self.x.get_stats()['entries'], 0)
+
+    def test_get_evicts_least_recently_used(self):
+        x = keyindex.KeyIndexCache(max_entries=1)
+        x.get(self.key_ring)
+        x.get(self.key_ring, secret=True)
+        self.assertEqual(list(x.entries), [(self.temp_dir, True)])
+
+    def test_invalidate_home_dir(self):
+        other = MagicMock(home='tests/data/altkeys')
+        other.list_keys.return_value = []
+        self.x.get(self.key_ring)
+        self.x.get(self.key_ring, secret=True)
+        self.x.get(other)
+        self.x.invalidate(self.temp_dir)
+        self.assertEqual(list(self.x.entries), [('tests/data/altkeys', False)])
+
+    def test_invalidate_all(self):
+        self.x.get(self.key_ring)
+        self.x.invalidate()
+        self.assertEqual(self.x.get_stats()['entries'], 0)
+
+    def test_module_cache(self):
+        self.assertIsInstance(keyindex.cache, keyindex.KeyIndexCache)
@@ -0,0 +1,193 @@
+"""
+test_keyparser.py
+
+Test suite for keyparser module
+
+Copyright (C) 2018 Disappeer Labs
+License: GPLv3
+"""
+
+import unittest
+from unittest.mock import patch
+import hashlib
+import tempfile
+from disappeer import settings
+from disappeer.gpg.helpers import keyparser
+from disappeer.gpg.helpers import armor
+from disappeer.gpg.agents import keyring
+
+
+key_dir = 'tests/data/keys'
+
+ed25519_pubkey = '''-----BEGIN PGP PUBLIC KEY BLOCK-----
+
+mDMEatTnhhYJKwYBBAHaRw8BAQdAqTplcINpJFGRqzC4lCl7VI6QrlvGKaf/IcdP
+cMl4a1e0GmJvYiAodGVzdCkgPGJvYkBlbWFpbC5jb20+iJYEExYIAD4WIQQRpryQ
+xB5cHWuvKh9AqYgaDjQZGAUCatTnhgIbAwUJBgeZugULCQgHAgYVCgkICwIEFgID
+AQIeAQIXgAAKCRBAqYgaDjQZGGY7AP9e8VQjM8VTRN/tNmWEEb7zHdyxrbni6EU3
+Zjsxl0BMnAD+MHIiQ679rzeUOs+7oME9zRloAHkTVO4m1m6044gp6QC0EmJvYiA8
+Ym9iQHdvcmsuY29tPoiWBBMWCAA+FiEEEaa8kMQeXB1rryofQKmIGg40GRgFAmrU
+54YCGwMFCQYHmboFCwkIBwIGFQoJCAsCBBYCAwECHgECF4AACgkQQKmIGg40GRjK
++gEA0tBzaKWL6d6r1X9ufHjOuc3p4Z7CDGIoK91FAs23YF0A/jiulL5DLpVszt/6
+LfuKdiz4cDwsgeGaf7q5LWtAtAQKuDgEatTnhhIKKwYBBAGXVQEFAQEHQAJXxxOr
+UySFn7taG2Fa2r5SDUB8V/rDVGdEq9MX0bc8AwEIB4h+BBgWCAAmFiEEEaa8kMQe
+XB1rryofQKmIGg40GRgFAmrU54YCGwwFCQYHmboACgkQQKmIGg40GRjMrAD+O6Uj
+uzkDmRFt8OD11nf016a8z0b/GFbBRv/Eo7RQA8IA/18+ahLrU8gZHTdCHAW1rU6C
+bUCZDUNsQE2CKpURStwB
+=/IEQ
+-----END PGP PUBLIC KEY BLOCK-----'''
+
+
+def encode_packet(tag, body):
+    if len(body) < 192:
+        length = bytes([len(body)])
+    else:
+        length = bytes([((len(body) - 192) >> 8) + 192, (len(body) - 192) & 0xFF])
+    return bytes([0xC0 | tag]) + length + body
+
+
+def ed25519_with_primary(edit):
+    """
+    Armored ed25519_pubkey with its public key packet body passed through edit
+    """
+    packets = list(keyparser.read_packets(armor.dearmor(ed25519_pubkey).data))
+    tag, body = packets[0]
+    packets[0] = (tag, edit(bytes(body)))
+    data = b''.join(encode_packet(tag, body) for tag, body in packets)
+    return armor.armor('PGP PUBLIC KEY BLOCK', data)
+
+
+class TestImports(unittest.TestCase):
+
+    def test_hashlib(self):
+        self.assertEqual(hashlib, keyparser.hashlib)
+
+    def test_settings(self):
+        self.assertEqual(settings, keyparser.settings)
+
+    def test_armor(self):
+        self.assertEqual(armor, keyparser.armor)
+
+
+class TestParsePublicKey(unittest.TestCase):
+
+    def setUp(self):
+        self.key_ring = keyring.KeyRing(key_dir)
+        self.alice_pubkey = self.key_ring.export_key('AA74BBFE8A31ADBC0E9ED26B190DB52959AC3560')
+
+    def alice_packets(self):
+        return armor.dearmor(self.alice_pubkey).data
+
+    def test_rsa_key_fields_match_gpg(self):
+        target = self.key_ring.list_keys()[0]
+        result = keyparser.parse_public_key(self.alice_pubkey)
+        for name in ('length', 'algo', 'keyid', 'date', 'expires', 'uids', 'subkeys', 'fingerprint'):
+            self.assertEqual(result[name], target[name])
+        self.assertEqual(result['cap'], 'escaESCA')
+        self.assertEqual(result['subkey_info']['A58D508E0BE72B6D']['algo'], '16')
+
+    def test_ed25519_key_fields_match_gpg(self):
+        result = keyparser.parse_public_key(ed25519_pubkey)
+        self.assertEqual(result['fingerprint'], '11A6BC90C41E5C1D6BAF2A1F40A9881A0E341918')
+        self.assertEqual(result['keyid'], '40A9881A0E341918')
+        self.assertEqual(result['algo'], '22')
+        self.assertEqual(result['length'], '255')
+        self.assertEqual(result['curve'], 'ed25519')
+        self.assertEqual(result['date'], '1792337798')
+        self.assertEqual(result['expires'], '1893499200')
+        self.assertEqual(result['cap'], 'scESC')
+        self.assertEqual(result['uids'], ['bob (test) <bob@email.com>', 'bob <bob@work.com>'])
+        self.assertEqual(result['subkeys'], [['839495730CB0686D', 'e', '437E96CD1BC54CBCFA746062839495730CB0686D']])
+        self.assertEqual(result['subkey_info']['839495730CB0686D']['curve'], 'cv25519')
+
+    def test_expired_key_trust_is_e(self):
+        reader = keyparser.KeyReader()
+        reader.read(armor.dearmor(ed25519_pubkey).data)
+        result = reader.key_dict(now=1893499201)
+        self.assertEqual(result['trust'], 'e')
+
+    def gpg_import_count(self, text):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            return keyring.KeyRing(temp_dir).import_key(text).count
+
+    def test_trailing_space_on_base64_line_matches_gpg(self):
+        lines = ed25519_pubkey.split('\n')
+        lines[3] = lines[3] + ' '
+        text = '\n'.join(lines)
+        self.assertEqual(self.gpg_import_count(text), 1)
+        self.assertEqual(keyparser.parse_public_key(text), keyparser.parse_public_key(ed25519_pubkey))
+
+    def test_armor_inside_text_matches_gpg(self):
+        text = 'Here is my key:\n' + ed25519_pubkey + '\nthanks'
+        self.assertEqual(self.gpg_import_count(text), 1)
+        self.assertEqual(keyparser.parse_public_key(text), keyparser.parse_public_key(ed25519_pubkey))
+
+    def test_crlf_line_ends_match_gpg(self):
+        text = ed25519_pubkey.replace('\n', '\r\n')
+        self.assertEqual(self.gpg_import_count(text), 1)
+        self.assertEqual(keyparser.parse_public_key(text), keyparser.parse_public_key(ed25519_pubkey))
+
+    def test_text_without_armor_raises_unsupported(self):
+        with self.assertRaises(keyparser.UnsupportedPacket):
+            keyparser.parse_public_key('xxx')
+
+    def test_returns_none_on_non_string(self):
+        self.assertIsNone(keyparser.parse_public_key(None))
+
+    def test_bad_checksum_raises_unsupported(self):
+        lines = ed25519_pubkey.splitlines()
+        lines[-2] = '=AAAA'
+        with self.assertRaises(keyparser.UnsupportedPacket):
+            keyparser.parse_public_key('\n'.join(lines))
+
+    def test_returns_none_if_text_is_too_long(self):
+        with patch.object(keyparser.settings, 'max_public_key_length', len(ed25519_pubkey) - 1):
+            self.assertIsNone(keyparser.parse_public_key(ed25519_pubkey))
+
+    def test_other_block_type_raises_unsupported(self):
+        text = ed25519_pubkey.replace('PUBLIC KEY', 'PRIVATE KEY')
+        with self.assertRaises(keyparser.UnsupportedPacket):
+            keyparser.parse_public_key(text)
+
+    def test_returns_none_on_two_keys(self):
+        data = self.alice_packets() + armor.dearmor(ed25519_pubkey).data
+        self.assertIsNone(keyparser.parse_public_key(armor.armor('PGP PUBLIC KEY BLOCK', data)))
+
+    def test_returns_none_on_truncated_packets(self):
+        data = self.alice_packets()[:-10]
+        self.assertIsNone(keyparser.parse_public_key(armor.armor('PGP PUBLIC KEY BLOCK', data)))
+
+    def test_unlisted_curve_raises_unsupported(self):
+        ed448_oid = bytes.fromhex('2B6571')
+        text = ed25519_with_primary(lambda body: body[:6] + bytes([len(ed448_oid)]) + ed448_oid + body[16:])
+        with self.assertRaises(keyparser.UnsupportedPacket):
+            keyparser.parse_public_key(text)
+
+    def test_version_5_key_raises_unsupported(self):
+        text = ed25519_with_primary(lambda body: b'\x05' + body[1:])
+        with self.assertRaises(keyparser.UnsupportedPacket):
+            keyparser.parse_public_key(text)
+
+    def test_unlisted_algorithm_raises_unsupported(self):
+        text = ed25519_with_primary(lambda body: body[:5] + bytes([20]) + body[6:])
+        with self.assertRaises(keyparser.UnsupportedPacket):
+            keyparser.parse_public_key(text)
+
+    def test_partial_body_length_raises_unsupported(self):
+        data = bytes([0xC0 | keyparser.tag_public_key, 224]) + armor.dearmor(ed25519_pubkey).data
+        with self.assertRaises(keyparser.UnsupportedPacket):
+            keyparser.parse_public_key(armor.armor('PGP PUBLIC KEY BLOCK', data))
+
+    def test_returns_none_on_truncated_key_packet(self):
+        text = ed25519_with_primary(lambda body: body[:20])
+        self.assertIsNone(keyparser.parse_public_key(text))
+
+    def test_returns_none_without_uid(self):
+        packets = keyparser.read_packets(armor.dearmor(ed25519_pubkey).data)
+        tag, body = next(packets)
+        data = bytes([0xC0 | tag, len(body)]) + body
+        self.assertIsNone(keyparser.parse_public_key(armor.armor('PGP PUBLIC KEY BLOCK', data)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+"""
+test_memoryfile.py
+
+Test suite for memoryfile module
+
+Copyright (C) 2018 Disappeer Labs
+License: GPLv3
+"""
+
+import unittest
+from unittest.mock import patch
+import os
+import subprocess
+import tempfile
+from disappeer.gpg.helpers import memoryfile
+
+
+class TestImports(unittest.TestCase):
+
+    def test_os(self):
+        self.assertEqual(os, memoryfile.os)
+
+    def test_tempfile(self):
+        self.assertEqual(tempfile, memoryfile.tempfile)
+
+
+class TestMemoryFile(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch.object(memoryfile, 'memfd_usable', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def read(self, path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def test_write_all_finishes_short_writes(self):
+        read_fd, write_fd = os.pipe()
+        self.addCleanup(os.close, read_fd)
+        real_write = os.write
+        with patch.object(memoryfile.os, 'write', side_effect=lambda fd, data: real_write(fd, data[:2])) as target:
+            memoryfile.write_all(write_fd, b'abcdef')
+        os.close(write_fd)
+        self.assertEqual(target.call_count, 3)
+        self.assertEqual(os.read(read_fd, 16), b'abcdef')
+
+    def test_memory_file_yields_readable_path(self):
+        with memoryfile.memory_file(b'sig data') as path:
+            self.assertEqual(self.read(path), b'sig data')
+
+    def test_memory_file_readable_by_subprocess(self):
+        with memoryfile.memory_file(b'sig data') as path:
+            result = subprocess.run(['cat', path], stdout=subprocess.PIPE)
+        self.assertEqual(result.stdout, b'sig data')
+
+    @unittest.skipUnless(hasattr(os, 'memfd_create'), 'memfd not available')
+    def test_memory_file_uses_memfd_if_usable(self):
+        with memoryfile.memory_file(b'sig data') as path:
+            self.assertTrue(memoryfile.memfd_usable)
+            self.assertTrue(path.startswith('/proc/{}/fd/'.format(os.getpid())))
+
+    def test_memory_file_falls_back_to_temporary_file(self):
+        with patch.object(memoryfile, 'probe_memfd', return_value=False):
+            with memoryfile.memory_file(b'sig data') as path:
+                self.assertEqual(self.read(path), b'sig data')
+                self.assertEqual(os.path.dirname(path), memoryfile.get_tmpfs_dir() or tempfile.gettempdir())
+        self.assertFalse(os.path.exists(path))
+
+    def test_probe_memfd_false_without_memfd_create(self):
+        with patch.object(memoryfile, 'os') as mocked:
+            del mocked.memfd_create
+            self.assertFalse(memoryfile.probe_memfd())
+
+    def test_get_tmpfs_dir_none_without_tmpfs(self):
+        with patch.object(memoryfile, 'tmpfs_dir', '/nonexistent/shm'):
+            self.assertIsNone(memoryfile.get_tmpfs_dir())
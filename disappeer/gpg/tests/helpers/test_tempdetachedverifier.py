@@ -16,7 +16,6 @@ from disappeer.gpg.agents import detachedverifier
 from disappeer.gpg.agents.signer import Signer
 import json
 from disappeer.gpg.agents.keyring import KeyRing
-import tempfile
 import copy
 
 
@@ -28,9 +27,6 @@ class TestImports(unittest.TestCase):
     def test_detachedverifier(self):
         self.assertEqual(detachedverifier, tempdetachedverifier.detachedverifier)
 
-    def test_tempfile(self):
-        self.assertEqual(tempfile, tempdetachedverifier.tempfile)
-
 
 def build_mock_sig_dict(data_dict):
     encoded_data_dict = json.dumps(data_dict)
@@ -11,7 +11,7 @@ import unittest
 from unittest.mock import MagicMock, patch
 from disappeer.gpg.helpers import tempkeyring
 from disappeer.gpg.agents import keyring
-import tempfile
+from disappeer.gpg.helpers import tempkeyringpool
 
 
 class TestImports(unittest.TestCase):
@@ -19,8 +19,8 @@ class TestImports(unittest.TestCase):
     def test_keyring(self):
         self.assertEqual(keyring, tempkeyring.keyring)
 
-    def test_tempfile(self):
-        self.assertEqual(tempfile, tempkeyring.tempfile)
+    def test_tempkeyringpool(self):
+        self.assertEqual(tempkeyringpool, tempkeyring.tempkeyringpool)
 
 
 class TestClassBasics(unittest.TestCase):
@@ -33,11 +33,11 @@ class TestClassBasics(unittest.TestCase):
 
     def test_create_temp_dir_returns_temp_dir(self):
         result = self.x.create_temp_dir()
-        self.assertIsInstance(result, tempfile.TemporaryDirectory)
+        self.assertIsInstance(result, tempkeyringpool.TempKeyRingDir)
         result.cleanup()
 
     def test_temp_dir_attribute_is_temp_dir(self):
-        self.assertIsInstance(self.x.temp_dir, tempfile.TemporaryDirectory)
+        self.assertIsInstance(self.x.temp_dir, tempkeyringpool.TempKeyRingDir)
 
     def test_close_temp_dir_calls_close_on_temp_dir(self):
         try:
@@ -0,0 +1,157 @@
+"""
+test_tempkeyringpool.py
+
+Test suite for tempkeyringpool module, TempKeyRingPool and TempKeyRingDir class objects
+
+Copyright (C) 2018 Disappeer Labs
+License: GPLv3
+"""
+
+import unittest
+from unittest.mock import patch
+import os
+import socket
+import tempfile
+from disappeer.gpg.helpers import tempkeyringpool
+from disappeer.gpg.helpers import keyindex
+from disappeer.gpg.agents import keyring
+from disappeer import settings
+
+
+class TestImports(unittest.TestCase):
+
+    def test_keyring(self):
+        self.assertEqual(keyring, tempkeyringpool.keyring)
+
+    def test_keyindex(self):
+        self.assertEqual(keyindex, tempkeyringpool.keyindex)
+
+    def test_settings(self):
+        self.assertEqual(settings, tempkeyringpool.settings)
+
+
+class TestTempKeyRingPool(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        keydir = "tests/data/keys"
+        cls.pub_key = keyring.KeyRing(keydir).export_key('190DB52959AC3560')
+
+    def setUp(self):
+        self.base_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.base_dir.cleanup)
+        self.x = tempkeyringpool.TempKeyRingPool(max_idle=2, base_dir=self.base_dir.name)
+        self.addCleanup(self.x.close)
+
+    def test_max_idle_from_settings(self):
+        x = tempkeyringpool.TempKeyRingPool()
+        self.assertEqual(x.max_idle, settings.temp_keyring_pool_size)
+
+    def test_acquire_creates_home_dir_with_keyring_files(self):
+        path = self.x.acquire()
+        self.assertEqual(os.path.dirname(path), self.base_dir.name)
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o700)
+        self.assertEqual(sorted(self.x.template), sorted(tempkeyringpool.template_file_names))
+        for name in tempkeyringpool.template_file_names:
+            self.assertTrue(os.path.isfile(os.path.join(path, name)))
+
+    def test_acquire_copies_template_into_later_home_dirs(self):
+        self.x.acquire()
+        with patch.object(self.x, 'create_template') as target:
+            path = self.x.acquire()
+        self.assertFalse(target.called)
+        with open(os.path.join(path, 'pubring.kbx'), 'rb') as f:
+            self.assertEqual(f.read(), self.x.template['pubring.kbx'])
+
+    def test_release_then_acquire_reuses_home_dir(self):
+        path = self.x.acquire()
+        self.x.release(path)
+        self.assertEqual(self.x.get_stats(), dict(idle=1, created=1, discarded=0))
+        self.assertEqual(self.x.acquire(), path)
+
+    def test_release_wipes_imported_keys(self):
+        path = self.x.acquire()
+        key_ring = keyring.KeyRing(path)
+        self.assertEqual(key_ring.import_key(self.pub_key).count, 1)
+        self.assertEqual(len(key_ring.get_raw_key_list()), 1)
+        self.x.release(path)
+        self.assertEqual(self.x.acquire(), path)
+        self.assertEqual(len(keyring.KeyRing(path).get_raw_key_list()), 0)
+        self.assertFalse(os.path.exists(os.path.join(path, 'pubring.kbx~')))
+
+    def test_release_invalidates_key_index(self):
+        path = self.x.acquire()
+        with patch.object(tempkeyringpool.keyindex.cache, 'invalidate') as target:
+            self.x.release(path)
+        target.assert_called_with(path)
+
+    def test_release_keeps_sockets(self):
+        path = self.x.acquire()
+        sock = socket.socket(socket.AF_UNIX)
+        self.addCleanup(sock.close)
+        sock.bind(os.path.join(path, 'S.gpg-agent'))
+        self.x.release(path)
+        self.assertEqual(self.x.get_stats()['idle'], 1)
+        self.assertTrue(os.path.exists(os.path.join(path, 'S.gpg-agent')))
+
+    def test_release_discards_home_dir_with_secret_keys(self):
+        path = self.x.acquire()
+        os.mkdir(os.path.join(path, 'private-keys-v1.d'))
+        with open(os.path.join(path, 'private-keys-v1.d', 'key.key'), 'w') as f:
+            f.write('secret')
+        self.x.release(path)
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(self.x.get_stats(), dict(idle=0, created=0, discarded=1))
+
+    def test_release_discards_beyond_max_idle(self):
+        paths = [self.x.acquire() for _ in range(3)]
+        for path in paths:
+            self.x.release(path)
+        self.assertEqual(self.x.get_stats(), dict(idle=2, created=2, discarded=1))
+        self.assertFalse(os.path.exists(paths[2]))
+
+    def test_acquire_discards_unhealthy_idle_home_dir(self):
+        path = self.x.acquire()
+        self.x.release(path)
+        os.chmod(path, 0o755)
+        self.assertNotEqual(self.x.acquire(), path)
+        self.assertFalse(os.path.exists(path))
+
+    def test_release_after_close_does_nothing(self):
+        path = self.x.acquire()
+        self.x.close()
+        self.x.release(path)
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(self.x.get_stats()['idle'], 0)
+
+    def test_check_pid_forgets_parent_home_dirs(self):
+        path = self.x.acquire()
+        self.x.pid = -1
+        self.x.release(path)
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(self.x.get_stats()['created'], 0)
+        self.x.created.add(path)
+
+    def test_close_removes_idle_and_checked_out(self):
+        first = self.x.acquire()
+        second = self.x.acquire()
+        self.x.release(first)
+        self.x.close()
+        self.assertFalse(os.path.exists(first))
+        self.assertFalse(os.path.exists(second))
+
+    def test_checkout_cleanup_releases_once(self):
+        temp_dir = self.x.checkout()
+        self.assertIsInstance(temp_dir, tempkeyringpool.TempKeyRingDir)
+        with patch.object(self.x, 'release') as target:
+            temp_dir.cleanup()
+            temp_dir.cleanup()
+        target.assert_called_once_with(temp_dir.name)
+
+    def test_checkout_context_manager(self):
+        with self.x.checkout() as path:
+            self.assertTrue(os.path.isdir(path))
+        self.assertEqual(self.x.get_stats()['idle'], 1)
+
+    def test_module_pool(self):
+        self.assertIsInstance(tempkeyringpool.pool, tempkeyringpool.TempKeyRingPool)
@@ -53,6 +53,8 @@ class BaseMessagesTable(abstractdbtable.AbstractDBTable):
         command = "select * from {} where nonce='{}'".format(self.table_name,
                                                              nonce)
         result = self.fetch_one(command)
+        if result is None:
+            return None
         result = self.build_named_tuple(result[1:])
         return result
 
@@ -127,6 +127,10 @@ class TestClassBasics(unittest.TestCase):
         result = self.x.fetch_named_tuple_by_nonce(nonce_val)
         self.assertEqual(nonce_val, result[0])
 
+    def test_fetch_record_by_missing_nonce_returns_none(self):
+        result = self.x.fetch_named_tuple_by_nonce('missing_nonce')
+        self.assertIsNone(result)
+
     def test_delete_record_by_nonce(self):
         target = self.x.delete_record_where_x_equals_y = MagicMock()
         nonce_string = 'nonce_string'
@@ -14,11 +14,14 @@ from disappeer.models.db import dbpeercontactstable
 from disappeer.models.db import dbsentmessagestable
 from disappeer.models.db import dbreceivedmessagestable
 from disappeer.models.db import dbserversynctable
+from disappeer.models.db import nonceindex
 from disappeer import settings
 
 
 class DatabaseFacade:
 
+    server_nonce_index = nonceindex.pending_contact_response_nonces
+
     def __init__(self, host_key_observer, get_user_database_dir_method):
         self.host_key_observer = host_key_observer
         self.get_user_database_dir_method = get_user_database_dir_method
@@ -215,9 +218,14 @@ class DatabaseFacade:
         self.update_server_sync_db()
 
     def update_server_sync_db(self):
-        self.server_sync_table.delete_all_nonces()
+        """
+        Refresh the ContactResponseServer nonce index, and the sync db file if it is persisted
+        """
         raw_vals = self.pending_contact_response_table.fetch_all_nonces()
-        massaged = [(x,) for x in raw_vals]
-        self.server_sync_table.insert_new_vals(massaged)
+        self.server_nonce_index.replace(raw_vals)
+        if settings.server_sync_db_persist:
+            self.server_sync_table.delete_all_nonces()
+            massaged = [(x,) for x in raw_vals]
+            self.server_sync_table.insert_new_vals(massaged)
 
 
@@ -8,6 +8,11 @@ License: GPLv3
 """
 
 import sqlite3
+from disappeer.utilities import metrics
+
+
+query_seconds = metrics.registry.histogram('disappeer_db_query_seconds',
+                                           'Seconds per sqlite query including connect and commit, per operation')
 
 
 class DBExecutor:
@@ -16,26 +21,29 @@ class DBExecutor:
         self.database = db_file_path
 
     def execute(self, *args):
-        connection = sqlite3.connect(self.database)
-        cursor = connection.cursor()
-        cursor.execute(*args)
-        connection.commit()
-        connection.close()
+        with metrics.timer(query_seconds, operation='execute'):
+            connection = sqlite3.connect(self.database)
+            cursor = connection.cursor()
+            cursor.execute(*args)
+            connection.commit()
+            connection.close()
 
     def fetch_all(self, *args):
-        connection = sqlite3.connect(self.database)
-        cursor = connection.cursor()
-        cursor.execute(*args)
-        result = cursor.fetchall()
-        connection.commit()
-        connection.close()
+        with metrics.timer(query_seconds, operation='fetch_all'):
+            connection = sqlite3.connect(self.database)
+            cursor = connection.cursor()
+            cursor.execute(*args)
+            result = cursor.fetchall()
+            connection.commit()
+            connection.close()
         return result
 
     def fetch_one(self, *args):
-        connection = sqlite3.connect(self.database)
-        cursor = connection.cursor()
-        cursor.execute(*args)
-        result = cursor.fetchone()
-        connection.commit()
-        connection.close()
+        with metrics.timer(query_seconds, operation='fetch_one'):
+            connection = sqlite3.connect(self.database)
+            cursor = connection.cursor()
+            cursor.execute(*args)
+            result = cursor.fetchone()
+            connection.commit()
+            connection.close()
         return result
@@ -0,0 +1,40 @@
+"""
+nonceindex.py
+
+Module for the NonceIndex class object, an in-memory set of nonces shared across threads.
+
+The DatabaseFacade replaces the contents whenever the pending contact responses change,
+the ContactResponseServer handlers test membership without touching the database.
+
+Copyright (C) 2018 Disappeer Labs
+License: GPLv3
+"""
+
+import threading
+
+
+class NonceIndex:
+
+    def __init__(self, values=()):
+        self.lock = threading.Lock()
+        self.values = frozenset(values)
+        self.version = 0
+
+    def __contains__(self, value):
+        # Readers take no lock, replace swaps in a new frozenset
+        try:
+            return value in self.values
+        except TypeError:
+            return False
+
+    def __len__(self):
+        return len(self.values)
+
+    def replace(self, values):
+        with self.lock:
+            self.values = frozenset(values)
+            self.version += 1
+
+
+# Request nonces of our outstanding contact requests, shared by DatabaseFacade and the ContactResponseServer
+pending_contact_response_nonces = NonceIndex()
@@ -8,7 +8,7 @@ License: GPLv3
 """
 
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 from disappeer.models.db import databasefacade
 from disappeer.utilities import observable
 from disappeer.models.db import dbcontactrequesttable
@@ -17,6 +17,7 @@ from disappeer.models.db import dbpeercontactstable
 from disappeer.models.db import dbsentmessagestable
 from disappeer.models.db import dbreceivedmessagestable
 from disappeer.models.db import dbserversynctable
+from disappeer.models.db import nonceindex
 import os
 from disappeer import settings
 from disappeer.utilities import dirmaker
@@ -434,6 +435,23 @@ class TestClassBasics(unittest.TestCase):
         result = self.x.server_sync_table.fetch_all_nonces()
         self.assertEqual(result, target)
 
+    def test_update_server_sync_db_replaces_nonce_index(self):
+        example_db_pending_row_1 = ('status', 'nonce_1', 'gpg_pub_key', 'gpg_fingerprint', 'host')
+        self.x.pending_contact_response_table.insert_data_row(example_db_pending_row_1)
+        version = self.x.server_nonce_index.version
+        self.x.update_server_sync_db()
+        self.assertIn('nonce_1', self.x.server_nonce_index)
+        self.assertEqual(self.x.server_nonce_index.version, version + 1)
+
+    @patch.object(databasefacade.settings, 'server_sync_db_persist', False)
+    def test_update_server_sync_db_skips_sync_table_unless_persisted(self):
+        target = self.x.server_sync_table = MagicMock()
+        self.x.update_server_sync_db()
+        self.assertFalse(target.insert_new_vals.called)
+
+    def test_server_nonce_index_is_shared_index(self):
+        self.assertIs(self.x.server_nonce_index, nonceindex.pending_contact_response_nonces)
+
     def test_set_db_tables_calls_update_server_sync_method(self):
         target = self.x.update_server_sync_db = MagicMock()
         self.x.set_db_tables(None)
@@ -42,6 +42,14 @@ class TestClassBasics(unittest.TestCase):
     def test_path_attribute(self):
         self.assertEqual(self.db_file_path, self.x.database)
 
+    def test_execute_and_fetch_observe_query_seconds(self):
+        before = [dbexecutor.query_seconds.get(operation=item)[1] for item in ['execute', 'fetch_all', 'fetch_one']]
+        self.x.execute(self.create_table)
+        self.x.fetch_all('SELECT * FROM {}'.format(self.table_name))
+        self.x.fetch_one('SELECT * FROM {}'.format(self.table_name))
+        after = [dbexecutor.query_seconds.get(operation=item)[1] for item in ['execute', 'fetch_all', 'fetch_one']]
+        self.assertEqual([a - b for a, b in zip(after, before)], [1, 1, 1])
+
     def test_execute_method_executes_string(self):
         self.x.execute(self.create_table)
         connection = sqlite3.connect(self.db_file_path)
@@ -0,0 +1,41 @@
+"""
+test_nonceindex.py
+
+Test suite for the NonceIndex class object
+
+Copyright (C) 2018 Disappeer Labs
+License: GPLv3
+"""
+
+import unittest
+import threading
+from disappeer.models.db import nonceindex
+
+
+class TestImports(unittest.TestCase):
+
+    def test_threading(self):
+        self.assertEqual(threading, nonceindex.threading)
+
+
+class TestNonceIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.x = nonceindex.NonceIndex(['aaa', 'bbb'])
+
+    def test_contains(self):
+        self.assertIn('aaa', self.x)
+        self.assertNotIn('ccc', self.x)
+        self.assertEqual(len(self.x), 2)
+
+    def test_unhashable_value_not_contained(self):
+        self.assertNotIn(['aaa'], self.x)
+
+    def test_replace_swaps_values_and_bumps_version(self):
+        self.x.replace(['ccc'])
+        self.assertNotIn('aaa', self.x)
+        self.assertIn('ccc', self.x)
+        self.assertEqual(self.x.version, 1)
+
+    def test_shared_index_instance(self):
+        self.assertIsInstance(nonceindex.pending_contact_response_nonces, nonceindex.NonceIndex)
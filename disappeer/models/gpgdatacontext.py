@@ -13,6 +13,7 @@ from disappeer.gpg.helpers import hostkeyobservable
 from disappeer import settings
 import os
 from disappeer.gpg.agents import keyring
+from disappeer.gpg.agents import gpgpool
 
 
 class GPGDataContext:
@@ -49,6 +50,7 @@ class GPGDataContext:
 
     def set_home_dir(self, new_home_path):
         self.set_permissions(new_home_path)
+        gpgpool.pool.invalidate()
         self.home_dir_observable.set(new_home_path)
 
     def get_home_dir(self):
@@ -98,13 +100,7 @@ class GPGDataContext:
         return result
 
     def get_key_dict_by_identifier(self, identifier):
-        key_list = self.get_raw_key_list()
-        for key in key_list:
-            if key['fingerprint'] == identifier:
-                return key
-            elif key['keyid'] == identifier:
-                return key
-        return None
+        return self.key_ring.get_key_index().find(identifier)
 
     def set_permissions(self, path):
         os.chmod(path, 0o700)
@@ -8,11 +8,12 @@ License: GPLv3
 """
 
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 from disappeer.models import gpgdatacontext
 from disappeer.utilities import observable
 from disappeer import settings
 from disappeer.gpg.agents import keyring
+from disappeer.gpg.agents import gpgpool
 from disappeer.gpg.helpers import keylistobservable
 from disappeer.gpg.helpers import hostkeyobservable
 import copy
@@ -37,6 +38,9 @@ class TestImports(unittest.TestCase):
     def test_hostkeyobservable(self):
         self.assertEqual(hostkeyobservable, gpgdatacontext.hostkeyobservable)
 
+    def test_gpgpool(self):
+        self.assertEqual(gpgpool, gpgdatacontext.gpgpool)
+
     def test_os(self):
         self.assertEqual(os, gpgdatacontext.os)
 
@@ -176,6 +180,12 @@ class TestGPGDataContextMethods(GPGDataContextSetupClass):
         self.x.set_home_dir(new_path)
         target.assert_called_with(new_path)
 
+    def test_set_home_dir_invalidates_gpg_pool(self):
+        new_path = 'tests/data/keys'
+        with patch.object(gpgpool.pool, 'invalidate') as target:
+            self.x.set_home_dir(new_path)
+        target.assert_called_with()
+
     def test_get_home_dir_returns_home_dir(self):
         result = self.x.get_home_dir()
         self.assertEqual(self.x.home_dir_observable.get(), result)
@@ -9,11 +9,33 @@ License: GPLv3
 
 import abc
 import socket
-import socks
+from disappeer import settings
+from disappeer.net.bases import connectionpool
+from disappeer.net.bases import packet
+from disappeer.net.bases import peercapabilities
+from disappeer.net.bases import transports
+from disappeer.utilities import metrics
+
+
+connect_seconds = metrics.registry.histogram('disappeer_client_connect_seconds',
+                                             'Seconds to connect and wrap a new peer connection, per transport')
+exchanges = metrics.registry.counter('disappeer_client_exchanges_total',
+                                     'Client request exchanges per command, by result: ok, failed, busy, '
+                                     'connect_error, or stale for a pooled connection the peer dropped')
+
+
+class PeerBusyError(Exception):
+    """
+    Reported as a client error when the peer answered with a busy frame, it did not handle the request
+    """
 
 
 class AbstractClient(metaclass=abc.ABCMeta):
 
+    # Shared by all client types, peers that negotiated keep-alive are reached without a new circuit stream
+    pool = connectionpool.ConnectionPool()
+    capabilities = peercapabilities.PeerCapabilities()
+
     def __init__(self, argnamespace):
         self.argnamespace = argnamespace
         self.sock = None
@@ -48,24 +70,25 @@ class AbstractClient(metaclass=abc.ABCMeta):
     def queue(self):
         return self.argnamespace.queue
 
+    @property
+    def transport(self):
+        """
+        Per client transport from the argnamespace, if given, else the configured default
+        """
+        name = getattr(self.argnamespace, 'transport', None) or settings.client_transport
+        return transports.get_transport(name)
+
     def create_socket(self):
-        # Original socket object
-        # self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        # self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        # self.sock.settimeout(10)
-        # return self.sock
-
-        # # Second version, with bytes string
-        # self.sock = socks.socksocket()
-        # self.sock.set_proxy(socks.PROXY_TYPE_SOCKS5, b'127.0.0.1', 9050, True)
-        # return self.sock
-
-        self.sock = socks.socksocket()
-        self.sock.set_proxy(socks.PROXY_TYPE_SOCKS5, '127.0.0.1', 9050, True)
+        self.sock = self.transport.create_socket()
+        self.sock.settimeout(settings.client_connect_timeout)
         return self.sock
 
     def connect(self):
-        self.sock.connect(self.interface)
+        """
+        Connect under client_connect_timeout, later reads and writes are bounded by client_io_timeout
+        """
+        self.transport.connect(self.sock, self.interface)
+        self.sock.settimeout(settings.client_io_timeout)
 
     @abc.abstractmethod
     def wrap_socket(self):
@@ -88,10 +111,93 @@ class AbstractClient(metaclass=abc.ABCMeta):
 
     def configure_transport(self):
         try:
-            self.create_socket()
-            self.connect()
-            self.wrap_socket()
+            with metrics.timer(connect_seconds, transport=self.transport.name):
+                self.create_socket()
+                self.connect()
+                self.wrap_socket()
         except (socket.error, ConnectionRefusedError) as err:
             self.error = err
+            exchanges.inc(command=self.command, result='connect_error')
             return err
         self.set_protocol()
+
+    def configure_protocol(self):
+        """
+        Called by concrete set_protocol methods once the protocol exists
+        """
+        self.protocol.keep_alive = settings.peer_keep_alive
+        flags = self.capabilities.get(self.interface)
+        if not settings.binary_payload_codec:
+            flags &= ~packet.Header.flag_binary
+        self.protocol.payload_flags = flags
+
+    def resume_connection(self):
+        protocol = self.pool.acquire(self.interface)
+        if protocol is None:
+            return False
+        self.protocol = protocol
+        self.sock = protocol.sock
+        return True
+
+    def send_over_resumed_connection(self):
+        """
+        Exchange over a pooled connection, return False if the peer dropped it before answering,
+        so the caller can fall back to a fresh connection. Once the peer started answering, or a read
+        timed out, the request may have been received: a failed exchange is reported, not resent.
+        Concrete clients provide report_result.
+        """
+        try:
+            self.protocol.send_request(self.payload_dict, self.command)
+            result = self.protocol.handle_response()
+        except OSError:
+            return self.drop_stale_connection()
+        if not self.protocol.incoming_started and not self.protocol.timed_out:
+            # Closed at EOF before any response byte, the peer dropped the idle connection
+            return self.drop_stale_connection()
+        self.release_connection(result)
+        self.report_response(result)
+        return True
+
+    def drop_stale_connection(self):
+        exchanges.inc(command=self.command, result='stale')
+        self.pool.discard(self.protocol)
+        self.protocol = None
+        self.sock = None
+        return False
+
+    def report_response(self, result):
+        """
+        Report the exchange result, or a PeerBusyError if the peer was too busy to handle the request.
+        Concrete clients provide report_result and report_error.
+        """
+        if self.protocol.peer_busy:
+            self.error = PeerBusyError('Peer busy, request not handled')
+            self.report_error()
+        else:
+            self.report_result(result)
+
+    def release_connection(self, result):
+        """
+        Record the frame flags the peer advertised, pool the connection if the peer keeps it alive.
+        A failed exchange forgets the flags, so the next attempt falls back to plain JSON frames.
+        A busy peer closes the connection but says nothing about its flags.
+        """
+        if self.protocol.peer_busy:
+            exchanges.inc(command=self.command, result='busy')
+            self.pool.discard(self.protocol)
+            return
+        if not self.nonce_is_valid(result):
+            exchanges.inc(command=self.command, result='failed')
+            self.capabilities.forget(self.interface)
+            self.pool.discard(self.protocol)
+            return
+        exchanges.inc(command=self.command, result='ok')
+        self.capabilities.update(self.interface, self.protocol.peer_flags)
+        if self.protocol.is_reusable():
+            self.pool.release(self.interface, self.protocol)
+
+    def nonce_is_valid(self, result):
+        try:
+            return result['nonce'] == self.nonce
+        except (KeyError, TypeError):
+            return False
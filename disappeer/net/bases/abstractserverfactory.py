@@ -45,14 +45,26 @@ class AbstractServerFactory(metaclass=abc.ABCMeta):
     def server_obj(self):
         raise NotImplementedError
 
-    def build(self):
+    def build(self, sock=None):
+        """
+        With sock, the server takes over that bound and listening socket instead of binding its own
+        """
         try:
-            server = self.server_obj(self.interface, self.request_handler_obj)
+            if sock is None:
+                server = self.server_obj(self.interface, self.request_handler_obj)
+            else:
+                server = self.server_obj(self.interface, self.request_handler_obj, bind_and_activate=False)
+                server.socket.close()
+                server.socket = sock
         except OSError as err:
-            error_dict = dict(desc=constants.command_list.Server_Error,
-                              error=err,
-                              interface=self.interface)
-            self.queue.put(error_dict)
+            self.report_error(err)
             return None
         server.queue = self.queue
+        server.name = self.name
         return server
+
+    def report_error(self, err):
+        error_dict = dict(desc=constants.command_list.Server_Error,
+                          error=err,
+                          interface=self.interface)
+        self.queue.put(error_dict)
@@ -0,0 +1,109 @@
+"""
+admission.py
+
+Module for inbound request admission control:
+    - TokenBucket, rate limiter refilled continuously up to a burst size
+    - AdmissionController, token buckets per observed request property
+
+Each server's request handler checks a request with its controller right after reading it,
+so a request over budget is dropped before any validation spawns a gpg subprocess.
+
+Copyright (C) 2018 Disappeer Labs
+License: GPLv3
+"""
+
+import collections
+import threading
+import time
+
+
+class TokenBucket:
+
+    def __init__(self, rate, burst, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.tokens = burst
+        self.updated = clock()
+
+    def refill(self):
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def can_consume(self, tokens):
+        self.refill()
+        return self.tokens >= tokens
+
+    def consume(self, tokens):
+        self.tokens -= tokens
+
+
+class AdmissionController:
+    """
+    budgets maps a dimension to (tokens per second, burst):
+        - 'request': all requests to the server, one token each
+        - 'bytes': all requests to the server, one token per payload byte
+        - any other name: a bucket per observed value, e.g. per nonce or per claimed key
+    Keyed buckets are kept for the max_keys most recently seen values, a value seen
+    again after eviction starts over with a full bucket.
+    """
+
+    global_dimensions = ['request', 'bytes']
+
+    def __init__(self, budgets, max_keys=4096, clock=time.monotonic):
+        self.budgets = budgets
+        self.max_keys = max_keys
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.buckets = {name: self.build_bucket(name) for name in self.global_dimensions if name in budgets}
+        self.keyed_buckets = collections.OrderedDict()
+        self.admitted_count = 0
+        self.rejected_counts = collections.Counter()
+
+    def build_bucket(self, dimension):
+        rate, burst = self.budgets[dimension]
+        return TokenBucket(rate, burst, self.clock)
+
+    def get_keyed_bucket(self, dimension, value):
+        key = (dimension, value)
+        bucket = self.keyed_buckets.get(key)
+        if bucket is None:
+            bucket = self.keyed_buckets[key] = self.build_bucket(dimension)
+            while len(self.keyed_buckets) > self.max_keys:
+                self.keyed_buckets.popitem(last=False)
+        else:
+            self.keyed_buckets.move_to_end(key)
+        return bucket
+
+    def admit(self, size=0, **observed):
+        """
+        Return True and charge every bucket if all of them have budget left, else charge nothing.
+        observed values of None, and dimensions without a budget, are skipped.
+        """
+        with self.lock:
+            charges = []
+            if 'request' in self.buckets:
+                charges.append(('request', self.buckets['request'], 1))
+            if 'bytes' in self.buckets:
+                bucket = self.buckets['bytes']
+                # A request larger than the burst is admitted on a full bucket
+                charges.append(('bytes', bucket, min(size, bucket.burst)))
+            for dimension, value in observed.items():
+                if value is not None and dimension in self.budgets:
+                    charges.append((dimension, self.get_keyed_bucket(dimension, value), 1))
+            for dimension, bucket, tokens in charges:
+                if not bucket.can_consume(tokens):
+                    self.rejected_counts[dimension] += 1
+                    return False
+            for dimension, bucket, tokens in charges:
+                bucket.consume(tokens)
+            self.admitted_count += 1
+            return True
+
+    def get_stats(self):
+        with self.lock:
+            return dict(admitted=self.admitted_count,
+                        rejected=sum(self.rejected_counts.values()),
+                        rejected_by=dict(self.rejected_counts),
+                        tracked_keys=len(self.keyed_buckets))
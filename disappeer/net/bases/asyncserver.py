@@ -0,0 +1,460 @@
+"""
+asyncserver.py
+
+Module for the asyncio network server backend:
+    - BufferedRequest, socket-like object wrapping a frame read on the event loop
+    - AsyncServerContext, stands in for the socketserver server object passed to request handlers
+    - AsyncServerEngine, runs the listeners for all server factories on one event loop
+    - AsyncServerManager, drop-in replacement for ServerThreadManager
+
+Connections are accepted and framed on the event loop, so slow peers only cost a coroutine.
+Complete frames are handed to the existing request handler classes on a bounded worker pool,
+since validation blocks on gpg subprocesses. Past max_handlers frames running or waiting for a
+worker per server, further frames are answered with a busy frame, as the threaded servers do
+past their pool and queue. A connection the handler answered without closing
+(keep-alive) is read again for the next frame, one handler call per frame. The chunk payloads of
+a chunked message are spooled to a temporary file before the handler runs, and the protocol
+decodes from that spool rather than spooling the stream again. With unix_socket_listen set,
+each server also listens on a Unix domain socket for clients on the same host.
+
+Copyright (C) 2018 Disappeer Labs
+License: GPLv3
+"""
+
+import asyncio
+import concurrent.futures
+import functools
+import io
+import os
+import socket
+import tempfile
+import threading
+import time
+from disappeer import settings
+from disappeer.net.bases import packet
+from disappeer.net.bases import baseprotocol
+from disappeer.net.bases import poolingmixin
+from disappeer.utilities import helpers
+from disappeer.utilities import metrics
+from disappeer.utilities.logger import log
+
+
+class BufferedRequest:
+    """
+    Socket-like object handed to the synchronous request handlers.
+    Reads are served from the frame bytes, or spooled file, already received on the event loop,
+    writes are collected and flushed by the engine once the handler returns. For a chunked message
+    the frame is the first header, and spooled_stream holds the chunk payloads for the protocol.
+    """
+
+    def __init__(self, frame, spooled_stream=None):
+        self.stream = frame if hasattr(frame, 'readinto') else io.BytesIO(frame)
+        self.spooled_stream = spooled_stream
+        self.outgoing = []
+        self.closed = False
+
+    def recv_into(self, buffer, num_bytes=0):
+        num_bytes = num_bytes or len(buffer)
+        return self.stream.readinto(memoryview(buffer)[:num_bytes])
+
+    def recv(self, num_bytes, flags=0):
+        position = self.stream.tell()
+        target = self.stream.read(num_bytes)
+        if flags & socket.MSG_PEEK:
+            self.stream.seek(position)
+        return target
+
+    def sendall(self, data):
+        self.outgoing.append(bytes(data))
+
+    def settimeout(self, value):
+        pass
+
+    def gettimeout(self):
+        return None
+
+    def close(self):
+        self.closed = True
+
+    def getvalue(self):
+        return b''.join(self.outgoing)
+
+    def release(self):
+        self.stream.close()
+        if self.spooled_stream is not None:
+            self.spooled_stream.spool.close()
+
+
+class RequestTimeout(Exception):
+    """
+    Peer missed a read deadline partway through a request
+    """
+
+
+class AsyncServerContext:
+    """
+    Passed to request handlers as their server object: provides the queue,
+    and defers everything else to the factory's socketserver class.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.queue = factory.queue
+
+    def __getattr__(self, name):
+        return getattr(self.factory.server_obj, name)
+
+    def get_request_count(self, request):
+        """
+        Each handler sees one request, the engine itself closes a connection past keep_alive_max_requests
+        """
+        return 1
+
+
+class AsyncServerEngine:
+
+    header = packet.Header
+    max_message_length = baseprotocol.BaseProtocol.max_message_length
+    max_stream_length = baseprotocol.BaseProtocol.max_stream_length
+    header_read_timeout = baseprotocol.BaseProtocol.header_read_timeout
+    payload_read_timeout = baseprotocol.BaseProtocol.payload_read_timeout
+    request_read_timeout = baseprotocol.BaseProtocol.request_read_timeout
+    max_half_open = settings.max_half_open_connections
+    # Per server, as a threaded server's pool plus queue
+    max_handlers = settings.server_max_workers + settings.server_max_queued_requests
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or settings.async_server_max_workers
+        self.loop = None
+        self.loop_thread = None
+        self.executor = None
+        self.servers = {}
+        self.unix_servers = {}
+        self.contexts = {}
+        self.stats = {}
+        self.connections = {}
+        self.idle_connections = {}
+        self.lock = threading.Lock()
+
+    def is_running(self):
+        return self.loop_thread is not None and self.loop_thread.is_alive()
+
+    def start(self):
+        with self.lock:
+            if self.is_running():
+                return
+            self.loop = asyncio.new_event_loop()
+            self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers,
+                                                                  thread_name_prefix='Async_Server_Worker')
+            self.loop.set_default_executor(self.executor)
+            self.loop_thread = threading.Thread(target=self.run_loop, name='Async_Server_Engine')
+            self.loop_thread.daemon = True
+            self.loop_thread.start()
+
+    def run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def stop(self):
+        with self.lock:
+            if not self.is_running():
+                return
+            self.run_coroutine(self.shutdown())
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.loop_thread.join()
+            self.loop.close()
+            self.executor.shutdown(wait=False)
+            self.loop_thread = None
+            self.loop = None
+            self.executor = None
+
+    def run_coroutine(self, coroutine):
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        return future.result()
+
+    def add_server(self, factory):
+        self.start()
+        return self.run_coroutine(self.start_server(factory))
+
+    def remove_server(self, factory):
+        if not self.is_running():
+            return
+        self.run_coroutine(self.stop_server(factory.name))
+        if not self.servers:
+            self.stop()
+
+    def drain_server(self, factory, timeout):
+        if not self.is_running():
+            return dict(drained=True, seconds=0, cut_off=[], queued=0)
+        report = self.run_coroutine(self.drain_connections(factory.name, timeout))
+        if not self.servers:
+            self.stop()
+        return report
+
+    def reset_context(self, factory):
+        """
+        Handlers read the context per frame, a new one takes effect for the next frame on every connection
+        """
+        if factory.name in self.contexts:
+            self.contexts[factory.name] = AsyncServerContext(factory)
+
+    async def start_server(self, factory):
+        handler = functools.partial(self.handle_connection, factory)
+        try:
+            server = await asyncio.start_server(handler, factory.host, factory.port, reuse_address=True)
+        except OSError as err:
+            factory.report_error(err)
+            return None
+        self.servers[factory.name] = server
+        self.contexts[factory.name] = AsyncServerContext(factory)
+        self.stats[factory.name] = self.new_stats()
+        if settings.unix_socket_listen:
+            await self.start_unix_server(factory, handler)
+        return server
+
+    async def start_unix_server(self, factory, handler):
+        """
+        Also listen on the Unix socket for the factory's port, for clients on this host
+        """
+        path = helpers.get_unix_socket_path(factory.port)
+        try:
+            os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+            if os.path.exists(path):
+                os.unlink(path)
+            server = await asyncio.start_unix_server(handler, path=path)
+        except OSError as err:
+            factory.report_error(err)
+            return None
+        self.unix_servers[factory.name] = (server, path)
+        return server
+
+    async def stop_server(self, name):
+        server = self.servers.pop(name, None)
+        self.contexts.pop(name, None)
+        if server is not None:
+            server.close()
+        unix_server = self.unix_servers.pop(name, None)
+        if unix_server is not None:
+            unix_server[0].close()
+            try:
+                os.unlink(unix_server[1])
+            except OSError:
+                pass
+
+    async def drain_connections(self, name, timeout):
+        """
+        Close the listeners and idle kept-alive connections, wait up to timeout seconds for connections
+        mid-request, then cancel the rest
+        """
+        start = time.monotonic()
+        await self.stop_server(name)
+        idle = set(self.idle_connections.get(name, set()))
+        for task in idle:
+            task.cancel()
+        connections = self.connections.get(name, {})
+        pending = set(connections) - idle
+        if pending:
+            done, pending = await asyncio.wait(pending, timeout=timeout)
+        cut_off = [connections.get(task) for task in pending]
+        for task in pending:
+            task.cancel()
+        return dict(drained=not pending,
+                    seconds=round(time.monotonic() - start, 3),
+                    cut_off=cut_off,
+                    queued=0)
+
+    async def shutdown(self):
+        """
+        Close all listeners and cancel the connections still being served.
+        """
+        for name in list(self.servers):
+            await self.stop_server(name)
+        current = asyncio.current_task()
+        pending = [task for task in asyncio.all_tasks() if task is not current]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    async def read_frame(self, reader, header_timeout):
+        """
+        Read one header and payload off the stream, return a BufferedRequest for the handler,
+        or None if the header announces more than max_message_length.
+        header_timeout bounds the wait for the header, asyncio.TimeoutError if it passes.
+        Once the header is in, a peer missing the payload or request deadline raises RequestTimeout.
+        """
+        header_data = await asyncio.wait_for(reader.readexactly(self.header.length), header_timeout)
+        length = self.header.unpack(header_data)[0]
+        if length > self.max_message_length:
+            return None
+        try:
+            return await asyncio.wait_for(self.read_request(reader, header_data, length), self.request_read_timeout)
+        except asyncio.TimeoutError:
+            raise RequestTimeout
+
+    async def read_request(self, reader, header_data, length):
+        payload_data = await self.read_payload(reader, length)
+        if self.header.unpack_flags(header_data) & self.header.flag_chunked:
+            return await self.read_stream(reader, header_data, payload_data)
+        return BufferedRequest(header_data + payload_data)
+
+    async def read_payload(self, reader, length):
+        return await asyncio.wait_for(reader.readexactly(length), self.payload_read_timeout)
+
+    async def read_stream(self, reader, first_header, first_payload):
+        """
+        Spool the chunk payloads of the stream opened by first_header, return a BufferedRequest serving
+        first_header with the spool as its spooled_stream. None if a chunk or the whole stream is too long,
+        or a chunk changes the command or codec flags of the first.
+        """
+        command = self.header.unpack(first_header)[1]
+        codec_flags = self.header.unpack_flags(first_header) & ~self.header.flag_chunked
+        spool = tempfile.TemporaryFile()
+        try:
+            spool.write(first_payload)
+            total = len(first_payload)
+            chunks = 1
+            while True:
+                header_data = await asyncio.wait_for(reader.readexactly(self.header.length),
+                                                     self.header_read_timeout)
+                length, chunk_command = self.header.unpack(header_data)
+                flags = self.header.unpack_flags(header_data)
+                total += length
+                if length > self.max_message_length or total > self.max_stream_length:
+                    spool.close()
+                    return None
+                if chunk_command != command or flags & ~self.header.flag_chunked != codec_flags:
+                    spool.close()
+                    return None
+                spool.write(await self.read_payload(reader, length))
+                chunks += 1
+                if not flags & self.header.flag_chunked:
+                    break
+        except BaseException:
+            spool.close()
+            raise
+        spool.flush()
+        return BufferedRequest(first_header, baseprotocol.SpooledStream(spool, total, chunks))
+
+    async def handle_connection(self, factory, reader, writer):
+        """
+        A connection is half-open until its first frame is read, past max_half_open of them
+        per server new connections are answered with a busy frame and closed right away.
+        """
+        stats = self.stats.setdefault(factory.name, self.new_stats())
+        if stats['half_open'] >= self.max_half_open:
+            stats['dropped'] += 1
+            poolingmixin.connections.inc(server=factory.name, result='dropped')
+            writer.write(poolingmixin.PoolingMixIn.rejection_frame)
+            writer.close()
+            return
+        stats['half_open'] += 1
+        poolingmixin.connections.inc(server=factory.name, result='accepted')
+        served = 0
+        task = asyncio.current_task()
+        connections = self.connections.setdefault(factory.name, {})
+        idle = self.idle_connections.setdefault(factory.name, set())
+        try:
+            client_address = writer.get_extra_info('peername')
+            connections[task] = client_address
+            try:
+                request = await self.read_frame(reader, self.header_read_timeout)
+            finally:
+                stats['half_open'] -= 1
+            while request is not None:
+                if stats['handlers'] >= self.max_handlers:
+                    request.release()
+                    stats['rejected'] += 1
+                    poolingmixin.connections.inc(server=factory.name, result='rejected')
+                    writer.write(poolingmixin.PoolingMixIn.rejection_frame)
+                    await writer.drain()
+                    return
+                stats['handlers'] += 1
+                try:
+                    await self.loop.run_in_executor(None, self.run_handler, factory, request, client_address)
+                finally:
+                    stats['handlers'] -= 1
+                    request.release()
+                served += 1
+                response = request.getvalue()
+                if response:
+                    writer.write(response)
+                    await writer.drain()
+                if request.closed or not response or served >= settings.keep_alive_max_requests:
+                    return
+                if factory.name not in self.servers:
+                    # Draining, no further requests on this connection
+                    return
+                idle.add(task)
+                try:
+                    request = await self.read_frame(reader, settings.keep_alive_idle_timeout)
+                finally:
+                    idle.discard(task)
+        except RequestTimeout:
+            stats['timeouts'] += 1
+        except asyncio.TimeoutError:
+            # Past the first request the header wait is keep-alive idle time, not a stalled peer
+            if served == 0:
+                stats['timeouts'] += 1
+        except (asyncio.IncompleteReadError, ConnectionError, UnicodeDecodeError):
+            pass
+        except asyncio.CancelledError:
+            # Engine shutdown, end quietly: the stream callback reports cancelled tasks as errors
+            pass
+        except Exception as err:
+            log.error("{} async handler error: {}".format(factory.name, err))
+        finally:
+            connections.pop(task, None)
+            writer.close()
+
+    def new_stats(self):
+        return dict(half_open=0, dropped=0, timeouts=0, handlers=0, rejected=0)
+
+    def get_stats(self, name):
+        stats = dict(max_half_open=self.max_half_open, max_handlers=self.max_handlers)
+        stats.update(self.stats.get(name) or self.new_stats())
+        return stats
+
+    def run_handler(self, factory, request, client_address):
+        context = self.contexts.get(factory.name) or AsyncServerContext(factory)
+        with metrics.timer(poolingmixin.handler_seconds, poolingmixin.handlers_in_flight, server=factory.name):
+            factory.request_handler_obj(request, client_address, context)
+
+
+class AsyncServerManager:
+    """
+    Same start/stop interface as ServerThreadManager, but registers the factory's
+    listener with a shared AsyncServerEngine instead of running a thread per server.
+    """
+
+    def __init__(self, factory, engine):
+        self.factory = factory
+        self.engine = engine
+        self.widget = None
+
+    def start(self):
+        self.widget = self.engine.add_server(self.factory)
+
+    def stop(self):
+        self.engine.remove_server(self.factory)
+        self.widget = None
+
+    def drain(self, timeout=None):
+        timeout = settings.server_drain_timeout if timeout is None else timeout
+        report = self.engine.drain_server(self.factory, timeout)
+        self.widget = None
+        return report
+
+    def restart(self):
+        """
+        The listener stays open on the event loop, only the handler context is replaced
+        """
+        if self.widget is None:
+            self.start()
+        else:
+            self.engine.reset_context(self.factory)
+
+    def get_stats(self):
+        """
+        Worker pool is shared across servers in the asyncio engine, only per-server connection counters
+        """
+        return self.engine.get_stats(self.factory.name)
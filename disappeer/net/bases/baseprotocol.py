@@ -8,43 +8,207 @@ License: GPLv3
 """
 
 from disappeer.net.bases import packet
+from disappeer import settings
+from disappeer.utilities import metrics
+import collections
+import mmap
+import socket
 import struct
+import tempfile
+import time
+
+
+frames = metrics.registry.counter('disappeer_protocol_frames_total', 'Frames sent and received, per command')
+frame_bytes = metrics.registry.counter('disappeer_protocol_bytes_total', 'Frame bytes sent and received')
+
+# Chunk payloads of a stream a transport already read and checked, length bytes over chunks frames
+SpooledStream = collections.namedtuple('SpooledStream', ['spool', 'length', 'chunks'])
 
 
 class BaseProtocol:
 
     max_message_length = 65535
+    max_stream_length = settings.max_stream_length
+    header_read_timeout = settings.header_read_timeout
+    payload_read_timeout = settings.payload_read_timeout
+    request_read_timeout = settings.request_read_timeout
     header = packet.Header
     header_length = header.length
     payload = packet.Payload
+    binary_payload = packet.BinaryPayload
+    # Shared frame templates for fixed shape payloads, keyed by command, codec and constant fields
+    frame_templates = {}
+    max_frame_templates = 256
+    template_scalars = (str, int, float, bool, type(None))
+    # Parts per sendmsg call, well under the usual IOV_MAX of 1024
+    max_send_parts = 512
+    # Sent by a saturated server instead of handling the request, the request may be retried later
+    busy_string = 'BSY'
 
     def __init__(self, sock):
         self.sock = sock
+        self.payload_flags = 0
+        self.incoming_flags = 0
+        self.incoming_length = 0
+        self.request_deadline = None
+        self.read_deadline = None
+        self.timed_out = False
+        self.incoming_started = False
+        self.peer_busy = False
+        self.frame_buffer = bytearray(self.header_length + self.max_message_length)
+        self.frame_view = memoryview(self.frame_buffer)
         self.ack_string = 'ACK'
         self.request_string = 'REQ'
         self.response_string = 'RES'
         self.message_string = 'MSG'
 
     def build_packet(self, payload_dict, command_string):
-        payload = packet.Payload(payload_dict)
-        result = packet.PacketFactory(payload).build(command_string)
+        result = b''.join(self.build_parts(payload_dict, command_string))
         return result
 
-    def _recvall(self, sock, num):
-        fragments = []
-        while len(b"".join(fragments)) < num:
-            current = sock.recv(num - len(b"".join(fragments)))
-            if not current:
+    def build_parts(self, payload_dict, command_string):
+        payload = self.select_payload(payload_dict)
+        factory = packet.PacketFactory(payload, self.select_compressor())
+        if self.payload_flags & self.header.flag_chunked:
+            return factory.build_parts(command_string, self.max_message_length)
+        return factory.build_parts(command_string)
+
+    def build_template_parts(self, payload_dict, command_string, variable_key):
+        """
+        Frame parts from the cached template for the shape of payload_dict, None if it does not fit one:
+        other values must be scalars, and the frame small enough to skip compression and chunking.
+        """
+        value = payload_dict.get(variable_key)
+        if not isinstance(value, str):
+            return None
+        if self.payload_flags & self.header.flag_binary and self.binary_payload.can_encode(payload_dict):
+            payload_class = self.binary_payload
+        else:
+            payload_class = self.payload
+        try:
+            # Typed, so True and 1 do not share a template
+            fields = tuple((key, None, None) if key == variable_key else (key, type(item), item)
+                           for key, item in payload_dict.items())
+            key = (command_string, payload_class, fields)
+            template = self.frame_templates.get(key)
+        except TypeError:
+            return None
+        if template is None:
+            if not all(isinstance(item, self.template_scalars) for item in payload_dict.values()):
+                return None
+            try:
+                template = packet.FrameTemplate(command_string, payload_dict, variable_key, payload_class)
+            except ValueError:
+                # A constant value contained the template marker
+                return None
+            if len(self.frame_templates) < self.max_frame_templates:
+                self.frame_templates[key] = template
+        if not template.can_fill(value):
+            return None
+        parts = template.parts(value)
+        length = len(parts[1]) + len(parts[2]) + len(parts[3])
+        compressor = self.select_compressor()
+        if length > self.max_message_length or (compressor is not None and length >= compressor.threshold):
+            return None
+        return parts
+
+    def send_parts(self, parts, command_string, frame_count=None):
+        """
+        Write frame parts with scatter-gather sendmsg on OS sockets that have it, other socket-like
+        objects get the parts joined for sendall. frame_count defaults to alternating header and payload parts.
+        """
+        total = sum(len(item) for item in parts)
+        if isinstance(self.sock, socket.socket) and hasattr(self.sock, 'sendmsg'):
+            for offset in range(0, len(parts), self.max_send_parts):
+                batch = parts[offset:offset + self.max_send_parts]
+                sent = self.sock.sendmsg(batch)
+                batch_total = sum(len(item) for item in batch)
+                if sent < batch_total:
+                    # Short write, finish the rest of the batch the plain way
+                    self.sock.sendall(b''.join(batch)[sent:])
+        else:
+            self.sock.sendall(b''.join(parts))
+        if frame_count is None:
+            frame_count = len(parts) // 2
+        frames.inc(frame_count, command=command_string, direction='out')
+        frame_bytes.inc(total, direction='out')
+
+    def select_payload(self, payload_dict):
+        """
+        Binary codec once the peer is known to accept it, JSON otherwise
+        """
+        if self.payload_flags & self.header.flag_binary and self.binary_payload.can_encode(payload_dict):
+            return self.binary_payload(payload_dict)
+        return packet.Payload(payload_dict)
+
+    def select_compressor(self):
+        """
+        Compressor for the configured method once the peer is known to accept it, None otherwise
+        """
+        method = settings.payload_compression
+        flag = packet.Compressor.methods.get(method)
+        if flag is None or not self.payload_flags & flag:
+            return None
+        return packet.Compressor(method, settings.payload_compression_level, settings.payload_compression_threshold)
+
+    def _recv_into(self, sock, view):
+        """
+        Fill the memoryview from sock, return the filled slice of the view.
+        Slice is short if the peer closes the connection early, or misses read_deadline.
+        The deadline is absolute, so trickling bytes does not extend it.
+        """
+        total = len(view)
+        received = 0
+        while received < total:
+            if self.read_deadline is not None:
+                remaining = self.read_deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timed_out = True
+                    break
+                sock.settimeout(remaining)
+            try:
+                count = sock.recv_into(view[received:], total - received)
+            except socket.timeout:
+                self.timed_out = True
+                break
+            if not count:
                 break
-            fragments.append(current)
-        return b"".join(fragments)
+            received += count
+        return view[:received]
+
+    def _recvall(self, sock, num):
+        buffer = bytearray(num)
+        return self._recv_into(sock, memoryview(buffer))
+
+    def phase_deadline(self, timeout):
+        """
+        Deadline for one read phase, never later than the deadline for the whole request
+        """
+        deadline = time.monotonic() + timeout
+        if self.request_deadline is not None:
+            deadline = min(deadline, self.request_deadline)
+        return deadline
 
     def recv_header(self):
-        header_data = self._recvall(self.sock, self.header_length)
+        """
+        Returns a view into frame_buffer, valid until the next recv_header on this protocol.
+        Copy it with bytes() to keep it longer.
+        """
+        self.read_deadline = self.phase_deadline(self.header_read_timeout)
+        header_view = self.frame_view[:self.header_length]
+        header_data = self._recv_into(self.sock, header_view)
+        if header_data:
+            self.incoming_started = True
         return header_data
 
     def recv_payload(self, payload_length):
-        result = self._recvall(self.sock, payload_length)
+        """
+        Returns a view into frame_buffer, valid until the next recv_payload on this protocol.
+        decode_payload copies what it keeps, so decoded results outlive the view.
+        """
+        self.read_deadline = self.phase_deadline(self.payload_read_timeout)
+        payload_view = self.frame_view[self.header_length:self.header_length + payload_length]
+        result = self._recv_into(self.sock, payload_view)
         return result
 
     def validate_header(self, header_data, command_string):
@@ -55,19 +219,128 @@ class BaseProtocol:
 
         length_val = unpacked[0]
         command_val = unpacked[1]
+        flags_val = self.header.unpack_flags(header_data)
         if command_val != command_string:
+            if command_val == self.busy_string:
+                self.peer_busy = True
             return False
         elif length_val > self.max_message_length:
             return False
+        elif flags_val & ~self.header.supported_flags:
+            return False
         else:
+            self.incoming_flags = flags_val
+            frames.inc(command=command_string, direction='in')
+            frame_bytes.inc(self.header_length + length_val, direction='in')
             return unpacked
 
     def process_incoming(self, command_string):
+        """
+        Returns False on an invalid or truncated request, timed_out tells if a read deadline passed,
+        incoming_started if any byte of the request arrived, peer_busy if the peer sent a busy frame instead
+        """
+        self.timed_out = False
+        self.incoming_started = False
+        self.peer_busy = False
+        self.request_deadline = time.monotonic() + self.request_read_timeout
+        previous_timeout = self.sock.gettimeout()
+        try:
+            return self.read_incoming(command_string)
+        finally:
+            self.request_deadline = None
+            self.read_deadline = None
+            self.sock.settimeout(previous_timeout)
+
+    def read_incoming(self, command_string):
         header_data = self.recv_header()
         header = self.validate_header(header_data, command_string)
         if not header:
             return False
 
+        if self.incoming_flags & self.header.flag_chunked:
+            return self.process_incoming_stream(header[0], command_string)
+        self.incoming_length = header[0]
         payload_data = self.recv_payload(header[0])
-        decoded = self.payload(payload_data).decode()
-        return decoded
\ No newline at end of file
+        if self.timed_out:
+            return False
+        return self.decode_payload(payload_data, self.max_message_length)
+
+    def decode_payload(self, payload_data, limit):
+        """
+        Decompressed payloads may not exceed limit bytes, returns False if they do, are corrupt,
+        or are malformed or truncated binary payloads
+        """
+        compression_flags = self.incoming_flags & self.header.compression_flags
+        if compression_flags:
+            try:
+                payload_data = packet.Compressor.decompress(payload_data, compression_flags, limit)
+            except ValueError:
+                return False
+            # Compressed replies are only useful to a peer that compresses too
+            self.payload_flags |= compression_flags
+        if self.incoming_flags & self.header.flag_binary:
+            try:
+                decoded = self.binary_payload(payload_data).decode()
+            except ValueError:
+                return False
+            # Peer just proved it speaks the binary codec, answer in kind
+            self.payload_flags |= self.header.flag_binary
+        else:
+            decoded = self.payload(payload_data).decode()
+        return decoded
+
+    def process_incoming_stream(self, chunk_length, command_string):
+        """
+        Spool chunk frames to a temporary file until the last one, so only one frame buffer is
+        held in memory while the stream is in flight. Returns False on a truncated stream,
+        a stream longer than max_stream_length, or chunks that disagree on command or codec.
+        A socket offering a spooled_stream has read the chunks already, that spool is decoded as is.
+        """
+        spooled = getattr(self.sock, 'spooled_stream', None)
+        if isinstance(spooled, SpooledStream):
+            return self.decode_spooled_stream(spooled, chunk_length, command_string)
+        codec_flags = self.incoming_flags & ~self.header.flag_chunked
+        total = 0
+        with tempfile.TemporaryFile() as spool:
+            while True:
+                chunk = self.recv_payload(chunk_length)
+                if len(chunk) < chunk_length:
+                    return False
+                total += chunk_length
+                if total > self.max_stream_length:
+                    return False
+                spool.write(chunk)
+                if not self.incoming_flags & self.header.flag_chunked:
+                    break
+                header = self.validate_header(self.recv_header(), command_string)
+                if not header or (self.incoming_flags & ~self.header.flag_chunked) != codec_flags:
+                    return False
+                chunk_length = header[0]
+            spool.flush()
+            self.incoming_length = total
+            return self.decode_spooled(spool, total)
+
+    def decode_spooled_stream(self, spooled, chunk_length, command_string):
+        """
+        The transport checked each chunk against the first header, as process_incoming_stream does
+        """
+        if spooled.length > self.max_stream_length:
+            return False
+        frames.inc(spooled.chunks - 1, command=command_string, direction='in')
+        frame_bytes.inc((spooled.chunks - 1) * self.header_length + spooled.length - chunk_length, direction='in')
+        self.incoming_flags &= ~self.header.flag_chunked
+        self.incoming_length = spooled.length
+        return self.decode_spooled(spooled.spool, spooled.length)
+
+    def decode_spooled(self, spool, length):
+        if length == 0:
+            return self.decode_payload(b'', self.max_stream_length)
+        mapped = mmap.mmap(spool.fileno(), length, access=mmap.ACCESS_READ)
+        try:
+            return self.decode_payload(memoryview(mapped), self.max_stream_length)
+        finally:
+            try:
+                mapped.close()
+            except BufferError:
+                # A decode error traceback still holds a view of the mapping, it is freed with it
+                pass
@@ -8,14 +8,17 @@ License: GPLv3
 """
 
 from disappeer.net.bases import clientfactory
-from disappeer.net.bases import threadmanagers
+from disappeer.net.bases import clientexecutor
 
 
 class ClientController:
 
+    # Shared by all controllers, bounds outbound sends and keeps them ordered per peer
+    executor = clientexecutor.ClientExecutor()
+
     def __init__(self, client_type, argnamespace):
         self.client_factory = clientfactory.ClientFactory(client_type, argnamespace)
-        self.client = threadmanagers.ClientThreadManager(self.client_factory)
+        self.client = clientexecutor.ClientExecutorManager(self.client_factory, self.executor)
 
     def start(self):
         self.client.start()
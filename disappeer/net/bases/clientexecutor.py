@@ -0,0 +1,177 @@
+"""
+clientexecutor.py
+
+Module for outbound client sends:
+    - ClientExecutor, shared worker pool with a serial queue per destination
+    - ClientExecutorManager, drop-in replacement for ClientThreadManager
+
+Sends to the same host and port run one at a time in submission order, sends to different
+destinations run in parallel up to max_workers, and at most max_per_host to one host across
+its ports. Workers are daemon threads, as the per-send threads were, so a send hung on an
+unreachable peer does not block shutdown. Client sockets carry connect and IO timeouts, so a
+send to a silent peer ends and frees its worker.
+
+Copyright (C) 2018 Disappeer Labs
+License: GPLv3
+"""
+
+import collections
+import queue
+import threading
+import time
+from disappeer import settings
+from disappeer.utilities.logger import log
+
+
+class ClientExecutor:
+
+    def __init__(self, max_workers=None, max_per_host=None):
+        self.max_workers = max_workers or settings.client_executor_max_workers
+        self.max_per_host = max_per_host or settings.client_executor_max_per_host
+        self.lock = threading.Lock()
+        self.ready = queue.Queue()
+        self.pending = {}
+        self.host_in_flight = {}
+        self.deferred = {}
+        self.workers = []
+        self.in_flight = 0
+        self.submitted_count = 0
+        self.completed_count = 0
+        self.failed_count = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.latency_last = 0.0
+
+    def submit(self, destination, job):
+        """
+        Queue job, a callable, behind earlier jobs for the same (host, port) destination
+        """
+        with self.lock:
+            self.submitted_count += 1
+            jobs = self.pending.get(destination)
+            if jobs is None:
+                jobs = self.pending[destination] = collections.deque()
+                # Destination has nothing queued or in flight, hand it to a worker
+                self.ready.put(destination)
+            jobs.append((job, time.monotonic()))
+            if len(self.workers) < min(self.max_workers, len(self.pending)):
+                self.start_worker()
+
+    def start_worker(self):
+        worker = threading.Thread(target=self.run_worker, name='Client_Executor_Worker')
+        worker.daemon = True
+        self.workers.append(worker)
+        worker.start()
+
+    def run_worker(self):
+        while True:
+            destination = self.ready.get()
+            if destination is None:
+                return
+            self.run_next(destination)
+
+    def run_next(self, destination):
+        """
+        Run the oldest job for destination, then requeue the destination behind the others
+        so one busy peer cannot hold a worker while other peers wait. A destination whose host
+        already has max_per_host sends in flight waits aside until one of them finishes.
+        """
+        host = destination[0]
+        with self.lock:
+            if self.host_in_flight.get(host, 0) >= self.max_per_host:
+                self.deferred.setdefault(host, collections.deque()).append(destination)
+                return None
+            job, submitted = self.pending[destination].popleft()
+            self.host_in_flight[host] = self.host_in_flight.get(host, 0) + 1
+            self.in_flight += 1
+        failed = False
+        try:
+            job()
+        except Exception as err:
+            failed = True
+            log.error("Client send to {} failed: {}".format(destination, err))
+        with self.lock:
+            self.in_flight -= 1
+            self.end_host_send(host)
+            self.record_result(time.monotonic() - submitted, failed)
+            if self.pending[destination]:
+                self.ready.put(destination)
+            else:
+                del self.pending[destination]
+
+    def end_host_send(self, host):
+        """
+        Called with the lock held, hands the host's next waiting destination back to the workers
+        """
+        self.host_in_flight[host] -= 1
+        if not self.host_in_flight[host]:
+            del self.host_in_flight[host]
+        waiting = self.deferred.get(host)
+        if waiting:
+            self.ready.put(waiting.popleft())
+            if not waiting:
+                del self.deferred[host]
+
+    def record_result(self, latency, failed):
+        if failed:
+            self.failed_count += 1
+        else:
+            self.completed_count += 1
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+        self.latency_last = latency
+
+    def shutdown(self):
+        """
+        Stop the workers once the sends already queued have run
+        """
+        with self.lock:
+            workers = self.workers
+            self.workers = []
+        for _ in workers:
+            self.ready.put(None)
+        for worker in workers:
+            worker.join()
+
+    def get_stats(self):
+        """
+        Latency is measured from submit to completion, so it includes time queued behind the same peer
+        """
+        with self.lock:
+            finished = self.completed_count + self.failed_count
+            return dict(max_workers=self.max_workers,
+                        max_per_host=self.max_per_host,
+                        workers=len(self.workers),
+                        destinations=len(self.pending),
+                        hosts_in_flight=len(self.host_in_flight),
+                        queue_depth=sum(len(jobs) for jobs in self.pending.values()),
+                        in_flight=self.in_flight,
+                        submitted=self.submitted_count,
+                        completed=self.completed_count,
+                        failed=self.failed_count,
+                        latency_last=self.latency_last,
+                        latency_mean=self.latency_total / finished if finished else 0.0,
+                        latency_max=self.latency_max)
+
+
+class ClientExecutorManager:
+    """
+    Same start/stop interface as ClientThreadManager, but runs the client's send
+    on a shared ClientExecutor instead of a thread of its own.
+    """
+
+    def __init__(self, factory, executor):
+        self.factory = factory
+        self.executor = executor
+        self.widget = None
+
+    @property
+    def destination(self):
+        return self.factory.argnamespace.host, self.factory.argnamespace.port
+
+    def start(self):
+        self.widget = self.factory.build()
+        self.executor.submit(self.destination, self.widget.send)
+
+    def stop(self):
+        self.widget.stop()
@@ -0,0 +1,140 @@
+"""
+connectionpool.py
+
+Module for the ConnectionPool class object, process-wide pool of idle peer connections.
+
+Connections are parked as their ContactProtocol objects, keyed by (host, port), once the peer
+negotiated keep-alive. Checkout skips connections that expired or went readable while idle
+(closed by the peer), eviction closes the oldest connections beyond the per-peer and total limits.
+
+Copyright (C) 2018 Disappeer Labs
+License: GPLv3
+"""
+
+import collections
+import select
+import threading
+import time
+from disappeer import settings
+
+
+class ConnectionPool:
+
+    # Fraction of the peer's advertised idle timeout a connection is kept for, leaves room for latency
+    peer_idle_fraction = 0.8
+
+    def __init__(self, max_per_peer=None, max_connections=None, max_idle=None):
+        self.max_per_peer = max_per_peer or settings.connection_pool_max_per_peer
+        self.max_connections = max_connections or settings.connection_pool_max_connections
+        self.max_idle = max_idle or settings.connection_pool_max_idle
+        self.idle = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def acquire(self, interface):
+        """
+        Return a healthy idle protocol connected to interface, or None
+        """
+        stale = []
+        target = None
+        now = time.monotonic()
+        with self.lock:
+            entries = self.idle.get(interface, [])
+            while entries:
+                protocol, expires = entries.pop()
+                if expires > now and self.is_healthy(protocol.sock):
+                    target = protocol
+                    break
+                stale.append(protocol)
+            if not entries:
+                self.idle.pop(interface, None)
+            if target is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            self.evicted += len(stale)
+        self.close_all_protocols(stale)
+        return target
+
+    def release(self, interface, protocol):
+        """
+        Park a protocol whose peer negotiated keep-alive for the next client sending to interface
+        """
+        max_idle = min(self.max_idle, protocol.peer_idle_timeout * self.peer_idle_fraction)
+        expires = time.monotonic() + max_idle
+        with self.lock:
+            entries = self.idle.pop(interface, [])
+            entries.append((protocol, expires))
+            self.idle[interface] = entries
+            evicted = self.collect_evictions()
+        self.close_all_protocols(evicted)
+
+    def discard(self, protocol):
+        protocol.sock.close()
+
+    def collect_evictions(self):
+        """
+        Remove expired entries and entries beyond the limits, oldest peer first. Call with lock held.
+        """
+        now = time.monotonic()
+        evicted = []
+        for interface in list(self.idle):
+            entries = self.idle[interface]
+            live = [entry for entry in entries if entry[1] > now]
+            evicted.extend(entry[0] for entry in entries if entry[1] <= now)
+            while len(live) > self.max_per_peer:
+                evicted.append(live.pop(0)[0])
+            if live:
+                self.idle[interface] = live
+            else:
+                del self.idle[interface]
+        while self.count_idle() > self.max_connections:
+            interface, entries = next(iter(self.idle.items()))
+            evicted.append(entries.pop(0)[0])
+            if not entries:
+                del self.idle[interface]
+        self.evicted += len(evicted)
+        return evicted
+
+    def evict_expired(self):
+        with self.lock:
+            evicted = self.collect_evictions()
+        self.close_all_protocols(evicted)
+
+    def close_all(self):
+        with self.lock:
+            protocols = [entry[0] for entries in self.idle.values() for entry in entries]
+            self.idle.clear()
+        self.close_all_protocols(protocols)
+
+    def close_all_protocols(self, protocols):
+        for protocol in protocols:
+            try:
+                protocol.sock.close()
+            except OSError:
+                pass
+
+    def count_idle(self):
+        return sum(len(entries) for entries in self.idle.values())
+
+    def is_healthy(self, sock):
+        """
+        An idle keep-alive connection should have nothing to read, readable means the peer closed it
+        """
+        try:
+            if sock.fileno() < 0:
+                return False
+            readable, _, _ = select.select([sock], [], [], 0)
+        except (OSError, ValueError):
+            return False
+        return not readable
+
+    def get_stats(self):
+        with self.lock:
+            return dict(idle=self.count_idle(),
+                        peers=len(self.idle),
+                        hits=self.hits,
+                        misses=self.misses,
+                        evicted=self.evicted)
@@ -1,7 +1,18 @@
 """
 packet.py
 
-Module for packet-related networking classes: Header, Payload, PacketFactory
+Module for packet-related networking classes: Header, Payload, BinaryPayload, Compressor, PacketFactory, FrameTemplate
+
+Frame flags ride in the top byte of the header length field. Old peers see a flagged frame
+as oversized and drop it, so flags are only used once the peer advertised support for them.
+
+A payload too large for one frame is sent as consecutive frames with the same command, every
+frame but the last flagged chunked. Each chunk is bounded by the receiver's frame length limit.
+
+Compression applies to the encoded payload before it is split into chunks.
+
+Frames are built as a list of parts, headers and payload slices, so senders can hand them to
+a scatter-gather write instead of concatenating them first.
 
 Copyright (C) 2018 Disappeer Labs
 License: GPLv3
@@ -9,34 +20,66 @@ License: GPLv3
 
 import struct
 import json
+import lzma
+import zlib
+from disappeer.gpg.helpers import armor
 
 
 class Header:
     length = 7
     format_constant = 'I 3s'
     header_struct = struct.Struct(format_constant)
+    flag_shift = 24
+    length_mask = (1 << flag_shift) - 1
+    flag_binary = 0x01
+    flag_chunked = 0x02
+    flag_zlib = 0x04
+    flag_lzma = 0x08
+    compression_flags = flag_zlib | flag_lzma
+    supported_flags = flag_binary | flag_chunked | flag_zlib | flag_lzma
+    # Encoded command strings, commands are a handful of constants
+    command_bytes = {}
+    max_command_bytes = 64
+
+    @classmethod
+    def encode_command(cls, msg_cmd_string):
+        result = cls.command_bytes.get(msg_cmd_string)
+        if result is None:
+            result = bytes(msg_cmd_string, 'utf-8')
+            if len(cls.command_bytes) < cls.max_command_bytes:
+                cls.command_bytes[msg_cmd_string] = result
+        return result
 
     @classmethod
-    def pack(cls, msg_len_int, msg_cmd_string):
-        msg_cmd_bytes = bytes(msg_cmd_string, 'utf-8')
-        packed = cls.header_struct.pack(msg_len_int, msg_cmd_bytes)
+    def pack(cls, msg_len_int, msg_cmd_string, flags=0):
+        if msg_len_int > cls.length_mask:
+            raise ValueError('Frame length {} does not fit the header'.format(msg_len_int))
+        msg_cmd_bytes = cls.encode_command(msg_cmd_string)
+        packed = cls.header_struct.pack(flags << cls.flag_shift | msg_len_int, msg_cmd_bytes)
         return packed
 
     @classmethod
     def unpack(cls, packed_bytes):
         unpacked = cls.header_struct.unpack(packed_bytes)
-        final = (unpacked[0], unpacked[1].decode('utf-8'))
+        final = (unpacked[0] & cls.length_mask, unpacked[1].decode('utf-8'))
         return final
 
     @classmethod
-    def build(cls, payload, command_string):
+    def unpack_flags(cls, packed_bytes):
+        unpacked = cls.header_struct.unpack(packed_bytes)
+        return unpacked[0] >> cls.flag_shift
+
+    @classmethod
+    def build(cls, payload, command_string, flags=0):
         length_payload = len(payload)
-        header = cls.pack(length_payload, command_string)
+        header = cls.pack(length_payload, command_string, flags)
         return header
 
 
 class Payload:
 
+    flags = 0
+
     def __init__(self, data):
         self.data = data
 
@@ -45,18 +88,268 @@ class Payload:
         return encoded
 
     def decode(self):
-        decoded = self.data.decode('utf-8')
+        """
+        Data may be bytes, bytearray or memoryview, decoded without an intermediate copy to bytes
+        """
+        decoded = str(self.data, 'utf-8')
         result = json.loads(decoded)
         return result
 
 
+class BinaryPayload:
+    """
+    Versioned binary codec for flat dicts with string keys:
+        version (B), field count (H), then per field:
+        key length (B), key, value type (1s), value length (I), value
+    Value types: s utf-8 string, a ASCII-armored PGP block sent as raw packet bytes, j JSON.
+    Armored strings are only sent raw when re-armoring reproduces them exactly. The sender's
+    checksum line travels with the block, so neither side computes CRC24 on the hot path.
+    """
+
+    flags = Header.flag_binary
+    version = 1
+    prefix_struct = struct.Struct('!BH')
+    key_struct = struct.Struct('!B')
+    value_struct = struct.Struct('!cI')
+    armor_struct = struct.Struct('!BHB')
+    checksum_length = 4
+    armor_begin = '-----BEGIN PGP '
+
+    def __init__(self, data):
+        self.data = data
+
+    @classmethod
+    def can_encode(cls, data):
+        if not isinstance(data, dict) or len(data) > 0xFFFF:
+            return False
+        return all(isinstance(key, str) and len(key.encode('utf-8')) <= 0xFF for key in data)
+
+    def encode(self):
+        parts = [self.prefix_struct.pack(self.version, len(self.data))]
+        for key, value in self.data.items():
+            key_bytes = key.encode('utf-8')
+            value_type, value_bytes = self.encode_value(value)
+            parts.append(self.key_struct.pack(len(key_bytes)))
+            parts.append(key_bytes)
+            parts.append(self.value_struct.pack(value_type, len(value_bytes)))
+            parts.append(value_bytes)
+        return b''.join(parts)
+
+    def encode_value(self, value):
+        if isinstance(value, str):
+            if value.startswith(self.armor_begin):
+                armored = self.encode_armored(value)
+                if armored is not None:
+                    return b'a', armored
+            return b's', value.encode('utf-8')
+        return b'j', json.dumps(value).encode('utf-8')
+
+    def encode_armored(self, value):
+        block = armor.dearmor(value, verify=False)
+        if block is None or armor.rearmor(block) != value:
+            return None
+        block_type = block.block_type.encode('ascii')
+        headers = '\n'.join(block.headers).encode('utf-8')
+        checksum = (block.checksum or '').encode('ascii')
+        if len(block_type) > 0xFF or len(headers) > 0xFFFF:
+            return None
+        prefix = self.armor_struct.pack(len(block_type), len(headers), len(checksum))
+        return prefix + block_type + headers + checksum + block.data
+
+    def decode(self):
+        """
+        Data may be bytes, bytearray or memoryview. Raises ValueError on malformed input.
+        """
+        view = memoryview(self.data)
+        try:
+            version, count = self.prefix_struct.unpack_from(view, 0)
+            if version != self.version:
+                raise ValueError('Unsupported binary payload version {}'.format(version))
+            position = self.prefix_struct.size
+            result = {}
+            for _ in range(count):
+                key_length = self.key_struct.unpack_from(view, position)[0]
+                position += self.key_struct.size
+                key = str(self.read_slice(view, position, key_length), 'utf-8')
+                position += key_length
+                value_type, value_length = self.value_struct.unpack_from(view, position)
+                position += self.value_struct.size
+                value_view = self.read_slice(view, position, value_length)
+                position += value_length
+                result[key] = self.decode_value(value_type, value_view)
+        except struct.error as err:
+            raise ValueError('Truncated binary payload') from err
+        if position != len(view):
+            raise ValueError('Trailing bytes in binary payload')
+        return result
+
+    def read_slice(self, view, position, length):
+        if position + length > len(view):
+            raise ValueError('Truncated binary payload')
+        return view[position:position + length]
+
+    def decode_value(self, value_type, value_view):
+        if value_type == b's':
+            return str(value_view, 'utf-8')
+        elif value_type == b'j':
+            return json.loads(str(value_view, 'utf-8'))
+        elif value_type == b'a':
+            return self.decode_armored(value_view)
+        raise ValueError('Unknown binary payload value type {}'.format(value_type))
+
+    def decode_armored(self, value_view):
+        type_length, headers_length, checksum_length = self.armor_struct.unpack_from(value_view, 0)
+        if checksum_length not in (0, self.checksum_length):
+            raise ValueError('Bad armor checksum length in binary payload')
+        position = self.armor_struct.size
+        block_type = str(self.read_slice(value_view, position, type_length), 'ascii')
+        position += type_length
+        headers = str(self.read_slice(value_view, position, headers_length), 'utf-8')
+        position += headers_length
+        checksum = str(self.read_slice(value_view, position, checksum_length), 'ascii')
+        position += checksum_length
+        block = armor.ArmoredBlock(block_type,
+                                   tuple(headers.split('\n')) if headers else (),
+                                   bytes(value_view[position:]),
+                                   checksum or None)
+        return armor.rearmor(block)
+
+
+class Compressor:
+    """
+    Compresses encoded payloads of at least threshold bytes, when that actually saves bytes.
+    decompress refuses to produce more than limit bytes, so a small frame cannot expand into
+    an arbitrarily large buffer.
+    """
+
+    methods = dict(zlib=Header.flag_zlib, lzma=Header.flag_lzma)
+
+    def __init__(self, method, level, threshold):
+        self.method = method
+        self.flag = self.methods[method]
+        self.level = level
+        self.threshold = threshold
+
+    def compress(self, data):
+        """
+        Return compressed data and its header flag, or data unchanged and 0
+        """
+        if len(data) < self.threshold:
+            return data, 0
+        if self.flag == Header.flag_zlib:
+            compressed = zlib.compress(data, self.level)
+        else:
+            compressed = lzma.compress(data, preset=self.level)
+        if len(compressed) >= len(data):
+            return data, 0
+        return compressed, self.flag
+
+    @classmethod
+    def decompress(cls, data, flags, limit):
+        """
+        Raises ValueError on corrupt data, unknown flags, or output over limit bytes
+        """
+        try:
+            if flags == Header.flag_zlib:
+                decompressor = zlib.decompressobj()
+                result = decompressor.decompress(data, limit + 1)
+                complete = decompressor.eof
+            elif flags == Header.flag_lzma:
+                decompressor = lzma.LZMADecompressor()
+                result = decompressor.decompress(data, max_length=limit + 1)
+                complete = decompressor.eof
+            else:
+                raise ValueError('Unknown compression flags {}'.format(flags))
+        except (zlib.error, lzma.LZMAError) as err:
+            raise ValueError('Corrupt compressed payload') from err
+        if len(result) > limit:
+            raise ValueError('Decompressed payload exceeds {} bytes'.format(limit))
+        if not complete:
+            raise ValueError('Truncated compressed payload')
+        return result
+
+
 class PacketFactory:
 
-    def __init__(self, payload):
+    def __init__(self, payload, compressor=None):
         self.header = Header
         self.payload = payload
+        self.compressor = compressor
 
-    def build(self, command_string):
+    def encode(self):
+        """
+        Return encoded payload bytes, header flags and the length before compression
+        """
         encoded_payload = self.payload.encode()
-        header = self.header.build(encoded_payload, command_string)
-        return header + encoded_payload
+        flags = self.payload.flags
+        if self.compressor is None:
+            return encoded_payload, flags, len(encoded_payload)
+        compressed, compression_flag = self.compressor.compress(encoded_payload)
+        return compressed, flags | compression_flag, len(encoded_payload)
+
+    def build(self, command_string):
+        return b''.join(self.build_parts(command_string))
+
+    def build_chunked(self, command_string, chunk_length):
+        return b''.join(self.build_parts(command_string, chunk_length))
+
+    def build_parts(self, command_string, chunk_length=None):
+        """
+        Return the frame as a list of alternating headers and payload slices.
+        With chunk_length, payloads up to chunk_length build a single plain frame, larger ones a run
+        of chunk frames. A large payload is streamed even if it compresses into one chunk, since
+        receivers only decompress a plain frame up to their frame length limit.
+        """
+        encoded_payload, flags, raw_length = self.encode()
+        if chunk_length is None or raw_length <= chunk_length:
+            header = self.header.build(encoded_payload, command_string, flags)
+            return [header, encoded_payload]
+        view = memoryview(encoded_payload)
+        parts = []
+        for offset in range(0, len(view), chunk_length):
+            chunk = view[offset:offset + chunk_length]
+            chunk_flags = flags
+            if offset + chunk_length < len(view):
+                chunk_flags |= self.header.flag_chunked
+            parts.append(self.header.build(chunk, command_string, chunk_flags))
+            parts.append(chunk)
+        if len(view) <= chunk_length:
+            parts[0] = self.header.build(view, command_string, flags | self.header.flag_chunked)
+            parts.append(self.header.build(b'', command_string, flags))
+            parts.append(b'')
+        return parts
+
+
+class FrameTemplate:
+    """
+    Preformatted frame for payload dicts of one shape whose only varying value is the string at
+    variable_key, such as ACKs differing only by nonce. The constant fields are encoded once,
+    parts encodes just the variable value and packs the header.
+    """
+
+    marker = '\x00template\x00'
+
+    def __init__(self, command_string, data, variable_key, payload_class=Payload):
+        self.command_string = command_string
+        self.binary = payload_class is BinaryPayload
+        self.flags = payload_class.flags
+        encoded = payload_class(dict(data, **{variable_key: self.marker})).encode()
+        self.prefix, self.suffix = encoded.split(self.encode_value(self.marker))
+
+    def encode_value(self, value):
+        if self.binary:
+            value_bytes = value.encode('utf-8')
+            return BinaryPayload.value_struct.pack(b's', len(value_bytes)) + value_bytes
+        return bytes(json.dumps(value), 'utf-8')
+
+    def can_fill(self, value):
+        if not isinstance(value, str):
+            return False
+        # The binary codec would send armored values as raw packets
+        return not (self.binary and value.startswith(BinaryPayload.armor_begin))
+
+    def parts(self, value):
+        value_bytes = self.encode_value(value)
+        length = len(self.prefix) + len(value_bytes) + len(self.suffix)
+        header = Header.pack(length, self.command_string, self.flags)
+        return [header, self.prefix, value_bytes, self.suffix]
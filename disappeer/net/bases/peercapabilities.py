@@ -0,0 +1,33 @@
+"""
+peercapabilities.py
+
+Module for the PeerCapabilities class object, process-wide record of the frame flags
+each peer advertised in its ACKs, keyed by (host, port)
+
+Copyright (C) 2018 Disappeer Labs
+License: GPLv3
+"""
+
+import threading
+from disappeer.net.bases import packet
+
+
+class PeerCapabilities:
+
+    def __init__(self):
+        self.flags = {}
+        self.lock = threading.Lock()
+
+    def get(self, interface):
+        with self.lock:
+            return self.flags.get(interface, 0)
+
+    def update(self, interface, flags):
+        if not isinstance(flags, int):
+            return
+        with self.lock:
+            self.flags[interface] = flags & packet.Header.supported_flags
+
+    def forget(self, interface):
+        with self.lock:
+            self.flags.pop(interface, None)
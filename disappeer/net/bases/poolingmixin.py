@@ -0,0 +1,304 @@
+"""
+poolingmixin.py
+
+Module for the PoolingMixIn class object, a bounded replacement for socketserver.ThreadingMixIn
+
+Copyright (C) 2018 Disappeer Labs
+License: GPLv3
+"""
+
+import concurrent.futures
+import functools
+import socket
+import threading
+import time
+from disappeer import settings
+from disappeer.net.bases import baseprotocol
+from disappeer.net.bases import packet
+from disappeer.net.bases import socketwaiter
+from disappeer.utilities import metrics
+
+
+# Shared with the asyncio engine, labelled by server name
+connections = metrics.registry.counter('disappeer_server_connections_total',
+                                       'Connections accepted, rejected as busy, or dropped as half-open, per server')
+handler_seconds = metrics.registry.histogram('disappeer_server_handler_seconds',
+                                             'Seconds spent in request handlers, per server')
+handlers_in_flight = metrics.registry.gauge('disappeer_server_handlers_in_flight',
+                                            'Request handlers running, per server')
+
+
+class PoolingMixIn:
+    """
+    Handle requests on a fixed size worker pool instead of a new thread per connection.
+    Once every worker is busy and max_queued_requests are waiting, further connections
+    are answered with a BUSY frame and closed, at accept or once their first bytes arrive.
+
+    Connections are half-open from accept until their first bytes arrive. They wait on a
+    SocketWaiter rather than a worker, and are only handed to the pool once readable, so
+    silent peers cannot hold the pool. Past max_half_open of them new connections are dropped,
+    and a connection that sends nothing within header_read_timeout of accept is closed.
+
+    A handler that sets keep_open leaves its connection to the server once it returns. The
+    connection then waits for its next request on a second SocketWaiter, also without a worker,
+    for up to keep_alive_idle_timeout. Past max_idle such connections, further ones are closed.
+
+    drain lets accepted connections finish once serve_forever has stopped, close_pool shuts the
+    workers down without closing the listening socket, so a new server can take it over.
+    """
+
+    max_workers = settings.server_max_workers
+    max_queued_requests = settings.server_max_queued_requests
+    request_queue_size = settings.server_accept_backlog
+    max_half_open = settings.max_half_open_connections
+    header_read_timeout = settings.header_read_timeout
+    max_idle = settings.server_max_idle_connections
+    keep_alive_idle_timeout = settings.keep_alive_idle_timeout
+    block_on_close = False
+    rejection_frame = packet.PacketFactory(packet.Payload(dict(desc='BUSY'))).build(baseprotocol.BaseProtocol.busy_string)
+    # Metrics label, set to the factory name when built by a server factory
+    name = None
+
+    def __init__(self, *args, **kwargs):
+        self.pool_lock = threading.Lock()
+        self.queued_count = 0
+        self.active_count = 0
+        self.accepted_count = 0
+        self.rejected_count = 0
+        self.half_open_count = 0
+        self.dropped_count = 0
+        self.timeout_count = 0
+        self.idle_count = 0
+        self.request_counts = {}
+        self.in_flight = {}
+        self.cut_off = False
+        self.pool_idle = threading.Condition(self.pool_lock)
+        self.drain_event = threading.Event()
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers,
+                                                              thread_name_prefix=type(self).__name__)
+        self.half_open_waiter = socketwaiter.SocketWaiter(type(self).__name__ + '_Half_Open')
+        self.idle_waiter = socketwaiter.SocketWaiter(type(self).__name__ + '_Idle')
+        super().__init__(*args, **kwargs)
+
+    def is_saturated(self):
+        return self.queued_count + self.active_count >= self.max_workers + self.max_queued_requests
+
+    def process_request(self, request, client_address):
+        """
+        Called on the accept thread: park the connection until its first bytes arrive
+        """
+        with self.pool_lock:
+            if self.is_saturated():
+                self.rejected_count += 1
+                result = 'rejected'
+            elif self.half_open_count >= self.max_half_open:
+                self.dropped_count += 1
+                result = 'dropped'
+            else:
+                self.half_open_count += 1
+                result = None
+        if result is not None:
+            connections.inc(server=self.get_name(), result=result)
+            self.reject_request(request)
+            return None
+        on_ready = functools.partial(self.request_data_ready, client_address=client_address)
+        if not self.half_open_waiter.park(request, self.header_read_timeout, on_ready, self.request_data_expired):
+            self.end_half_open(request)
+
+    def request_data_ready(self, request, client_address):
+        """
+        Called on the waiter thread once the peer sent data or closed, hands the connection to the pool
+        """
+        with self.pool_lock:
+            self.half_open_count -= 1
+            rejected = self.is_saturated()
+            if rejected:
+                self.rejected_count += 1
+            else:
+                self.accepted_count += 1
+                self.queued_count += 1
+        connections.inc(server=self.get_name(), result='rejected' if rejected else 'accepted')
+        if rejected:
+            self.reject_request(request)
+        else:
+            self.executor.submit(self.process_request_worker, request, client_address)
+
+    def request_data_expired(self, request):
+        with self.pool_lock:
+            self.timeout_count += 1
+        self.end_half_open(request)
+
+    def end_half_open(self, request):
+        with self.pool_lock:
+            self.half_open_count -= 1
+        self.shutdown_request(request)
+
+    def next_request_ready(self, request, client_address):
+        """
+        Called on the waiter thread once a kept-alive connection is readable again
+        """
+        with self.pool_lock:
+            self.idle_count -= 1
+            rejected = self.is_saturated()
+            if rejected:
+                self.rejected_count += 1
+                self.request_counts.pop(request, None)
+            else:
+                self.queued_count += 1
+        if rejected:
+            connections.inc(server=self.get_name(), result='rejected')
+            self.reject_request(request)
+        else:
+            self.executor.submit(self.process_request_worker, request, client_address)
+
+    def end_idle(self, request):
+        with self.pool_lock:
+            self.idle_count -= 1
+        self.end_connection(request)
+
+    def park_idle(self, request, client_address):
+        """
+        Keep a connection open for its next request without holding a worker, return False if it cannot be kept
+        """
+        with self.pool_lock:
+            if self.drain_event.is_set() or self.idle_count >= self.max_idle:
+                return False
+            self.idle_count += 1
+        on_ready = functools.partial(self.next_request_ready, client_address=client_address)
+        if self.idle_waiter.park(request, self.keep_alive_idle_timeout, on_ready, self.end_idle):
+            return True
+        with self.pool_lock:
+            self.idle_count -= 1
+        return False
+
+    def end_connection(self, request):
+        with self.pool_lock:
+            self.request_counts.pop(request, None)
+        self.shutdown_request(request)
+
+    def get_request_count(self, request):
+        """
+        Requests served over this connection so far, counting the one being handled
+        """
+        with self.pool_lock:
+            return self.request_counts.get(request, 1)
+
+    def process_request_worker(self, request, client_address):
+        with self.pool_lock:
+            self.queued_count -= 1
+            self.active_count += 1
+            self.in_flight[request] = client_address
+            cut_off = self.cut_off
+            self.request_counts[request] = self.request_counts.get(request, 0) + 1
+        keep_open = False
+        try:
+            if not cut_off and self.has_request_data(request):
+                keep_open = self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            # Released before parking, a parked connection can be handed to another worker right away
+            with self.pool_lock:
+                self.active_count -= 1
+                del self.in_flight[request]
+            if not (keep_open and self.park_idle(request, client_address)):
+                self.end_connection(request)
+            with self.pool_lock:
+                self.pool_idle.notify_all()
+
+    def has_request_data(self, request):
+        """
+        Tell a connection handed over as readable with data from one the peer closed
+        """
+        try:
+            request.settimeout(0)
+            try:
+                return len(request.recv(1, socket.MSG_PEEK)) > 0
+            except BlockingIOError:
+                # Nothing buffered after all, the handler's read deadlines apply
+                return True
+            finally:
+                request.settimeout(None)
+        except OSError:
+            return False
+
+    def finish_request(self, request, client_address):
+        """
+        Count requests whose handler protocol gave up on a read deadline, return True if the handler keeps the connection open
+        """
+        with metrics.timer(handler_seconds, handlers_in_flight, server=self.get_name()):
+            handler = self.RequestHandlerClass(request, client_address, self)
+        if getattr(getattr(handler, 'protocol', None), 'timed_out', False) is True:
+            with self.pool_lock:
+                self.timeout_count += 1
+        return getattr(handler, 'keep_open', False) is True
+
+    def drain(self, timeout):
+        """
+        Wait up to timeout seconds for accepted connections to be served, call once serve_forever has stopped.
+        Connections still open at the deadline are shut down, and queued ones are closed unserved.
+        Return a report with the addresses of the connections that were cut off.
+        """
+        start = time.monotonic()
+        self.drain_event.set()
+        # No further requests on kept-alive connections
+        for request in self.idle_waiter.close():
+            self.end_idle(request)
+        with self.pool_idle:
+            drained = self.pool_idle.wait_for(lambda: self.queued_count + self.active_count == 0, timeout)
+            self.cut_off = not drained
+            cut_off = list(self.in_flight.items())
+            queued = self.queued_count
+        for request, client_address in cut_off:
+            try:
+                request.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        return dict(drained=drained,
+                    seconds=round(time.monotonic() - start, 3),
+                    cut_off=[client_address for request, client_address in cut_off],
+                    queued=queued)
+
+    def get_name(self):
+        return self.name or type(self).__name__
+
+    def reject_request(self, request):
+        """
+        Best effort, non-blocking BUSY reply so the accept loop never waits on a flooding peer.
+        """
+        try:
+            request.settimeout(0)
+            request.sendall(self.rejection_frame)
+        except OSError:
+            pass
+        self.shutdown_request(request)
+
+    def get_stats(self):
+        with self.pool_lock:
+            stats = dict(max_workers=self.max_workers,
+                         max_queued_requests=self.max_queued_requests,
+                         queue_depth=self.queued_count,
+                         active=self.active_count,
+                         accepted=self.accepted_count,
+                         rejected=self.rejected_count,
+                         max_half_open=self.max_half_open,
+                         half_open=self.half_open_count,
+                         dropped=self.dropped_count,
+                         max_idle=self.max_idle,
+                         idle=self.idle_count,
+                         timeouts=self.timeout_count)
+        return stats
+
+    def close_pool(self):
+        """
+        Close connections still waiting for data, and shut the workers down
+        """
+        for request in self.half_open_waiter.close():
+            self.end_half_open(request)
+        for request in self.idle_waiter.close():
+            self.end_idle(request)
+        self.executor.shutdown(wait=self.block_on_close)
+
+    def server_close(self):
+        super().server_close()
+        self.close_pool()
@@ -0,0 +1,129 @@
+"""
+replaycache.py
+
+Module for the ReplayCache class object, remembers recently seen request keys.
+
+Entries expire after ttl seconds, and the least recently added entry is evicted beyond
+max_entries. With a path, each entry is appended to that file as a JSON line, and unexpired
+entries are loaded back when the cache is created, so replays are caught across restarts.
+
+Copyright (C) 2018 Disappeer Labs
+License: GPLv3
+"""
+
+import collections
+import json
+import os
+import threading
+import time
+from disappeer import settings
+from disappeer.utilities.logger import log
+
+
+class ReplayCache:
+
+    def __init__(self, max_entries=None, ttl=None, path=None, clock=time.time):
+        self.max_entries = max_entries or settings.replay_cache_max_entries
+        self.ttl = ttl or settings.replay_cache_ttl
+        self.path = path or settings.replay_cache_path
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.entries = collections.OrderedDict()
+        self.hit_count = 0
+        self.appended = 0
+        if self.path is not None:
+            self.load()
+
+    def __contains__(self, key):
+        with self.lock:
+            return self.lookup(key, self.clock())
+
+    def lookup(self, key, now):
+        expiry = self.entries.get(key)
+        if expiry is None:
+            return False
+        if expiry <= now:
+            del self.entries[key]
+            return False
+        return True
+
+    def add(self, key):
+        """
+        Record key, return False if it was already recorded and unexpired
+        """
+        with self.lock:
+            now = self.clock()
+            if self.lookup(key, now):
+                self.hit_count += 1
+                return False
+            expiry = now + self.ttl
+            self.insert(key, expiry)
+            if self.path is not None:
+                self.append(key, expiry)
+                if self.appended > self.max_entries:
+                    self.compact(now)
+            return True
+
+    def discard(self, key):
+        """
+        Forget key, for a request recorded but not handled
+        """
+        with self.lock:
+            if self.entries.pop(key, None) is not None and self.path is not None:
+                self.compact(self.clock())
+
+    def insert(self, key, expiry):
+        self.entries[key] = expiry
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def append(self, key, expiry):
+        try:
+            with open(self.path, 'a') as f:
+                f.write(json.dumps([list(key), expiry]) + '\n')
+            self.appended += 1
+        except OSError as err:
+            log.error("Replay cache could not be persisted to {}: {}".format(self.path, err))
+
+    def load(self):
+        """
+        Read unexpired entries from path, then rewrite the file with only those
+        """
+        now = self.clock()
+        try:
+            with open(self.path) as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return None
+        except OSError as err:
+            log.error("Replay cache could not be loaded from {}: {}".format(self.path, err))
+            return None
+        for line in lines:
+            try:
+                key, expiry = json.loads(line)
+                key = tuple(key)
+            except (ValueError, TypeError):
+                continue
+            if expiry > now:
+                self.insert(key, expiry)
+        self.compact(now)
+
+    def compact(self, now):
+        """
+        Rewrite path with the unexpired entries, so the file stays within max_entries lines between loads
+        """
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                for key, expiry in self.entries.items():
+                    if expiry > now:
+                        f.write(json.dumps([list(key), expiry]) + '\n')
+            os.replace(tmp_path, self.path)
+            self.appended = 0
+        except OSError as err:
+            log.error("Replay cache could not be compacted at {}: {}".format(self.path, err))
+
+    def get_stats(self):
+        with self.lock:
+            return dict(entries=len(self.entries),
+                        hits=self.hit_count)
@@ -26,5 +26,17 @@ class ServerController:
         self.server.stop()
         self.status.set(False)
 
+    def drain(self, timeout=None):
+        report = self.server.drain(timeout)
+        self.status.set(False)
+        return report
+
+    def restart(self):
+        self.server.restart()
+        self.status.set(True)
+
     def get_status(self):
         return self.status.get()
+
+    def get_stats(self):
+        return self.server.get_stats()
@@ -0,0 +1,145 @@
+"""
+socketwaiter.py
+
+Module for the SocketWaiter class object, waits on server connections with no data yet, without a worker thread each.
+
+One thread selects on every parked socket. A socket is handed to its ready callback once it is
+readable, with data or at EOF, or to its expired callback once its deadline passes. Callbacks
+run on the waiter thread and must not block.
+
+Copyright (C) 2018 Disappeer Labs
+License: GPLv3
+"""
+
+import selectors
+import socket
+import threading
+import time
+from disappeer.utilities.logger import log
+
+
+class SocketWaiter:
+
+    def __init__(self, name=None):
+        self.name = name or type(self).__name__
+        self.lock = threading.Lock()
+        self.selector = None
+        self.thread = None
+        self.wakeup_recv = None
+        self.wakeup_send = None
+        self.parked = {}
+        self.pending = []
+        self.closed = False
+
+    def park(self, sock, timeout, on_ready, on_expired):
+        """
+        Wait up to timeout seconds for sock to turn readable, then call on_ready(sock), or on_expired(sock)
+        past the deadline. Return False if the waiter is closed, sock is then left to the caller.
+        """
+        with self.lock:
+            if self.closed:
+                return False
+            if self.thread is None:
+                self.start()
+            self.pending.append((sock, (time.monotonic() + timeout, on_ready, on_expired)))
+        self.wakeup()
+        return True
+
+    def start(self):
+        self.selector = selectors.DefaultSelector()
+        self.wakeup_recv, self.wakeup_send = socket.socketpair()
+        self.wakeup_recv.setblocking(False)
+        self.wakeup_send.setblocking(False)
+        self.selector.register(self.wakeup_recv, selectors.EVENT_READ)
+        self.thread = threading.Thread(target=self.run, name=self.name, daemon=True)
+        self.thread.start()
+
+    def wakeup(self):
+        try:
+            self.wakeup_send.send(b'x')
+        except OSError:
+            # Full wakeup buffer, the thread is woken already
+            pass
+
+    def run(self):
+        while True:
+            with self.lock:
+                if self.closed:
+                    return None
+                pending, self.pending = self.pending, []
+                for sock, entry in pending:
+                    self.register(sock, entry)
+                deadlines = [entry[0] for entry in self.parked.values()]
+            timeout = max(0, min(deadlines) - time.monotonic()) if deadlines else None
+            events = self.selector.select(timeout)
+            for key, mask in events:
+                if key.fileobj is self.wakeup_recv:
+                    self.drain_wakeup()
+                else:
+                    self.dispatch(key.fileobj, expired=False)
+            now = time.monotonic()
+            with self.lock:
+                expired = [sock for sock, entry in self.parked.items() if entry[0] <= now]
+            for sock in expired:
+                self.dispatch(sock, expired=True)
+
+    def register(self, sock, entry):
+        """
+        Called with the lock held, a socket closed before it was registered expires right away
+        """
+        try:
+            self.selector.register(sock, selectors.EVENT_READ)
+        except (ValueError, OSError):
+            entry = (0,) + entry[1:]
+        self.parked[sock] = entry
+
+    def dispatch(self, sock, expired):
+        """
+        Unpark sock and call its expired or ready callback
+        """
+        with self.lock:
+            entry = self.parked.pop(sock, None)
+            if entry is None:
+                return None
+            try:
+                self.selector.unregister(sock)
+            except (KeyError, ValueError, OSError):
+                pass
+        try:
+            callback = entry[2] if expired else entry[1]
+            callback(sock)
+        except Exception as err:
+            log.error("{} callback error: {}".format(self.name, err))
+
+    def drain_wakeup(self):
+        try:
+            while self.wakeup_recv.recv(4096):
+                pass
+        except OSError:
+            pass
+
+    def close(self):
+        """
+        Stop the thread, return the sockets still parked, their callbacks are not called
+        """
+        with self.lock:
+            closed = self.closed
+            self.closed = True
+            thread = self.thread
+        if thread is None or closed:
+            return []
+        self.wakeup()
+        if thread is not threading.current_thread():
+            thread.join()
+        with self.lock:
+            socks = list(self.parked) + [sock for sock, entry in self.pending]
+            self.parked = {}
+            self.pending = []
+        self.selector.close()
+        self.wakeup_recv.close()
+        self.wakeup_send.close()
+        return socks
+
+    def get_stats(self):
+        with self.lock:
+            return dict(parked=len(self.parked) + len(self.pending))
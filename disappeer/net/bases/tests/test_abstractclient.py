@@ -13,7 +13,12 @@ import net.bases.abstractclient as abstractclient
 import abc
 import types
 import socket
-import socks
+from disappeer import settings
+from disappeer.net.bases import connectionpool
+from disappeer.net.bases import transports
+from disappeer.net.bases import peercapabilities
+from disappeer.net.bases import poolingmixin
+from disappeer.net.contact import contactprotocol
 
 
 class TestImports(unittest.TestCase):
@@ -24,8 +29,17 @@ class TestImports(unittest.TestCase):
     def test_socket(self):
         self.assertEqual(socket, abstractclient.socket)
 
-    def test_socks(self):
-        self.assertEqual(socks, abstractclient.socks)
+    def test_transports(self):
+        self.assertEqual(transports, abstractclient.transports)
+
+    def test_settings(self):
+        self.assertEqual(settings, abstractclient.settings)
+
+    def test_connectionpool(self):
+        self.assertEqual(connectionpool, abstractclient.connectionpool)
+
+    def test_peercapabilities(self):
+        self.assertEqual(peercapabilities, abstractclient.peercapabilities)
 
 
 class MockConcreateAbstractClient(abstractclient.AbstractClient):
@@ -36,6 +50,12 @@ class MockConcreateAbstractClient(abstractclient.AbstractClient):
     def handle_response(self):
         raise NotImplementedError
 
+    def report_result(self, result):
+        pass
+
+    def report_error(self):
+        pass
+
     def set_protocol(self):
         raise NotImplementedError
 
@@ -125,12 +145,10 @@ class TestAbstractClientClassBasics(unittest.TestCase):
         result.close()
         self.assertEqual(check, 1)
 
-    @unittest.skip("Must test manually with socks proxy")
-    def test_create_socket_sets_timeout(self):
-        target = 10.0
+    def test_create_socket_sets_connect_timeout(self):
         result = self.x.create_socket()
         result.close()
-        self.assertEqual(result.timeout, target)
+        self.assertEqual(result.gettimeout(), settings.client_connect_timeout)
 
     def test_create_socket_sets_sock_attribute(self):
         result = self.x.create_socket()
@@ -139,16 +157,40 @@ class TestAbstractClientClassBasics(unittest.TestCase):
 
     def test_create_socket_is_socks_proxy_socket(self):
         result = self.x.create_socket()
-        self.assertIsInstance(result, socks.socksocket)
-        target_proxy_args = (2, '127.0.0.1', 9050, True, None, None)
+        self.assertIsInstance(result, transports.socks.socksocket)
+        target_proxy_args = (2, settings.socks_proxy_host, settings.socks_proxy_port, True, None, None)
         self.assertEqual(target_proxy_args, result.proxy)
         result.close()
 
+    def test_transport_default_from_settings(self):
+        self.assertEqual(self.x.transport.name, settings.client_transport)
+
+    def test_transport_from_argnamespace(self):
+        self.name_space_obj.transport = 'tcp'
+        self.assertIsInstance(self.x.transport, transports.TCPTransport)
+        result = self.x.create_socket()
+        result.close()
+        self.assertEqual(type(result), socket.socket)
+
     def test_connect_method_calls_connect(self):
         target = self.x.sock = MagicMock()
         self.x.connect()
         target.connect.assert_called_with(self.x.interface)
 
+    def test_connect_method_sets_io_timeout(self):
+        target = self.x.sock = MagicMock()
+        self.x.connect()
+        target.settimeout.assert_called_with(settings.client_io_timeout)
+
+    def test_configure_transport_method_with_connect_timeout_sets_and_returns_error(self):
+        sub = self.x.create_socket = MagicMock()
+        sub2 = self.x.set_protocol = MagicMock()
+        target = self.x.sock = MagicMock()
+        target.connect.side_effect = socket.timeout
+        result = self.x.configure_transport()
+        self.assertIsInstance(result, socket.timeout)
+        sub2.assert_not_called()
+
     def test_handle_response_raises_not_implemented(self):
         with self.assertRaises(NotImplementedError):
             self.x.handle_response()
@@ -211,4 +253,189 @@ class TestAbstractClientClassBasics(unittest.TestCase):
         final = target.connect.side_effect = ConnectionRefusedError
         result = self.x.configure_transport()
         self.assertIsInstance(result, ConnectionRefusedError)
-        self.assertIsInstance(self.x.error, ConnectionRefusedError)
\ No newline at end of file
+        self.assertIsInstance(self.x.error, ConnectionRefusedError)
+
+
+class TestConnectionReuse(unittest.TestCase):
+
+    def setUp(self):
+        self.name_space_obj = types.SimpleNamespace(host='host',
+                                                    port='port',
+                                                    payload_dict=dict(nonce='nonce'),
+                                                    command='MSG',
+                                                    queue=MagicMock(),
+                                                    nonce='nonce')
+        self.x = MockConcreateAbstractClient(self.name_space_obj)
+        self.x.pool = connectionpool.ConnectionPool()
+        self.x.capabilities = peercapabilities.PeerCapabilities()
+        self.x.report_result = MagicMock()
+        self.x.report_error = MagicMock()
+        self.protocol = MagicMock()
+        self.protocol.peer_busy = False
+        self.protocol.is_reusable.return_value = True
+        self.protocol.peer_idle_timeout = 30
+        self.protocol.peer_flags = 1
+
+    def test_pool_is_shared_across_clients(self):
+        self.assertIsInstance(abstractclient.AbstractClient.pool, connectionpool.ConnectionPool)
+
+    def test_nonce_is_valid(self):
+        self.assertTrue(self.x.nonce_is_valid(dict(nonce='nonce')))
+        self.assertFalse(self.x.nonce_is_valid(dict(nonce='other')))
+        self.assertFalse(self.x.nonce_is_valid(dict()))
+        self.assertFalse(self.x.nonce_is_valid(False))
+
+    def test_configure_protocol_sets_keep_alive_and_peer_flags(self):
+        self.x.capabilities.update(self.x.interface, 1)
+        self.x.protocol = self.protocol
+        self.x.configure_protocol()
+        self.assertEqual(self.protocol.keep_alive, settings.peer_keep_alive)
+        self.assertEqual(self.protocol.payload_flags, 1)
+
+    @patch.object(abstractclient.settings, 'binary_payload_codec', False)
+    def test_configure_protocol_leaves_flags_when_codec_disabled(self):
+        self.x.capabilities.update(self.x.interface, 1)
+        self.protocol.payload_flags = 0
+        self.x.protocol = self.protocol
+        self.x.configure_protocol()
+        self.assertEqual(self.protocol.payload_flags, 0)
+
+    def test_release_connection_records_peer_flags(self):
+        self.x.protocol = self.protocol
+        self.x.release_connection(dict(nonce='nonce'))
+        self.assertEqual(self.x.capabilities.get(self.x.interface), 1)
+
+    def test_release_connection_forgets_peer_flags_on_failure(self):
+        self.x.capabilities.update(self.x.interface, 1)
+        self.x.protocol = self.protocol
+        self.x.release_connection(False)
+        self.assertEqual(self.x.capabilities.get(self.x.interface), 0)
+
+    def test_release_connection_counts_exchange_result(self):
+        self.name_space_obj.command = 'TEX'
+        self.x.protocol = self.protocol
+        self.x.release_connection(dict(nonce='nonce'))
+        self.x.release_connection(False)
+        self.assertEqual(abstractclient.exchanges.get(command='TEX', result='ok'), 1)
+        self.assertEqual(abstractclient.exchanges.get(command='TEX', result='failed'), 1)
+
+    def test_release_connection_discards_busy_peer_keeping_flags(self):
+        self.name_space_obj.command = 'TBS'
+        self.x.capabilities.update(self.x.interface, 1)
+        self.protocol.peer_busy = True
+        self.x.protocol = self.protocol
+        self.x.release_connection(False)
+        self.protocol.sock.close.assert_called_with()
+        self.assertEqual(self.x.capabilities.get(self.x.interface), 1)
+        self.assertEqual(abstractclient.exchanges.get(command='TBS', result='busy'), 1)
+        self.assertEqual(abstractclient.exchanges.get(command='TBS', result='failed'), 0)
+
+    def test_report_response_reports_result(self):
+        self.x.protocol = self.protocol
+        self.x.report_response(dict(nonce='nonce'))
+        self.x.report_result.assert_called_with(dict(nonce='nonce'))
+        self.assertFalse(self.x.report_error.called)
+
+    def test_report_response_reports_busy_peer_as_error(self):
+        self.protocol.peer_busy = True
+        self.x.protocol = self.protocol
+        self.x.report_response(False)
+        self.assertIsInstance(self.x.error, abstractclient.PeerBusyError)
+        self.x.report_error.assert_called_with()
+        self.assertFalse(self.x.report_result.called)
+
+    def test_send_over_resumed_connection_reports_busy_peer(self):
+        self.protocol.handle_response.return_value = False
+        self.protocol.incoming_started = True
+        self.protocol.timed_out = False
+        self.protocol.peer_busy = True
+        self.x.protocol = self.protocol
+        self.assertTrue(self.x.send_over_resumed_connection())
+        self.assertIsInstance(self.x.error, abstractclient.PeerBusyError)
+        self.assertFalse(self.x.report_result.called)
+
+    def test_busy_frame_from_server_is_reported_as_busy(self):
+        local, remote = socket.socketpair()
+        try:
+            remote.sendall(poolingmixin.PoolingMixIn.rejection_frame)
+            self.x.protocol = contactprotocol.ContactProtocol(local)
+            self.x.sock = local
+            self.x.protocol.handle_response()
+            self.x.report_response(False)
+        finally:
+            local.close()
+            remote.close()
+        self.assertIsInstance(self.x.error, abstractclient.PeerBusyError)
+
+    def test_resume_connection_false_when_pool_empty(self):
+        self.assertFalse(self.x.resume_connection())
+
+    def test_resume_connection_takes_protocol_from_pool(self):
+        self.x.pool.acquire = MagicMock(return_value=self.protocol)
+        self.assertTrue(self.x.resume_connection())
+        self.x.pool.acquire.assert_called_with(self.x.interface)
+        self.assertIs(self.x.protocol, self.protocol)
+        self.assertIs(self.x.sock, self.protocol.sock)
+
+    def test_release_connection_parks_reusable_protocol(self):
+        self.x.pool.release = MagicMock()
+        self.x.protocol = self.protocol
+        self.x.release_connection(dict(nonce='nonce'))
+        self.x.pool.release.assert_called_with(self.x.interface, self.protocol)
+
+    def test_release_connection_skips_one_shot_protocol(self):
+        self.x.pool.release = MagicMock()
+        self.protocol.is_reusable.return_value = False
+        self.x.protocol = self.protocol
+        self.x.release_connection(dict(nonce='nonce'))
+        self.assertFalse(self.x.pool.release.called)
+
+    def test_release_connection_discards_on_nonce_mismatch(self):
+        self.x.protocol = self.protocol
+        self.x.release_connection(dict(nonce='other'))
+        self.protocol.sock.close.assert_called_with()
+
+    def test_send_over_resumed_connection_reports_result(self):
+        self.protocol.handle_response.return_value = dict(nonce='nonce', desc='ACK', keep_alive=30)
+        self.x.release_connection = MagicMock()
+        self.x.protocol = self.protocol
+        result = self.x.send_over_resumed_connection()
+        self.assertTrue(result)
+        self.protocol.send_request.assert_called_with(self.x.payload_dict, self.x.command)
+        self.x.report_result.assert_called_with(self.protocol.handle_response.return_value)
+        self.x.release_connection.assert_called_with(self.protocol.handle_response.return_value)
+
+    def test_send_over_resumed_connection_false_when_peer_dropped(self):
+        self.protocol.send_request.side_effect = BrokenPipeError
+        self.x.protocol = self.protocol
+        result = self.x.send_over_resumed_connection()
+        self.assertFalse(result)
+        self.protocol.sock.close.assert_called_with()
+        self.assertIsNone(self.x.protocol)
+        self.assertFalse(self.x.report_result.called)
+
+    def test_send_over_resumed_connection_false_on_eof_before_response(self):
+        self.protocol.handle_response.return_value = False
+        self.protocol.incoming_started = False
+        self.protocol.timed_out = False
+        self.x.protocol = self.protocol
+        self.assertFalse(self.x.send_over_resumed_connection())
+        self.protocol.sock.close.assert_called_with()
+        self.assertFalse(self.x.report_result.called)
+
+    def test_send_over_resumed_connection_reports_invalid_response(self):
+        self.protocol.handle_response.return_value = dict(nonce='other', desc='ACK')
+        self.protocol.incoming_started = True
+        self.protocol.timed_out = False
+        self.x.protocol = self.protocol
+        self.assertTrue(self.x.send_over_resumed_connection())
+        self.x.report_result.assert_called_with(self.protocol.handle_response.return_value)
+        self.protocol.sock.close.assert_called_with()
+
+    def test_send_over_resumed_connection_reports_timed_out_response(self):
+        self.protocol.handle_response.return_value = False
+        self.protocol.incoming_started = False
+        self.protocol.timed_out = True
+        self.x.protocol = self.protocol
+        self.assertTrue(self.x.send_over_resumed_connection())
+        self.x.report_result.assert_called_with(False)
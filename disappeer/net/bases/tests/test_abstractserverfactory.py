@@ -8,7 +8,7 @@ License: GPLv3
 """
 
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, PropertyMock, patch
 from disappeer.net.bases import abstractserverfactory
 import abc
 import queue
@@ -118,6 +118,21 @@ class TestClassBasics(unittest.TestCase):
         result = self.mocked.build()
         self.assertEqual(result.queue, self.mocked.queue)
 
+    def test_build_method_sets_name(self):
+        result = self.mocked.build()
+        self.assertEqual(result.name, self.mocked.name)
+
+    def test_build_method_with_sock_takes_over_socket(self):
+        sock = MagicMock()
+        server_class = MagicMock()
+        original_socket = server_class.return_value.socket
+        with patch.object(MockConcrete, 'server_obj', new_callable=PropertyMock, return_value=server_class):
+            result = self.mocked.build(sock)
+        server_class.assert_called_with(self.mocked.interface, self.mocked.request_handler_obj,
+                                        bind_and_activate=False)
+        original_socket.close.assert_called_with()
+        self.assertIs(result.socket, sock)
+
     def test_build_method_catches_os_error_puts_error_dict_to_queue_returns_none(self):
         error_class = MockBuildError(self.q)
         mock_queue = error_class.queue = MagicMock()
@@ -125,3 +140,11 @@ class TestClassBasics(unittest.TestCase):
         self.assertTrue(mock_queue.put.called)
         self.assertIsNone(result)
 
+    def test_report_error_puts_error_dict_to_queue(self):
+        mock_queue = self.x.queue = MagicMock()
+        err = OSError()
+        self.x.report_error(err)
+        target = dict(desc=constants.command_list.Server_Error,
+                      error=err,
+                      interface=self.x.interface)
+        mock_queue.put.assert_called_with(target)
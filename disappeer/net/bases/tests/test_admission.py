@@ -0,0 +1,109 @@
+"""
+test_admission.py
+
+Test suite for the TokenBucket and AdmissionController class objects
+
+Copyright (C) 2018 Disappeer Labs
+License: GPLv3
+"""
+
+import unittest
+import collections
+import threading
+from disappeer.net.bases import admission
+
+
+class TestImports(unittest.TestCase):
+
+    def test_collections(self):
+        self.assertEqual(collections, admission.collections)
+
+    def test_threading(self):
+        self.assertEqual(threading, admission.threading)
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.x = admission.TokenBucket(2, 4, self.clock)
+
+    def test_starts_full(self):
+        self.assertTrue(self.x.can_consume(4))
+        self.assertFalse(self.x.can_consume(5))
+
+    def test_refills_at_rate_up_to_burst(self):
+        self.x.consume(4)
+        self.assertFalse(self.x.can_consume(1))
+        self.clock.now = 1.0
+        self.assertTrue(self.x.can_consume(2))
+        self.assertFalse(self.x.can_consume(3))
+        self.clock.now = 100.0
+        self.x.refill()
+        self.assertEqual(self.x.tokens, 4)
+
+
+class TestAdmissionController(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.budgets = dict(request=(1, 3),
+                            bytes=(100, 1000),
+                            nonce=(0.1, 1))
+        self.x = admission.AdmissionController(self.budgets, max_keys=2, clock=self.clock)
+
+    def test_no_budgets_admits_everything(self):
+        x = admission.AdmissionController(dict())
+        self.assertTrue(all(x.admit(size=10 ** 9, nonce='a') for _ in range(100)))
+
+    def test_request_budget_rejects_after_burst(self):
+        self.assertEqual([self.x.admit() for _ in range(4)], [True, True, True, False])
+        self.clock.now = 1.0
+        self.assertTrue(self.x.admit())
+
+    def test_bytes_budget(self):
+        self.assertTrue(self.x.admit(size=600))
+        self.assertFalse(self.x.admit(size=600))
+        self.assertTrue(self.x.admit(size=400))
+
+    def test_request_larger_than_burst_admitted_on_full_bucket(self):
+        self.assertTrue(self.x.admit(size=5000))
+        self.assertFalse(self.x.admit(size=1))
+
+    def test_nonce_budget_is_per_value(self):
+        self.assertTrue(self.x.admit(nonce='a'))
+        self.assertFalse(self.x.admit(nonce='a'))
+        self.assertTrue(self.x.admit(nonce='b'))
+
+    def test_rejection_charges_nothing(self):
+        self.x.admit(nonce='a')
+        self.x.admit(nonce='a')
+        self.assertEqual(self.x.buckets['request'].tokens, 2)
+
+    def test_none_and_unbudgeted_values_skipped(self):
+        self.assertTrue(self.x.admit(nonce=None, fingerprint='f'))
+        self.assertTrue(self.x.admit(nonce=None, fingerprint='f'))
+        self.assertEqual(len(self.x.keyed_buckets), 0)
+
+    def test_keyed_buckets_capped_at_max_keys(self):
+        for value in ['a', 'b', 'c']:
+            self.x.admit(nonce=value)
+        self.assertEqual(list(self.x.keyed_buckets), [('nonce', 'b'), ('nonce', 'c')])
+
+    def test_get_stats(self):
+        self.x.admit(nonce='a')
+        self.x.admit(nonce='a')
+        target = dict(admitted=1,
+                      rejected=1,
+                      rejected_by=dict(nonce=1),
+                      tracked_keys=1)
+        self.assertEqual(self.x.get_stats(), target)
@@ -0,0 +1,514 @@
+"""
+test_asyncserver.py
+
+Test suite for the asyncio server backend module
+
+Copyright (C) 2018 Disappeer Labs
+License: GPLv3
+"""
+
+import unittest
+from unittest.mock import MagicMock, patch
+import asyncio
+import os
+import queue
+import socket
+import socketserver
+import tempfile
+import threading
+import time
+from disappeer.net.bases import asyncserver
+from disappeer.net.bases import abstractserverfactory
+from disappeer.net.bases import baseprotocol
+from disappeer.net.bases import packet
+from disappeer.utilities import helpers
+from disappeer import settings
+
+
+class TestImports(unittest.TestCase):
+
+    def test_asyncio(self):
+        self.assertEqual(asyncio, asyncserver.asyncio)
+
+    def test_packet(self):
+        self.assertEqual(packet, asyncserver.packet)
+
+    def test_settings(self):
+        self.assertEqual(settings, asyncserver.settings)
+
+    def test_helpers(self):
+        self.assertEqual(helpers, asyncserver.helpers)
+
+
+class EchoAckRequestHandler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        protocol = baseprotocol.BaseProtocol(self.request)
+        result = protocol.process_incoming(protocol.message_string)
+        if result is False:
+            return
+        self.server.queue.put(result)
+        ack = protocol.build_packet(dict(nonce=result['nonce'], desc='ACK'), protocol.ack_string)
+        self.request.sendall(ack)
+        self.request.close()
+
+
+class KeepAliveEchoRequestHandler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        protocol = baseprotocol.BaseProtocol(self.request)
+        result = protocol.process_incoming(protocol.message_string)
+        ack = protocol.build_packet(dict(nonce=result['nonce'], desc='ACK'), protocol.ack_string)
+        self.request.sendall(ack)
+
+
+class BlockingRequestHandler(socketserver.BaseRequestHandler):
+
+    started = threading.Semaphore(0)
+    release_event = threading.Event()
+
+    def handle(self):
+        self.started.release()
+        self.release_event.wait(5)
+        protocol = baseprotocol.BaseProtocol(self.request)
+        ack = protocol.build_packet(dict(desc='ACK'), protocol.ack_string)
+        self.request.sendall(ack)
+        self.request.close()
+
+
+class MockServerClass:
+
+    @classmethod
+    def get_sync_db_path(cls):
+        return 'sync_db_path'
+
+
+class LoopbackFactory(abstractserverfactory.AbstractServerFactory):
+
+    @property
+    def name(self):
+        return 'Loopback_Server'
+
+    @property
+    def host(self):
+        return '127.0.0.1'
+
+    @property
+    def port(self):
+        return 0
+
+    @property
+    def request_handler_obj(self):
+        return EchoAckRequestHandler
+
+    @property
+    def server_obj(self):
+        return MockServerClass
+
+
+class TestBufferedRequest(unittest.TestCase):
+
+    def setUp(self):
+        self.frame = b'hello world'
+        self.x = asyncserver.BufferedRequest(self.frame)
+
+    def test_recv_into_copies_frame_bytes(self):
+        buffer = bytearray(5)
+        result = self.x.recv_into(buffer, 5)
+        self.assertEqual(result, 5)
+        self.assertEqual(buffer, b'hello')
+
+    def test_recv_into_returns_zero_when_frame_consumed(self):
+        self.x.recv_into(bytearray(20), 20)
+        result = self.x.recv_into(bytearray(20), 20)
+        self.assertEqual(result, 0)
+
+    def test_recv_returns_bytes(self):
+        result = self.x.recv(5)
+        self.assertEqual(result, b'hello')
+
+    def test_recv_peek_does_not_consume(self):
+        self.assertEqual(self.x.recv(5, socket.MSG_PEEK), b'hello')
+        self.assertEqual(self.x.recv(5), b'hello')
+
+    def test_sendall_collects_output(self):
+        self.x.sendall(b'one')
+        self.x.sendall(memoryview(b'two'))
+        self.assertEqual(self.x.getvalue(), b'onetwo')
+
+    def test_close_sets_closed(self):
+        self.x.close()
+        self.assertTrue(self.x.closed)
+
+    def test_reads_from_spooled_file(self):
+        spool = tempfile.TemporaryFile()
+        spool.write(b'spooled')
+        spool.seek(0)
+        request = asyncserver.BufferedRequest(spool)
+        self.assertEqual(request.recv(3, socket.MSG_PEEK), b'spo')
+        buffer = bytearray(7)
+        self.assertEqual(request.recv_into(buffer, 7), 7)
+        self.assertEqual(buffer, b'spooled')
+        request.release()
+        self.assertTrue(spool.closed)
+
+    def test_release_closes_spooled_stream(self):
+        spool = tempfile.TemporaryFile()
+        request = asyncserver.BufferedRequest(b'header', baseprotocol.SpooledStream(spool, 0, 1))
+        request.release()
+        self.assertTrue(spool.closed)
+
+    def test_baseprotocol_reads_frame(self):
+        protocol = baseprotocol.BaseProtocol(None)
+        frame = protocol.build_packet(dict(msg='hello'), protocol.message_string)
+        protocol.sock = asyncserver.BufferedRequest(frame)
+        result = protocol.process_incoming(protocol.message_string)
+        self.assertEqual(result, dict(msg='hello'))
+
+
+class TestAsyncServerContext(unittest.TestCase):
+
+    def setUp(self):
+        self.queue = MagicMock()
+        self.factory = LoopbackFactory(self.queue)
+        self.x = asyncserver.AsyncServerContext(self.factory)
+
+    def test_queue_attribute(self):
+        self.assertEqual(self.x.queue, self.queue)
+
+    def test_defers_to_server_obj(self):
+        self.assertEqual(self.x.get_sync_db_path(), 'sync_db_path')
+
+    def test_get_request_count_is_one(self):
+        self.assertEqual(self.x.get_request_count(MagicMock()), 1)
+
+
+class TestAsyncServerEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.queue = queue.Queue()
+        self.factory = LoopbackFactory(self.queue)
+        self.x = asyncserver.AsyncServerEngine(max_workers=2)
+
+    def tearDown(self):
+        self.x.stop()
+
+    def send_frame(self, port, frame):
+        with socket.create_connection(('127.0.0.1', port), timeout=5) as sock:
+            sock.sendall(frame)
+            protocol = baseprotocol.BaseProtocol(sock)
+            return protocol.process_incoming(protocol.ack_string)
+
+    def test_max_workers_attribute(self):
+        self.assertEqual(self.x.max_workers, 2)
+
+    def test_max_workers_default_from_settings(self):
+        engine = asyncserver.AsyncServerEngine()
+        self.assertEqual(engine.max_workers, settings.async_server_max_workers)
+
+    def test_not_running_before_start(self):
+        self.assertFalse(self.x.is_running())
+
+    def test_start_and_stop(self):
+        self.x.start()
+        self.assertTrue(self.x.is_running())
+        self.x.stop()
+        self.assertFalse(self.x.is_running())
+
+    def test_add_server_serves_frames_and_acks(self):
+        server = self.x.add_server(self.factory)
+        port = server.sockets[0].getsockname()[1]
+        protocol = baseprotocol.BaseProtocol(None)
+        frame = protocol.build_packet(dict(nonce='xxx'), protocol.message_string)
+        result = self.send_frame(port, frame)
+        self.assertEqual(result, dict(nonce='xxx', desc='ACK'))
+        self.assertEqual(self.queue.get(timeout=5), dict(nonce='xxx'))
+
+    def test_add_server_serves_concurrent_connections(self):
+        server = self.x.add_server(self.factory)
+        port = server.sockets[0].getsockname()[1]
+        protocol = baseprotocol.BaseProtocol(None)
+        idle = [socket.create_connection(('127.0.0.1', port), timeout=5) for _ in range(10)]
+        try:
+            frame = protocol.build_packet(dict(nonce='yyy'), protocol.message_string)
+            result = self.send_frame(port, frame)
+        finally:
+            for sock in idle:
+                sock.close()
+        self.assertEqual(result['nonce'], 'yyy')
+
+    def test_oversized_header_closes_connection(self):
+        server = self.x.add_server(self.factory)
+        port = server.sockets[0].getsockname()[1]
+        frame = packet.Header.pack(self.x.max_message_length + 1, 'MSG')
+        with socket.create_connection(('127.0.0.1', port), timeout=5) as sock:
+            sock.sendall(frame)
+            result = sock.recv(10)
+        self.assertEqual(result, b'')
+
+    def test_open_connection_serves_further_frames(self):
+        server = self.x.add_server(self.factory)
+        port = server.sockets[0].getsockname()[1]
+        protocol = baseprotocol.BaseProtocol(None)
+        with unittest.mock.patch.object(LoopbackFactory, 'request_handler_obj', KeepAliveEchoRequestHandler):
+            with socket.create_connection(('127.0.0.1', port), timeout=5) as sock:
+                protocol.sock = sock
+                results = []
+                for nonce in ['one', 'two']:
+                    sock.sendall(protocol.build_packet(dict(nonce=nonce), protocol.message_string))
+                    results.append(protocol.process_incoming(protocol.ack_string)['nonce'])
+        self.assertEqual(results, ['one', 'two'])
+
+    def test_closed_request_ends_connection(self):
+        server = self.x.add_server(self.factory)
+        port = server.sockets[0].getsockname()[1]
+        protocol = baseprotocol.BaseProtocol(None)
+        with socket.create_connection(('127.0.0.1', port), timeout=5) as sock:
+            sock.sendall(protocol.build_packet(dict(nonce='one'), protocol.message_string))
+            protocol.sock = sock
+            protocol.process_incoming(protocol.ack_string)
+            self.assertEqual(sock.recv(10), b'')
+
+    def test_chunked_message_is_spooled_and_served(self):
+        server = self.x.add_server(self.factory)
+        port = server.sockets[0].getsockname()[1]
+        protocol = baseprotocol.BaseProtocol(None)
+        protocol.payload_flags = packet.Header.flag_chunked
+        payload_dict = dict(nonce='big', msg='x' * (self.x.max_message_length * 2))
+        frame = protocol.build_packet(payload_dict, protocol.message_string)
+        result = self.send_frame(port, frame)
+        self.assertEqual(result['nonce'], 'big')
+        self.assertEqual(self.queue.get(timeout=5), payload_dict)
+
+    def read_frame_from(self, data):
+        async def read():
+            reader = asyncio.StreamReader()
+            reader.feed_data(data)
+            reader.feed_eof()
+            return await self.x.read_frame(reader, 5)
+        return asyncio.run(read())
+
+    def build_stream(self, payload_dict):
+        protocol = baseprotocol.BaseProtocol(None)
+        protocol.payload_flags = packet.Header.flag_chunked
+        return protocol.build_packet(payload_dict, protocol.message_string)
+
+    def test_stream_spooled_once_and_decoded_from_that_spool(self):
+        payload_dict = dict(msg='x' * (self.x.max_message_length * 2))
+        request = self.read_frame_from(self.build_stream(payload_dict))
+        self.addCleanup(request.release)
+        self.assertGreater(request.spooled_stream.chunks, 2)
+        receiver = baseprotocol.BaseProtocol(request)
+        with unittest.mock.patch.object(baseprotocol.tempfile, 'TemporaryFile') as temporary_file:
+            result = receiver.process_incoming(receiver.message_string)
+        self.assertFalse(temporary_file.called)
+        self.assertEqual(result, payload_dict)
+        self.assertEqual(receiver.incoming_length, request.spooled_stream.length)
+
+    def test_stream_chunk_changing_command_rejected(self):
+        frame = bytearray(self.build_stream(dict(msg='x' * (self.x.max_message_length * 2))))
+        position = packet.Header.length + packet.Header.unpack(frame[:packet.Header.length])[0]
+        chunk_header = bytes(frame[position:position + packet.Header.length])
+        frame[position:position + packet.Header.length] = packet.Header.pack(packet.Header.unpack(chunk_header)[0],
+                                                                             'ACK',
+                                                                             packet.Header.unpack_flags(chunk_header))
+        self.assertIsNone(self.read_frame_from(bytes(frame)))
+
+    def test_stream_over_max_stream_length_closes_connection(self):
+        self.x.max_stream_length = self.x.max_message_length
+        server = self.x.add_server(self.factory)
+        port = server.sockets[0].getsockname()[1]
+        protocol = baseprotocol.BaseProtocol(None)
+        protocol.payload_flags = packet.Header.flag_chunked
+        frame = protocol.build_packet(dict(msg='x' * (self.x.max_message_length * 2)), protocol.message_string)
+        with socket.create_connection(('127.0.0.1', port), timeout=5) as sock:
+            try:
+                sock.sendall(frame)
+                result = sock.recv(10)
+            except ConnectionError:
+                result = b''
+        self.assertEqual(result, b'')
+
+    def test_unix_socket_listener_serves_frames(self):
+        protocol = baseprotocol.BaseProtocol(None)
+        frame = protocol.build_packet(dict(nonce='unix'), protocol.message_string)
+        with tempfile.TemporaryDirectory() as directory:
+            with unittest.mock.patch.multiple(settings, unix_socket_listen=True, unix_socket_dir=directory + '/'):
+                self.x.add_server(self.factory)
+                path = helpers.get_unix_socket_path(self.factory.port)
+                with socket.socket(socket.AF_UNIX) as sock:
+                    sock.settimeout(5)
+                    sock.connect(path)
+                    sock.sendall(frame)
+                    protocol.sock = sock
+                    result = protocol.process_incoming(protocol.ack_string)
+                self.x.remove_server(self.factory)
+                self.assertFalse(os.path.exists(path))
+        self.assertEqual(result, dict(nonce='unix', desc='ACK'))
+
+    def test_get_stats_initial_values(self):
+        self.x.add_server(self.factory)
+        target = dict(max_half_open=settings.max_half_open_connections,
+                      max_handlers=settings.server_max_workers + settings.server_max_queued_requests,
+                      half_open=0, dropped=0, timeouts=0, handlers=0, rejected=0)
+        self.assertEqual(self.x.get_stats(self.factory.name), target)
+
+    def test_frames_past_max_handlers_get_busy_frame(self):
+        self.x.max_handlers = 1
+        BlockingRequestHandler.release_event.clear()
+        self.addCleanup(BlockingRequestHandler.release_event.set)
+        with patch.object(LoopbackFactory, 'request_handler_obj', BlockingRequestHandler):
+            server = self.x.add_server(self.factory)
+            port = server.sockets[0].getsockname()[1]
+            frame = packet.PacketFactory(packet.Payload(dict(nonce='held'))).build('MSG')
+            with socket.create_connection(('127.0.0.1', port), timeout=5) as held:
+                held.sendall(frame)
+                self.assertTrue(BlockingRequestHandler.started.acquire(timeout=5))
+                with socket.create_connection(('127.0.0.1', port), timeout=5) as busy:
+                    busy.sendall(frame)
+                    protocol = baseprotocol.BaseProtocol(busy)
+                    self.assertIs(protocol.process_incoming(protocol.ack_string), False)
+                    self.assertIs(protocol.peer_busy, True)
+                stats = self.x.get_stats(self.factory.name)
+                self.assertEqual(stats['handlers'], 1)
+                self.assertEqual(stats['rejected'], 1)
+                BlockingRequestHandler.release_event.set()
+                protocol = baseprotocol.BaseProtocol(held)
+                self.assertEqual(protocol.process_incoming(protocol.ack_string), dict(desc='ACK'))
+        self.assertEqual(self.x.get_stats(self.factory.name)['handlers'], 0)
+
+    def test_silent_peer_times_out_and_is_counted(self):
+        self.x.header_read_timeout = 0.1
+        server = self.x.add_server(self.factory)
+        port = server.sockets[0].getsockname()[1]
+        with socket.create_connection(('127.0.0.1', port), timeout=5) as sock:
+            self.assertEqual(sock.recv(10), b'')
+        self.assertEqual(self.x.get_stats(self.factory.name)['timeouts'], 1)
+        self.assertEqual(self.x.get_stats(self.factory.name)['half_open'], 0)
+
+    def test_trickling_payload_times_out_and_is_counted(self):
+        self.x.payload_read_timeout = 0.1
+        server = self.x.add_server(self.factory)
+        port = server.sockets[0].getsockname()[1]
+        with socket.create_connection(('127.0.0.1', port), timeout=5) as sock:
+            sock.sendall(packet.Header.pack(100, 'MSG') + b'{')
+            self.assertEqual(sock.recv(10), b'')
+        self.assertEqual(self.x.get_stats(self.factory.name)['timeouts'], 1)
+
+    def test_idle_keep_alive_connection_not_counted_as_timeout(self):
+        server = self.x.add_server(self.factory)
+        port = server.sockets[0].getsockname()[1]
+        protocol = baseprotocol.BaseProtocol(None)
+        with unittest.mock.patch.object(LoopbackFactory, 'request_handler_obj', KeepAliveEchoRequestHandler):
+            with unittest.mock.patch.object(asyncserver.settings, 'keep_alive_idle_timeout', 0.1):
+                with socket.create_connection(('127.0.0.1', port), timeout=5) as sock:
+                    sock.sendall(protocol.build_packet(dict(nonce='one'), protocol.message_string))
+                    protocol.sock = sock
+                    protocol.process_incoming(protocol.ack_string)
+                    self.assertEqual(sock.recv(10), b'')
+        self.assertEqual(self.x.get_stats(self.factory.name)['timeouts'], 0)
+
+    def test_connections_past_max_half_open_get_busy_frame(self):
+        self.x.max_half_open = 1
+        server = self.x.add_server(self.factory)
+        port = server.sockets[0].getsockname()[1]
+        with socket.create_connection(('127.0.0.1', port), timeout=5) as silent:
+            for _ in range(50):
+                if self.x.get_stats(self.factory.name)['half_open'] == 1:
+                    break
+                time.sleep(0.01)
+            with socket.create_connection(('127.0.0.1', port), timeout=5) as dropped:
+                protocol = baseprotocol.BaseProtocol(dropped)
+                self.assertIs(protocol.process_incoming(protocol.ack_string), False)
+                self.assertIs(protocol.peer_busy, True)
+            stats = self.x.get_stats(self.factory.name)
+        self.assertEqual(stats['dropped'], 1)
+        self.assertEqual(stats['half_open'], 1)
+
+    def test_add_server_bind_error_reports_to_queue(self):
+        blocker = socket.socket()
+        blocker.bind(('127.0.0.1', 0))
+        blocker.listen(1)
+        port = blocker.getsockname()[1]
+        factory = LoopbackFactory(self.queue)
+        factory.report_error = MagicMock()
+        try:
+            with unittest.mock.patch.object(LoopbackFactory, 'port', port):
+                result = self.x.add_server(factory)
+        finally:
+            blocker.close()
+        self.assertIsNone(result)
+        self.assertTrue(factory.report_error.called)
+
+    def test_remove_last_server_stops_engine(self):
+        self.x.add_server(self.factory)
+        self.x.remove_server(self.factory)
+        self.assertFalse(self.x.is_running())
+
+    def test_drain_server_not_running_reports_drained(self):
+        result = self.x.drain_server(self.factory, 5)
+        self.assertIs(result['drained'], True)
+
+    def test_drain_server_closes_idle_keep_alive_connection(self):
+        server = self.x.add_server(self.factory)
+        port = server.sockets[0].getsockname()[1]
+        protocol = baseprotocol.BaseProtocol(None)
+        with unittest.mock.patch.object(LoopbackFactory, 'request_handler_obj', KeepAliveEchoRequestHandler):
+            with socket.create_connection(('127.0.0.1', port), timeout=5) as sock:
+                protocol.sock = sock
+                sock.sendall(protocol.build_packet(dict(nonce='one'), protocol.message_string))
+                protocol.process_incoming(protocol.ack_string)
+                report = self.x.drain_server(self.factory, 5)
+                self.assertEqual(sock.recv(1), b'')
+        self.assertIs(report['drained'], True)
+        self.assertLess(report['seconds'], 5)
+        self.assertFalse(self.x.is_running())
+
+    def test_reset_context_replaces_context_of_served_factory(self):
+        self.x.add_server(self.factory)
+        context = self.x.contexts[self.factory.name]
+        self.x.reset_context(self.factory)
+        self.assertIsNot(self.x.contexts[self.factory.name], context)
+
+
+class TestAsyncServerManager(unittest.TestCase):
+
+    def setUp(self):
+        self.factory = MagicMock()
+        self.engine = MagicMock()
+        self.x = asyncserver.AsyncServerManager(self.factory, self.engine)
+
+    def test_widget_attribute_none(self):
+        self.assertIsNone(self.x.widget)
+
+    def test_start_adds_server_to_engine(self):
+        self.x.start()
+        self.engine.add_server.assert_called_with(self.factory)
+        self.assertEqual(self.x.widget, self.engine.add_server.return_value)
+
+    def test_stop_removes_server_from_engine(self):
+        self.x.start()
+        self.x.stop()
+        self.engine.remove_server.assert_called_with(self.factory)
+        self.assertIsNone(self.x.widget)
+
+    def test_drain_returns_engine_drain_report(self):
+        self.x.start()
+        result = self.x.drain(5)
+        self.engine.drain_server.assert_called_with(self.factory, 5)
+        self.assertEqual(result, self.engine.drain_server.return_value)
+        self.assertIsNone(self.x.widget)
+
+    def test_restart_without_widget_starts(self):
+        self.x.restart()
+        self.engine.add_server.assert_called_with(self.factory)
+
+    def test_restart_resets_context(self):
+        self.x.start()
+        self.x.restart()
+        self.engine.reset_context.assert_called_with(self.factory)
+
+    def test_get_stats_returns_engine_stats_for_factory(self):
+        result = self.x.get_stats()
+        self.engine.get_stats.assert_called_with(self.factory.name)
+        self.assertEqual(result, self.engine.get_stats.return_value)
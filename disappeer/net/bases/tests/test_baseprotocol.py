@@ -11,7 +11,11 @@ import unittest
 from unittest.mock import MagicMock
 from disappeer.net.bases import baseprotocol
 from disappeer.net.bases import packet
+import socket
 import struct
+import tempfile
+import threading
+from disappeer import settings
 
 
 class TestImports(unittest.TestCase):
@@ -22,6 +26,9 @@ class TestImports(unittest.TestCase):
     def test_struct(self):
         self.assertEqual(struct, baseprotocol.struct)
 
+    def test_settings(self):
+        self.assertEqual(settings, baseprotocol.settings)
+
 
 class FakeSocket(MagicMock):
 
@@ -34,6 +41,47 @@ class FakeSocket(MagicMock):
         self.msg = self.msg[num_bytes:]
         return target
 
+    def recv_into(self, buffer, num_bytes):
+        target = self.recv(num_bytes)
+        buffer[:len(target)] = target
+        return len(target)
+
+    def settimeout(self, value):
+        self.timeout = value
+
+    def gettimeout(self):
+        return None
+
+
+class FragmentedSocket(FakeSocket):
+
+    def __init__(self, payload_data, fragment_size):
+        super().__init__(payload_data)
+        self.fragment_size = fragment_size
+        self.recv_into_calls = 0
+
+    def recv_into(self, buffer, num_bytes):
+        self.recv_into_calls += 1
+        return super().recv_into(buffer, min(num_bytes, self.fragment_size))
+
+
+class RecordingSocket(socket.socket):
+    """
+    Records sendmsg calls, with short_write set only that many bytes of the first part are sent
+    """
+
+    short_write = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sendmsg_calls = []
+
+    def sendmsg(self, buffers, *args):
+        self.sendmsg_calls.append(list(buffers))
+        if self.short_write is not None:
+            return self.send(bytes(buffers[0])[:self.short_write])
+        return super().sendmsg(buffers, *args)
+
 
 class MockProtocolInstance(baseprotocol.BaseProtocol):
     pass
@@ -92,27 +140,97 @@ class TestBaseProtocolClassBasics(SetUpClass):
         result = self.x.build_packet(payload_dict, request)
         self.assertEqual(hard_target, result)
 
+    def test_frame_buffer_attribute(self):
+        self.assertIsInstance(self.x.frame_buffer, bytearray)
+        self.assertEqual(len(self.x.frame_buffer), self.x.header_length + self.x.max_message_length)
+
+    def test_frame_view_attribute(self):
+        self.assertIsInstance(self.x.frame_view, memoryview)
+        self.assertIs(self.x.frame_view.obj, self.x.frame_buffer)
+
     def test_recv_all_method(self):
         input_string = 'hello'
         sock = FakeSocket(input_string)
         result = self.x._recvall(sock, 4)
         self.assertEqual(b'hell', result)
 
+    def test_recv_all_method_returns_short_result_on_closed_socket(self):
+        input_string = 'hello'
+        sock = FakeSocket(input_string)
+        result = self.x._recvall(sock, 10)
+        self.assertEqual(b'hello', result)
+
+    def test_recv_into_method_fills_view_from_fragments(self):
+        input_string = 'hello world'
+        sock = FragmentedSocket(input_string, 2)
+        view = memoryview(bytearray(len(input_string)))
+        result = self.x._recv_into(sock, view)
+        self.assertEqual(result, b'hello world')
+        self.assertEqual(sock.recv_into_calls, 6)
+
     def test_recv_header_method(self):
         val = '6666'
-        sub = self.x._recvall = MagicMock(return_value=val)
+        sub = self.x._recv_into = MagicMock(return_value=val)
         result = self.x.recv_header()
-        sub.assert_called_with(self.x.sock, self.x.header_length)
+        args = sub.call_args[0]
+        self.assertEqual(args[0], self.x.sock)
+        self.assertEqual(len(args[1]), self.x.header_length)
         self.assertEqual(result, val)
 
     def test_recv_payload_method(self):
         val = '6666'
-        sub = self.x._recvall = MagicMock(return_value=val)
+        sub = self.x._recv_into = MagicMock(return_value=val)
         payload_length = 10
         result = self.x.recv_payload(payload_length)
-        sub.assert_called_with(self.x.sock, payload_length)
+        args = sub.call_args[0]
+        self.assertEqual(args[0], self.x.sock)
+        self.assertEqual(len(args[1]), payload_length)
         self.assertEqual(result, val)
 
+    def test_header_and_payload_fill_frame_buffer(self):
+        payload_dict = dict(msg='hello')
+        packet_bytes = self.x.build_packet(payload_dict, self.x.message_string)
+        self.x.sock = FragmentedSocket(packet_bytes.decode('utf-8'), 3)
+        self.x.recv_header()
+        self.x.recv_payload(len(packet_bytes) - self.x.header_length)
+        self.assertEqual(bytes(self.x.frame_buffer[:len(packet_bytes)]), packet_bytes)
+
+    def test_recv_payload_view_is_reused_by_next_frame(self):
+        first = self.x.build_packet(dict(msg='first'), self.x.message_string)
+        second = self.x.build_packet(dict(msg='other'), self.x.message_string)
+        self.x.sock = FakeSocket((first + second).decode('utf-8'))
+        self.x.recv_header()
+        first_view = self.x.recv_payload(len(first) - self.x.header_length)
+        kept = bytes(first_view)
+        self.x.recv_header()
+        self.x.recv_payload(len(second) - self.x.header_length)
+        self.assertEqual(kept, first[self.x.header_length:])
+        self.assertEqual(first_view, second[self.x.header_length:])
+
+    def test_process_incoming_two_frames_in_a_row_leaves_first_result_unchanged(self):
+        for flags in [0, packet.Header.flag_binary]:
+            local, remote = socket.socketpair()
+            try:
+                sender = baseprotocol.BaseProtocol(remote)
+                sender.payload_flags = flags
+                remote.sendall(sender.build_packet(dict(msg='first'), sender.message_string))
+                remote.sendall(sender.build_packet(dict(msg='other'), sender.message_string))
+                self.x.sock = local
+                first = self.x.process_incoming(self.x.message_string)
+                second = self.x.process_incoming(self.x.message_string)
+            finally:
+                local.close()
+                remote.close()
+            self.assertEqual(first, dict(msg='first'))
+            self.assertEqual(second, dict(msg='other'))
+
+    def test_process_incoming_reads_fragmented_frame(self):
+        payload_dict = dict(msg='hello world')
+        packet_bytes = self.x.build_packet(payload_dict, self.x.message_string)
+        self.x.sock = FragmentedSocket(packet_bytes.decode('utf-8'), 1)
+        result = self.x.process_incoming(self.x.message_string)
+        self.assertEqual(result, payload_dict)
+
     def test_validate_header_valid(self):
         payload_dict = dict(msg='hello')
         output = self.x.build_packet(payload_dict, self.x.request_string)
@@ -123,6 +241,70 @@ class TestBaseProtocolClassBasics(SetUpClass):
         result = self.x.validate_header(header_data, request_type)
         self.assertEqual(result, check)
 
+    def test_validate_header_counts_incoming_frame(self):
+        header_data = b'\x10\x00\x00\x00TIN'
+        before = baseprotocol.frame_bytes.get(direction='in')
+        self.x.validate_header(header_data, 'TIN')
+        self.assertEqual(baseprotocol.frames.get(command='TIN', direction='in'), 1)
+        self.assertEqual(baseprotocol.frame_bytes.get(direction='in') - before, self.x.header_length + 16)
+
+    def test_send_parts_joins_parts_for_socket_like_objects(self):
+        sock = self.x.sock = MagicMock()
+        parts = self.x.build_parts(dict(msg='hello'), 'TOU')
+        self.x.send_parts(parts, 'TOU')
+        sock.sendall.assert_called_with(self.x.build_packet(dict(msg='hello'), 'TOU'))
+        self.assertEqual(baseprotocol.frames.get(command='TOU', direction='out'), 1)
+
+    def test_send_parts_uses_sendmsg_on_sockets(self):
+        local, remote = socket.socketpair()
+        local = RecordingSocket(fileno=local.detach())
+        self.addCleanup(local.close)
+        self.addCleanup(remote.close)
+        self.x.sock = local
+        parts = self.x.build_parts(dict(msg='hello'), self.x.message_string)
+        self.x.send_parts(parts, self.x.message_string)
+        self.assertEqual(local.sendmsg_calls, [parts])
+        receiver = baseprotocol.BaseProtocol(remote)
+        self.assertEqual(receiver.process_incoming(receiver.message_string), dict(msg='hello'))
+
+    def test_send_parts_finishes_short_sendmsg_with_sendall(self):
+        local, remote = socket.socketpair()
+        local = RecordingSocket(fileno=local.detach())
+        local.short_write = 3
+        self.addCleanup(local.close)
+        self.addCleanup(remote.close)
+        self.x.sock = local
+        parts = self.x.build_parts(dict(msg='hello'), self.x.message_string)
+        self.x.send_parts(parts, self.x.message_string)
+        receiver = baseprotocol.BaseProtocol(remote)
+        self.assertEqual(receiver.process_incoming(receiver.message_string), dict(msg='hello'))
+
+    def test_build_template_parts_matches_build_packet(self):
+        payload_dict = dict(nonce='xxx', desc='ACK', keep_alive=30, frame_flags=15)
+        for flags in [0, packet.Header.flag_binary]:
+            self.x.payload_flags = flags
+            parts = self.x.build_template_parts(payload_dict, self.x.ack_string, 'nonce')
+            self.assertEqual(b''.join(parts), self.x.build_packet(payload_dict, self.x.ack_string))
+
+    def test_build_template_parts_reuses_template_across_nonces(self):
+        self.x.frame_templates = {}
+        first = self.x.build_template_parts(dict(nonce='one', desc='ACK'), self.x.ack_string, 'nonce')
+        second = self.x.build_template_parts(dict(nonce='two', desc='ACK'), self.x.ack_string, 'nonce')
+        self.assertEqual(len(self.x.frame_templates), 1)
+        self.assertIs(first[1], second[1])
+        self.assertEqual(b''.join(second), self.x.build_packet(dict(nonce='two', desc='ACK'), self.x.ack_string))
+
+    def test_build_template_parts_keeps_bool_and_int_apart(self):
+        self.x.frame_templates = {}
+        self.x.build_template_parts(dict(nonce='one', flag=1), self.x.ack_string, 'nonce')
+        parts = self.x.build_template_parts(dict(nonce='two', flag=True), self.x.ack_string, 'nonce')
+        self.assertEqual(b''.join(parts), self.x.build_packet(dict(nonce='two', flag=True), self.x.ack_string))
+
+    def test_build_template_parts_none_for_unfit_payloads(self):
+        self.assertIsNone(self.x.build_template_parts(dict(desc='ACK'), self.x.ack_string, 'nonce'))
+        self.assertIsNone(self.x.build_template_parts(dict(nonce=1), self.x.ack_string, 'nonce'))
+        self.assertIsNone(self.x.build_template_parts(dict(nonce='x', data=[1]), self.x.ack_string, 'nonce'))
+
     def test_validate_header_BAD_header_data(self):
         header_data = b'efwefwefwef'
         request_type = 'REQ'
@@ -135,6 +317,17 @@ class TestBaseProtocolClassBasics(SetUpClass):
         result = self.x.validate_header(header_data, request_type)
         self.assertFalse(result)
 
+    def test_validate_header_busy_frame_sets_peer_busy(self):
+        header_data = packet.Header.pack(10, self.x.busy_string)
+        result = self.x.validate_header(header_data, self.x.ack_string)
+        self.assertFalse(result)
+        self.assertIs(self.x.peer_busy, True)
+
+    def test_validate_header_other_command_leaves_peer_busy(self):
+        header_data = packet.Header.pack(10, self.x.response_string)
+        self.x.validate_header(header_data, self.x.ack_string)
+        self.assertIs(self.x.peer_busy, False)
+
     def test_validate_header_not_valid_length_val(self):
         header_data = packet.Header.pack(66666, 'REQ')
         request_type = 'REQ'
@@ -188,5 +381,336 @@ class TestBaseProtocolClassBasics(SetUpClass):
         result = self.x.process_incoming(req_string)
         self.assertEqual(final, target_decode_method.return_value)
 
+    def test_payload_flags_default_zero(self):
+        self.assertEqual(self.x.payload_flags, 0)
+
+    def test_select_payload_json_by_default(self):
+        result = self.x.select_payload(dict(msg='hello'))
+        self.assertIsInstance(result, packet.Payload)
 
+    def test_select_payload_binary_when_flagged(self):
+        self.x.payload_flags = packet.Header.flag_binary
+        result = self.x.select_payload(dict(msg='hello'))
+        self.assertIsInstance(result, packet.BinaryPayload)
 
+    def test_select_payload_json_when_not_binary_encodable(self):
+        self.x.payload_flags = packet.Header.flag_binary
+        result = self.x.select_payload(['hello'])
+        self.assertIsInstance(result, packet.Payload)
+
+    def test_validate_header_rejects_unsupported_flags(self):
+        header_data = packet.Header.pack(10, 'REQ', 0x80)
+        result = self.x.validate_header(header_data, 'REQ')
+        self.assertFalse(result)
+
+    def test_validate_header_records_incoming_flags(self):
+        header_data = packet.Header.pack(10, 'REQ', packet.Header.flag_binary)
+        result = self.x.validate_header(header_data, 'REQ')
+        self.assertEqual(result, (10, 'REQ'))
+        self.assertEqual(self.x.incoming_flags, packet.Header.flag_binary)
+
+    def test_process_incoming_decodes_binary_frame_and_answers_in_kind(self):
+        local, remote = socket.socketpair()
+        try:
+            sender = baseprotocol.BaseProtocol(remote)
+            sender.payload_flags = packet.Header.flag_binary
+            remote.sendall(sender.build_packet(dict(msg='hello'), sender.message_string))
+            self.x.sock = local
+            result = self.x.process_incoming(self.x.message_string)
+        finally:
+            local.close()
+            remote.close()
+        self.assertEqual(result, dict(msg='hello'))
+        self.assertTrue(self.x.payload_flags & packet.Header.flag_binary)
+
+    def test_process_incoming_resets_peer_busy(self):
+        local, remote = socket.socketpair()
+        try:
+            remote.close()
+            self.x.sock = local
+            self.x.peer_busy = True
+            self.x.process_incoming(self.x.ack_string)
+        finally:
+            local.close()
+        self.assertIs(self.x.peer_busy, False)
+
+    def test_process_incoming_started_false_on_eof_before_any_byte(self):
+        local, remote = socket.socketpair()
+        try:
+            remote.close()
+            self.x.sock = local
+            result = self.x.process_incoming(self.x.message_string)
+        finally:
+            local.close()
+        self.assertIs(result, False)
+        self.assertIs(self.x.incoming_started, False)
+
+    def test_process_incoming_started_true_on_partial_header(self):
+        local, remote = socket.socketpair()
+        try:
+            remote.sendall(packet.Header.pack(10, self.x.message_string)[:3])
+            remote.close()
+            self.x.sock = local
+            result = self.x.process_incoming(self.x.message_string)
+        finally:
+            local.close()
+        self.assertIs(result, False)
+        self.assertIs(self.x.incoming_started, True)
+
+    def test_process_incoming_rejects_truncated_binary_payload(self):
+        payload_data = packet.BinaryPayload(dict(msg='hello')).encode()[:-3]
+        local, remote = socket.socketpair()
+        try:
+            remote.sendall(packet.Header.pack(len(payload_data), self.x.message_string, packet.Header.flag_binary)
+                           + payload_data)
+            self.x.sock = local
+            result = self.x.process_incoming(self.x.message_string)
+        finally:
+            local.close()
+            remote.close()
+        self.assertIs(result, False)
+        self.assertFalse(self.x.payload_flags & packet.Header.flag_binary)
+
+
+class TestChunkedStreams(unittest.TestCase):
+
+    def setUp(self):
+        self.local, self.remote = socket.socketpair()
+        self.x = baseprotocol.BaseProtocol(self.local)
+        self.sender = baseprotocol.BaseProtocol(self.remote)
+        self.sender.payload_flags = packet.Header.flag_chunked
+
+    def tearDown(self):
+        self.local.close()
+        self.remote.close()
+
+    def send_in_background(self, data):
+        thread = threading.Thread(target=self.remote.sendall, args=(data,))
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def test_max_stream_length_from_settings(self):
+        self.assertEqual(self.x.max_stream_length, settings.max_stream_length)
+
+    def test_small_payload_not_chunked(self):
+        data = self.sender.build_packet(dict(msg='hello'), self.sender.message_string)
+        self.assertEqual(packet.Header.unpack_flags(data[:packet.Header.length]), 0)
+
+    def test_stream_larger_than_one_frame_round_trips(self):
+        payload_dict = dict(msg='x' * (self.x.max_message_length * 3))
+        thread = self.send_in_background(self.sender.build_packet(payload_dict, self.sender.message_string))
+        result = self.x.process_incoming(self.x.message_string)
+        thread.join(5)
+        self.assertEqual(result, payload_dict)
+        self.assertEqual(len(self.x.frame_buffer), self.x.header_length + self.x.max_message_length)
+
+    def test_binary_stream_round_trips(self):
+        self.sender.payload_flags |= packet.Header.flag_binary
+        payload_dict = dict(msg='x' * (self.x.max_message_length * 2))
+        thread = self.send_in_background(self.sender.build_packet(payload_dict, self.sender.message_string))
+        result = self.x.process_incoming(self.x.message_string)
+        thread.join(5)
+        self.assertEqual(result, payload_dict)
+
+    def test_stream_over_max_stream_length_rejected(self):
+        self.x.max_stream_length = self.x.max_message_length * 2
+        payload_dict = dict(msg='x' * (self.x.max_message_length * 3))
+        thread = self.send_in_background(self.sender.build_packet(payload_dict, self.sender.message_string))
+        result = self.x.process_incoming(self.x.message_string)
+        self.local.close()
+        thread.join(5)
+        self.assertIs(result, False)
+
+    def test_truncated_stream_rejected(self):
+        data = self.sender.build_packet(dict(msg='x' * 100000), self.sender.message_string)
+        thread = self.send_in_background(data[:80000])
+        thread.join(5)
+        self.remote.close()
+        result = self.x.process_incoming(self.x.message_string)
+        self.assertIs(result, False)
+
+    def test_chunks_with_mixed_command_rejected(self):
+        first = packet.Header.pack(4, 'MSG', packet.Header.flag_chunked) + b'{"a"'
+        second = packet.Header.pack(5, 'REQ') + b': 1}'
+        self.remote.sendall(first + second)
+        result = self.x.process_incoming(self.x.message_string)
+        self.assertIs(result, False)
+
+    def test_chunks_with_mixed_codec_rejected(self):
+        first = packet.Header.pack(4, 'MSG', packet.Header.flag_chunked) + b'{"a"'
+        second = packet.Header.pack(5, 'MSG', packet.Header.flag_binary) + b': 1}'
+        self.remote.sendall(first + second)
+        result = self.x.process_incoming(self.x.message_string)
+        self.assertIs(result, False)
+
+
+class TestCompression(unittest.TestCase):
+
+    def setUp(self):
+        self.local, self.remote = socket.socketpair()
+        self.x = baseprotocol.BaseProtocol(self.local)
+        self.sender = baseprotocol.BaseProtocol(self.remote)
+        self.sender.payload_flags = packet.Header.flag_zlib | packet.Header.flag_lzma
+        self.payload_dict = dict(msg='compress me ' * 1000)
+
+    def tearDown(self):
+        self.local.close()
+        self.remote.close()
+
+    def send_in_background(self, data):
+        thread = threading.Thread(target=self.remote.sendall, args=(data,))
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def test_select_compressor_none_until_peer_accepts(self):
+        self.assertIsNone(self.x.select_compressor())
+
+    def test_select_compressor_uses_settings(self):
+        result = self.sender.select_compressor()
+        self.assertEqual(result.method, settings.payload_compression)
+        self.assertEqual(result.level, settings.payload_compression_level)
+        self.assertEqual(result.threshold, settings.payload_compression_threshold)
+
+    def test_select_compressor_none_when_disabled(self):
+        with unittest.mock.patch.object(baseprotocol.settings, 'payload_compression', None):
+            self.assertIsNone(self.sender.select_compressor())
+
+    def test_compressed_frame_round_trips_and_answers_in_kind(self):
+        data = self.sender.build_packet(self.payload_dict, self.sender.message_string)
+        self.assertTrue(packet.Header.unpack_flags(data[:packet.Header.length]) & packet.Header.compression_flags)
+        self.assertLess(len(data), len(packet.Payload(self.payload_dict).encode()))
+        self.remote.sendall(data)
+        result = self.x.process_incoming(self.x.message_string)
+        self.assertEqual(result, self.payload_dict)
+        self.assertTrue(self.x.payload_flags & packet.Header.flag_zlib)
+
+    def test_lzma_frame_round_trips(self):
+        with unittest.mock.patch.object(baseprotocol.settings, 'payload_compression', 'lzma'):
+            data = self.sender.build_packet(self.payload_dict, self.sender.message_string)
+        self.assertEqual(packet.Header.unpack_flags(data[:packet.Header.length]), packet.Header.flag_lzma)
+        self.remote.sendall(data)
+        self.assertEqual(self.x.process_incoming(self.x.message_string), self.payload_dict)
+
+    def test_frame_decompressing_past_max_message_length_rejected(self):
+        payload_dict = dict(msg='x' * (self.x.max_message_length * 4))
+        data = packet.PacketFactory(packet.Payload(payload_dict), self.sender.select_compressor()).build('MSG')
+        self.assertLess(len(data), self.x.max_message_length)
+        self.remote.sendall(data)
+        result = self.x.process_incoming(self.x.message_string)
+        self.assertIs(result, False)
+
+    def test_large_payload_compressed_into_one_chunk_is_streamed(self):
+        self.sender.payload_flags |= packet.Header.flag_chunked
+        payload_dict = dict(msg='x' * (self.x.max_message_length * 4))
+        thread = self.send_in_background(self.sender.build_packet(payload_dict, self.sender.message_string))
+        result = self.x.process_incoming(self.x.message_string)
+        thread.join(5)
+        self.assertEqual(result, payload_dict)
+
+    def test_stream_decompressing_past_max_stream_length_rejected(self):
+        self.x.max_stream_length = self.x.max_message_length * 2
+        self.sender.payload_flags |= packet.Header.flag_chunked
+        payload_dict = dict(msg='x' * (self.x.max_message_length * 4))
+        thread = self.send_in_background(self.sender.build_packet(payload_dict, self.sender.message_string))
+        result = self.x.process_incoming(self.x.message_string)
+        thread.join(5)
+        self.assertIs(result, False)
+
+    def spooled_socket(self, payload_dict):
+        data = packet.Payload(payload_dict).encode()
+        spool = tempfile.TemporaryFile()
+        self.addCleanup(spool.close)
+        spool.write(data)
+        spool.flush()
+        sock = MagicMock()
+        sock.spooled_stream = baseprotocol.SpooledStream(spool, len(data), 2)
+        return sock
+
+    def test_stream_spooled_by_transport_decoded_in_place(self):
+        payload_dict = dict(msg='x' * 1000)
+        self.x.sock = self.spooled_socket(payload_dict)
+        self.x.incoming_flags = packet.Header.flag_chunked
+        with unittest.mock.patch.object(baseprotocol.tempfile, 'TemporaryFile') as temporary_file:
+            result = self.x.process_incoming_stream(100, self.x.message_string)
+        self.assertFalse(temporary_file.called)
+        self.assertEqual(result, payload_dict)
+        self.assertEqual(self.x.incoming_length, self.x.sock.spooled_stream.length)
+        self.assertEqual(self.x.incoming_flags, 0)
+
+    def test_stream_spooled_by_transport_over_max_stream_length_rejected(self):
+        self.x.sock = self.spooled_socket(dict(msg='x' * 1000))
+        self.x.max_stream_length = 100
+        self.assertIs(self.x.process_incoming_stream(100, self.x.message_string), False)
+
+    def test_corrupt_compressed_frame_rejected(self):
+        self.remote.sendall(packet.Header.pack(9, 'MSG', packet.Header.flag_zlib) + b'not zlib!')
+        result = self.x.process_incoming(self.x.message_string)
+        self.assertIs(result, False)
+
+
+class TestReadDeadlines(unittest.TestCase):
+
+    def setUp(self):
+        self.local, self.remote = socket.socketpair()
+        self.x = baseprotocol.BaseProtocol(self.local)
+        self.frame = self.x.build_packet(dict(msg='hello'), self.x.message_string)
+
+    def tearDown(self):
+        self.local.close()
+        self.remote.close()
+
+    def test_timeouts_from_settings(self):
+        self.assertEqual(self.x.header_read_timeout, settings.header_read_timeout)
+        self.assertEqual(self.x.payload_read_timeout, settings.payload_read_timeout)
+        self.assertEqual(self.x.request_read_timeout, settings.request_read_timeout)
+
+    def test_complete_frame_within_deadlines(self):
+        self.remote.sendall(self.frame)
+        result = self.x.process_incoming(self.x.message_string)
+        self.assertEqual(result, dict(msg='hello'))
+        self.assertFalse(self.x.timed_out)
+
+    def test_silent_peer_misses_header_deadline(self):
+        self.x.header_read_timeout = 0.05
+        result = self.x.process_incoming(self.x.message_string)
+        self.assertIs(result, False)
+        self.assertTrue(self.x.timed_out)
+
+    def test_stalled_payload_misses_payload_deadline(self):
+        self.x.payload_read_timeout = 0.05
+        self.remote.sendall(self.frame[:-1])
+        result = self.x.process_incoming(self.x.message_string)
+        self.assertIs(result, False)
+        self.assertTrue(self.x.timed_out)
+
+    def test_trickling_peer_misses_absolute_deadline(self):
+        self.x.header_read_timeout = 0.2
+        stop = threading.Event()
+
+        def trickle():
+            for byte in self.frame[:packet.Header.length - 1]:
+                if stop.wait(0.05):
+                    return
+                self.remote.sendall(bytes([byte]))
+
+        thread = threading.Thread(target=trickle)
+        thread.daemon = True
+        thread.start()
+        result = self.x.process_incoming(self.x.message_string)
+        stop.set()
+        thread.join(5)
+        self.assertIs(result, False)
+        self.assertTrue(self.x.timed_out)
+
+    def test_request_deadline_caps_phase_deadlines(self):
+        self.x.request_deadline = 0
+        self.assertEqual(self.x.phase_deadline(60), 0)
+
+    def test_socket_timeout_restored(self):
+        self.local.settimeout(7)
+        self.remote.sendall(self.frame)
+        self.x.process_incoming(self.x.message_string)
+        self.assertEqual(self.local.gettimeout(), 7)
+        self.assertIsNone(self.x.request_deadline)
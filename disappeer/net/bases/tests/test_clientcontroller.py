@@ -11,7 +11,7 @@ import unittest
 from unittest.mock import MagicMock
 from disappeer.net.bases import clientcontroller
 from disappeer.net.bases import clientfactory
-from disappeer.net.bases import threadmanagers
+from disappeer.net.bases import clientexecutor
 from types import SimpleNamespace
 
 
@@ -20,8 +20,8 @@ class TestImports(unittest.TestCase):
     def test_clientfactory(self):
         self.assertEqual(clientfactory, clientcontroller.clientfactory)
 
-    def test_threadmanager(self):
-        self.assertEqual(threadmanagers, clientcontroller.threadmanagers)
+    def test_clientexecutor(self):
+        self.assertEqual(clientexecutor, clientcontroller.clientexecutor)
 
 
 class TestClassBasics(unittest.TestCase):
@@ -42,8 +42,13 @@ class TestClassBasics(unittest.TestCase):
         self.assertEqual(self.client_type, self.x.client_factory.client_type)
         self.assertEqual(self.argnamespace, self.x.client_factory.argnamespace)
 
-    def test_client_attribute_is_instance_threadmanager(self):
-        self.assertIsInstance(self.x.client, threadmanagers.ClientThreadManager)
+    def test_client_attribute_is_instance_executor_manager(self):
+        self.assertIsInstance(self.x.client, clientexecutor.ClientExecutorManager)
+
+    def test_executor_shared_across_controllers(self):
+        other = clientcontroller.ClientController(self.client_type, self.argnamespace)
+        self.assertIs(self.x.client.executor, other.client.executor)
+        self.assertIsInstance(self.x.executor, clientexecutor.ClientExecutor)
 
     def test_start_method_calls_start_on_client_attribute(self):
         target = self.x.client = MagicMock()
@@ -0,0 +1,174 @@
+"""
+test_clientexecutor.py
+
+Test suite for the ClientExecutor and ClientExecutorManager class objects
+
+Copyright (C) 2018 Disappeer Labs
+License: GPLv3
+"""
+
+import unittest
+from unittest.mock import MagicMock
+import threading
+import queue
+from types import SimpleNamespace
+from disappeer.net.bases import clientexecutor
+from disappeer import settings
+
+
+class TestImports(unittest.TestCase):
+
+    def test_queue(self):
+        self.assertEqual(queue, clientexecutor.queue)
+
+    def test_settings(self):
+        self.assertEqual(settings, clientexecutor.settings)
+
+
+class TestClientExecutor(unittest.TestCase):
+
+    def setUp(self):
+        self.x = clientexecutor.ClientExecutor(max_workers=2)
+        self.results = queue.Queue()
+
+    def tearDown(self):
+        self.x.shutdown()
+
+    def job(self, name, event=None):
+        def run():
+            if event is not None:
+                event.wait(5)
+            self.results.put(name)
+        return run
+
+    def collect(self, count):
+        return [self.results.get(timeout=5) for _ in range(count)]
+
+    def test_max_workers_default_from_settings(self):
+        self.assertEqual(clientexecutor.ClientExecutor().max_workers, settings.client_executor_max_workers)
+
+    def test_max_per_host_default_from_settings(self):
+        self.assertEqual(clientexecutor.ClientExecutor().max_per_host, settings.client_executor_max_per_host)
+
+    def test_initial_stats(self):
+        target = dict(max_workers=2,
+                      max_per_host=1,
+                      workers=0,
+                      destinations=0,
+                      hosts_in_flight=0,
+                      queue_depth=0,
+                      in_flight=0,
+                      submitted=0,
+                      completed=0,
+                      failed=0,
+                      latency_last=0.0,
+                      latency_mean=0.0,
+                      latency_max=0.0)
+        self.assertEqual(self.x.get_stats(), target)
+
+    def test_sends_to_one_destination_run_in_order(self):
+        gate = threading.Event()
+        self.x.submit(('peer', 1), self.job(0, gate))
+        for name in range(1, 5):
+            self.x.submit(('peer', 1), self.job(name))
+        self.assertEqual(self.x.get_stats()['workers'], 1)
+        gate.set()
+        self.assertEqual(self.collect(5), [0, 1, 2, 3, 4])
+
+    def test_sends_to_different_destinations_run_in_parallel(self):
+        gate = threading.Event()
+        self.x.submit(('slow_peer', 1), self.job('slow', gate))
+        self.x.submit(('fast_peer', 1), self.job('fast'))
+        self.assertEqual(self.collect(1), ['fast'])
+        gate.set()
+        self.assertEqual(self.collect(1), ['slow'])
+
+    def test_workers_capped_at_max_workers(self):
+        gate = threading.Event()
+        for name in range(5):
+            self.x.submit((name, 1), self.job(name, gate))
+        stats = self.x.get_stats()
+        self.assertEqual(stats['workers'], 2)
+        self.assertEqual(stats['destinations'], 5)
+        gate.set()
+        self.assertEqual(sorted(self.collect(5)), [0, 1, 2, 3, 4])
+
+    def test_slow_host_holds_one_worker_across_its_ports(self):
+        gate = threading.Event()
+        started = threading.Event()
+        self.x.submit(('slow_peer', 1), lambda: (started.set(), gate.wait(5), self.results.put('slow 1')))
+        self.assertTrue(started.wait(5))
+        self.x.submit(('slow_peer', 2), self.job('slow 2'))
+        self.x.submit(('fast_peer', 1), self.job('fast'))
+        self.assertEqual(self.collect(1), ['fast'])
+        stats = self.x.get_stats()
+        self.assertEqual(stats['in_flight'], 1)
+        self.assertEqual(stats['hosts_in_flight'], 1)
+        self.assertEqual(stats['queue_depth'], 1)
+        gate.set()
+        self.assertEqual(self.collect(2), ['slow 1', 'slow 2'])
+
+    def test_max_per_host_allows_parallel_sends_to_one_host(self):
+        self.x.shutdown()
+        self.x = clientexecutor.ClientExecutor(max_workers=2, max_per_host=2)
+        gate = threading.Event()
+        self.x.submit(('peer', 1), self.job('one', gate))
+        self.x.submit(('peer', 2), self.job('two'))
+        self.assertEqual(self.collect(1), ['two'])
+        gate.set()
+        self.assertEqual(self.collect(1), ['one'])
+
+    def test_stats_while_sends_in_flight(self):
+        gate = threading.Event()
+        started = threading.Event()
+        self.x.submit(('peer', 1), lambda: (started.set(), gate.wait(5)))
+        self.x.submit(('peer', 1), self.job('next'))
+        self.assertTrue(started.wait(5))
+        stats = self.x.get_stats()
+        self.assertEqual(stats['in_flight'], 1)
+        self.assertEqual(stats['queue_depth'], 1)
+        gate.set()
+        self.collect(1)
+
+    def test_failed_send_counted_and_queue_continues(self):
+        self.x.submit(('peer', 1), MagicMock(side_effect=OSError('unreachable')))
+        self.x.submit(('peer', 1), self.job('next'))
+        self.assertEqual(self.collect(1), ['next'])
+        self.x.shutdown()
+        stats = self.x.get_stats()
+        self.assertEqual(stats['failed'], 1)
+        self.assertEqual(stats['completed'], 1)
+        self.assertEqual(stats['destinations'], 0)
+        self.assertGreaterEqual(stats['latency_max'], stats['latency_mean'])
+
+    def test_shutdown_stops_workers(self):
+        self.x.submit(('peer', 1), self.job('one'))
+        workers = list(self.x.workers)
+        self.x.shutdown()
+        self.assertFalse(any(worker.is_alive() for worker in workers))
+        self.assertEqual(self.x.get_stats()['workers'], 0)
+
+
+class TestClientExecutorManager(unittest.TestCase):
+
+    def setUp(self):
+        self.factory = MagicMock()
+        self.factory.argnamespace = SimpleNamespace(host='host.onion', port=1234)
+        self.executor = MagicMock()
+        self.x = clientexecutor.ClientExecutorManager(self.factory, self.executor)
+
+    def test_widget_attribute_none(self):
+        self.assertIsNone(self.x.widget)
+
+    def test_destination_is_host_and_port(self):
+        self.assertEqual(self.x.destination, ('host.onion', 1234))
+
+    def test_start_submits_send_for_destination(self):
+        self.x.start()
+        self.assertEqual(self.x.widget, self.factory.build.return_value)
+        self.executor.submit.assert_called_with(('host.onion', 1234), self.x.widget.send)
+
+    def test_stop_calls_stop_on_widget(self):
+        self.x.start()
+        self.x.stop()
+        self.assertTrue(self.x.widget.stop.called)
@@ -0,0 +1,135 @@
+"""
+test_connectionpool.py
+
+Test suite for the ConnectionPool class object
+
+Copyright (C) 2018 Disappeer Labs
+License: GPLv3
+"""
+
+import unittest
+from unittest.mock import patch
+import select
+import socket
+import time
+from disappeer.net.bases import connectionpool
+from disappeer import settings
+
+
+class TestImports(unittest.TestCase):
+
+    def test_select(self):
+        self.assertEqual(select, connectionpool.select)
+
+    def test_settings(self):
+        self.assertEqual(settings, connectionpool.settings)
+
+
+class FakeProtocol:
+
+    def __init__(self, sock, peer_idle_timeout=30):
+        self.sock = sock
+        self.peer_idle_timeout = peer_idle_timeout
+
+
+class TestClassBasics(unittest.TestCase):
+
+    def setUp(self):
+        self.x = connectionpool.ConnectionPool()
+        self.pairs = []
+        self.interface = ('host.onion', 16663)
+
+    def tearDown(self):
+        for local, remote in self.pairs:
+            local.close()
+            remote.close()
+
+    def make_protocol(self, peer_idle_timeout=30):
+        pair = socket.socketpair()
+        self.pairs.append(pair)
+        return FakeProtocol(pair[0], peer_idle_timeout)
+
+    def test_defaults_from_settings(self):
+        self.assertEqual(self.x.max_per_peer, settings.connection_pool_max_per_peer)
+        self.assertEqual(self.x.max_connections, settings.connection_pool_max_connections)
+        self.assertEqual(self.x.max_idle, settings.connection_pool_max_idle)
+
+    def test_acquire_empty_returns_none(self):
+        self.assertIsNone(self.x.acquire(self.interface))
+        self.assertEqual(self.x.get_stats()['misses'], 1)
+
+    def test_release_then_acquire_returns_protocol(self):
+        protocol = self.make_protocol()
+        self.x.release(self.interface, protocol)
+        self.assertIs(self.x.acquire(self.interface), protocol)
+        self.assertIsNone(self.x.acquire(self.interface))
+        self.assertEqual(self.x.get_stats()['hits'], 1)
+
+    def test_acquire_keyed_by_interface(self):
+        protocol = self.make_protocol()
+        self.x.release(self.interface, protocol)
+        self.assertIsNone(self.x.acquire(('other.onion', 16663)))
+
+    def test_acquire_skips_connection_closed_by_peer(self):
+        protocol = self.make_protocol()
+        self.x.release(self.interface, protocol)
+        self.pairs[0][1].close()
+        self.assertIsNone(self.x.acquire(self.interface))
+        self.assertEqual(protocol.sock.fileno(), -1)
+        self.assertEqual(self.x.get_stats()['evicted'], 1)
+
+    def test_acquire_skips_expired_connection(self):
+        protocol = self.make_protocol()
+        self.x.release(self.interface, protocol)
+        with patch.object(connectionpool.time, 'monotonic', return_value=time.monotonic() + 3600):
+            self.assertIsNone(self.x.acquire(self.interface))
+
+    def test_release_limits_idle_time_to_peer_timeout(self):
+        protocol = self.make_protocol(peer_idle_timeout=1)
+        self.x.release(self.interface, protocol)
+        expires = self.x.idle[self.interface][0][1]
+        self.assertLessEqual(expires - time.monotonic(), self.x.peer_idle_fraction)
+
+    def test_release_evicts_beyond_max_per_peer(self):
+        protocols = [self.make_protocol() for _ in range(self.x.max_per_peer + 1)]
+        for protocol in protocols:
+            self.x.release(self.interface, protocol)
+        self.assertEqual(self.x.get_stats()['idle'], self.x.max_per_peer)
+        self.assertEqual(protocols[0].sock.fileno(), -1)
+
+    def test_release_evicts_oldest_peer_beyond_max_connections(self):
+        self.x.max_connections = 2
+        protocols = [self.make_protocol() for _ in range(3)]
+        for count, protocol in enumerate(protocols):
+            self.x.release(('host{}.onion'.format(count), 16663), protocol)
+        self.assertEqual(self.x.get_stats()['idle'], 2)
+        self.assertNotIn(('host0.onion', 16663), self.x.idle)
+        self.assertEqual(protocols[0].sock.fileno(), -1)
+
+    def test_evict_expired(self):
+        protocol = self.make_protocol()
+        self.x.release(self.interface, protocol)
+        with patch.object(connectionpool.time, 'monotonic', return_value=time.monotonic() + 3600):
+            self.x.evict_expired()
+        self.assertEqual(self.x.get_stats()['idle'], 0)
+
+    def test_discard_closes_socket(self):
+        protocol = self.make_protocol()
+        self.x.discard(protocol)
+        self.assertEqual(protocol.sock.fileno(), -1)
+
+    def test_close_all(self):
+        protocols = [self.make_protocol() for _ in range(2)]
+        for protocol in protocols:
+            self.x.release(self.interface, protocol)
+        self.x.close_all()
+        self.assertEqual(self.x.get_stats()['idle'], 0)
+        self.assertTrue(all(protocol.sock.fileno() == -1 for protocol in protocols))
+
+    def test_is_healthy(self):
+        protocol = self.make_protocol()
+        self.assertTrue(self.x.is_healthy(protocol.sock))
+        self.pairs[0][1].sendall(b'x')
+        self.assertFalse(self.x.is_healthy(protocol.sock))
+        protocol.sock.close()
+        self.assertFalse(self.x.is_healthy(protocol.sock))
@@ -11,6 +11,8 @@ import unittest
 import net.bases.packet as packet
 import struct
 import json
+import os
+from disappeer.gpg.helpers import armor
 
 
 class TestImports(unittest.TestCase):
@@ -21,6 +23,9 @@ class TestImports(unittest.TestCase):
     def test_json(self):
         self.assertEqual(json, packet.json)
 
+    def test_armor(self):
+        self.assertEqual(armor, packet.armor)
+
 
 class TestHeaderClass(unittest.TestCase):
 
@@ -63,6 +68,38 @@ class TestHeaderClass(unittest.TestCase):
         hard_target = b'\x0b\x00\x00\x00HEL'
         self.assertEqual(result, hard_target)
 
+    def test_pack_sets_flags_in_top_byte(self):
+        result = self.class_obj.pack(self.msg_len_val, self.msg_command_val, self.class_obj.flag_binary)
+        self.assertEqual(result, b'\xc8\x01\x00\x01HEL')
+
+    def test_unpack_masks_flags_from_length(self):
+        packed = self.class_obj.pack(self.msg_len_val, self.msg_command_val, self.class_obj.flag_binary)
+        self.assertEqual(self.class_obj.unpack(packed), (self.msg_len_val, self.msg_command_val))
+
+    def test_unpack_flags(self):
+        packed = self.class_obj.pack(self.msg_len_val, self.msg_command_val, self.class_obj.flag_binary)
+        self.assertEqual(self.class_obj.unpack_flags(packed), self.class_obj.flag_binary)
+        self.assertEqual(self.class_obj.unpack_flags(self.hard_target_bytes_string), 0)
+
+    def test_supported_flags_include_binary(self):
+        self.assertTrue(self.class_obj.supported_flags & self.class_obj.flag_binary)
+
+    def test_supported_flags_include_chunked(self):
+        self.assertTrue(self.class_obj.supported_flags & self.class_obj.flag_chunked)
+
+    def test_supported_flags_include_compression(self):
+        self.assertEqual(self.class_obj.supported_flags & self.class_obj.compression_flags,
+                         self.class_obj.flag_zlib | self.class_obj.flag_lzma)
+
+    def test_pack_rejects_length_overflowing_into_flags(self):
+        with self.assertRaises(ValueError):
+            self.class_obj.pack(self.class_obj.length_mask + 1, self.msg_command_val)
+
+    def test_encode_command_caches_bytes(self):
+        result = self.class_obj.encode_command('CMD')
+        self.assertEqual(result, b'CMD')
+        self.assertIs(self.class_obj.encode_command('CMD'), result)
+
 
 class TestPayloadClass(unittest.TestCase):
 
@@ -85,6 +122,136 @@ class TestPayloadClass(unittest.TestCase):
         result = encoded_payload.decode()
         self.assertEqual(result, self.data)
 
+    def test_decode_method_decodes_data_from_memoryview(self):
+        hard_target = memoryview(bytearray(b'["Hello World"]'))
+        encoded_payload = packet.Payload(hard_target)
+        result = encoded_payload.decode()
+        self.assertEqual(result, self.data)
+
+
+class TestBinaryPayloadClass(unittest.TestCase):
+
+    def setUp(self):
+        self.armored = armor.armor('PGP MESSAGE', os.urandom(700))
+        self.data = dict(ciphertext=self.armored, nonce='abc123', keep_alive=30, note='caf\xe9')
+        self.x = packet.BinaryPayload(self.data)
+
+    def test_flags_attribute(self):
+        self.assertEqual(self.x.flags, packet.Header.flag_binary)
+
+    def test_round_trip(self):
+        result = packet.BinaryPayload(self.x.encode()).decode()
+        self.assertEqual(result, self.data)
+
+    def test_round_trip_from_memoryview(self):
+        encoded = memoryview(bytearray(self.x.encode()))
+        result = packet.BinaryPayload(encoded).decode()
+        self.assertEqual(result, self.data)
+
+    def test_encode_starts_with_version(self):
+        self.assertEqual(self.x.encode()[0], packet.BinaryPayload.version)
+
+    def test_armored_value_sent_as_raw_bytes(self):
+        value_type, value_bytes = self.x.encode_value(self.armored)
+        self.assertEqual(value_type, b'a')
+        self.assertLess(len(value_bytes), len(self.armored) * 0.8)
+
+    def test_armored_value_with_comment_header_round_trips(self):
+        armored = armor.armor('PGP PUBLIC KEY BLOCK', os.urandom(100), headers=('Comment: test',))
+        result = packet.BinaryPayload(packet.BinaryPayload(dict(key=armored)).encode()).decode()
+        self.assertEqual(result['key'], armored)
+
+    def test_irregular_armor_sent_as_string(self):
+        irregular = self.armored.replace('\n', '\r\n')
+        value_type, value_bytes = self.x.encode_value(irregular)
+        self.assertEqual(value_type, b's')
+        result = packet.BinaryPayload(packet.BinaryPayload(dict(ciphertext=irregular)).encode()).decode()
+        self.assertEqual(result['ciphertext'], irregular)
+
+    def test_encoded_smaller_than_json(self):
+        json_length = len(packet.Payload(self.data).encode())
+        self.assertLess(len(self.x.encode()), json_length * 0.8)
+
+    def test_can_encode(self):
+        self.assertTrue(packet.BinaryPayload.can_encode(self.data))
+        self.assertFalse(packet.BinaryPayload.can_encode(['list']))
+        self.assertFalse(packet.BinaryPayload.can_encode({1: 'int key'}))
+
+    def test_decode_truncated_raises_value_error(self):
+        encoded = self.x.encode()
+        with self.assertRaises(ValueError):
+            packet.BinaryPayload(encoded[:-1]).decode()
+        with self.assertRaises(ValueError):
+            packet.BinaryPayload(encoded[:2]).decode()
+
+    def test_decode_trailing_bytes_raises_value_error(self):
+        with self.assertRaises(ValueError):
+            packet.BinaryPayload(self.x.encode() + b'x').decode()
+
+    def test_decode_unknown_version_raises_value_error(self):
+        encoded = bytearray(self.x.encode())
+        encoded[0] = 99
+        with self.assertRaises(ValueError):
+            packet.BinaryPayload(encoded).decode()
+
+    def test_decode_unknown_value_type_raises_value_error(self):
+        encoded = packet.BinaryPayload(dict(a='b')).encode().replace(b'\x01as', b'\x01aq')
+        with self.assertRaises(ValueError):
+            packet.BinaryPayload(encoded).decode()
+
+
+class TestCompressorClass(unittest.TestCase):
+
+    def setUp(self):
+        self.data = b'hello world ' * 200
+        self.x = packet.Compressor('zlib', 6, 1024)
+
+    def test_attributes(self):
+        self.assertEqual(self.x.flag, packet.Header.flag_zlib)
+        self.assertEqual(packet.Compressor('lzma', 6, 1024).flag, packet.Header.flag_lzma)
+
+    def test_unknown_method_raises_key_error(self):
+        with self.assertRaises(KeyError):
+            packet.Compressor('bz2', 6, 1024)
+
+    def test_compress_round_trips(self):
+        for method in packet.Compressor.methods:
+            compressed, flag = packet.Compressor(method, 6, 1024).compress(self.data)
+            self.assertLess(len(compressed), len(self.data))
+            self.assertEqual(packet.Compressor.decompress(compressed, flag, len(self.data)), self.data)
+
+    def test_compress_skips_data_below_threshold(self):
+        self.assertEqual(self.x.compress(self.data[:100]), (self.data[:100], 0))
+
+    def test_compress_skips_incompressible_data(self):
+        data = os.urandom(4096)
+        self.assertEqual(self.x.compress(data), (data, 0))
+
+    def test_decompress_from_memoryview(self):
+        compressed, flag = self.x.compress(self.data)
+        result = packet.Compressor.decompress(memoryview(bytearray(compressed)), flag, len(self.data))
+        self.assertEqual(result, self.data)
+
+    def test_decompress_over_limit_raises_value_error(self):
+        for method in packet.Compressor.methods:
+            compressed, flag = packet.Compressor(method, 6, 1024).compress(self.data)
+            with self.assertRaises(ValueError):
+                packet.Compressor.decompress(compressed, flag, len(self.data) - 1)
+
+    def test_decompress_truncated_raises_value_error(self):
+        compressed, flag = self.x.compress(self.data)
+        with self.assertRaises(ValueError):
+            packet.Compressor.decompress(compressed[:-4], flag, len(self.data))
+
+    def test_decompress_corrupt_raises_value_error(self):
+        with self.assertRaises(ValueError):
+            packet.Compressor.decompress(b'not compressed', packet.Header.flag_lzma, 1024)
+
+    def test_decompress_both_flags_raises_value_error(self):
+        compressed, flag = self.x.compress(self.data)
+        with self.assertRaises(ValueError):
+            packet.Compressor.decompress(compressed, packet.Header.compression_flags, len(self.data))
+
 
 class TestPacketFactoryClass(unittest.TestCase):
 
@@ -105,3 +272,102 @@ class TestPacketFactoryClass(unittest.TestCase):
         hard_target = b'\x16\x00\x00\x00HEL{"msg": "Hello World"}'
         self.assertEqual(result, hard_target)
 
+    def test_build_method_flags_binary_payload(self):
+        payload = packet.BinaryPayload(self.data)
+        result = packet.PacketFactory(payload).build(self.cmd)
+        self.assertEqual(packet.Header.unpack_flags(result[:packet.Header.length]), packet.Header.flag_binary)
+        self.assertEqual(packet.Header.unpack(result[:packet.Header.length])[0], len(payload.encode()))
+
+    def split_frames(self, data):
+        frames = []
+        while data:
+            header = data[:packet.Header.length]
+            length = packet.Header.unpack(header)[0]
+            frames.append((packet.Header.unpack_flags(header), data[packet.Header.length:packet.Header.length + length]))
+            data = data[packet.Header.length + length:]
+        return frames
+
+    def test_build_chunked_small_payload_is_plain_frame(self):
+        result = self.x.build_chunked(self.cmd, 100)
+        self.assertEqual(result, self.x.build(self.cmd))
+
+    def test_build_chunked_splits_large_payload(self):
+        payload = packet.Payload(dict(msg='x' * 250))
+        encoded = payload.encode()
+        result = packet.PacketFactory(payload).build_chunked(self.cmd, 100)
+        frames = self.split_frames(result)
+        self.assertEqual([len(chunk) for flags, chunk in frames], [100, 100, len(encoded) - 200])
+        self.assertEqual([flags for flags, chunk in frames],
+                         [packet.Header.flag_chunked, packet.Header.flag_chunked, 0])
+        self.assertEqual(b''.join(chunk for flags, chunk in frames), encoded)
+
+    def test_build_chunked_keeps_codec_flag_on_every_chunk(self):
+        payload = packet.BinaryPayload(dict(msg='x' * 250))
+        result = packet.PacketFactory(payload).build_chunked(self.cmd, 100)
+        self.assertTrue(all(flags & packet.Header.flag_binary for flags, chunk in self.split_frames(result)))
+
+    def test_compressor_attribute_default_none(self):
+        self.assertIsNone(self.x.compressor)
+
+    def test_build_flags_compressed_payload(self):
+        payload = packet.Payload(dict(msg='x' * 2000))
+        result = packet.PacketFactory(payload, packet.Compressor('zlib', 6, 1024)).build(self.cmd)
+        header = result[:packet.Header.length]
+        self.assertEqual(packet.Header.unpack_flags(header), packet.Header.flag_zlib)
+        body = result[packet.Header.length:]
+        self.assertEqual(packet.Header.unpack(header)[0], len(body))
+        self.assertEqual(packet.Compressor.decompress(body, packet.Header.flag_zlib, 4096), payload.encode())
+
+    def test_build_chunked_compressed_into_one_chunk_ends_with_empty_frame(self):
+        payload = packet.Payload(dict(msg='x' * 2000))
+        result = packet.PacketFactory(payload, packet.Compressor('zlib', 6, 1024)).build_chunked(self.cmd, 1000)
+        frames = self.split_frames(result)
+        self.assertEqual([flags for flags, chunk in frames],
+                         [packet.Header.flag_zlib | packet.Header.flag_chunked, packet.Header.flag_zlib])
+        self.assertEqual(frames[1][1], b'')
+
+    def test_build_parts_alternate_headers_and_payload(self):
+        parts = self.x.build_parts(self.cmd)
+        self.assertEqual(len(parts), 2)
+        self.assertEqual(b''.join(parts), self.x.build(self.cmd))
+
+    def test_build_parts_chunked_pairs_each_chunk_with_its_header(self):
+        payload = packet.Payload(dict(msg='x' * 250))
+        parts = packet.PacketFactory(payload).build_parts(self.cmd, 100)
+        self.assertEqual(len(parts), 6)
+        self.assertTrue(all(len(parts[index]) == packet.Header.length for index in range(0, 6, 2)))
+
+
+class TestFrameTemplateClass(unittest.TestCase):
+
+    def setUp(self):
+        self.data = dict(nonce='xxx', desc='ACK', keep_alive=30)
+
+    def build(self, payload_class, data):
+        return packet.PacketFactory(payload_class(data)).build('ACK')
+
+    def test_json_parts_match_packet_factory(self):
+        x = packet.FrameTemplate('ACK', self.data, 'nonce')
+        for nonce in ['one', 'two "quoted"', '\u00e9']:
+            result = b''.join(x.parts(nonce))
+            self.assertEqual(result, self.build(packet.Payload, dict(self.data, nonce=nonce)))
+
+    def test_binary_parts_match_packet_factory(self):
+        x = packet.FrameTemplate('ACK', self.data, 'nonce', packet.BinaryPayload)
+        for nonce in ['one', 'a much longer nonce value']:
+            result = b''.join(x.parts(nonce))
+            self.assertEqual(result, self.build(packet.BinaryPayload, dict(self.data, nonce=nonce)))
+
+    def test_parts_are_header_prefix_value_suffix(self):
+        x = packet.FrameTemplate('ACK', self.data, 'nonce')
+        parts = x.parts('one')
+        self.assertEqual(len(parts), 4)
+        self.assertEqual(parts[1], x.prefix)
+        self.assertEqual(parts[3], x.suffix)
+
+    def test_can_fill(self):
+        x = packet.FrameTemplate('ACK', self.data, 'nonce')
+        self.assertTrue(x.can_fill('one'))
+        self.assertFalse(x.can_fill(1))
+        binary = packet.FrameTemplate('ACK', self.data, 'nonce', packet.BinaryPayload)
+        self.assertFalse(binary.can_fill(packet.BinaryPayload.armor_begin + 'MESSAGE-----'))
@@ -0,0 +1,45 @@
+"""
+test_peercapabilities.py
+
+Test suite for the PeerCapabilities class object
+
+Copyright (C) 2018 Disappeer Labs
+License: GPLv3
+"""
+
+import unittest
+from disappeer.net.bases import peercapabilities
+from disappeer.net.bases import packet
+
+
+class TestImports(unittest.TestCase):
+
+    def test_packet(self):
+        self.assertEqual(packet, peercapabilities.packet)
+
+
+class TestClassBasics(unittest.TestCase):
+
+    def setUp(self):
+        self.x = peercapabilities.PeerCapabilities()
+        self.interface = ('host.onion', 16663)
+
+    def test_get_unknown_peer_returns_zero(self):
+        self.assertEqual(self.x.get(self.interface), 0)
+
+    def test_update_then_get(self):
+        self.x.update(self.interface, packet.Header.flag_binary)
+        self.assertEqual(self.x.get(self.interface), packet.Header.flag_binary)
+
+    def test_update_masks_unsupported_flags(self):
+        self.x.update(self.interface, 0xFF)
+        self.assertEqual(self.x.get(self.interface), packet.Header.supported_flags)
+
+    def test_update_ignores_non_int(self):
+        self.x.update(self.interface, 'xxx')
+        self.assertEqual(self.x.get(self.interface), 0)
+
+    def test_forget(self):
+        self.x.update(self.interface, packet.Header.flag_binary)
+        self.x.forget(self.interface)
+        self.assertEqual(self.x.get(self.interface), 0)
@@ -0,0 +1,539 @@
+"""
+test_poolingmixin.py
+
+Test suite for the PoolingMixIn class object
+
+Copyright (C) 2018 Disappeer Labs
+License: GPLv3
+"""
+
+import unittest
+from unittest.mock import MagicMock
+import concurrent.futures
+import socket
+import socketserver
+import threading
+import time
+from disappeer.net.bases import poolingmixin
+from disappeer.net.bases import baseprotocol
+from disappeer import settings
+
+
+class TestImports(unittest.TestCase):
+
+    def test_concurrent_futures(self):
+        self.assertEqual(concurrent.futures, poolingmixin.concurrent.futures)
+
+    def test_settings(self):
+        self.assertEqual(settings, poolingmixin.settings)
+
+
+class BlockingRequestHandler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        self.server.started.release()
+        self.server.release_event.wait(5)
+        self.request.sendall(b'done')
+
+
+class KeepAliveRequestHandler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        data = self.request.recv(1)
+        count = self.server.get_request_count(self.request)
+        self.request.sendall(data + bytes([count]))
+        self.keep_open = data == b'k'
+
+
+class PooledTCPServer(poolingmixin.PoolingMixIn, socketserver.TCPServer):
+    allow_reuse_address = True
+    max_workers = 1
+    max_queued_requests = 1
+
+
+class TestClassBasics(unittest.TestCase):
+
+    def setUp(self):
+        self.x = PooledTCPServer(('127.0.0.1', 0), BlockingRequestHandler, bind_and_activate=False)
+
+    def tearDown(self):
+        self.x.server_close()
+
+    def test_default_max_workers_from_settings(self):
+        self.assertEqual(poolingmixin.PoolingMixIn.max_workers, settings.server_max_workers)
+
+    def test_default_max_queued_requests_from_settings(self):
+        self.assertEqual(poolingmixin.PoolingMixIn.max_queued_requests, settings.server_max_queued_requests)
+
+    def test_request_queue_size_from_settings(self):
+        self.assertEqual(poolingmixin.PoolingMixIn.request_queue_size, settings.server_accept_backlog)
+
+    def test_executor_attribute(self):
+        self.assertIsInstance(self.x.executor, concurrent.futures.ThreadPoolExecutor)
+
+    def test_rejection_frame_is_busy_frame(self):
+        protocol = baseprotocol.BaseProtocol(None)
+        target = protocol.build_packet(dict(desc='BUSY'), protocol.busy_string)
+        self.assertEqual(self.x.rejection_frame, target)
+
+    def test_get_stats_initial_values(self):
+        result = self.x.get_stats()
+        target = dict(max_workers=1,
+                      max_queued_requests=1,
+                      queue_depth=0,
+                      active=0,
+                      accepted=0,
+                      rejected=0,
+                      max_half_open=settings.max_half_open_connections,
+                      half_open=0,
+                      dropped=0,
+                      max_idle=settings.server_max_idle_connections,
+                      idle=0,
+                      timeouts=0)
+        self.assertEqual(result, target)
+
+    def test_process_request_parks_connection_until_data(self):
+        self.x.executor = MagicMock()
+        self.x.half_open_waiter = MagicMock()
+        request = MagicMock()
+        self.x.process_request(request, 'address')
+        args = self.x.half_open_waiter.park.call_args[0]
+        self.assertEqual(args[0], request)
+        self.assertEqual(args[1], self.x.header_read_timeout)
+        self.assertEqual(args[3], self.x.request_data_expired)
+        self.assertFalse(self.x.executor.submit.called)
+        args[2](request)
+        self.x.executor.submit.assert_called_with(self.x.process_request_worker, request, 'address')
+        stats = self.x.get_stats()
+        self.assertEqual(stats['queue_depth'], 1)
+        self.assertEqual(stats['half_open'], 0)
+        self.assertEqual(stats['accepted'], 1)
+
+    def test_process_request_closes_connection_if_waiter_closed(self):
+        self.x.half_open_waiter = MagicMock()
+        self.x.half_open_waiter.park.return_value = False
+        self.x.shutdown_request = MagicMock()
+        self.x.process_request('request', 'address')
+        self.x.shutdown_request.assert_called_with('request')
+        self.assertEqual(self.x.get_stats()['half_open'], 0)
+
+    def test_request_data_ready_rejects_when_saturated(self):
+        self.x.executor = MagicMock()
+        self.x.reject_request = MagicMock()
+        self.x.half_open_count = 1
+        self.x.active_count = 1
+        self.x.queued_count = 1
+        self.x.request_data_ready('request', 'address')
+        self.x.reject_request.assert_called_with('request')
+        self.assertFalse(self.x.executor.submit.called)
+        self.assertEqual(self.x.get_stats()['rejected'], 1)
+        self.assertEqual(self.x.get_stats()['half_open'], 0)
+
+    def test_request_data_expired_counts_timeout_and_closes(self):
+        self.x.shutdown_request = MagicMock()
+        self.x.half_open_count = 1
+        self.x.request_data_expired('request')
+        self.x.shutdown_request.assert_called_with('request')
+        stats = self.x.get_stats()
+        self.assertEqual(stats['timeouts'], 1)
+        self.assertEqual(stats['half_open'], 0)
+
+    def test_process_request_rejects_when_saturated(self):
+        self.x.executor = MagicMock()
+        self.x.reject_request = MagicMock()
+        self.x.active_count = 1
+        self.x.queued_count = 1
+        request = MagicMock()
+        self.x.process_request(request, 'address')
+        self.x.reject_request.assert_called_with(request)
+        self.assertFalse(self.x.executor.submit.called)
+        self.assertEqual(self.x.get_stats()['rejected'], 1)
+
+    def test_reject_request_sends_rejection_frame_and_shuts_down(self):
+        request = MagicMock()
+        self.x.shutdown_request = MagicMock()
+        self.x.reject_request(request)
+        request.sendall.assert_called_with(self.x.rejection_frame)
+        self.x.shutdown_request.assert_called_with(request)
+
+    def test_reject_request_ignores_os_error(self):
+        request = MagicMock()
+        request.sendall.side_effect = OSError
+        self.x.shutdown_request = MagicMock()
+        self.x.reject_request(request)
+        self.assertTrue(self.x.shutdown_request.called)
+
+    def test_process_request_worker_calls_finish_and_shutdown(self):
+        self.x.has_request_data = MagicMock(return_value=True)
+        self.x.finish_request = MagicMock(return_value=False)
+        self.x.shutdown_request = MagicMock()
+        self.x.queued_count = 1
+        self.x.process_request_worker('request', 'address')
+        self.x.finish_request.assert_called_with('request', 'address')
+        self.x.shutdown_request.assert_called_with('request')
+        self.assertEqual(self.x.get_stats()['active'], 0)
+        self.assertEqual(self.x.get_stats()['queue_depth'], 0)
+
+    def test_process_request_worker_skips_handler_without_request_data(self):
+        self.x.has_request_data = MagicMock(return_value=False)
+        self.x.finish_request = MagicMock()
+        self.x.shutdown_request = MagicMock()
+        self.x.queued_count = 1
+        self.x.process_request_worker('request', 'address')
+        self.assertFalse(self.x.finish_request.called)
+        self.x.shutdown_request.assert_called_with('request')
+
+    def test_process_request_drops_past_max_half_open(self):
+        self.x.executor = MagicMock()
+        self.x.reject_request = MagicMock()
+        self.x.half_open_count = self.x.max_half_open
+        self.x.process_request('request', 'address')
+        self.x.reject_request.assert_called_with('request')
+        self.assertEqual(self.x.get_stats()['dropped'], 1)
+        self.assertEqual(self.x.get_stats()['rejected'], 0)
+
+    def test_process_request_counts_half_open(self):
+        self.x.half_open_waiter = MagicMock()
+        self.x.process_request('request', 'address')
+        self.assertEqual(self.x.get_stats()['half_open'], 1)
+
+    def test_has_request_data_true_when_data_waiting(self):
+        local, remote = socket.socketpair()
+        remote.sendall(b'x')
+        result = self.x.has_request_data(local)
+        self.assertIs(result, True)
+        self.assertEqual(local.recv(1), b'x')
+        self.assertIsNone(local.gettimeout())
+        local.close()
+        remote.close()
+
+    def test_has_request_data_does_not_block_without_data(self):
+        local, remote = socket.socketpair()
+        self.assertIs(self.x.has_request_data(local), True)
+        self.assertIsNone(local.gettimeout())
+        local.close()
+        remote.close()
+
+    def test_has_request_data_false_on_eof(self):
+        local, remote = socket.socketpair()
+        remote.close()
+        self.assertIs(self.x.has_request_data(local), False)
+        local.close()
+
+    def test_finish_request_counts_protocol_timeouts(self):
+        handler = self.x.RequestHandlerClass = MagicMock()
+        handler.return_value.protocol.timed_out = True
+        self.x.finish_request('request', 'address')
+        handler.assert_called_with('request', 'address', self.x)
+        self.assertEqual(self.x.get_stats()['timeouts'], 1)
+
+    def test_finish_request_ignores_handler_without_protocol(self):
+        self.x.RequestHandlerClass = MagicMock(return_value=object())
+        self.x.finish_request('request', 'address')
+        self.assertEqual(self.x.get_stats()['timeouts'], 0)
+
+    def test_finish_request_returns_handler_keep_open(self):
+        self.x.RequestHandlerClass = MagicMock()
+        self.x.RequestHandlerClass.return_value.keep_open = True
+        self.assertIs(self.x.finish_request('request', 'address'), True)
+        self.x.RequestHandlerClass.return_value.keep_open = MagicMock()
+        self.assertIs(self.x.finish_request('request', 'address'), False)
+
+    def test_process_request_worker_parks_kept_open_connection(self):
+        self.x.has_request_data = MagicMock(return_value=True)
+        self.x.finish_request = MagicMock(return_value=True)
+        self.x.shutdown_request = MagicMock()
+        self.x.idle_waiter = MagicMock()
+        self.x.queued_count = 1
+        self.x.process_request_worker('request', 'address')
+        self.assertFalse(self.x.shutdown_request.called)
+        args = self.x.idle_waiter.park.call_args[0]
+        self.assertEqual(args[:2], ('request', self.x.keep_alive_idle_timeout))
+        self.assertEqual(args[3], self.x.end_idle)
+        stats = self.x.get_stats()
+        self.assertEqual(stats['idle'], 1)
+        self.assertEqual(stats['active'], 0)
+        self.assertEqual(self.x.get_request_count('request'), 1)
+
+    def test_kept_open_connection_closed_past_max_idle(self):
+        self.x.has_request_data = MagicMock(return_value=True)
+        self.x.finish_request = MagicMock(return_value=True)
+        self.x.shutdown_request = MagicMock()
+        self.x.idle_waiter = MagicMock()
+        self.x.max_idle = 1
+        self.x.idle_count = 1
+        self.x.queued_count = 1
+        self.x.process_request_worker('request', 'address')
+        self.assertFalse(self.x.idle_waiter.park.called)
+        self.x.shutdown_request.assert_called_with('request')
+        self.assertEqual(self.x.get_stats()['idle'], 1)
+
+    def test_kept_open_connection_closed_once_draining(self):
+        self.x.idle_waiter = MagicMock()
+        self.x.drain_event.set()
+        self.assertIs(self.x.park_idle('request', 'address'), False)
+        self.assertFalse(self.x.idle_waiter.park.called)
+
+    def test_next_request_ready_submits_and_counts_requests(self):
+        self.x.executor = MagicMock()
+        self.x.idle_count = 1
+        self.x.request_counts['request'] = 1
+        self.x.next_request_ready('request', 'address')
+        self.x.executor.submit.assert_called_with(self.x.process_request_worker, 'request', 'address')
+        self.assertEqual(self.x.get_stats()['idle'], 0)
+        self.assertEqual(self.x.get_stats()['queue_depth'], 1)
+        self.x.has_request_data = MagicMock(return_value=False)
+        self.x.shutdown_request = MagicMock()
+        self.x.process_request_worker('request', 'address')
+        self.assertEqual(self.x.request_counts, {})
+
+    def test_end_idle_closes_connection(self):
+        self.x.shutdown_request = MagicMock()
+        self.x.idle_count = 1
+        self.x.request_counts['request'] = 2
+        self.x.end_idle('request')
+        self.x.shutdown_request.assert_called_with('request')
+        self.assertEqual(self.x.get_stats()['idle'], 0)
+        self.assertEqual(self.x.get_request_count('request'), 1)
+
+    def test_get_name_defaults_to_class_name(self):
+        self.assertEqual(self.x.get_name(), 'PooledTCPServer')
+        self.x.name = 'server_name'
+        self.assertEqual(self.x.get_name(), 'server_name')
+
+    def test_process_request_counts_connection_metric(self):
+        self.x.executor = MagicMock()
+        self.x.reject_request = MagicMock()
+        self.x.name = 'test_metrics_server'
+        self.x.half_open_count = 1
+        self.x.request_data_ready(MagicMock(), 'address')
+        self.x.active_count = 2
+        self.x.process_request(MagicMock(), 'address')
+        self.assertEqual(poolingmixin.connections.get(server='test_metrics_server', result='accepted'), 1)
+        self.assertEqual(poolingmixin.connections.get(server='test_metrics_server', result='rejected'), 1)
+
+    def test_finish_request_observes_handler_seconds(self):
+        self.x.RequestHandlerClass = MagicMock(return_value=object())
+        self.x.name = 'test_metrics_handler'
+        self.x.finish_request('request', 'address')
+        self.assertEqual(poolingmixin.handler_seconds.get(server='test_metrics_handler')[1], 1)
+        self.assertEqual(poolingmixin.handlers_in_flight.get(server='test_metrics_handler'), 0)
+
+    def test_process_request_worker_handles_error(self):
+        self.x.has_request_data = MagicMock(return_value=True)
+        self.x.finish_request = MagicMock(side_effect=ValueError)
+        self.x.handle_error = MagicMock()
+        self.x.shutdown_request = MagicMock()
+        self.x.queued_count = 1
+        self.x.process_request_worker('request', 'address')
+        self.x.handle_error.assert_called_with('request', 'address')
+        self.assertTrue(self.x.shutdown_request.called)
+
+
+class TestSaturation(unittest.TestCase):
+
+    def setUp(self):
+        self.x = PooledTCPServer(('127.0.0.1', 0), BlockingRequestHandler)
+        self.x.started = threading.Semaphore(0)
+        self.x.release_event = threading.Event()
+        self.port = self.x.server_address[1]
+        self.thread = threading.Thread(target=self.x.serve_forever, kwargs=dict(poll_interval=0.05))
+        self.thread.daemon = True
+        self.thread.start()
+        self.sockets = []
+
+    def tearDown(self):
+        self.x.release_event.set()
+        for sock in self.sockets:
+            sock.close()
+        self.x.shutdown()
+        self.x.server_close()
+
+    def connect(self):
+        sock = socket.create_connection(('127.0.0.1', self.port), timeout=5)
+        sock.sendall(b'x')
+        self.sockets.append(sock)
+        return sock
+
+    def test_connections_beyond_pool_and_queue_are_rejected(self):
+        self.connect()
+        self.assertTrue(self.x.started.acquire(timeout=5))
+        self.connect()
+        rejected = self.connect()
+        protocol = baseprotocol.BaseProtocol(rejected)
+        result = protocol.process_incoming(protocol.ack_string)
+        self.assertIs(result, False)
+        self.assertIs(protocol.peer_busy, True)
+        stats = self.x.get_stats()
+        self.assertEqual(stats['active'], 1)
+        self.assertEqual(stats['queue_depth'], 1)
+        self.assertEqual(stats['rejected'], 1)
+        self.assertEqual(stats['accepted'], 2)
+
+    def test_queued_request_runs_when_worker_frees_up(self):
+        first = self.connect()
+        self.assertTrue(self.x.started.acquire(timeout=5))
+        second = self.connect()
+        self.x.release_event.set()
+        self.assertEqual(first.recv(4), b'done')
+        self.assertEqual(second.recv(4), b'done')
+
+
+class TestHalfOpen(TestSaturation):
+
+    def connect_silent(self):
+        sock = socket.create_connection(('127.0.0.1', self.port), timeout=5)
+        self.sockets.append(sock)
+        return sock
+
+    def wait_for_stat(self, name, value):
+        deadline = time.monotonic() + 5
+        while self.x.get_stats()[name] != value and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return self.x.get_stats()[name]
+
+    def test_silent_peers_hold_no_worker(self):
+        for _ in range(3):
+            self.connect_silent()
+        self.assertEqual(self.wait_for_stat('half_open', 3), 3)
+        sock = self.connect()
+        self.assertTrue(self.x.started.acquire(timeout=5))
+        self.x.release_event.set()
+        self.assertEqual(sock.recv(4), b'done')
+        stats = self.x.get_stats()
+        self.assertEqual(stats['half_open'], 3)
+        self.assertEqual(stats['rejected'], 0)
+
+    def test_silent_peer_closed_after_header_read_timeout(self):
+        self.x.header_read_timeout = 0.1
+        sock = self.connect_silent()
+        self.assertEqual(sock.recv(4), b'')
+        self.assertEqual(self.wait_for_stat('timeouts', 1), 1)
+        self.assertEqual(self.x.get_stats()['half_open'], 0)
+        self.assertFalse(self.x.started.acquire(timeout=0.1))
+
+    def test_close_pool_closes_half_open_connections(self):
+        sock = self.connect_silent()
+        self.assertEqual(self.wait_for_stat('half_open', 1), 1)
+        self.x.shutdown()
+        self.x.close_pool()
+        self.assertEqual(sock.recv(4), b'')
+        self.assertEqual(self.x.get_stats()['half_open'], 0)
+
+
+class TestKeepAlive(unittest.TestCase):
+
+    def setUp(self):
+        self.x = PooledTCPServer(('127.0.0.1', 0), KeepAliveRequestHandler)
+        self.port = self.x.server_address[1]
+        self.thread = threading.Thread(target=self.x.serve_forever, kwargs=dict(poll_interval=0.05))
+        self.thread.daemon = True
+        self.thread.start()
+        self.sockets = []
+
+    def tearDown(self):
+        for sock in self.sockets:
+            sock.close()
+        self.x.shutdown()
+        self.x.server_close()
+
+    def connect_silent(self):
+        sock = socket.create_connection(('127.0.0.1', self.port), timeout=5)
+        self.sockets.append(sock)
+        return sock
+
+    def wait_for_stat(self, name, value):
+        deadline = time.monotonic() + 5
+        while self.x.get_stats()[name] != value and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return self.x.get_stats()[name]
+
+    def exchange(self, sock, data):
+        sock.sendall(data)
+        return sock.recv(2)
+
+    def test_requests_counted_per_connection(self):
+        sock = self.connect_silent()
+        self.assertEqual(self.exchange(sock, b'k'), b'k\x01')
+        self.assertEqual(self.exchange(sock, b'k'), b'k\x02')
+        self.assertEqual(self.exchange(sock, b'x'), b'x\x03')
+        self.assertEqual(sock.recv(1), b'')
+
+    def test_idle_kept_alive_connections_hold_no_worker(self):
+        idle = [self.connect_silent() for _ in range(3)]
+        for sock in idle:
+            self.assertEqual(self.exchange(sock, b'k'), b'k\x01')
+        self.assertEqual(self.wait_for_stat('idle', 3), 3)
+        start = time.monotonic()
+        sock = self.connect_silent()
+        self.assertEqual(self.exchange(sock, b'x'), b'x\x01')
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(self.wait_for_stat('active', 0), 0)
+        self.assertEqual(self.x.get_stats()['rejected'], 0)
+
+    def test_idle_connection_closed_after_idle_timeout(self):
+        self.x.keep_alive_idle_timeout = 0.1
+        sock = self.connect_silent()
+        self.exchange(sock, b'k')
+        self.assertEqual(sock.recv(1), b'')
+        self.assertEqual(self.wait_for_stat('idle', 0), 0)
+        self.assertEqual(self.x.get_stats()['timeouts'], 0)
+
+    def test_drain_closes_idle_connections(self):
+        sock = self.connect_silent()
+        self.exchange(sock, b'k')
+        self.assertEqual(self.wait_for_stat('idle', 1), 1)
+        self.x.shutdown()
+        report = self.x.drain(1)
+        self.assertIs(report['drained'], True)
+        self.assertEqual(sock.recv(1), b'')
+        self.assertEqual(self.x.get_stats()['idle'], 0)
+
+
+class TestDrain(TestSaturation):
+
+    def test_drain_sets_drain_event(self):
+        self.x.shutdown()
+        self.x.drain(1)
+        self.assertTrue(self.x.drain_event.is_set())
+
+    def test_drain_waits_for_in_flight_handler(self):
+        sock = self.connect()
+        self.assertTrue(self.x.started.acquire(timeout=5))
+        self.x.shutdown()
+        threading.Timer(0.1, self.x.release_event.set).start()
+        report = self.x.drain(5)
+        self.assertIs(report['drained'], True)
+        self.assertEqual(report['cut_off'], [])
+        self.assertEqual(sock.recv(4), b'done')
+
+    def test_drain_cuts_off_handler_past_deadline(self):
+        self.x.handle_error = MagicMock()
+        sock = self.connect()
+        self.assertTrue(self.x.started.acquire(timeout=5))
+        self.x.shutdown()
+        report = self.x.drain(0.1)
+        self.assertIs(report['drained'], False)
+        self.assertEqual(report['cut_off'], [sock.getsockname()])
+        self.assertEqual(report['queued'], 0)
+        self.assertEqual(sock.recv(4), b'')
+
+    def test_drain_closes_queued_connection_unserved_after_deadline(self):
+        self.x.handle_error = MagicMock()
+        self.connect()
+        self.assertTrue(self.x.started.acquire(timeout=5))
+        queued = self.connect()
+        deadline = time.monotonic() + 5
+        while self.x.get_stats()['queue_depth'] < 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.x.shutdown()
+        report = self.x.drain(0.1)
+        self.assertEqual(report['queued'], 1)
+        self.x.release_event.set()
+        self.assertEqual(queued.recv(4), b'')
+        self.assertFalse(self.x.started.acquire(timeout=0.1))
+
+    def test_close_pool_keeps_listening_socket_open(self):
+        self.x.shutdown()
+        self.x.close_pool()
+        self.assertNotEqual(self.x.socket.fileno(), -1)
@@ -0,0 +1,109 @@
+"""
+test_replaycache.py
+
+Test suite for the ReplayCache class object
+
+Copyright (C) 2018 Disappeer Labs
+License: GPLv3
+"""
+
+import unittest
+import json
+import os
+import tempfile
+from disappeer.net.bases import replaycache
+from disappeer import settings
+
+
+class TestImports(unittest.TestCase):
+
+    def test_settings(self):
+        self.assertEqual(settings, replaycache.settings)
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestReplayCache(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.x = replaycache.ReplayCache(max_entries=2, ttl=10, clock=self.clock)
+
+    def test_defaults_from_settings(self):
+        x = replaycache.ReplayCache()
+        self.assertEqual(x.max_entries, settings.replay_cache_max_entries)
+        self.assertEqual(x.ttl, settings.replay_cache_ttl)
+        self.assertEqual(x.path, settings.replay_cache_path)
+
+    def test_add_returns_false_for_recorded_key(self):
+        self.assertIs(self.x.add(('nonce', 'digest')), True)
+        self.assertIn(('nonce', 'digest'), self.x)
+        self.assertIs(self.x.add(('nonce', 'digest')), False)
+        self.assertEqual(self.x.get_stats(), dict(entries=1, hits=1))
+
+    def test_discard_forgets_key(self):
+        self.x.add(('nonce', 'digest'))
+        self.x.discard(('nonce', 'digest'))
+        self.x.discard(('other', 'digest'))
+        self.assertIs(self.x.add(('nonce', 'digest')), True)
+
+    def test_entry_expires_after_ttl(self):
+        self.x.add(('nonce', 'digest'))
+        self.clock.now += 10
+        self.assertNotIn(('nonce', 'digest'), self.x)
+        self.assertIs(self.x.add(('nonce', 'digest')), True)
+
+    def test_oldest_entry_evicted_beyond_max_entries(self):
+        for name in ['a', 'b', 'c']:
+            self.x.add((name, 'digest'))
+        self.assertNotIn(('a', 'digest'), self.x)
+        self.assertIn(('c', 'digest'), self.x)
+
+
+class TestReplayCachePersistence(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, 'replay_cache')
+        self.clock = FakeClock()
+
+    def build(self):
+        return replaycache.ReplayCache(max_entries=2, ttl=10, path=self.path, clock=self.clock)
+
+    def test_entries_survive_restart(self):
+        self.build().add(('nonce', 'digest'))
+        self.assertIn(('nonce', 'digest'), self.build())
+
+    def test_discarded_entry_not_loaded_after_restart(self):
+        x = self.build()
+        x.add(('nonce', 'digest'))
+        x.discard(('nonce', 'digest'))
+        self.assertNotIn(('nonce', 'digest'), self.build())
+
+    def test_load_drops_expired_and_malformed_lines(self):
+        x = self.build()
+        x.add(('old', 'digest'))
+        self.clock.now += 5
+        x.add(('new', 'digest'))
+        with open(self.path, 'a') as f:
+            f.write('xxx\n')
+        self.clock.now += 6
+        x = self.build()
+        self.assertEqual(list(x.entries), [('new', 'digest')])
+        with open(self.path) as f:
+            self.assertEqual([json.loads(line)[0] for line in f], [['new', 'digest']])
+
+    def test_file_compacted_when_appends_exceed_max_entries(self):
+        x = self.build()
+        for name in ['a', 'b', 'c']:
+            x.add((name, 'digest'))
+        with open(self.path) as f:
+            self.assertEqual(len(f.readlines()), 2)
@@ -64,8 +64,24 @@ class TestServerControllerClassBasics(unittest.TestCase):
         self.x.stop()
         self.assertFalse(self.x.status.get())
 
+    def test_drain_method_returns_server_drain_report(self):
+        self.x.status.set(True)
+        result = self.x.drain(5)
+        self.x.server.drain.assert_called_with(5)
+        self.assertEqual(result, self.x.server.drain.return_value)
+        self.assertFalse(self.x.status.get())
+
+    def test_restart_method_calls_restart_on_server(self):
+        self.x.restart()
+        self.assertTrue(self.x.server.restart.called)
+        self.assertTrue(self.x.status.get())
+
     def test_get_status_method(self):
         target = 'hello'
         self.x.status.set(target)
         check = self.x.get_status()
         self.assertEqual(target, check)
+
+    def test_get_stats_method_returns_server_stats(self):
+        result = self.x.get_stats()
+        self.assertEqual(result, self.x.server.get_stats.return_value)
@@ -0,0 +1,121 @@
+"""
+test_socketwaiter.py
+
+Test suite for the SocketWaiter class object
+
+Copyright (C) 2018 Disappeer Labs
+License: GPLv3
+"""
+
+import unittest
+import queue
+import selectors
+import socket
+import threading
+from disappeer.net.bases import socketwaiter
+
+
+class TestImports(unittest.TestCase):
+
+    def test_selectors(self):
+        self.assertEqual(selectors, socketwaiter.selectors)
+
+    def test_threading(self):
+        self.assertEqual(threading, socketwaiter.threading)
+
+
+class TestSocketWaiter(unittest.TestCase):
+
+    def setUp(self):
+        self.x = socketwaiter.SocketWaiter('Test_Waiter')
+        self.addCleanup(self.x.close)
+        self.results = queue.Queue()
+        self.pairs = []
+
+    def tearDown(self):
+        for local, remote in self.pairs:
+            local.close()
+            remote.close()
+
+    def pair(self):
+        result = socket.socketpair()
+        self.pairs.append(result)
+        return result
+
+    def on_ready(self, sock):
+        self.results.put(('ready', sock))
+
+    def on_expired(self, sock):
+        self.results.put(('expired', sock))
+
+    def test_thread_started_on_first_park(self):
+        self.assertIsNone(self.x.thread)
+        local, remote = self.pair()
+        self.x.park(local, 5, self.on_ready, self.on_expired)
+        self.assertTrue(self.x.thread.is_alive())
+        self.assertEqual(self.x.thread.name, 'Test_Waiter')
+
+    def test_ready_called_when_data_arrives(self):
+        local, remote = self.pair()
+        self.assertIs(self.x.park(local, 5, self.on_ready, self.on_expired), True)
+        remote.sendall(b'x')
+        self.assertEqual(self.results.get(timeout=5), ('ready', local))
+        self.assertEqual(local.recv(1), b'x')
+
+    def test_ready_called_on_eof(self):
+        local, remote = self.pair()
+        self.x.park(local, 5, self.on_ready, self.on_expired)
+        remote.close()
+        self.assertEqual(self.results.get(timeout=5), ('ready', local))
+
+    def test_expired_called_past_deadline(self):
+        local, remote = self.pair()
+        self.x.park(local, 0.05, self.on_ready, self.on_expired)
+        self.assertEqual(self.results.get(timeout=5), ('expired', local))
+        self.assertEqual(self.x.get_stats(), dict(parked=0))
+
+    def test_each_socket_dispatched_once(self):
+        local, remote = self.pair()
+        self.x.park(local, 0.05, self.on_ready, self.on_expired)
+        remote.sendall(b'x')
+        self.results.get(timeout=5)
+        self.assertRaises(queue.Empty, self.results.get, timeout=0.2)
+
+    def test_sockets_wait_independently(self):
+        first, first_remote = self.pair()
+        second, second_remote = self.pair()
+        self.x.park(first, 5, self.on_ready, self.on_expired)
+        self.x.park(second, 0.05, self.on_ready, self.on_expired)
+        self.assertEqual(self.results.get(timeout=5), ('expired', second))
+        first_remote.sendall(b'x')
+        self.assertEqual(self.results.get(timeout=5), ('ready', first))
+
+    def test_closed_socket_expires(self):
+        local, remote = self.pair()
+        local.close()
+        self.x.park(local, 5, self.on_ready, self.on_expired)
+        self.assertEqual(self.results.get(timeout=5), ('expired', local))
+
+    def test_callback_error_does_not_stop_thread(self):
+        first, first_remote = self.pair()
+        second, second_remote = self.pair()
+        self.x.park(first, 0.01, self.on_ready, None)
+        self.x.park(second, 5, self.on_ready, self.on_expired)
+        second_remote.sendall(b'x')
+        self.assertEqual(self.results.get(timeout=5), ('ready', second))
+
+    def test_close_returns_parked_sockets_without_callbacks(self):
+        local, remote = self.pair()
+        self.x.park(local, 5, self.on_ready, self.on_expired)
+        self.assertEqual(self.x.close(), [local])
+        self.assertFalse(self.x.thread.is_alive())
+        self.assertTrue(self.results.empty())
+
+    def test_park_refused_once_closed(self):
+        self.assertEqual(self.x.close(), [])
+        local, remote = self.pair()
+        self.assertIs(self.x.park(local, 5, self.on_ready, self.on_expired), False)
+
+
+if __name__ == '__main__':
+    unittest.main()
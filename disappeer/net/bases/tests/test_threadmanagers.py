@@ -14,7 +14,12 @@ import unittest
 from unittest.mock import MagicMock, patch
 import net.bases.threadmanagers as threadmanagers
 import abc
+import socket
+import socketserver
 import threading
+from disappeer import settings
+from disappeer.net.bases import abstractserverfactory
+from disappeer.net.bases import poolingmixin
 
 
 class TestImports(unittest.TestCase):
@@ -145,6 +150,14 @@ class TestServerThreadManager(unittest.TestCase):
         self.assertTrue(target.called)
         self.assertTrue(target1.called)
 
+    def test_get_stats_returns_empty_dict_without_widget(self):
+        self.assertEqual(self.x.get_stats(), dict())
+
+    def test_get_stats_returns_widget_stats(self):
+        self.x.widget = MagicMock()
+        result = self.x.get_stats()
+        self.assertEqual(result, self.x.widget.get_stats.return_value)
+
 
 class TestClientThreadManager(unittest.TestCase):
 
@@ -168,4 +181,100 @@ class TestClientThreadManager(unittest.TestCase):
         self.x.widget = MagicMock()
         target = self.x.widget.stop = MagicMock()
         self.x.stop()
-        self.assertTrue(target.called)
\ No newline at end of file
+        self.assertTrue(target.called)
+
+class TestServerThreadManagerDrain(unittest.TestCase):
+
+    def setUp(self):
+        self.mock_factory = MagicMock()
+        self.mock_factory.name = 'Server'
+        self.x = threadmanagers.ServerThreadManager(self.mock_factory)
+        self.x.widget = MagicMock()
+        self.x.widget.drain.return_value = dict(drained=True, seconds=0, cut_off=[], queued=0)
+
+    def test_drain_shuts_down_drains_and_closes(self):
+        result = self.x.drain(5)
+        self.x.widget.shutdown.assert_called_with()
+        self.x.widget.drain.assert_called_with(5)
+        self.x.widget.server_close.assert_called_with()
+        self.assertEqual(result, self.x.widget.drain.return_value)
+
+    def test_drain_timeout_default_from_settings(self):
+        self.x.drain()
+        self.x.widget.drain.assert_called_with(settings.server_drain_timeout)
+
+    def test_restart_without_widget_starts(self):
+        self.x.widget = None
+        self.x.start = MagicMock()
+        self.x.restart()
+        self.x.start.assert_called_with()
+
+    @patch('threading.Thread')
+    def test_restart_builds_widget_on_old_socket_and_retires_old(self, mock_thread):
+        old = self.x.widget
+        self.x.restart(5)
+        old.socket.setblocking.assert_called_with(False)
+        self.mock_factory.build.assert_called_with(old.socket)
+        self.assertEqual(self.x.widget, self.mock_factory.build.return_value)
+        mock_thread.assert_called_with(target=self.x.retire, args=(old, 5), name='Server_Retire')
+
+    def test_restart_keeps_old_widget_if_build_fails(self):
+        old = self.x.widget
+        self.mock_factory.build.return_value = None
+        self.x.restart()
+        self.assertEqual(self.x.widget, old)
+
+    def test_retire_drains_and_closes_pool(self):
+        widget = self.x.widget
+        result = self.x.retire(widget, 5)
+        widget.shutdown.assert_called_with()
+        widget.drain.assert_called_with(5)
+        widget.close_pool.assert_called_with()
+        self.assertFalse(widget.server_close.called)
+        self.assertEqual(result, widget.drain.return_value)
+
+
+class EchoRequestHandler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        self.request.sendall(self.request.recv(4))
+
+
+class PooledTCPServer(poolingmixin.PoolingMixIn, socketserver.TCPServer):
+    allow_reuse_address = True
+
+
+class LoopbackServerFactory(abstractserverfactory.AbstractServerFactory):
+
+    name = 'Loopback_Server'
+    host = '127.0.0.1'
+    port = 0
+    request_handler_obj = EchoRequestHandler
+    server_obj = PooledTCPServer
+
+
+class TestServerThreadManagerRestart(unittest.TestCase):
+
+    def setUp(self):
+        self.x = threadmanagers.ServerThreadManager(LoopbackServerFactory(MagicMock()))
+        self.x.start()
+        self.port = self.x.widget.server_address[1]
+
+    def tearDown(self):
+        self.x.stop()
+
+    def echo(self):
+        with socket.create_connection(('127.0.0.1', self.port), timeout=5) as sock:
+            sock.sendall(b'ping')
+            return sock.recv(4)
+
+    def test_restart_serves_on_same_socket(self):
+        old = self.x.widget
+        self.assertEqual(self.echo(), b'ping')
+        retire_thread = self.x.restart(1)
+        self.assertIsNot(self.x.widget, old)
+        self.assertIs(self.x.widget.socket, old.socket)
+        self.assertEqual(self.echo(), b'ping')
+        retire_thread.join(5)
+        self.assertFalse(retire_thread.is_alive())
+        self.assertEqual(self.echo(), b'ping')
@@ -0,0 +1,115 @@
+"""
+test_transports.py
+
+Test suite for the client transports module
+
+Copyright (C) 2018 Disappeer Labs
+License: GPLv3
+"""
+
+import unittest
+from unittest.mock import MagicMock, patch
+import socket
+import socks
+import tempfile
+from disappeer.net.bases import transports
+from disappeer.utilities import helpers
+from disappeer import settings
+
+
+class TestImports(unittest.TestCase):
+
+    def test_socks(self):
+        self.assertEqual(socks, transports.socks)
+
+    def test_settings(self):
+        self.assertEqual(settings, transports.settings)
+
+    def test_helpers(self):
+        self.assertEqual(helpers, transports.helpers)
+
+
+class TestGetTransport(unittest.TestCase):
+
+    def test_registered_transports(self):
+        self.assertIsInstance(transports.get_transport('socks'), transports.SocksTransport)
+        self.assertIsInstance(transports.get_transport('tcp'), transports.TCPTransport)
+        self.assertIsInstance(transports.get_transport('unix'), transports.UnixTransport)
+
+    def test_default_setting_is_registered(self):
+        self.assertIn(settings.client_transport, transports.transports)
+
+    def test_unknown_name_raises_value_error(self):
+        with self.assertRaises(ValueError):
+            transports.get_transport('xxx')
+
+
+class TestSocksTransport(unittest.TestCase):
+
+    def setUp(self):
+        self.x = transports.SocksTransport()
+
+    def test_create_socket_is_socks_proxy_socket(self):
+        result = self.x.create_socket()
+        result.close()
+        self.assertIsInstance(result, socks.socksocket)
+        target_proxy_args = (2, settings.socks_proxy_host, settings.socks_proxy_port, True, None, None)
+        self.assertEqual(target_proxy_args, result.proxy)
+
+    def test_connect_calls_connect_with_interface(self):
+        sock = MagicMock()
+        self.x.connect(sock, ('host.onion', 1234))
+        sock.connect.assert_called_with(('host.onion', 1234))
+
+
+class TestTCPTransport(unittest.TestCase):
+
+    def setUp(self):
+        self.x = transports.TCPTransport()
+
+    def test_create_socket_is_plain_inet_socket(self):
+        result = self.x.create_socket()
+        result.close()
+        self.assertEqual(type(result), socket.socket)
+        self.assertEqual(result.family, socket.AF_INET)
+
+    def test_connects_to_loopback_listener(self):
+        with socket.socket() as listener:
+            listener.bind(('127.0.0.1', 0))
+            listener.listen(1)
+            with self.x.create_socket() as sock:
+                self.x.connect(sock, listener.getsockname())
+                conn, _ = listener.accept()
+                conn.close()
+
+
+class TestUnixTransport(unittest.TestCase):
+
+    def setUp(self):
+        self.x = transports.UnixTransport()
+
+    def test_create_socket_is_unix_socket(self):
+        result = self.x.create_socket()
+        result.close()
+        self.assertEqual(result.family, socket.AF_UNIX)
+
+    def test_connects_to_socket_for_port_in_peer_dir(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = helpers.get_unix_socket_path(1234, directory)
+            with socket.socket(socket.AF_UNIX) as listener:
+                listener.bind(path)
+                listener.listen(1)
+                with self.x.create_socket() as sock:
+                    self.x.connect(sock, ('unix:' + directory, 1234))
+                    conn, _ = listener.accept()
+                    conn.close()
+
+    def test_get_socket_path_ignores_own_socket_dir(self):
+        with patch.object(settings, 'unix_socket_dir', '/own/sockets/'):
+            result = self.x.get_socket_path(('unix:/peer/sockets', 1234))
+        self.assertEqual(result, '/peer/sockets/1234.sock')
+
+    def test_get_socket_path_raises_value_error_without_unix_host(self):
+        for host in ['localhost', 'unix:']:
+            with self.assertRaises(ValueError):
+                self.x.get_socket_path((host, 1234))
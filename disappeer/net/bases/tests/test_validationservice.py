@@ -0,0 +1,224 @@
+"""
+test_validationservice.py
+
+Test suite for the ValidationService class object and validation jobs
+
+Copyright (C) 2018 Disappeer Labs
+License: GPLv3
+"""
+
+import unittest
+from unittest.mock import MagicMock, patch
+import concurrent.futures
+import queue
+import threading
+from disappeer.net.bases import validationservice
+from disappeer.utilities import metrics
+from disappeer import settings
+
+
+class TestImports(unittest.TestCase):
+
+    def test_concurrent_futures(self):
+        self.assertEqual(concurrent.futures, validationservice.concurrent.futures)
+
+    def test_settings(self):
+        self.assertEqual(settings, validationservice.settings)
+
+    def test_metrics(self):
+        self.assertEqual(metrics, validationservice.metrics)
+
+
+def blocking_job(event, value):
+    event.wait(5)
+    return value
+
+
+def failing_job():
+    raise OSError('gpg not found')
+
+
+def recording_job(value):
+    metrics.registry.counter('disappeer_test_jobs_total', 'Test jobs').inc(job=value)
+    return validationservice.ValidationResult(True, None, value)
+
+
+class TestJobs(unittest.TestCase):
+
+    def test_validate_contact_request_invalid_structure(self):
+        result = validationservice.validate_contact_request(dict(xxx='xxx'))
+        self.assertIsInstance(result, validationservice.ValidationResult)
+        self.assertIs(result.valid, False)
+        self.assertIs(result.result_dict, False)
+        self.assertIsNotNone(result.error)
+
+    @patch.object(validationservice.messagevalidator, 'MessageValidator')
+    def test_validate_message_copies_verify_result(self, validator):
+        validator.return_value.valid = True
+        validator.return_value.verify_result.valid = True
+        validator.return_value.verify_result.fingerprint = 'fingerprint'
+        result = validationservice.validate_message(dict(), 'key_dir', 'passphrase')
+        validator.assert_called_with(dict(), 'key_dir', 'passphrase')
+        self.assertIs(result.valid, True)
+        self.assertEqual(result.verify_result, validationservice.VerifyResult(True, 'fingerprint'))
+
+    @patch.object(validationservice.contactresponsevalidator, 'ContactResponseValidator')
+    @patch.object(validationservice.dbpendingcontactresponsetable, 'DBPendingContactResponseTable')
+    def test_validate_contact_response_builds_table_from_path(self, table, validator):
+        validator.return_value.valid = None
+        result = validationservice.validate_contact_response(dict(), 'key_dir', 'db_path', 'passphrase')
+        table.assert_called_with('db_path')
+        validator.assert_called_with(dict(), 'key_dir', table.return_value, 'passphrase')
+        self.assertIs(result.valid, False)
+
+
+class TestValidationService(unittest.TestCase):
+
+    def setUp(self):
+        self.x = validationservice.ValidationService(max_workers=1, max_pending=1, executor_type='thread')
+
+    def tearDown(self):
+        self.x.shutdown()
+
+    def test_defaults_from_settings(self):
+        x = validationservice.ValidationService()
+        self.assertEqual(x.max_workers, settings.validation_max_workers)
+        self.assertEqual(x.max_pending, settings.validation_max_pending)
+        self.assertEqual(x.max_backlog, settings.validation_max_backlog)
+        self.assertEqual(x.executor_type, settings.validation_executor)
+        self.assertIsNone(x.executor)
+
+    def test_unknown_executor_raises_value_error(self):
+        self.x.executor_type = 'xxx'
+        with self.assertRaises(ValueError):
+            self.x.submit(blocking_job, (threading.Event(), 1))
+
+    def test_run_returns_job_result(self):
+        event = threading.Event()
+        event.set()
+        self.assertEqual(self.x.run(blocking_job, (event, 'result')), 'result')
+
+    def test_callback_called_with_result(self):
+        results = queue.Queue()
+        event = threading.Event()
+        event.set()
+        self.x.submit(blocking_job, (event, 'result'), results.put)
+        self.assertEqual(results.get(timeout=5), 'result')
+
+    def test_failed_job_returns_invalid_result(self):
+        result = self.x.run(failing_job, ())
+        self.assertIs(result.valid, False)
+        self.assertEqual(result.error, 'gpg not found')
+        self.assertEqual(self.x.get_stats()['failed'], 1)
+
+    def test_caller_never_runs_job_when_pool_saturated(self):
+        event = threading.Event()
+        pooled = self.x.submit(blocking_job, (event, 'pooled'))
+        threads = queue.Queue()
+        waiting = self.x.submit(lambda value: (threads.put(threading.current_thread()), value)[1], ('queued',))
+        self.assertFalse(waiting.done())
+        self.assertTrue(threads.empty())
+        stats = self.x.get_stats()
+        self.assertEqual(stats['pending'], 1)
+        self.assertEqual(stats['backlog'], 1)
+        event.set()
+        self.assertEqual(pooled.result(timeout=5), 'pooled')
+        self.assertEqual(waiting.result(timeout=5), 'queued')
+        self.assertIsNot(threads.get(timeout=5), threading.current_thread())
+        self.assertEqual(self.x.get_stats()['submitted'], 2)
+
+    def test_backlog_jobs_run_in_submission_order(self):
+        event = threading.Event()
+        results = queue.Queue()
+        self.x.submit(blocking_job, (event, 'pooled'))
+        for name in range(3):
+            self.x.submit(results.put, (name,))
+        event.set()
+        self.assertEqual([results.get(timeout=5) for _ in range(3)], [0, 1, 2])
+
+    def test_backlog_job_callback_and_failure(self):
+        event = threading.Event()
+        results = queue.Queue()
+        self.x.submit(blocking_job, (event, 'pooled'))
+        self.x.submit(failing_job, (), results.put)
+        event.set()
+        result = results.get(timeout=5)
+        self.assertIs(result.valid, False)
+        self.assertEqual(result.error, 'gpg not found')
+
+    def test_cancelled_backlog_job_is_skipped(self):
+        event = threading.Event()
+        pooled = self.x.submit(blocking_job, (event, 'pooled'))
+        job = MagicMock()
+        cancelled = self.x.submit(job, ())
+        self.assertTrue(cancelled.cancel())
+        after = self.x.submit(blocking_job, (event, 'after'))
+        event.set()
+        self.assertEqual(after.result(timeout=5), 'after')
+        self.assertFalse(job.called)
+        self.assertEqual(self.x.get_stats()['pending'], 0)
+
+    def test_job_past_max_backlog_rejected_without_running(self):
+        self.x.max_backlog = 1
+        event = threading.Event()
+        results = queue.Queue()
+        self.x.submit(blocking_job, (event, 'pooled'))
+        waiting = self.x.submit(blocking_job, (event, 'queued'))
+        job = MagicMock()
+        rejected = self.x.submit(job, (), results.put)
+        self.assertTrue(rejected.done())
+        result = results.get(timeout=5)
+        self.assertIs(result.valid, False)
+        self.assertEqual(result.error, 'validation queue full')
+        stats = self.x.get_stats()
+        self.assertEqual(stats['backlog'], 1)
+        self.assertEqual(stats['rejected'], 1)
+        event.set()
+        self.assertEqual(waiting.result(timeout=5), 'queued')
+        self.assertFalse(job.called)
+
+    def test_shutdown_cancels_backlog(self):
+        event = threading.Event()
+        self.x.submit(blocking_job, (event, 'pooled'))
+        waiting = self.x.submit(blocking_job, (event, 'queued'))
+        self.x.shutdown(wait=False)
+        event.set()
+        self.assertTrue(waiting.cancelled())
+        self.assertEqual(self.x.get_stats()['backlog'], 0)
+
+    def test_run_job_in_process_attaches_no_metrics(self):
+        result = validationservice.run_job(recording_job, ('thread',))
+        self.assertIsNone(result.metrics)
+        self.assertEqual(metrics.registry.counter('disappeer_test_jobs_total', 'Test jobs').get(job='thread'), 1)
+
+    @patch.object(validationservice.multiprocessing, 'parent_process')
+    def test_run_job_in_worker_process_attaches_metric_deltas(self, parent_process):
+        parent_process.return_value = MagicMock()
+        registry = metrics.MetricsRegistry()
+        with patch.object(validationservice.metrics, 'registry', registry):
+            result = validationservice.run_job(recording_job, ('worker',))
+        self.assertEqual(result.metrics['disappeer_test_jobs_total'][3], {(('job', 'worker'),): 1})
+        self.assertEqual(registry.take_deltas(), {})
+
+    def test_job_done_merges_metric_deltas(self):
+        worker = metrics.MetricsRegistry()
+        worker.counter('disappeer_test_jobs_total', 'Test jobs').inc(job='merged')
+        future = concurrent.futures.Future()
+        future.set_result(validationservice.ValidationResult(True, None, None, metrics=worker.take_deltas()))
+        self.x.pending = 1
+        self.x.job_done(future)
+        self.assertEqual(metrics.registry.counter('disappeer_test_jobs_total', 'Test jobs').get(job='merged'), 1)
+
+    def test_process_executor_runs_job(self):
+        x = validationservice.ValidationService(max_workers=1, executor_type='process')
+        self.addCleanup(x.shutdown)
+        result = x.run(validationservice.validate_contact_request, (dict(),))
+        self.assertIsInstance(x.executor, concurrent.futures.ProcessPoolExecutor)
+        self.assertIs(result.valid, False)
+
+    def test_process_executor_job_metrics_reach_parent_registry(self):
+        x = validationservice.ValidationService(max_workers=1, executor_type='process')
+        self.addCleanup(x.shutdown)
+        counter = metrics.registry.counter('disappeer_test_jobs_total', 'Test jobs')
+        self.assertIs(x.run(recording_job, ('process',)).valid, True)
+        self.assertEqual(counter.get(job='process'), 1)
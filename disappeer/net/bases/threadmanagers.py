@@ -12,6 +12,8 @@ License: GPLv3
 
 import abc
 import threading
+from disappeer import settings
+from disappeer.utilities.logger import log
 
 
 class AbstractThreadManager(metaclass=abc.ABCMeta):
@@ -50,6 +52,64 @@ class ServerThreadManager(AbstractThreadManager):
         self.widget.shutdown()
         self.widget.server_close()
 
+    def drain(self, timeout=None):
+        """
+        Stop accepting, give accepted connections up to timeout seconds to finish, then close.
+        Returns the drain report, see PoolingMixIn.drain.
+        """
+        timeout = settings.server_drain_timeout if timeout is None else timeout
+        self.widget.shutdown()
+        report = self.widget.drain(timeout)
+        self.widget.server_close()
+        self.log_drain_report(report)
+        return report
+
+    def restart(self, timeout=None):
+        """
+        Serve from a newly built server on the same listening socket, without waiting for the old
+        serve_forever loop. The old server drains in the background and is closed without its socket.
+        """
+        if self.widget is None:
+            self.start()
+            return None
+        old_widget = self.widget
+        # Both loops may wake for one connection until the old one stops, the loser must not block in accept
+        old_widget.socket.setblocking(False)
+        widget = self.factory.build(old_widget.socket)
+        if widget is None:
+            return None
+        self.widget = widget
+        self.widget_thread = threading.Thread(target=self.run_widget_command, name=self.factory.name)
+        self.widget_thread.daemon = True
+        self.widget_thread.start()
+        timeout = settings.server_drain_timeout if timeout is None else timeout
+        retire_thread = threading.Thread(target=self.retire, args=(old_widget, timeout),
+                                         name=self.factory.name + '_Retire')
+        retire_thread.daemon = True
+        retire_thread.start()
+        return retire_thread
+
+    def retire(self, widget, timeout):
+        widget.shutdown()
+        report = widget.drain(timeout)
+        widget.close_pool()
+        self.log_drain_report(report)
+        return report
+
+    def log_drain_report(self, report):
+        if report['drained']:
+            return
+        log.warning("{} drain cut off {} connection(s) after {}s: {}, {} queued".format(self.factory.name,
+                                                                                   len(report['cut_off']),
+                                                                                   report['seconds'],
+                                                                                   report['cut_off'],
+                                                                                   report['queued']))
+
+    def get_stats(self):
+        if self.widget is None:
+            return dict()
+        return self.widget.get_stats()
+
 
 class ClientThreadManager(AbstractThreadManager):
 
@@ -0,0 +1,76 @@
+"""
+transports.py
+
+Module for the client transports, how a client socket reaches a peer's (host, port) interface:
+    - SocksTransport, through the Tor SOCKS5 proxy
+    - TCPTransport, direct TCP for LAN and loopback peers
+    - UnixTransport, Unix domain socket for instances on the same host, whose host is 'unix:<peer's unix_socket_dir>'
+
+Copyright (C) 2018 Disappeer Labs
+License: GPLv3
+"""
+
+import socket
+import socks
+from disappeer import settings
+from disappeer.utilities import helpers
+
+
+class SocksTransport:
+
+    name = 'socks'
+
+    def create_socket(self):
+        sock = socks.socksocket()
+        sock.set_proxy(socks.PROXY_TYPE_SOCKS5, settings.socks_proxy_host, settings.socks_proxy_port, True)
+        return sock
+
+    def connect(self, sock, interface):
+        sock.connect(interface)
+
+
+class TCPTransport:
+
+    name = 'tcp'
+
+    def create_socket(self):
+        return socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+
+    def connect(self, sock, interface):
+        sock.connect(interface)
+
+
+class UnixTransport:
+
+    name = 'unix'
+    host_prefix = 'unix:'
+
+    def create_socket(self):
+        return socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+    def connect(self, sock, interface):
+        sock.connect(self.get_socket_path(interface))
+
+    def get_socket_path(self, interface):
+        """
+        Take a peer's ('unix:<its unix_socket_dir>', port), return the path of its socket for port.
+        Raises ValueError for any other host, the peer's socket is never looked for in this instance's dir
+        """
+        host, port = interface
+        socket_dir = host[len(self.host_prefix):] if host.startswith(self.host_prefix) else ''
+        if not socket_dir:
+            raise ValueError("Unix transport needs a '{}<socket dir>' host, not: {}".format(self.host_prefix, host))
+        return helpers.get_unix_socket_path(port, socket_dir)
+
+
+transports = {item.name: item() for item in [SocksTransport, TCPTransport, UnixTransport]}
+
+
+def get_transport(name):
+    """
+    Raises ValueError for an unknown transport name
+    """
+    try:
+        return transports[name]
+    except KeyError:
+        raise ValueError("Unknown client transport: {}".format(name))
@@ -0,0 +1,223 @@
+"""
+validationservice.py
+
+Module for running gpg heavy validation off the calling thread:
+    - ValidationService, worker pool for validation jobs with bounds on jobs handed to the pool and jobs waiting
+    - validate_message, validate_contact_response, validate_contact_request, the jobs
+
+Jobs are module level functions taking plain arguments, so they can run in worker processes.
+Each builds its validator in the worker and returns a ValidationResult, which carries what
+callers read from the validator objects. From a worker process the result also carries the
+metric deltas the job recorded, gpg call timings mostly, which are merged into this process's
+registry as the job completes.
+
+The Tk main loop submits with a callback that puts the result back on the root queue,
+the contact request server waits on the result in its handler thread.
+
+Copyright (C) 2018 Disappeer Labs
+License: GPLv3
+"""
+
+import collections
+import concurrent.futures
+import functools
+import multiprocessing
+import threading
+from disappeer import settings
+from disappeer.models.db import dbpendingcontactresponsetable
+from disappeer.net.contact import contactrequestvalidator
+from disappeer.net.contactresponse import contactresponsevalidator
+from disappeer.net.message import messagevalidator
+from disappeer.utilities import metrics
+from disappeer.utilities.logger import log
+
+
+ValidationResult = collections.namedtuple('ValidationResult', ['valid', 'error', 'data_dict', 'verify_result',
+                                                               'result_dict', 'metrics'])
+ValidationResult.__new__.__defaults__ = (None, None, None, None)
+
+VerifyResult = collections.namedtuple('VerifyResult', ['valid', 'fingerprint'])
+
+
+def validate_message(payload_dict, key_dir, passphrase):
+    validator = messagevalidator.MessageValidator(payload_dict, key_dir, passphrase)
+    validator.validate()
+    verify_result = None
+    if validator.verify_result is not None:
+        verify_result = VerifyResult(bool(validator.verify_result.valid), validator.verify_result.fingerprint)
+    return ValidationResult(validator.valid is True, validator.error, validator.data_dict, verify_result)
+
+
+def validate_contact_response(payload, key_dir, db_file_path, passphrase):
+    table = dbpendingcontactresponsetable.DBPendingContactResponseTable(db_file_path)
+    validator = contactresponsevalidator.ContactResponseValidator(payload, key_dir, table, passphrase)
+    validator.validate()
+    return ValidationResult(validator.valid is True, validator.error, validator.data_dict)
+
+
+def validate_contact_request(contact_request_dict):
+    validator = contactrequestvalidator.ContactRequestValidator(contact_request_dict)
+    return ValidationResult(validator.valid is True, validator.error, validator.data_dict,
+                            result_dict=validator.result_dict)
+
+
+def run_job(job, args):
+    """
+    Run job on a pool worker. In a worker process, attach the metric deltas recorded since the
+    last job, the registry there is not exported.
+    """
+    result = job(*args)
+    if multiprocessing.parent_process() is not None and isinstance(result, ValidationResult):
+        result = result._replace(metrics=metrics.registry.take_deltas())
+    return result
+
+
+class ValidationService:
+
+    def __init__(self, max_workers=None, max_pending=None, executor_type=None, max_backlog=None):
+        self.max_workers = max_workers or settings.validation_max_workers
+        self.max_pending = max_pending or settings.validation_max_pending
+        self.max_backlog = max_backlog or settings.validation_max_backlog
+        self.executor_type = executor_type or settings.validation_executor
+        self.lock = threading.Lock()
+        self.executor = None
+        self.pending = 0
+        self.backlog = collections.deque()
+        self.submitted_count = 0
+        self.failed_count = 0
+        self.rejected_count = 0
+
+    def get_executor(self):
+        """
+        Created on first use, worker processes are spawned rather than forked from the threaded app
+        """
+        if self.executor is None:
+            if self.executor_type == 'process':
+                self.executor = concurrent.futures.ProcessPoolExecutor(self.max_workers,
+                                                                       multiprocessing.get_context('spawn'))
+            elif self.executor_type == 'thread':
+                self.executor = concurrent.futures.ThreadPoolExecutor(self.max_workers,
+                                                                      thread_name_prefix='Validation_Worker')
+            else:
+                raise ValueError("Unknown validation executor: {}".format(self.executor_type))
+        return self.executor
+
+    def submit(self, job, args, callback=None):
+        """
+        Run job(*args) on the pool and return its future, callback is called with the ValidationResult.
+        With max_pending jobs already on the pool the job waits in the backlog, it never runs in the
+        calling thread, which may be the Tk main loop. With max_backlog jobs waiting too, the job is
+        not run and its future is done with an invalid result.
+        """
+        with self.lock:
+            self.submitted_count += 1
+            queued = self.pending >= self.max_pending
+            if queued:
+                future = concurrent.futures.Future()
+                if len(self.backlog) >= self.max_backlog:
+                    self.rejected_count += 1
+                    future.set_result(ValidationResult(False, 'validation queue full', None, None))
+                else:
+                    self.backlog.append((future, job, args))
+            else:
+                self.pending += 1
+                executor = self.get_executor()
+        if not queued:
+            future = self.start_job(executor, job, args)
+        if callback is not None:
+            future.add_done_callback(lambda item: callback(self.get_result(item)))
+        return future
+
+    def run(self, job, args):
+        """
+        Submit job and wait for its ValidationResult
+        """
+        future = self.submit(job, args)
+        return self.get_result(future)
+
+    def start_job(self, executor, job, args):
+        future = executor.submit(run_job, job, args)
+        future.add_done_callback(self.job_done)
+        return future
+
+    def job_done(self, future):
+        """
+        Merge the job's metric deltas, then hand the oldest backlog job not cancelled meanwhile to the pool
+        """
+        self.merge_metrics(future)
+        with self.lock:
+            self.pending -= 1
+            while self.backlog:
+                waiting, job, args = self.backlog.popleft()
+                if waiting.set_running_or_notify_cancel():
+                    self.pending += 1
+                    executor = self.get_executor()
+                    break
+            else:
+                return None
+        try:
+            started = self.start_job(executor, job, args)
+        except Exception as err:
+            with self.lock:
+                self.pending -= 1
+            waiting.set_exception(err)
+            return None
+        started.add_done_callback(functools.partial(self.forward_result, waiting))
+
+    def merge_metrics(self, future):
+        try:
+            result = future.result()
+        except Exception:
+            return None
+        if isinstance(result, ValidationResult) and result.metrics:
+            metrics.registry.merge_deltas(result.metrics)
+
+    def forward_result(self, waiting, future):
+        """
+        Settle the future handed out for a backlog job with the outcome of its pool future
+        """
+        try:
+            waiting.set_result(future.result())
+        except Exception as err:
+            waiting.set_exception(err)
+
+    def get_result(self, future):
+        """
+        ValidationResult of a finished job, an invalid result if the job raised
+        """
+        try:
+            return future.result()
+        except Exception as err:
+            with self.lock:
+                self.failed_count += 1
+            log.error("Validation job failed: {}".format(err))
+            return ValidationResult(False, str(err), None, None)
+
+    def shutdown(self, wait=True):
+        """
+        Backlog jobs not started yet are cancelled
+        """
+        with self.lock:
+            executor = self.executor
+            self.executor = None
+            backlog, self.backlog = self.backlog, collections.deque()
+        for waiting, job, args in backlog:
+            waiting.cancel()
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def get_stats(self):
+        with self.lock:
+            return dict(executor=self.executor_type,
+                        max_workers=self.max_workers,
+                        max_pending=self.max_pending,
+                        pending=self.pending,
+                        max_backlog=self.max_backlog,
+                        backlog=len(self.backlog),
+                        submitted=self.submitted_count,
+                        failed=self.failed_count,
+                        rejected=self.rejected_count)
+
+
+# Shared by the receivers and the contact request server
+service = ValidationService()
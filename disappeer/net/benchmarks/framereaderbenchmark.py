@@ -0,0 +1,135 @@
+"""
+framereaderbenchmark.py
+
+Micro-benchmark for the BaseProtocol frame reader.
+
+Frames of increasing size, up to BaseProtocol.max_message_length, are fed through a
+socket that delivers Tor cell sized fragments. The time per byte should stay flat
+as the frame size grows, i.e. the reader scales linearly in the number of fragments.
+
+Run with:
+    python -m disappeer.net.benchmarks.framereaderbenchmark
+
+Copyright (C) 2018 Disappeer Labs
+License: GPLv3
+"""
+
+import argparse
+import time
+from disappeer.net.bases import baseprotocol
+
+
+# Payload bytes carried by a single Tor relay cell
+tor_cell_payload_size = 498
+
+
+class FragmentedSocket:
+    """
+    Minimal socket stand-in that hands out at most fragment_size bytes per read.
+    """
+
+    def __init__(self, data, fragment_size):
+        self.view = memoryview(data)
+        self.fragment_size = fragment_size
+        self.position = 0
+        self.recv_into_calls = 0
+
+    def recv_into(self, buffer, num_bytes):
+        self.recv_into_calls += 1
+        count = min(num_bytes, self.fragment_size, len(self.view) - self.position)
+        buffer[:count] = self.view[self.position:self.position + count]
+        self.position += count
+        return count
+
+    def settimeout(self, value):
+        pass
+
+    def gettimeout(self):
+        return None
+
+    def rewind(self):
+        self.position = 0
+        self.recv_into_calls = 0
+
+
+class FrameReaderBenchmark:
+
+    def __init__(self, sizes=None, fragment_size=tor_cell_payload_size, rounds=20):
+        self.max_size = baseprotocol.BaseProtocol.max_message_length
+        self.sizes = sizes or self.default_sizes()
+        self.fragment_size = fragment_size
+        self.rounds = rounds
+        self.results = []
+
+    def default_sizes(self):
+        sizes = []
+        size = 1024
+        while size < self.max_size:
+            sizes.append(size)
+            size *= 2
+        sizes.append(self.max_size)
+        return sizes
+
+    def build_frame(self, size):
+        """
+        Build a MSG frame whose encoded payload is exactly size bytes long.
+        """
+        protocol = baseprotocol.BaseProtocol(None)
+        overhead = len(protocol.payload(dict(data='')).encode())
+        payload_dict = dict(data='x' * (size - overhead))
+        return protocol.build_packet(payload_dict, protocol.message_string)
+
+    def time_frame(self, size):
+        frame = self.build_frame(size)
+        sock = FragmentedSocket(frame, self.fragment_size)
+        protocol = baseprotocol.BaseProtocol(sock)
+        best = None
+        for _ in range(self.rounds):
+            sock.rewind()
+            start = time.perf_counter()
+            protocol.process_incoming(protocol.message_string)
+            elapsed = time.perf_counter() - start
+            if best is None or elapsed < best:
+                best = elapsed
+        result = dict(size=size,
+                      fragments=sock.recv_into_calls,
+                      seconds=best,
+                      ns_per_byte=best * 1e9 / size)
+        return result
+
+    def run(self):
+        self.results = [self.time_frame(size) for size in self.sizes]
+        return self.results
+
+    def scaling_ratio(self):
+        """
+        Time per byte at the largest size over time per byte at the smallest size.
+        Close to 1.0 for a linear reader, grows with frame size for a quadratic one.
+        """
+        first = self.results[0]['ns_per_byte']
+        last = self.results[-1]['ns_per_byte']
+        return last / first
+
+    def report(self):
+        lines = ['{:>8} {:>10} {:>12} {:>12}'.format('size', 'fragments', 'usecs', 'ns/byte')]
+        for item in self.results:
+            lines.append('{:>8} {:>10} {:>12.1f} {:>12.2f}'.format(item['size'],
+                                                                   item['fragments'],
+                                                                   item['seconds'] * 1e6,
+                                                                   item['ns_per_byte']))
+        lines.append('scaling ratio (ns/byte largest / smallest): {:.2f}'.format(self.scaling_ratio()))
+        return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='BaseProtocol frame reader micro-benchmark')
+    parser.add_argument('--fragment-size', type=int, default=tor_cell_payload_size)
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+    bench = FrameReaderBenchmark(fragment_size=args.fragment_size, rounds=args.rounds)
+    bench.run()
+    print(bench.report())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,296 @@
+"""
+loopbackbenchmark.py
+
+End to end benchmark for the network servers.
+
+NetworkServers is started on loopback with free ports, and MessageClient or ContactRequestClient
+instances are driven against it over the direct TCP transport, bypassing SOCKS and Tor. Each concurrency
+level runs that many client threads sending back to back, and reports requests per second,
+p50/p99 latency per send, errors, and peak RSS of the process so far.
+
+The contact request workload sends one signed request built with ContactRequestFactory, so it
+needs --key-dir and --passphrase for a keyring holding the host key, and an existing
+settings.gpg_host_pubkey for the server's ACK. Each request then pays for gpg verification.
+
+Admission budgets are lifted while the benchmark runs, pass --admission to keep them.
+
+Run with:
+    python -m disappeer.net.benchmarks.loopbackbenchmark --output results.json
+    python -m disappeer.net.benchmarks.loopbackbenchmark --baseline results.json
+
+Copyright (C) 2018 Disappeer Labs
+License: GPLv3
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import queue
+import resource
+import socket
+import sys
+import threading
+import time
+import types
+from disappeer import settings
+from disappeer.gpg.helpers import armor
+from disappeer.net import networkservers
+from disappeer.net.bases import admission
+from disappeer.net.contact import contactrequestclient
+from disappeer.net.contact import contactrequestfactory
+from disappeer.net.message import messageclient
+
+
+default_levels = [1, 10, 100, 1000]
+
+
+class NullQueue:
+    """
+    Server side queue, the benchmark has no use for received items
+    """
+
+    def put(self, item):
+        pass
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def peak_rss_kb():
+    """
+    Peak resident set size of this process in KiB, ru_maxrss is in bytes on macOS
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        peak //= 1024
+    return peak
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class LoopbackBenchmark:
+
+    port_settings = ['port_contact_request_server', 'port_contact_response_server', 'port_message_server']
+
+    def __init__(self, levels=None, requests=1000, workload='message', engine=None, payload_size=4096,
+                 key_dir=None, passphrase=None, admission_budgets=False):
+        self.levels = levels or default_levels
+        self.requests = requests
+        self.workload = workload
+        self.engine = engine or settings.network_server_engine
+        self.payload_size = payload_size
+        self.key_dir = key_dir
+        self.passphrase = passphrase
+        self.admission_budgets = admission_budgets
+        self.servers = None
+        self.saved_ports = {}
+        self.saved_admission = {}
+        self.contact_request_payload = None
+        self.results = []
+
+    def start_servers(self):
+        for name in self.port_settings:
+            self.saved_ports[name] = getattr(settings, name)
+            setattr(settings, name, free_port())
+        self.servers = networkservers.NetworkServers(NullQueue(), engine=self.engine)
+        if not self.admission_budgets:
+            self.lift_admission()
+        self.servers.start_network_services()
+
+    def get_request_handlers(self):
+        controllers = [self.servers.contact_request_server, self.servers.contact_response_server,
+                       self.servers.message_server]
+        return [item.factory.request_handler_obj for item in controllers]
+
+    def lift_admission(self):
+        for handler in self.get_request_handlers():
+            self.saved_admission[handler] = handler.admission
+            handler.admission = admission.AdmissionController(dict())
+
+    def stop_servers(self):
+        if self.servers is not None:
+            self.servers.stop_network_services()
+            self.servers = None
+        for handler, controller in self.saved_admission.items():
+            handler.admission = controller
+        self.saved_admission = {}
+        for name, port in self.saved_ports.items():
+            setattr(settings, name, port)
+        self.saved_ports = {}
+
+    def build_message_args(self, results):
+        nonce = hashlib.sha1(os.urandom(16)).hexdigest()
+        ciphertext = armor.armor('PGP MESSAGE', os.urandom(self.payload_size))
+        return dict(host='127.0.0.1',
+                    port=settings.port_message_server,
+                    queue=results,
+                    payload_dict=dict(ciphertext=ciphertext, nonce=nonce),
+                    nonce=nonce,
+                    command='MSG',
+                    transport='tcp')
+
+    def build_contact_request_args(self, results):
+        if self.contact_request_payload is None:
+            factory = contactrequestfactory.ContactRequestFactory('127.0.0.1', self.key_dir, self.passphrase)
+            payload = factory.build()
+            if not isinstance(payload, dict):
+                raise ValueError('Contact request payload could not be signed with key dir {}'.format(self.key_dir))
+            self.contact_request_payload = payload
+        nonce = json.loads(self.contact_request_payload['data'])['nonce']
+        return dict(host='127.0.0.1',
+                    port=settings.port_contact_request_server,
+                    queue=results,
+                    payload_dict=self.contact_request_payload,
+                    nonce=nonce,
+                    command='REQ',
+                    transport='tcp')
+
+    def build_client(self, results):
+        if self.workload == 'message':
+            args = self.build_message_args(results)
+            client = messageclient.MessageClient
+        elif self.workload == 'contact_request':
+            args = self.build_contact_request_args(results)
+            client = contactrequestclient.ContactRequestClient
+        else:
+            raise ValueError('Unknown workload: {}'.format(self.workload))
+        return client(types.SimpleNamespace(**args))
+
+    def run_client(self, count, barrier, latencies, results):
+        barrier.wait()
+        for _ in range(count):
+            client = self.build_client(results)
+            start = time.perf_counter()
+            client.send()
+            latencies.append(time.perf_counter() - start)
+
+    def run_level(self, concurrency):
+        per_client = max(1, self.requests // concurrency)
+        results = queue.Queue()
+        latencies = []
+        barrier = threading.Barrier(concurrency + 1)
+        threads = [threading.Thread(target=self.run_client, args=(per_client, barrier, latencies, results))
+                   for _ in range(concurrency)]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        errors = 0
+        while not results.empty():
+            if not results.get().get('nonce_valid'):
+                errors += 1
+        total = per_client * concurrency
+        return dict(concurrency=concurrency,
+                    requests=total,
+                    errors=errors,
+                    seconds=elapsed,
+                    requests_per_second=total / elapsed if elapsed else 0.0,
+                    latency_p50=percentile(latencies, 0.5),
+                    latency_p99=percentile(latencies, 0.99),
+                    peak_rss_kb=peak_rss_kb())
+
+    def run(self):
+        self.start_servers()
+        try:
+            self.results = [self.run_level(level) for level in self.levels]
+        finally:
+            self.stop_servers()
+        return self.results
+
+    def to_dict(self):
+        return dict(workload=self.workload,
+                    engine=self.engine,
+                    payload_size=self.payload_size,
+                    requests=self.requests,
+                    python=platform.python_version(),
+                    platform=platform.platform(),
+                    timestamp=time.time(),
+                    results=self.results)
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def report(self):
+        lines = ['{:>8} {:>9} {:>7} {:>10} {:>10} {:>10} {:>10}'.format('clients', 'requests', 'errors', 'req/s',
+                                                                        'p50 ms', 'p99 ms', 'rss KiB')]
+        for item in self.results:
+            lines.append('{:>8} {:>9} {:>7} {:>10.1f} {:>10.2f} {:>10.2f} {:>10}'.format(item['concurrency'],
+                                                                                       item['requests'],
+                                                                                       item['errors'],
+                                                                                       item['requests_per_second'],
+                                                                                       item['latency_p50'] * 1e3,
+                                                                                       item['latency_p99'] * 1e3,
+                                                                                       item['peak_rss_kb']))
+        return '\n'.join(lines)
+
+
+def compare(baseline, current, tolerance=0.1):
+    """
+    Return a description of each level where throughput dropped, or p99 latency grew,
+    by more than tolerance relative to baseline. Both are to_dict style dicts.
+    """
+    previous = {item['concurrency']: item for item in baseline['results']}
+    regressions = []
+    for item in current['results']:
+        before = previous.get(item['concurrency'])
+        if before is None:
+            continue
+        if item['requests_per_second'] < before['requests_per_second'] * (1 - tolerance):
+            regressions.append('{} clients: {:.1f} req/s, was {:.1f}'.format(item['concurrency'],
+                                                                          item['requests_per_second'],
+                                                                          before['requests_per_second']))
+        if item['latency_p99'] > before['latency_p99'] * (1 + tolerance):
+            regressions.append('{} clients: p99 {:.2f} ms, was {:.2f}'.format(item['concurrency'],
+                                                                            item['latency_p99'] * 1e3,
+                                                                            before['latency_p99'] * 1e3))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Loopback benchmark for the network servers')
+    parser.add_argument('--levels', type=int, nargs='+', default=default_levels)
+    parser.add_argument('--requests', type=int, default=1000, help='requests per level, split across clients')
+    parser.add_argument('--workload', choices=['message', 'contact_request'], default='message')
+    parser.add_argument('--engine', choices=['threaded', 'asyncio'], default=settings.network_server_engine)
+    parser.add_argument('--payload-size', type=int, default=4096, help='raw ciphertext bytes per message')
+    parser.add_argument('--key-dir', default=settings.default_key_dir)
+    parser.add_argument('--passphrase')
+    parser.add_argument('--admission', action='store_true', help='keep the configured admission budgets')
+    parser.add_argument('--output', help='write results as JSON to this path')
+    parser.add_argument('--baseline', help='JSON results to compare against, exit 1 on regression')
+    parser.add_argument('--tolerance', type=float, default=0.1)
+    args = parser.parse_args()
+    bench = LoopbackBenchmark(levels=args.levels, requests=args.requests, workload=args.workload,
+                              engine=args.engine, payload_size=args.payload_size, key_dir=args.key_dir,
+                              passphrase=args.passphrase, admission_budgets=args.admission)
+    bench.run()
+    print(bench.report())
+    if args.output:
+        bench.save(args.output)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(json.load(f), bench.to_dict(), args.tolerance)
+        for line in regressions:
+            print('REGRESSION', line)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
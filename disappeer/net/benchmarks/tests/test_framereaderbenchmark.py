@@ -0,0 +1,81 @@
+"""
+test_framereaderbenchmark.py
+
+Test suite for the frame reader micro-benchmark module
+
+Copyright (C) 2018 Disappeer Labs
+License: GPLv3
+"""
+
+import unittest
+from disappeer.net.benchmarks import framereaderbenchmark
+from disappeer.net.bases import baseprotocol
+
+
+class TestImports(unittest.TestCase):
+
+    def test_baseprotocol(self):
+        self.assertEqual(baseprotocol, framereaderbenchmark.baseprotocol)
+
+
+class TestFragmentedSocket(unittest.TestCase):
+
+    def setUp(self):
+        self.data = b'hello world'
+        self.x = framereaderbenchmark.FragmentedSocket(self.data, 4)
+
+    def test_recv_into_returns_at_most_fragment_size(self):
+        buffer = bytearray(20)
+        result = self.x.recv_into(buffer, 20)
+        self.assertEqual(result, 4)
+        self.assertEqual(bytes(buffer[:4]), b'hell')
+
+    def test_recv_into_returns_zero_when_exhausted(self):
+        buffer = bytearray(20)
+        for _ in range(3):
+            self.x.recv_into(memoryview(buffer), 20)
+        result = self.x.recv_into(buffer, 20)
+        self.assertEqual(result, 0)
+
+    def test_rewind_resets_position_and_calls(self):
+        self.x.recv_into(bytearray(4), 4)
+        self.x.rewind()
+        self.assertEqual(self.x.position, 0)
+        self.assertEqual(self.x.recv_into_calls, 0)
+
+
+class TestFrameReaderBenchmark(unittest.TestCase):
+
+    def setUp(self):
+        self.sizes = [1024, 4096, 16384]
+        self.x = framereaderbenchmark.FrameReaderBenchmark(sizes=self.sizes, rounds=1)
+
+    def test_default_sizes_end_at_max_message_length(self):
+        bench = framereaderbenchmark.FrameReaderBenchmark()
+        self.assertEqual(bench.sizes[-1], baseprotocol.BaseProtocol.max_message_length)
+
+    def test_build_frame_payload_has_exact_size(self):
+        frame = self.x.build_frame(1024)
+        self.assertEqual(len(frame), baseprotocol.BaseProtocol.header_length + 1024)
+
+    def test_run_returns_result_per_size(self):
+        result = self.x.run()
+        self.assertEqual([item['size'] for item in result], self.sizes)
+
+    def test_fragment_count_grows_linearly_with_size(self):
+        result = self.x.run()
+        for item in result:
+            frame_length = item['size'] + baseprotocol.BaseProtocol.header_length
+            expected = -(-item['size'] // self.x.fragment_size) + 1
+            self.assertLessEqual(item['fragments'], expected + 1)
+            self.assertGreaterEqual(item['fragments'], frame_length // self.x.fragment_size)
+
+    def test_max_size_frame_is_read(self):
+        bench = framereaderbenchmark.FrameReaderBenchmark(sizes=[baseprotocol.BaseProtocol.max_message_length], rounds=1)
+        result = bench.run()
+        self.assertEqual(result[0]['size'], baseprotocol.BaseProtocol.max_message_length)
+
+    def test_report_contains_scaling_ratio(self):
+        self.x.run()
+        result = self.x.report()
+        self.assertIn('scaling ratio', result)
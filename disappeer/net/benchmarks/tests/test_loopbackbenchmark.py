@@ -0,0 +1,99 @@
+"""
+test_loopbackbenchmark.py
+
+Test suite for the loopback network benchmark module
+
+Copyright (C) 2018 Disappeer Labs
+License: GPLv3
+"""
+
+import unittest
+import json
+import os
+import tempfile
+import queue
+from disappeer.net.benchmarks import loopbackbenchmark
+from disappeer.net import networkservers
+from disappeer.net.message import messageclient
+from disappeer import settings
+
+
+class TestImports(unittest.TestCase):
+
+    def test_networkservers(self):
+        self.assertEqual(networkservers, loopbackbenchmark.networkservers)
+
+    def test_settings(self):
+        self.assertEqual(settings, loopbackbenchmark.settings)
+
+
+class TestHelpers(unittest.TestCase):
+
+    def test_percentile(self):
+        values = [float(item) for item in range(1, 101)]
+        self.assertEqual(loopbackbenchmark.percentile(values, 0.5), 51.0)
+        self.assertEqual(loopbackbenchmark.percentile(values, 0.99), 99.0)
+        self.assertEqual(loopbackbenchmark.percentile([], 0.5), 0.0)
+
+    def test_peak_rss_kb_positive(self):
+        self.assertGreater(loopbackbenchmark.peak_rss_kb(), 0)
+
+    def test_compare_flags_throughput_and_latency_regressions(self):
+        baseline = dict(results=[dict(concurrency=1, requests_per_second=100.0, latency_p99=0.010)])
+        current = dict(results=[dict(concurrency=1, requests_per_second=80.0, latency_p99=0.020)])
+        self.assertEqual(len(loopbackbenchmark.compare(baseline, current)), 2)
+
+    def test_compare_within_tolerance(self):
+        baseline = dict(results=[dict(concurrency=1, requests_per_second=100.0, latency_p99=0.010)])
+        current = dict(results=[dict(concurrency=1, requests_per_second=95.0, latency_p99=0.0105),
+                                dict(concurrency=10, requests_per_second=1.0, latency_p99=1.0)])
+        self.assertEqual(loopbackbenchmark.compare(baseline, current), [])
+
+
+class TestLoopbackBenchmark(unittest.TestCase):
+
+    def setUp(self):
+        self.x = loopbackbenchmark.LoopbackBenchmark(levels=[1, 2], requests=4, payload_size=256)
+
+    def test_default_levels(self):
+        self.assertEqual(loopbackbenchmark.LoopbackBenchmark().levels, [1, 10, 100, 1000])
+
+    def test_message_client_uses_tcp_transport(self):
+        client = self.x.build_client(queue.Queue())
+        self.assertIsInstance(client, messageclient.MessageClient)
+        self.assertEqual(client.transport.name, 'tcp')
+
+    def test_unknown_workload_raises_value_error(self):
+        self.x.workload = 'xxx'
+        with self.assertRaises(ValueError):
+            self.x.build_client(queue.Queue())
+
+    def test_run_reports_each_level_and_restores_ports(self):
+        ports = [getattr(settings, name) for name in self.x.port_settings]
+        result = self.x.run()
+        self.assertEqual([item['concurrency'] for item in result], [1, 2])
+        self.assertEqual([item['requests'] for item in result], [4, 4])
+        self.assertEqual([item['errors'] for item in result], [0, 0])
+        self.assertTrue(all(item['requests_per_second'] > 0 for item in result))
+        self.assertTrue(all(item['latency_p99'] >= item['latency_p50'] for item in result))
+        self.assertEqual([getattr(settings, name) for name in self.x.port_settings], ports)
+        self.assertIn('req/s', self.x.report())
+
+    def test_admission_lifted_while_running_and_restored(self):
+        self.x.start_servers()
+        handlers = self.x.get_request_handlers()
+        try:
+            self.assertTrue(all(item.admission.budgets == dict() for item in handlers))
+        finally:
+            self.x.stop_servers()
+        self.assertTrue(all(item.admission.budgets for item in handlers))
+
+    def test_save_writes_json(self):
+        self.x.results = [dict(concurrency=1)]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'results.json')
+            self.x.save(path)
+            with open(path) as f:
+                result = json.load(f)
+        self.assertEqual(result['results'], [dict(concurrency=1)])
+        self.assertEqual(result['workload'], 'message')
@@ -3,28 +3,74 @@ contactprotocol.py
 
 Module for the ContactProtocol class object
 
+Keep-alive: a server protocol with keep_alive set advertises its idle timeout in the ACK
+and leaves the socket open for further requests. A client protocol with keep_alive set
+only keeps the socket open if the peer advertised keep-alive, so old peers stay one-shot.
+
+Every ACK also advertises the header flags this node accepts, clients only send flagged
+frames to peers that advertised them.
+
 Copyright (C) 2018 Disappeer Labs
 License: GPLv3
 """
 
+from disappeer import settings
 from disappeer.net.bases import baseprotocol
 
 
 class ContactProtocol(baseprotocol.BaseProtocol):
 
+    keep_alive_key = 'keep_alive'
+    frame_flags_key = 'frame_flags'
+
     def __init__(self, sock):
         super().__init__(sock)
+        self.keep_alive = False
+        self.idle_timeout = settings.keep_alive_idle_timeout
+        self.peer_idle_timeout = None
+        self.peer_flags = 0
 
     def send_request(self, payload_dict, command_string):
-        packet = self.build_packet(payload_dict, command_string)
-        self.sock.sendall(packet)
+        parts = self.build_parts(payload_dict, command_string)
+        self.send_parts(parts, command_string)
 
     def handle_response(self):
         payload = self.process_incoming(self.ack_string)
-        self.sock.close()
+        self.peer_idle_timeout = self.read_peer_idle_timeout(payload)
+        self.peer_flags = self.read_peer_flags(payload)
+        if not self.is_reusable():
+            self.sock.close()
         return payload
 
+    def read_peer_idle_timeout(self, payload):
+        try:
+            result = payload[self.keep_alive_key]
+        except (KeyError, TypeError):
+            return None
+        if isinstance(result, (int, float)) and result > 0:
+            return result
+        return None
+
+    def read_peer_flags(self, payload):
+        try:
+            result = payload[self.frame_flags_key]
+        except (KeyError, TypeError):
+            return 0
+        if isinstance(result, int):
+            return result & self.header.supported_flags
+        return 0
+
+    def is_reusable(self):
+        return self.keep_alive and self.peer_idle_timeout is not None
+
     def send_ack(self, payload_dict):
-        packet = self.build_packet(payload_dict, self.ack_string)
-        self.sock.sendall(packet)
-        self.sock.close()
+        if self.keep_alive:
+            payload_dict[self.keep_alive_key] = self.idle_timeout
+        payload_dict[self.frame_flags_key] = self.header.supported_flags
+        parts = self.build_template_parts(payload_dict, self.ack_string, 'nonce')
+        if parts is None:
+            self.send_parts(self.build_parts(payload_dict, self.ack_string), self.ack_string)
+        else:
+            self.send_parts(parts, self.ack_string, frame_count=1)
+        if not self.keep_alive:
+            self.sock.close()
@@ -19,8 +19,11 @@ class ContactRequestClient(abstractclient.AbstractClient):
 
     def set_protocol(self):
         self.protocol = contactprotocol.ContactProtocol(self.sock)
+        self.configure_protocol()
 
     def send(self):
+        if self.resume_connection() and self.send_over_resumed_connection():
+            return
         self.configure_transport()
         if self.error:
             self.report_error()
@@ -31,20 +34,15 @@ class ContactRequestClient(abstractclient.AbstractClient):
 
     def handle_response(self):
         result = self.protocol.handle_response()
-        self.report_result(result)
+        self.release_connection(result)
+        self.report_response(result)
 
     def report_result(self, result):
         result_dict = self.build_result_dict(result)
         self.queue.put(result_dict)
 
     def build_result_dict(self, result):
-        try:
-            if result['nonce'] == self.nonce:
-                nonce_check = True
-            else:
-                nonce_check = False
-        except KeyError:
-            nonce_check = False
+        nonce_check = self.nonce_is_valid(result)
 
         result_dict = dict(desc=constants.command_list.New_Contact_Req_Client_Res,
                            result=result,
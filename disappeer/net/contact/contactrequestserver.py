@@ -7,10 +7,14 @@ Copyright (C) 2018 Disappeer Labs
 License: GPLv3
 """
 
+import json
 import socketserver
 from disappeer.net.bases import abstractserverfactory
+from disappeer.net.bases import admission
+from disappeer.net.bases import validationservice
+from disappeer.net.bases import poolingmixin
 from disappeer.net.contact import contactprotocol
-from disappeer.net.contact import contactrequestvalidator
+from disappeer.gpg.helpers import keyparser
 from disappeer import settings
 from disappeer.constants import constants
 command_list = constants.command_list
@@ -44,6 +48,12 @@ class ContactRequestServerFactory(abstractserverfactory.AbstractServerFactory):
 
 class ContactRequestServerRequestHandler(socketserver.BaseRequestHandler):
 
+    # Shared by all handler instances, validation runs gpg so budgets are tight
+    admission = admission.AdmissionController(settings.admission_budgets['contact_request'])
+    validation_service = validationservice.service
+    # Fingerprint budget shared by every claimed key the parser cannot read
+    unparsable_fingerprint = 'unparsable'
+
     def setup(self):
         self.protocol = contactprotocol.ContactProtocol(self.request)
 
@@ -51,11 +61,46 @@ class ContactRequestServerRequestHandler(socketserver.BaseRequestHandler):
         result = self.protocol.process_incoming(self.protocol.request_string)
         if result is False:
             return False
+        elif not self.is_admitted(result):
+            return False
         else:
             self.validate_result(result)
 
+    def is_admitted(self, result_dict):
+        """
+        Charge the request to the admission budgets, using only what can be read without gpg
+        """
+        nonce, fingerprint = self.read_claims(result_dict)
+        return self.admission.admit(size=self.protocol.incoming_length, nonce=nonce, fingerprint=fingerprint)
+
+    def read_claims(self, result_dict):
+        """
+        Return the claimed nonce and the fingerprint of the claimed public key, None for either if unreadable
+        """
+        try:
+            data_dict = json.loads(result_dict['data'])
+            nonce = data_dict.get('nonce')
+            pub_key = data_dict['gpg_pub_key']
+        except (KeyError, TypeError, ValueError, AttributeError):
+            return None, None
+        if not isinstance(nonce, str):
+            nonce = None
+        return nonce, self.read_fingerprint(pub_key)
+
+    def read_fingerprint(self, pub_key):
+        """
+        Armor and headers do not change the fingerprint, so every armoring of a key draws on one budget
+        """
+        try:
+            key_dict = keyparser.parse_public_key(pub_key)
+        except keyparser.UnsupportedPacket:
+            key_dict = None
+        if key_dict is None:
+            return self.unparsable_fingerprint
+        return key_dict['fingerprint']
+
     def validate_result(self, result_dict):
-        check = contactrequestvalidator.ContactRequestValidator(result_dict)
+        check = self.validation_service.run(validationservice.validate_contact_request, (result_dict,))
         if check.valid:
             self.handle_valid_result(check.result_dict)
 
@@ -83,5 +128,5 @@ class ContactRequestServerRequestHandler(socketserver.BaseRequestHandler):
         return result
 
 
-class ThreadedTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+class ThreadedTCPServer(poolingmixin.PoolingMixIn, socketserver.TCPServer):
     allow_reuse_address = True
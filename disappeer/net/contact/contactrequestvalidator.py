@@ -9,7 +9,8 @@ License: GPLv3
 
 from disappeer.gpg.agents import detachedverifier
 from disappeer.gpg.agents import keyring
-import tempfile
+from disappeer.gpg.helpers import tempkeyringpool
+from disappeer.gpg.helpers import keyparser
 import json
 
 
@@ -73,6 +74,17 @@ class ContactRequestValidator:
             self.valid = False
             return False
 
+    def is_key_parsable(self):
+        try:
+            key_dict = keyparser.parse_public_key(self.pub_key)
+        except keyparser.UnsupportedPacket:
+            # Well-formed but not readable by the parser, left to the gpg import
+            return None
+        if key_dict is None:
+            self.error = 'Malformed or oversized public key in request object.'
+            self.valid = False
+            return False
+
     def is_key_valid(self, key_dir):
         key_ring_agent = keyring.KeyRing(key_dir)
         result = key_ring_agent.import_key(self.pub_key)
@@ -88,19 +100,18 @@ class ContactRequestValidator:
         sig_bytes = bytes(self.sig, 'utf-8')
         data_bytes = bytes(self.data, 'utf-8')
 
-        with tempfile.NamedTemporaryFile() as tmp_file:
-            tmp_file.write(sig_bytes)
-            tmp_file.seek(0)
-            verify_detached = verifier.execute(tmp_file.name, data_bytes)
-            if not verify_detached.valid:
-                self.error = verify_detached.stderr
-            self.valid = verify_detached.valid
-            return verify_detached
+        verify_detached = verifier.verify_bytes(sig_bytes, data_bytes)
+        if not verify_detached.valid:
+            self.error = verify_detached.stderr
+        self.valid = verify_detached.valid
+        return verify_detached
 
     def validate(self):
         if self.is_data_valid() is False:
             return False
-        with tempfile.TemporaryDirectory() as tmp_dir:
+        if self.is_key_parsable() is False:
+            return False
+        with tempkeyringpool.pool.checkout() as tmp_dir:
             if self.is_key_valid(tmp_dir) is False:
                 return False
             result = self.verify_sig(tmp_dir)
@@ -9,8 +9,10 @@ License: GPLv3
 
 import unittest
 from unittest.mock import MagicMock
+import socket
 from disappeer.net.contact import contactprotocol
 from disappeer.net.bases import baseprotocol
+from disappeer import settings
 
 
 class FakeSocket(MagicMock):
@@ -30,6 +32,9 @@ class TestImports(unittest.TestCase):
     def test_baseprotocol(self):
         self.assertEqual(baseprotocol, contactprotocol.baseprotocol)
 
+    def test_settings(self):
+        self.assertEqual(settings, contactprotocol.settings)
+
 
 class TestClassBasics(unittest.TestCase):
 
@@ -48,19 +53,19 @@ class TestClassBasics(unittest.TestCase):
     def test_sock_attribute_set_on_base_class(self):
         self.assertEqual(self.socket, self.x.sock)
 
-    def test_send_request_method_calls_build_packet(self):
-        target = self.x.build_packet = MagicMock(return_value=self.payload)
+    def test_send_request_method_calls_build_parts(self):
+        target = self.x.build_parts = MagicMock(return_value=[b'header', b'payload'])
         sub = self.x.sock = MagicMock()
         sub = self.x.handle_response = MagicMock()
         self.x.send_request(self.payload, self.req)
         target.assert_called_with(self.payload, self.req)
 
     def test_send_request_method_calls_sendall_on_sock(self):
-        sub = self.x.build_packet = MagicMock(return_value=self.payload)
+        sub = self.x.build_parts = MagicMock(return_value=[b'header', b'payload'])
         sub_1 = self.x.handle_response = MagicMock()
         target = self.x.sock = MagicMock()
         self.x.send_request(self.payload, self.req)
-        target.sendall.assert_called_with(sub.return_value)
+        target.sendall.assert_called_with(b'headerpayload')
 
     def test_handle_response_calls_process_incoming_ack(self):
         target = self.x.process_incoming = MagicMock()
@@ -80,21 +85,132 @@ class TestClassBasics(unittest.TestCase):
         result = self.x.handle_response()
         self.assertEqual(result, sub.return_value)
 
-    def test_send_ack_method_builds_packet_with_ack_string(self):
+    def test_send_ack_method_builds_parts_with_ack_string(self):
         payload_dict = dict()
-        target = self.x.build_packet = MagicMock()
+        target = self.x.build_parts = MagicMock(return_value=[b'header', b'payload'])
         sub = self.x.sock = MagicMock()
         result = self.x.send_ack(payload_dict)
         target.assert_called_with(payload_dict, self.x.ack_string)
 
     def test_send_ack_method_calls_sock_sendall_with_packet(self):
-        sub = self.x.build_packet = MagicMock(return_value=self.payload)
+        sub = self.x.build_parts = MagicMock(return_value=[b'header', b'payload'])
         target = self.x.sock = MagicMock()
         self.x.send_ack(dict())
-        target.sendall.assert_called_with(sub.return_value)
+        target.sendall.assert_called_with(b'headerpayload')
+
+    def test_send_ack_method_uses_template_for_nonce_ack(self):
+        self.x.build_parts = MagicMock()
+        target = self.x.sock = MagicMock()
+        self.x.send_ack(dict(nonce='xxx', desc='ACK'))
+        self.assertFalse(self.x.build_parts.called)
+        expected = baseprotocol.BaseProtocol(None)
+        expected.keep_alive = False
+        target.sendall.assert_called_with(expected.build_packet(dict(nonce='xxx', desc='ACK',
+                                                                     frame_flags=self.x.header.supported_flags),
+                                                                self.x.ack_string))
 
     def test_send_ack_method_calls_sock_close(self):
         sub = self.x.build_packet = MagicMock(return_value=self.payload)
         target = self.x.sock = MagicMock()
         self.x.send_ack(dict())
         target.close.assert_called_with()
+
+
+class TestKeepAlive(unittest.TestCase):
+
+    def setUp(self):
+        self.server_sock, self.client_sock = socket.socketpair()
+        self.server = contactprotocol.ContactProtocol(self.server_sock)
+        self.client = contactprotocol.ContactProtocol(self.client_sock)
+
+    def tearDown(self):
+        self.server_sock.close()
+        self.client_sock.close()
+
+    def test_keep_alive_default_false(self):
+        self.assertFalse(self.server.keep_alive)
+
+    def test_idle_timeout_default_from_settings(self):
+        self.assertEqual(self.server.idle_timeout, settings.keep_alive_idle_timeout)
+
+    def test_send_ack_advertises_idle_timeout_and_leaves_socket_open(self):
+        self.server.sock = MagicMock()
+        self.server.keep_alive = True
+        payload_dict = dict(nonce='xxx')
+        self.server.send_ack(payload_dict)
+        self.assertEqual(payload_dict[self.server.keep_alive_key], self.server.idle_timeout)
+        self.assertFalse(self.server.sock.close.called)
+
+    def test_send_ack_without_keep_alive_does_not_advertise(self):
+        self.server.sock = MagicMock()
+        payload_dict = dict(nonce='xxx')
+        self.server.send_ack(payload_dict)
+        self.assertNotIn(self.server.keep_alive_key, payload_dict)
+
+    def test_send_ack_advertises_frame_flags(self):
+        self.server.sock = MagicMock()
+        payload_dict = dict(nonce='xxx')
+        self.server.send_ack(payload_dict)
+        self.assertEqual(payload_dict[self.server.frame_flags_key], self.server.header.supported_flags)
+
+    def test_read_peer_flags(self):
+        self.assertEqual(self.client.read_peer_flags(dict(frame_flags=1)), 1)
+        self.assertEqual(self.client.read_peer_flags(dict(frame_flags=0xFF)), self.client.header.supported_flags)
+        self.assertEqual(self.client.read_peer_flags(dict(nonce='xxx')), 0)
+        self.assertEqual(self.client.read_peer_flags(False), 0)
+
+    def test_handle_response_records_peer_flags(self):
+        self.client.process_incoming = MagicMock(return_value=dict(nonce='xxx', frame_flags=1))
+        self.client.sock = MagicMock()
+        self.client.handle_response()
+        self.assertEqual(self.client.peer_flags, 1)
+
+    def test_read_peer_idle_timeout(self):
+        self.assertEqual(self.client.read_peer_idle_timeout(dict(keep_alive=30)), 30)
+        self.assertIsNone(self.client.read_peer_idle_timeout(dict(nonce='xxx')))
+        self.assertIsNone(self.client.read_peer_idle_timeout(dict(keep_alive='30')))
+        self.assertIsNone(self.client.read_peer_idle_timeout(False))
+
+    def test_handle_response_closes_when_peer_is_one_shot(self):
+        self.client.keep_alive = True
+        self.client.process_incoming = MagicMock(return_value=dict(nonce='xxx'))
+        self.client.sock = MagicMock()
+        self.client.handle_response()
+        self.assertFalse(self.client.is_reusable())
+        self.client.sock.close.assert_called_with()
+
+    def test_handle_response_keeps_socket_when_negotiated(self):
+        self.client.keep_alive = True
+        self.client.process_incoming = MagicMock(return_value=dict(nonce='xxx', keep_alive=30))
+        self.client.sock = MagicMock()
+        self.client.handle_response()
+        self.assertTrue(self.client.is_reusable())
+        self.assertFalse(self.client.sock.close.called)
+
+    def test_several_exchanges_over_one_connection(self):
+        self.server.keep_alive = True
+        self.client.keep_alive = True
+        for nonce in ['one', 'two', 'three']:
+            self.client.send_request(dict(nonce=nonce), self.client.message_string)
+            request = self.server.process_incoming(self.server.message_string)
+            self.server.send_ack(dict(nonce=request['nonce'], desc='ACK'))
+            result = self.client.handle_response()
+            self.assertEqual(result['nonce'], nonce)
+            self.assertTrue(self.client.is_reusable())
+
+    def test_binary_exchange_after_negotiation(self):
+        self.client.send_request(dict(nonce='one'), self.client.message_string)
+        request = self.server.process_incoming(self.server.message_string)
+        self.server.send_ack(dict(nonce=request['nonce'], desc='ACK'))
+        self.client.handle_response()
+        self.client_sock, self.server_sock = socket.socketpair()
+        self.client.sock = self.client_sock
+        self.server.sock = self.server_sock
+        self.client.payload_flags = self.client.peer_flags
+        self.client.send_request(dict(nonce='two'), self.client.message_string)
+        request = self.server.process_incoming(self.server.message_string)
+        self.assertEqual(self.server.incoming_flags, self.server.header.flag_binary)
+        self.server.send_ack(dict(nonce=request['nonce'], desc='ACK'))
+        result = self.client.handle_response()
+        self.assertEqual(self.client.incoming_flags, self.client.header.flag_binary)
+        self.assertEqual(result['nonce'], 'two')
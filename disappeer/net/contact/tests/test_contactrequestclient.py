@@ -110,13 +110,37 @@ class TestClassBasics(unittest.TestCase):
         self.x.handle_response()
         target.handle_response.assert_called_with()
 
+    def test_handle_response_method_calls_release_connection(self):
+        target = self.x.release_connection = MagicMock()
+        sub = self.x.protocol = MagicMock()
+        self.x.handle_response()
+        target.assert_called_with(sub.handle_response.return_value)
+
+    def test_send_method_uses_resumed_connection(self):
+        sub = self.x.resume_connection = MagicMock(return_value=True)
+        sub1 = self.x.send_over_resumed_connection = MagicMock(return_value=True)
+        target = self.x.configure_transport = MagicMock()
+        self.x.send()
+        self.assertFalse(target.called)
+
     def test_handle_response_method_calls_report_result(self):
         val_dict = dict()
         target = self.x.report_result = MagicMock()
         sub = self.x.protocol = MagicMock(return_value=val_dict)
+        sub.peer_busy = False
         self.x.handle_response()
         target.assert_called_with(sub.handle_response.return_value)
 
+    def test_handle_response_method_reports_busy_peer_as_error(self):
+        target = self.x.report_result = MagicMock()
+        sub = self.x.build_error_dict = MagicMock()
+        self.x.protocol = MagicMock()
+        self.x.protocol.peer_busy = True
+        self.x.handle_response()
+        self.assertFalse(target.called)
+        self.assertIsInstance(self.x.error, abstractclient.PeerBusyError)
+        self.x.queue.put.assert_called_with(sub.return_value)
+
     def test_report_result_calls_build_result_dict(self):
         val = dict()
         target = self.x.build_result_dict = MagicMock()
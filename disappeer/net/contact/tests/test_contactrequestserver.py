@@ -11,13 +11,20 @@ import unittest
 from unittest.mock import MagicMock, patch
 from disappeer.net.contact import contactrequestserver
 import socketserver
+from disappeer.net.bases import poolingmixin
 from disappeer.net.bases import abstractserverfactory
+from disappeer.net.bases import admission
+from disappeer.net.bases import validationservice
 from disappeer.net.contact import contactprotocol
 from disappeer import settings
 from disappeer.constants import constants
 from disappeer.net.contact import contactrequestfactory
 from disappeer.net.contact import contactrequestvalidator
+from disappeer.gpg.helpers import keyparser
+from disappeer.gpg.helpers import armor
+from disappeer.gpg.agents import keyring
 import copy
+import json
 
 
 class TestImportsAndModuleVars(unittest.TestCase):
@@ -40,8 +47,11 @@ class TestImportsAndModuleVars(unittest.TestCase):
     def test_command_list(self):
         self.assertEqual(constants.command_list, contactrequestserver.command_list)
 
-    def test_contactrequestvalidator(self):
-        self.assertEqual(contactrequestvalidator, contactrequestserver.contactrequestvalidator)
+    def test_validationservice(self):
+        self.assertEqual(validationservice, contactrequestserver.validationservice)
+
+    def test_keyparser(self):
+        self.assertEqual(keyparser, contactrequestserver.keyparser)
 
 
 class TestThreadedTCPServerBasics(unittest.TestCase):
@@ -55,8 +65,8 @@ class TestThreadedTCPServerBasics(unittest.TestCase):
     def test_class_self(self):
         self.assertEqual(self.x, contactrequestserver.ThreadedTCPServer)
 
-    def test_threading_mixin_base(self):
-        self.assertIn(socketserver.ThreadingMixIn, self.base_list)
+    def test_pooling_mixin_base(self):
+        self.assertIn(poolingmixin.PoolingMixIn, self.base_list)
 
     def test_tcpserver_base(self):
         self.assertIn(socketserver.TCPServer, self.base_list)
@@ -120,6 +130,15 @@ class TestContactRequestServerRequestHandler(unittest.TestCase):
     def setUp(self):
         self.req_validator = copy.deepcopy(self.valid_req_validator)
         self.mocked_contact_protocol = contactrequestserver.contactprotocol.ContactProtocol = MagicMock(spec=contactprotocol.ContactProtocol(self.request))
+        # Unbudgeted controller, so tests neither share nor drain the class level budgets
+        admission_patcher = patch.object(contactrequestserver.ContactRequestServerRequestHandler, 'admission', admission.AdmissionController(dict()))
+        admission_patcher.start()
+        self.addCleanup(admission_patcher.stop)
+        service = validationservice.ValidationService(max_workers=1, executor_type='thread')
+        self.addCleanup(service.shutdown)
+        service_patcher = patch.object(self.x_class, 'validation_service', service)
+        service_patcher.start()
+        self.addCleanup(service_patcher.stop)
         self.x = contactrequestserver.ContactRequestServerRequestHandler(self.request, self.client_address, self.server)
 
     def test_class_self(self):
@@ -156,6 +175,50 @@ class TestContactRequestServerRequestHandler(unittest.TestCase):
         self.x.handle()
         target.assert_called_with(sub.return_value)
 
+    def test_handle_returns_false_without_validation_when_not_admitted(self):
+        target = self.x.validate_result = MagicMock()
+        self.x.admission = MagicMock()
+        self.x.admission.admit.return_value = False
+        self.x.protocol.process_incoming = MagicMock(return_value=self.valid_req_dict)
+        self.x.protocol.incoming_length = 10
+        result = self.x.handle()
+        self.assertIs(result, False)
+        self.assertFalse(target.called)
+
+    def test_read_claims_returns_nonce_and_key_fingerprint(self):
+        pub_key = keyring.KeyRing(self.key_dir).export_key('AA74BBFE8A31ADBC0E9ED26B190DB52959AC3560')
+        data = json.dumps(dict(nonce='nonce', gpg_pub_key=pub_key))
+        result = self.x.read_claims(dict(data=data))
+        self.assertEqual(result, ('nonce', 'AA74BBFE8A31ADBC0E9ED26B190DB52959AC3560'))
+
+    def test_read_claims_returns_none_on_unreadable_data(self):
+        self.assertEqual(self.x.read_claims(dict(data='xxx')), (None, None))
+        self.assertEqual(self.x.read_claims(dict()), (None, None))
+
+    def test_read_claims_charges_unparsable_keys_to_one_fingerprint(self):
+        for pub_key in ['xxx', armor.armor('PGP PUBLIC KEY BLOCK', b'\xc6\x05\x04'), 5]:
+            data = json.dumps(dict(nonce='nonce', gpg_pub_key=pub_key))
+            result = self.x.read_claims(dict(data=data))
+            self.assertEqual(result, ('nonce', self.x.unparsable_fingerprint))
+
+    def test_armorings_of_one_key_share_fingerprint_budget(self):
+        self.x.admission = admission.AdmissionController(dict(fingerprint=(1 / 60, 1)))
+        self.x.protocol.incoming_length = 10
+        pub_key = keyring.KeyRing(self.key_dir).export_key('AA74BBFE8A31ADBC0E9ED26B190DB52959AC3560')
+        block = armor.search(pub_key)
+        rearmored = armor.rearmor(block._replace(headers=('Comment: another armoring',)))
+        for index, text in enumerate([pub_key, '  ' + rearmored.replace('\n', '\r\n')]):
+            data = json.dumps(dict(nonce='nonce_{}'.format(index), gpg_pub_key=text))
+            self.assertIs(self.x.is_admitted(dict(data=data)), index == 0)
+
+    def test_validate_result_runs_contact_request_job_on_validation_service(self):
+        service = self.x.validation_service = MagicMock()
+        service.run.return_value.valid = False
+        target = self.x.handle_valid_result = MagicMock()
+        self.x.validate_result(self.valid_req_dict)
+        service.run.assert_called_with(validationservice.validate_contact_request, (self.valid_req_dict,))
+        self.assertFalse(target.called)
+
     def test_validate_result_calls_handle_valid_result_with_result_dict_on_valid(self):
         check = self.req_validator #contactrequestvalidator.ContactRequestValidator(self.valid_req_dict)
         target = self.x.handle_valid_result = MagicMock()
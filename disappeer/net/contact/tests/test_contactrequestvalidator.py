@@ -8,12 +8,15 @@ License: GPLv3
 """
 
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 from disappeer.net.contact import contactrequestvalidator
 from disappeer.net.contact import contactrequestfactory
 from disappeer.gpg.agents import detachedverifier
 from disappeer.gpg.agents import keyring
 import tempfile
+from disappeer.gpg.helpers import tempkeyringpool
+from disappeer.gpg.helpers import keyparser
+from disappeer.gpg.helpers import armor
 import json
 import copy
 
@@ -22,6 +25,8 @@ key_dir = 'tests/data/keys'
 passphrase = 'passphrase'
 factory = contactrequestfactory.ContactRequestFactory(host_address, key_dir, passphrase)
 req_dict = factory.build()
+# Public key packet cut short, armored
+truncated_pub_key = armor.armor('PGP PUBLIC KEY BLOCK', b'\xc6\x05\x04')
 
 
 class TestImports(unittest.TestCase):
@@ -32,8 +37,11 @@ class TestImports(unittest.TestCase):
     def test_gpgkeyring(self):
         self.assertEqual(keyring, contactrequestvalidator.keyring)
 
-    def test_tempfile(self):
-        self.assertEqual(tempfile, contactrequestvalidator.tempfile)
+    def test_tempkeyringpool(self):
+        self.assertEqual(tempkeyringpool, contactrequestvalidator.tempkeyringpool)
+
+    def test_keyparser(self):
+        self.assertEqual(keyparser, contactrequestvalidator.keyparser)
 
     def test_json(self):
         self.assertEqual(json, contactrequestvalidator.json)
@@ -233,6 +241,32 @@ class TestClassBasics(ContactRequestValidatorSetUpClass):
         self.assertIsNotNone(self.x.error)
         self.assertIs(self.x.valid, False)
 
+    def test_is_key_parsable_does_not_return_false_on_valid_key(self):
+        self.x.pub_key = keyring.KeyRing(key_dir).export_key('AA74BBFE8A31ADBC0E9ED26B190DB52959AC3560')
+        result = self.x.is_key_parsable()
+        self.assertIsNot(result, False)
+
+    def test_is_key_parsable_returns_false_sets_error_and_valid_on_bad_key(self):
+        self.x.pub_key = truncated_pub_key
+        result = self.x.is_key_parsable()
+        self.assertIs(result, False)
+        self.assertIsNotNone(self.x.error)
+        self.assertIs(self.x.valid, False)
+
+    def test_is_key_parsable_leaves_key_the_parser_does_not_read_to_gpg(self):
+        self.x.pub_key = 'xxx'
+        with patch.object(contactrequestvalidator.keyparser, 'parse_public_key', side_effect=keyparser.UnsupportedPacket):
+            result = self.x.is_key_parsable()
+        self.assertIsNot(result, False)
+        self.assertIsNone(self.x.error)
+
+    def test_validate_skips_checkout_on_unparsable_key(self):
+        self.x.pub_key = truncated_pub_key
+        with patch.object(contactrequestvalidator.tempkeyringpool.pool, 'checkout') as checkout:
+            result = self.x.validate()
+        self.assertIs(result, False)
+        self.assertFalse(checkout.called)
+
     def test_is_key_valid_returns_false_sets_error_and_valid_false_on_bad_key(self):
         self.x.pub_key = 'xxx'
         with tempfile.TemporaryDirectory() as tmp_dir:
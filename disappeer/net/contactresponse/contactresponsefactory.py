@@ -12,10 +12,10 @@ import random
 from disappeer import settings
 import sys
 import json
-import tempfile
 from disappeer.gpg.agents import keyring
 from disappeer.gpg.agents import signer
 from disappeer.gpg.agents import encrypter
+from disappeer.gpg.helpers import tempkeyringpool
 
 
 class ContactResponseFactory:
@@ -108,7 +108,7 @@ class ContactResponseFactory:
         return json.dumps(target_object)
 
     def create_temp_dir(self):
-        temp_dir = tempfile.TemporaryDirectory()
+        temp_dir = tempkeyringpool.pool.checkout()
         return temp_dir
 
     def close_temp_dir(self):
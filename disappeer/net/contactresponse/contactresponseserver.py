@@ -11,9 +11,10 @@ import socketserver
 import ssl
 from disappeer import settings
 from disappeer.net.bases import abstractserverfactory
+from disappeer.net.bases import admission
+from disappeer.net.bases import poolingmixin
 from disappeer.net.contact import contactprotocol
-from disappeer.models.db import dbpendingcontactresponsetable
-from disappeer.models.db import dbserversynctable
+from disappeer.models.db import nonceindex
 from disappeer.constants import constants
 command_list = constants.command_list
 
@@ -46,18 +47,31 @@ class ContactResponseServerFactory(abstractserverfactory.AbstractServerFactory):
 
 class SSLContactResponseRequestHandler(socketserver.BaseRequestHandler):
 
+    # Shared by all handler instances
+    admission = admission.AdmissionController(settings.admission_budgets['contact_response'])
+    nonce_index = nonceindex.pending_contact_response_nonces
+
     def setup(self):
         self.protocol = contactprotocol.ContactProtocol(self.request)
-        server_sync_path = self.server.get_sync_db_path()
-        self.db_server_sync_table = dbserversynctable.DBServerSyncTable(server_sync_path)
 
     def handle(self):
         result = self.protocol.process_incoming(self.protocol.response_string)
         if result is False:
             return False
+        elif not self.is_admitted(result):
+            return False
         elif self.is_result_valid(result):
             self.handle_valid_result(result)
 
+    def is_admitted(self, result_dict):
+        """
+        Charge the request to the admission budgets before the nonce is looked up
+        """
+        nonce = result_dict.get('response_nonce') if isinstance(result_dict, dict) else None
+        if not isinstance(nonce, str):
+            nonce = None
+        return self.admission.admit(size=self.protocol.incoming_length, nonce=nonce)
+
     def handle_valid_result(self, result_dict):
         self.send_response(result_dict)
         self.put_to_queue(result_dict)
@@ -95,21 +109,10 @@ class SSLContactResponseRequestHandler(socketserver.BaseRequestHandler):
             target = result_dict['request_nonce']
         except (KeyError, TypeError) as err:
             return False
-        nonce_list = self.db_server_sync_table.fetch_all_nonces()
-        if target in nonce_list:
-            return True
-        else:
-            return False
+        return target in self.nonce_index
 
 
-class SSLThreadedContactResponseTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+class SSLThreadedContactResponseTCPServer(poolingmixin.PoolingMixIn, socketserver.TCPServer):
     allow_reuse_address = True
 
-    @classmethod
-    def get_sync_db_path(cls):
-        """
-        This method must be overridden by caller, and patched with the proper method to get the current sync db path
-        """
-        raise NotImplementedError
-
 
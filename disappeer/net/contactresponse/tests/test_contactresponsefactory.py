@@ -15,7 +15,7 @@ import random
 from disappeer import settings
 import sys
 import json
-import tempfile
+from disappeer.gpg.helpers import tempkeyringpool
 from disappeer.gpg.agents import keyring
 from disappeer.gpg.agents import signer
 from disappeer.gpg.agents import encrypter
@@ -74,8 +74,8 @@ class TestImports(unittest.TestCase):
     def test_json(self):
         self.assertEqual(json, contactresponsefactory.json)
 
-    def test_tempfile(self):
-        self.assertEqual(tempfile, contactresponsefactory.tempfile)
+    def test_tempkeyringpool(self):
+        self.assertEqual(tempkeyringpool, contactresponsefactory.tempkeyringpool)
 
     def test_keyring(self):
         self.assertEqual(keyring, contactresponsefactory.keyring)
@@ -209,11 +209,11 @@ class TestClassBasics(unittest.TestCase):
 
     def test_create_temp_dir_returns_temp_dir(self):
         result = self.x.create_temp_dir()
-        self.assertIsInstance(result, tempfile.TemporaryDirectory)
+        self.assertIsInstance(result, tempkeyringpool.TempKeyRingDir)
         result.cleanup()
 
     def test_temp_dir_attribute_is_temp_dir(self):
-        self.assertIsInstance(self.x.temp_dir, tempfile.TemporaryDirectory)
+        self.assertIsInstance(self.x.temp_dir, tempkeyringpool.TempKeyRingDir)
 
     def test_close_temp_dir_calls_close_on_temp_dir(self):
         try:
@@ -12,11 +12,12 @@ from unittest.mock import MagicMock, patch
 from disappeer.net.contactresponse import contactresponseserver
 from disappeer.net.contact import contactprotocol
 import socketserver
+from disappeer.net.bases import poolingmixin
 import ssl
 from disappeer import settings
 from disappeer.net.bases import abstractserverfactory
-from disappeer.models.db import dbpendingcontactresponsetable
-from disappeer.models.db import dbserversynctable
+from disappeer.net.bases import admission
+from disappeer.models.db import nonceindex
 from disappeer.constants import constants
 
 
@@ -37,15 +38,16 @@ class TestImports(unittest.TestCase):
     def test_contactprotocl(self):
         self.assertEqual(contactprotocol, contactresponseserver.contactprotocol)
 
-    def test_dbpendingcontactresponsetable(self):
-        self.assertEqual(dbpendingcontactresponsetable, contactresponseserver.dbpendingcontactresponsetable)
+    def test_nonceindex(self):
+        self.assertEqual(nonceindex, contactresponseserver.nonceindex)
+
+    def test_handler_nonce_index_is_shared_index(self):
+        target = contactresponseserver.SSLContactResponseRequestHandler.nonce_index
+        self.assertIs(target, nonceindex.pending_contact_response_nonces)
 
     def test_command_list(self):
         self.assertEqual(constants.command_list, contactresponseserver.command_list)
 
-    def test_dbserversynctable(self):
-        self.assertEqual(dbserversynctable, contactresponseserver.dbserversynctable)
-
 
 class TestSSLThreadedContactResponseTCPServer(unittest.TestCase):
 
@@ -65,8 +67,8 @@ class TestSSLThreadedContactResponseTCPServer(unittest.TestCase):
     def test_class_self(self):
         self.assertEqual(self.x_class, contactresponseserver.SSLThreadedContactResponseTCPServer)
 
-    def test_threading_mixin_base(self):
-        self.assertIn(socketserver.ThreadingMixIn, self.base_list)
+    def test_pooling_mixin_base(self):
+        self.assertIn(poolingmixin.PoolingMixIn, self.base_list)
 
     def test_tcpserver_base(self):
         self.assertIn(socketserver.TCPServer, self.base_list)
@@ -84,19 +86,22 @@ class TestSSLThreadedContactResponseTCPServer(unittest.TestCase):
         result = self.x.get_request()
         self.assertTrue(accept.called)
 
-    def test_get_sync_db_path_raises_not_implemented(self):
-        with self.assertRaises(NotImplementedError):
-            contactresponseserver.SSLThreadedContactResponseTCPServer.get_sync_db_path()
-
 
 class TestSSLContactResponseRequestHandler(unittest.TestCase):
 
-    @patch('net.contactresponse.contactresponseserver.dbserversynctable.DBServerSyncTable')
-    def setUp(self, db_patch):
+    def setUp(self):
         self.request = MagicMock()
         self.client_address = MagicMock()
         self.server = MagicMock()
         self.mocked_contact_protocol = contactresponseserver.contactprotocol.ContactProtocol = MagicMock(spec=contactprotocol.ContactProtocol(self.request))
+        # Unbudgeted controller, so tests neither share nor drain the class level budgets
+        admission_patcher = patch.object(contactresponseserver.SSLContactResponseRequestHandler, 'admission', admission.AdmissionController(dict()))
+        admission_patcher.start()
+        self.addCleanup(admission_patcher.stop)
+        self.nonce_list = ['aaa', 'bbb']
+        index_patcher = patch.object(contactresponseserver.SSLContactResponseRequestHandler, 'nonce_index', nonceindex.NonceIndex(self.nonce_list))
+        index_patcher.start()
+        self.addCleanup(index_patcher.stop)
         self.x = contactresponseserver.SSLContactResponseRequestHandler(self.request, self.client_address, self.server)
 
     def test_instance(self):
@@ -113,17 +118,8 @@ class TestSSLContactResponseRequestHandler(unittest.TestCase):
         check = hasattr(self.x, 'setup')
         self.assertTrue(check)
 
-    @patch.object(contactresponseserver.dbserversynctable.DBServerSyncTable, 'execute')
-    def test_setup_sets_db_server_sync_table_attribute_with_server_sync_method_result(self, db_patch_1):
-        val = 'xxx'
-        target_method = self.x.server.get_sync_db_path = MagicMock(return_value=val)
-        self.x.setup()
-        self.assertIsInstance(self.x.db_server_sync_table, dbserversynctable.DBServerSyncTable)
-        self.assertEqual(target_method.return_value, self.x.db_server_sync_table.database)
-
-    @patch('disappeer.net.contactresponse.contactresponseserver.dbserversynctable.DBServerSyncTable')
     @patch('disappeer.net.contact.contactprotocol.ContactProtocol')
-    def test_setup_method_sets_protocol(self, target, db_patch):
+    def test_setup_method_sets_protocol(self, target):
         self.x.setup()
         self.assertTrue(target.called)
         self.assertIsNotNone(self.x.protocol)
@@ -141,6 +137,17 @@ class TestSSLContactResponseRequestHandler(unittest.TestCase):
         result = self.x.handle()
         self.assertIs(result, False)
 
+    def test_handle_returns_false_without_validation_when_not_admitted(self):
+        target = self.x.is_result_valid = MagicMock()
+        self.x.admission = MagicMock()
+        self.x.admission.admit.return_value = False
+        self.x.protocol.process_incoming = MagicMock(return_value=dict(response_nonce='abc'))
+        self.x.protocol.incoming_length = 10
+        result = self.x.handle()
+        self.assertIs(result, False)
+        self.assertFalse(target.called)
+        self.x.admission.admit.assert_called_with(size=10, nonce='abc')
+
     def test_check_dict_keys_returns_true_on_valid_input(self):
         target_list = ['ciphertext', 'request_nonce', 'response_nonce']
         valid_dict = dict(ciphertext='',
@@ -162,8 +169,7 @@ class TestSSLContactResponseRequestHandler(unittest.TestCase):
         self.assertIs(result, False)
 
     def test_nonce_is_valid_returns_true_on_valid_input(self):
-        nonce_list = ['aaa', 'bbb']
-        sub = self.x.db_server_sync_table.fetch_all_nonces = MagicMock(return_value=nonce_list)
+        nonce_list = self.nonce_list
         valid_dict = dict(ciphertext='',
                           request_nonce=nonce_list[0],
                           response_nonce='')
@@ -171,8 +177,7 @@ class TestSSLContactResponseRequestHandler(unittest.TestCase):
         self.assertIs(result, True)
 
     def test_nonce_is_valid_returns_false_on_invalid_input(self):
-        nonce_list = ['aaa', 'bbb']
-        sub = self.x.db_server_sync_table.fetch_all_nonces = MagicMock(return_value=nonce_list)
+        nonce_list = self.nonce_list
         valid_dict = dict(ciphertext='',
                           request_nonce='',
                           response_nonce='')
@@ -180,8 +185,7 @@ class TestSSLContactResponseRequestHandler(unittest.TestCase):
         self.assertIs(result, False)
 
     def test_nonce_is_valid_returns_false_on_bad_dict(self):
-        nonce_list = ['aaa', 'bbb']
-        sub = self.x.db_server_sync_table.fetch_all_nonces = MagicMock(return_value=nonce_list)
+        nonce_list = self.nonce_list
         invalid_dict = dict(ciphertext='',
                           xxxxx='',
                           response_nonce='')
@@ -189,8 +193,7 @@ class TestSSLContactResponseRequestHandler(unittest.TestCase):
         self.assertIs(result, False)
 
     def test_nonce_is_valid_returns_false_on_no_dict(self):
-        nonce_list = ['aaa', 'bbb']
-        sub = self.x.db_server_sync_table.fetch_all_nonces = MagicMock(return_value=nonce_list)
+        nonce_list = self.nonce_list
         bad = 'xxx'
         result = self.x.is_nonce_valid(bad)
         self.assertIs(result, False)
@@ -0,0 +1,68 @@
+"""
+batchvalidator.py
+
+Module for the BatchValidator class object, decrypts and verifies stored messages by nonce on the validation pool.
+
+Results come back as each message finishes, not in the order of the nonces. Only a window of
+messages is read from the db and submitted at once, so a batch over a large inbox holds a few
+ciphertexts at a time and leaves room on the shared pool for incoming messages.
+
+Copyright (C) 2018 Disappeer Labs
+License: GPLv3
+"""
+
+import collections
+import concurrent.futures
+from disappeer import settings
+from disappeer.net.bases import validationservice
+
+
+BatchResult = collections.namedtuple('BatchResult', ['nonce', 'validation'])
+
+
+class BatchValidator:
+
+    def __init__(self, messages_table, key_dir, passphrase, service=None, window=None):
+        self.messages_table = messages_table
+        self.key_dir = key_dir
+        self.passphrase = passphrase
+        self.service = service or validationservice.service
+        self.window = window or settings.message_batch_window
+
+    def validate(self, nonces):
+        """
+        Take nonces of messages in messages_table, yield a BatchResult per nonce in completion order
+        """
+        nonces = iter(nonces)
+        pending = {}
+        try:
+            while True:
+                for nonce in nonces:
+                    result = self.submit(nonce, pending)
+                    if result is not None:
+                        yield result
+                    if len(pending) >= self.window:
+                        break
+                if not pending:
+                    return None
+                done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    yield BatchResult(pending.pop(future), self.service.get_result(future))
+        finally:
+            # Closed before the end, jobs not started yet are dropped
+            for future in pending:
+                future.cancel()
+
+    def submit(self, nonce, pending):
+        """
+        Submit the message with nonce and add its future to pending, return an invalid BatchResult if it is not stored
+        """
+        record = self.fetch_record(nonce)
+        if record is None:
+            return BatchResult(nonce, validationservice.ValidationResult(False, 'No stored message for nonce', None, None))
+        args = (record._asdict(), self.key_dir, self.passphrase)
+        future = self.service.submit(validationservice.validate_message, args)
+        pending[future] = nonce
+
+    def fetch_record(self, nonce):
+        return self.messages_table.fetch_named_tuple_by_nonce(nonce)
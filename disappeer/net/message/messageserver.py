@@ -7,10 +7,14 @@ Copyright (C) 2018 Disappeer Labs
 License: GPLv3
 """
 
+import hashlib
 import socketserver
 import ssl
 from disappeer import settings
 from disappeer.net.bases import abstractserverfactory
+from disappeer.net.bases import admission
+from disappeer.net.bases import poolingmixin
+from disappeer.net.bases import replaycache
 from disappeer.net.contact import contactprotocol
 from disappeer.constants import constants
 
@@ -43,19 +47,83 @@ class MessageServerFactory(abstractserverfactory.AbstractServerFactory):
 
 class SSLMessageRequestHandler(socketserver.BaseRequestHandler):
 
+    # Shared by all handler instances
+    admission = admission.AdmissionController(settings.admission_budgets['message'])
+    replay_cache = replaycache.ReplayCache()
+
     def setup(self):
         self.protocol = contactprotocol.ContactProtocol(self.request)
+        self.keep_open = False
 
     def handle(self):
+        """
+        Serve one request, keep_open hands the connection back to the server to wait for the next one
+        """
+        count = self.server.get_request_count(self.request)
+        self.protocol.keep_alive = self.keep_alive_permitted(count)
+        result = self.handle_request()
+        if result is False:
+            return False
+        self.keep_open = self.protocol.keep_alive
+
+    def handle_request(self):
         result = self.protocol.process_incoming(self.protocol.message_string)
         if result is False:
             return False
+        replay_key = self.build_replay_key(result)
+        if not self.is_admitted(result, replay_key in self.replay_cache):
+            return False
         elif self.dict_keys_are_valid(result):
-            self.handle_valid_result(result)
+            if replay_key is None or self.replay_cache.add(replay_key):
+                self.handle_valid_result(result, replay_key)
+            else:
+                # Resent after a lost ACK, it was queued already
+                self.send_response(result)
+            return True
+        else:
+            return False
 
-    def handle_valid_result(self, result_dict):
+    def is_admitted(self, result_dict, replayed=False):
+        """
+        Charge the request to the admission budgets before it is queued for decryption.
+        A replay is not charged to its nonce, it will only be ACKed.
+        """
+        nonce = result_dict.get('nonce') if isinstance(result_dict, dict) else None
+        if replayed or not isinstance(nonce, str):
+            nonce = None
+        return self.admission.admit(size=self.protocol.incoming_length, nonce=nonce)
+
+    def build_replay_key(self, result_dict):
+        """
+        Return (nonce, ciphertext sha256) for the replay cache, None if either is missing
+        """
+        try:
+            nonce = result_dict['nonce']
+            ciphertext = result_dict['ciphertext']
+        except (KeyError, TypeError):
+            return None
+        if not isinstance(nonce, str) or not isinstance(ciphertext, str):
+            return None
+        return nonce, hashlib.sha256(bytes(ciphertext, 'utf-8')).hexdigest()
+
+    def keep_alive_permitted(self, count):
+        """
+        Offer keep-alive to the peer unless this is the last exchange allowed on the connection
+        """
+        return settings.peer_keep_alive and count < settings.keep_alive_max_requests
+
+    def handle_valid_result(self, result_dict, replay_key=None):
+        """
+        Queue the message before the ACK: if the ACK fails the peer resends, and the resend is only ACKed.
+        If queueing fails, the replay key is forgotten so the resend is queued.
+        """
+        try:
+            self.put_to_queue(result_dict)
+        except Exception:
+            if replay_key is not None:
+                self.replay_cache.discard(replay_key)
+            raise
         self.send_response(result_dict)
-        self.put_to_queue(result_dict)
 
     def send_response(self, result_dict):
         response_dict = self.build_response_dict(result_dict)
@@ -79,7 +147,7 @@ class SSLMessageRequestHandler(socketserver.BaseRequestHandler):
             return False
 
 
-class SSLThreadedMessageTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+class SSLThreadedMessageTCPServer(poolingmixin.PoolingMixIn, socketserver.TCPServer):
     allow_reuse_address = True
 
 
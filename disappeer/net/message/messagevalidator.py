@@ -10,7 +10,6 @@ License: GPLv3
 from disappeer.gpg.agents import decrypter
 from disappeer.gpg.agents import detachedverifier
 import json
-import tempfile
 
 
 class MessageValidator:
@@ -81,15 +80,12 @@ class MessageValidator:
     def verify_sig_dict(self, sig_dict):
         sig_bytes = bytes(sig_dict['sig'], 'utf-8')
         data_bytes = bytes(sig_dict['data'], 'utf-8')
-        with tempfile.NamedTemporaryFile() as tmp_file:
-            tmp_file.write(sig_bytes)
-            tmp_file.seek(0)
-            self.verify_result = self.gpg_verifier.execute(tmp_file.name, data_bytes)
-            if self.verify_result.valid:
-                return self.verify_result.valid
-            else:
-                self.set_error(self.verify_result.stderr)
-                return self.verify_result.valid
+        self.verify_result = self.gpg_verifier.verify_bytes(sig_bytes, data_bytes)
+        if self.verify_result.valid:
+            return self.verify_result.valid
+        else:
+            self.set_error(self.verify_result.stderr)
+            return self.verify_result.valid
 
     def check_sig_dict_keys(self, sig_dict):
         target_keys = ['sig', 'data']
@@ -0,0 +1,124 @@
+"""
+test_batchvalidator.py
+
+Test suite for the BatchValidator class object
+
+Copyright (C) 2018 Disappeer Labs
+License: GPLv3
+"""
+
+import unittest
+from unittest.mock import MagicMock, patch
+import collections
+import concurrent.futures
+import threading
+from disappeer.net.message import batchvalidator
+from disappeer.net.bases import validationservice
+from disappeer import settings
+
+
+Row = collections.namedtuple('Row', ['nonce', 'ciphertext', 'status'])
+
+
+class TestImports(unittest.TestCase):
+
+    def test_concurrent_futures(self):
+        self.assertEqual(concurrent.futures, batchvalidator.concurrent.futures)
+
+    def test_validationservice(self):
+        self.assertEqual(validationservice, batchvalidator.validationservice)
+
+    def test_settings(self):
+        self.assertEqual(settings, batchvalidator.settings)
+
+
+class FakeTable:
+
+    def __init__(self, nonces):
+        self.rows = {nonce: Row(nonce, 'ciphertext ' + nonce, 'unread') for nonce in nonces}
+        self.fetched = []
+
+    def fetch_named_tuple_by_nonce(self, nonce):
+        self.fetched.append(nonce)
+        return self.rows.get(nonce)
+
+
+class TestBatchValidator(unittest.TestCase):
+
+    def setUp(self):
+        self.service = validationservice.ValidationService(max_workers=4, max_pending=64, executor_type='thread')
+        self.addCleanup(self.service.shutdown)
+        self.nonces = ['a', 'b', 'c', 'd', 'e']
+        self.table = FakeTable(self.nonces)
+        self.x = batchvalidator.BatchValidator(self.table, 'key_dir', 'passphrase', self.service, window=2)
+        self.events = {}
+        patcher = patch.object(batchvalidator.validationservice, 'validate_message', self.job)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def job(self, payload_dict, key_dir, passphrase):
+        event = self.events.get(payload_dict['nonce'])
+        if event is not None:
+            event.wait(5)
+        if payload_dict['nonce'] == 'd':
+            raise OSError('gpg failed')
+        return validationservice.ValidationResult(True, None, dict(key_dir=key_dir, passphrase=passphrase,
+                                                                   ciphertext=payload_dict['ciphertext']), None)
+
+    def test_defaults(self):
+        x = batchvalidator.BatchValidator(self.table, 'key_dir', 'passphrase')
+        self.assertIs(x.service, validationservice.service)
+        self.assertEqual(x.window, settings.message_batch_window)
+
+    def test_validate_yields_result_per_nonce(self):
+        results = list(self.x.validate(['a', 'b', 'c']))
+        self.assertEqual(sorted(item.nonce for item in results), ['a', 'b', 'c'])
+        for item in results:
+            self.assertIs(item.validation.valid, True)
+            self.assertEqual(item.validation.data_dict, dict(key_dir='key_dir', passphrase='passphrase',
+                                                             ciphertext='ciphertext ' + item.nonce))
+
+    def test_validate_yields_in_completion_order(self):
+        self.events['a'] = threading.Event()
+        results = self.x.validate(['a', 'b'])
+        self.assertEqual(next(results).nonce, 'b')
+        self.events['a'].set()
+        self.assertEqual(next(results).nonce, 'a')
+
+    def test_validate_keeps_window_submitted(self):
+        self.events['a'] = threading.Event()
+        results = self.x.validate(self.nonces)
+        first = next(results)
+        self.assertEqual(first.nonce, 'b')
+        self.assertEqual(self.table.fetched, ['a', 'b'])
+        self.events['a'].set()
+        list(results)
+        self.assertEqual(self.table.fetched, self.nonces)
+
+    def test_validate_returns_invalid_result_for_failed_job(self):
+        results = {item.nonce: item.validation for item in self.x.validate(['d'])}
+        self.assertIs(results['d'].valid, False)
+        self.assertEqual(results['d'].error, 'gpg failed')
+
+    def test_validate_returns_invalid_result_for_missing_nonce(self):
+        results = list(self.x.validate(['xxx', 'a']))
+        self.assertEqual(results[0].nonce, 'xxx')
+        self.assertIs(results[0].validation.valid, False)
+        self.assertIsNotNone(results[0].validation.error)
+        self.assertIs(results[1].validation.valid, True)
+
+    def test_validate_cancels_pending_when_closed(self):
+        future = MagicMock()
+        self.x.service = MagicMock()
+        self.x.service.submit.return_value = future
+        results = self.x.validate(['a', 'xxx'])
+        self.assertEqual(next(results).nonce, 'xxx')
+        results.close()
+        future.cancel.assert_called_with()
+
+    def test_validate_empty(self):
+        self.assertEqual(list(self.x.validate([])), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -8,12 +8,16 @@ License: GPLv3
 """
 
 import unittest
+import hashlib
 from unittest.mock import MagicMock, patch
 from disappeer.net.message import messageserver
 import socketserver
+from disappeer.net.bases import poolingmixin
 import ssl
 from disappeer import settings
 from disappeer.net.bases import abstractserverfactory
+from disappeer.net.bases import admission
+from disappeer.net.bases import replaycache
 from disappeer.net.contact import contactprotocol
 from disappeer.constants import constants
 
@@ -57,8 +61,8 @@ class TestSSLMessageTCPServer(unittest.TestCase):
     def test_class_self(self):
         self.assertEqual(self.x_class, messageserver.SSLThreadedMessageTCPServer)
 
-    def test_threading_mixin_base(self):
-        self.assertIn(socketserver.ThreadingMixIn, self.base_list)
+    def test_pooling_mixin_base(self):
+        self.assertIn(poolingmixin.PoolingMixIn, self.base_list)
 
     def test_tcpserver_base(self):
         self.assertIn(socketserver.TCPServer, self.base_list)
@@ -83,7 +87,15 @@ class TestSSLMessageRequestHandler(unittest.TestCase):
         self.request = MagicMock()
         self.client_address = MagicMock()
         self.server = MagicMock()
+        self.server.get_request_count.return_value = 1
         self.mocked_contact_protocol = messageserver.contactprotocol.ContactProtocol = MagicMock(spec=contactprotocol.ContactProtocol(self.request))
+        # Unbudgeted controller, so tests neither share nor drain the class level budgets
+        admission_patcher = patch.object(messageserver.SSLMessageRequestHandler, 'admission', admission.AdmissionController(dict()))
+        admission_patcher.start()
+        self.addCleanup(admission_patcher.stop)
+        replay_patcher = patch.object(messageserver.SSLMessageRequestHandler, 'replay_cache', replaycache.ReplayCache())
+        replay_patcher.start()
+        self.addCleanup(replay_patcher.stop)
         self.x = messageserver.SSLMessageRequestHandler(self.request, self.client_address, self.server)
 
     def test_instance(self):
@@ -117,6 +129,82 @@ class TestSSLMessageRequestHandler(unittest.TestCase):
         result = self.x.handle()
         self.assertIs(result, False)
 
+    def test_handle_request_returns_false_without_validation_when_not_admitted(self):
+        target = self.x.dict_keys_are_valid = MagicMock()
+        self.x.admission = MagicMock()
+        self.x.admission.admit.return_value = False
+        self.x.protocol.process_incoming = MagicMock(return_value=dict(nonce='abc'))
+        self.x.protocol.incoming_length = 10
+        result = self.x.handle_request()
+        self.assertIs(result, False)
+        self.assertFalse(target.called)
+        self.x.admission.admit.assert_called_with(size=10, nonce='abc')
+
+    def test_handle_request_acks_replay_without_queueing(self):
+        payload = dict(ciphertext='ciphertext', nonce='abc')
+        self.x.protocol.process_incoming = MagicMock(return_value=payload)
+        self.x.protocol.incoming_length = 10
+        self.x.replay_cache.add(self.x.build_replay_key(payload))
+        target = self.x.put_to_queue = MagicMock()
+        result = self.x.handle_request()
+        self.assertIs(result, True)
+        self.assertFalse(target.called)
+        self.x.protocol.send_ack.assert_called_with(self.x.build_response_dict(payload))
+
+    def test_handle_request_queues_first_delivery_once(self):
+        payload = dict(ciphertext='ciphertext', nonce='abc')
+        self.x.protocol.process_incoming = MagicMock(return_value=payload)
+        self.x.protocol.incoming_length = 10
+        target = self.x.put_to_queue = MagicMock()
+        self.x.handle_request()
+        self.x.handle_request()
+        self.assertEqual(target.call_count, 1)
+
+    def test_message_queued_when_ack_fails_and_resend_only_acked(self):
+        payload = dict(ciphertext='ciphertext', nonce='abc')
+        self.x.protocol.process_incoming = MagicMock(return_value=payload)
+        self.x.protocol.incoming_length = 10
+        self.x.protocol.send_ack = MagicMock(side_effect=[BrokenPipeError(), None])
+        self.x.server = MagicMock()
+        with self.assertRaises(BrokenPipeError):
+            self.x.handle_request()
+        result = self.x.handle_request()
+        self.assertIs(result, True)
+        self.assertEqual(self.x.server.queue.put.call_count, 1)
+        self.assertEqual(self.x.server.queue.put.call_args[0][0]['payload'], payload)
+        self.assertEqual(self.x.protocol.send_ack.call_count, 2)
+
+    def test_resend_queued_when_queueing_failed(self):
+        payload = dict(ciphertext='ciphertext', nonce='abc')
+        self.x.protocol.process_incoming = MagicMock(return_value=payload)
+        self.x.protocol.incoming_length = 10
+        self.x.protocol.send_ack = MagicMock()
+        self.x.server = MagicMock()
+        self.x.server.queue.put = MagicMock(side_effect=[OSError(), None])
+        with self.assertRaises(OSError):
+            self.x.handle_request()
+        self.x.handle_request()
+        self.assertEqual(self.x.server.queue.put.call_count, 2)
+        self.assertEqual(self.x.protocol.send_ack.call_count, 1)
+
+    def test_replay_not_charged_to_nonce_budget(self):
+        self.x.admission = MagicMock()
+        self.x.protocol.incoming_length = 10
+        self.x.is_admitted(dict(nonce='abc'), True)
+        self.x.admission.admit.assert_called_with(size=10, nonce=None)
+
+    def test_build_replay_key(self):
+        key = self.x.build_replay_key(dict(ciphertext='ciphertext', nonce='abc'))
+        self.assertEqual(key, ('abc', hashlib.sha256(b'ciphertext').hexdigest()))
+        self.assertIsNone(self.x.build_replay_key(dict(nonce='abc')))
+        self.assertIsNone(self.x.build_replay_key('xxx'))
+
+    def test_is_admitted_ignores_non_string_nonce(self):
+        self.x.admission = MagicMock()
+        self.x.protocol.incoming_length = 10
+        self.x.is_admitted(dict(nonce=['abc']))
+        self.x.admission.admit.assert_called_with(size=10, nonce=None)
+
     def test_check_dict_keys_returns_true_on_valid_input(self):
         target_list = ['ciphertext', 'nonce']
         valid_dict = dict(ciphertext='',
@@ -141,13 +229,57 @@ class TestSSLMessageRequestHandler(unittest.TestCase):
         sub = self.x.dict_keys_are_valid = MagicMock(return_value=True)
         sub1 = self.x.protocol.process_incoming = MagicMock(return_value=dict())
         self.x.handle()
-        target.assert_called_with(sub1.return_value)
+        target.assert_called_with(sub1.return_value, None)
 
-    def test_handle_valid_result_calls_send_response(self):
-        mock_result = dict()
-        target = self.x.send_response = MagicMock()
-        self.x.handle_valid_result(mock_result)
-        target.assert_called_with(mock_result)
+    def test_handle_request_returns_false_on_invalid_keys(self):
+        sub = self.x.dict_keys_are_valid = MagicMock(return_value=False)
+        sub1 = self.x.protocol.process_incoming = MagicMock(return_value=dict())
+        result = self.x.handle_request()
+        self.assertIs(result, False)
+
+    def test_handle_request_returns_true_on_valid_result(self):
+        sub = self.x.handle_valid_result = MagicMock()
+        sub1 = self.x.dict_keys_are_valid = MagicMock(return_value=True)
+        sub2 = self.x.protocol.process_incoming = MagicMock(return_value=dict())
+        result = self.x.handle_request()
+        self.assertIs(result, True)
+
+    def test_keep_alive_permitted_until_last_request(self):
+        self.assertEqual(self.x.keep_alive_permitted(1), settings.peer_keep_alive)
+        self.assertFalse(self.x.keep_alive_permitted(settings.keep_alive_max_requests))
+
+    @patch.object(messageserver.settings, 'peer_keep_alive', False)
+    def test_keep_alive_not_permitted_when_disabled(self):
+        self.assertFalse(self.x.keep_alive_permitted(1))
+
+    def test_handle_keeps_connection_open_when_keep_alive_offered(self):
+        self.x.handle_request = MagicMock(return_value=True)
+        self.x.keep_alive_permitted = MagicMock(return_value=True)
+        self.x.server.get_request_count.return_value = 3
+        self.x.handle()
+        self.x.keep_alive_permitted.assert_called_with(3)
+        self.assertIs(self.x.keep_open, True)
+        self.assertEqual(self.x.handle_request.call_count, 1)
+
+    def test_handle_closes_connection_without_keep_alive(self):
+        self.x.handle_request = MagicMock(return_value=True)
+        self.x.keep_alive_permitted = MagicMock(return_value=False)
+        self.x.handle()
+        self.assertIs(self.x.keep_open, False)
+
+    def test_handle_closes_connection_on_invalid_request(self):
+        self.x.keep_open = False
+        self.x.handle_request = MagicMock(return_value=False)
+        self.x.keep_alive_permitted = MagicMock(return_value=True)
+        self.assertIs(self.x.handle(), False)
+        self.assertIs(self.x.keep_open, False)
+
+    def test_handle_valid_result_queues_before_ack(self):
+        calls = []
+        self.x.put_to_queue = MagicMock(side_effect=lambda item: calls.append('queue'))
+        self.x.send_response = MagicMock(side_effect=lambda item: calls.append('ack'))
+        self.x.handle_valid_result(dict())
+        self.assertEqual(calls, ['queue', 'ack'])
 
     def test_handle_valid_result_calls_put_to_queue(self):
         mock_result = dict()
@@ -17,7 +17,6 @@ from disappeer.gpg.agents import detachedverifier
 from disappeer.gpg.agents import keyring
 from disappeer.gpg.agents import signer
 import json
-import tempfile
 import copy
 
 
@@ -32,9 +31,6 @@ class TestImports(unittest.TestCase):
     def test_detachedverifier(self):
         self.assertEqual(detachedverifier, messagevalidator.detachedverifier)
 
-    def test_tempfile(self):
-        self.assertEqual(tempfile, messagevalidator.tempfile)
-
 
 gpg_pub_key_string = '''-----BEGIN PGP PUBLIC KEY BLOCK-----
 
@@ -7,26 +7,48 @@ Copyright (C) 2018 Disappeer Labs
 License: GPLv3
 """
 
+import functools
+from disappeer import settings
 from disappeer.net.contact import contactrequestserver
 from disappeer.net.contactresponse import contactresponseserver
 from disappeer.net.message import messageserver
 from disappeer.net.bases import servercontroller
 from disappeer.net.bases import threadmanagers
+from disappeer.net.bases import asyncserver
 
 
 class NetworkServers:
 
-    def __init__(self, queue):
+    def __init__(self, queue, engine=None):
         self.queue = queue
+        self.engine = engine or settings.network_server_engine
+        self.async_engine = None
+        manager = self.config_server_manager()
         self.contact_request_server = servercontroller.ServerController(self.queue,
                                                                         contactrequestserver.ContactRequestServerFactory,
-                                                                        threadmanagers.ServerThreadManager)
+                                                                        manager)
         self.contact_response_server = servercontroller.ServerController(self.queue,
                                                                          contactresponseserver.ContactResponseServerFactory,
-                                                                         threadmanagers.ServerThreadManager)
+                                                                         manager)
         self.message_server = servercontroller.ServerController(self.queue,
                                                                 messageserver.MessageServerFactory,
-                                                                threadmanagers.ServerThreadManager)
+                                                                manager)
+
+    def config_server_manager(self):
+        """
+        Return the manager class for the configured engine: a thread per server for 'threaded',
+        or a manager bound to one shared event loop for 'asyncio'.
+        Raises ValueError for unix_socket_listen with an engine that has no Unix listener.
+        """
+        if settings.unix_socket_listen and self.engine != 'asyncio':
+            raise ValueError("unix_socket_listen needs the asyncio network server engine, not: {}".format(self.engine))
+        if self.engine == 'asyncio':
+            self.async_engine = asyncserver.AsyncServerEngine()
+            return functools.partial(asyncserver.AsyncServerManager, engine=self.async_engine)
+        elif self.engine == 'threaded':
+            return threadmanagers.ServerThreadManager
+        else:
+            raise ValueError("Unknown network server engine: {}".format(self.engine))
 
     def start_network_services(self):
         self.contact_request_server.start()
@@ -38,6 +60,23 @@ class NetworkServers:
         self.contact_response_server.stop()
         self.message_server.stop()
 
+    def drain_network_services(self, timeout=None):
+        """
+        Stop the servers, letting accepted connections finish within timeout seconds.
+        Returns each server's drain report, keyed by server name.
+        """
+        controllers = [self.contact_request_server, self.contact_response_server, self.message_server]
+        result = {item.factory.name: item.drain(timeout) for item in controllers}
+        return result
+
+    def restart_network_services(self):
+        """
+        Restart the servers on their listening sockets, connections in flight are served by the old servers
+        """
+        self.contact_request_server.restart()
+        self.contact_response_server.restart()
+        self.message_server.restart()
+
     def are_running(self):
         request = self.contact_request_server.get_status()
         response = self.contact_response_server.get_status()
@@ -45,3 +84,18 @@ class NetworkServers:
         result = all([request, response, message])
         return result
 
+    def get_server_stats(self):
+        """
+        Worker pool queue depth and accept/reject counters, keyed by server name
+        """
+        controllers = [self.contact_request_server, self.contact_response_server, self.message_server]
+        result = {item.factory.name: item.get_stats() for item in controllers}
+        return result
+
+    def get_admission_stats(self):
+        """
+        Admitted and rejected request counters of each server's admission controller, keyed by server name
+        """
+        controllers = [self.contact_request_server, self.contact_response_server, self.message_server]
+        result = {item.factory.name: item.factory.request_handler_obj.admission.get_stats() for item in controllers}
+        return result
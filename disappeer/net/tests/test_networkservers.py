@@ -15,10 +15,18 @@ from disappeer.net.contactresponse import contactresponseserver
 from disappeer.net.message import messageserver
 from disappeer.net.bases import servercontroller
 from disappeer.net.bases import threadmanagers
+from disappeer.net.bases import asyncserver
+from disappeer import settings
 
 
 class TestImports(unittest.TestCase):
 
+    def test_asyncserver(self):
+        self.assertEqual(asyncserver, networkservers.asyncserver)
+
+    def test_settings(self):
+        self.assertEqual(settings, networkservers.settings)
+
     def test_contactrequestserver(self):
         self.assertEqual(contactrequestserver, networkservers.contactrequestserver)
 
@@ -140,3 +148,74 @@ class TestClassBasics(unittest.TestCase):
         self.assertIs(result, False)
 
 
+class TestServerEngineSelection(unittest.TestCase):
+
+    def setUp(self):
+        self.queue = MagicMock()
+
+    def test_default_engine_from_settings(self):
+        x = networkservers.NetworkServers(self.queue)
+        self.assertEqual(x.engine, settings.network_server_engine)
+
+    def test_threaded_engine_uses_server_thread_managers(self):
+        x = networkservers.NetworkServers(self.queue, engine='threaded')
+        self.assertIsNone(x.async_engine)
+        self.assertIsInstance(x.message_server.server, threadmanagers.ServerThreadManager)
+
+    def test_asyncio_engine_creates_shared_async_engine(self):
+        x = networkservers.NetworkServers(self.queue, engine='asyncio')
+        self.assertIsInstance(x.async_engine, asyncserver.AsyncServerEngine)
+
+    def test_asyncio_engine_servers_share_engine(self):
+        x = networkservers.NetworkServers(self.queue, engine='asyncio')
+        servers = [x.contact_request_server, x.contact_response_server, x.message_server]
+        for item in servers:
+            self.assertIsInstance(item.server, asyncserver.AsyncServerManager)
+            self.assertIs(item.server.engine, x.async_engine)
+
+    def test_unknown_engine_raises_value_error(self):
+        with self.assertRaises(ValueError):
+            networkservers.NetworkServers(self.queue, engine='xxx')
+
+    def test_unix_socket_listen_with_threaded_engine_raises_value_error(self):
+        with patch.object(settings, 'unix_socket_listen', True):
+            with self.assertRaises(ValueError):
+                networkservers.NetworkServers(self.queue, engine='threaded')
+
+    def test_unix_socket_listen_with_asyncio_engine(self):
+        with patch.object(settings, 'unix_socket_listen', True):
+            x = networkservers.NetworkServers(self.queue, engine='asyncio')
+        self.assertIsInstance(x.async_engine, asyncserver.AsyncServerEngine)
+
+    def test_get_server_stats_keyed_by_server_name(self):
+        x = networkservers.NetworkServers(self.queue, engine='threaded')
+        result = x.get_server_stats()
+        target = {'Contact_Request_Server': dict(),
+                  'Contact_Response_Server': dict(),
+                  'Message_Server': dict()}
+        self.assertEqual(result, target)
+
+    def test_drain_network_services_keyed_by_server_name(self):
+        x = networkservers.NetworkServers(self.queue, engine='threaded')
+        controllers = [x.contact_request_server, x.contact_response_server, x.message_server]
+        for item in controllers:
+            item.drain = MagicMock(return_value=item.factory.name)
+        result = x.drain_network_services(5)
+        for item in controllers:
+            item.drain.assert_called_with(5)
+        self.assertEqual(result, {name: name for name in result})
+        self.assertEqual(len(result), 3)
+
+    def test_restart_network_services_restarts_each_server(self):
+        x = networkservers.NetworkServers(self.queue, engine='threaded')
+        controllers = [x.contact_request_server, x.contact_response_server, x.message_server]
+        for item in controllers:
+            item.restart = MagicMock()
+        x.restart_network_services()
+        self.assertTrue(all(item.restart.called for item in controllers))
+
+    def test_get_admission_stats_keyed_by_server_name(self):
+        x = networkservers.NetworkServers(self.queue, engine='threaded')
+        result = x.get_admission_stats()
+        self.assertEqual(set(result), {'Contact_Request_Server', 'Contact_Response_Server', 'Message_Server'})
+        self.assertTrue(all('rejected_by' in item for item in result.values()))
@@ -19,10 +19,10 @@ class DisplaySentRequestController(basepopupcontroller.BasePopupController):
         super().__init__(root)
         self.gpg_pub_key = gpg_pub_key_string
         self.address = onion_address
-        self.pubkey_validator = gpgpubkeyvalidator.GPGPubKeyValidator(self.gpg_pub_key)
-        if self.pubkey_validator.valid:
+        self.key_dict = gpgpubkeyvalidator.read_key_dict(self.gpg_pub_key)
+        if self.key_dict is not None:
             self.view = displaysentrequestview.DisplaySentRequestView(self.window,
-                                                                      self.pubkey_validator.key_dict,
+                                                                      self.key_dict,
                                                                       self.address)
             self.config_event_bindings()
         else:
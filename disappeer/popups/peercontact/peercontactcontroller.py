@@ -17,10 +17,10 @@ class PeerContactController(basepopupcontroller.BasePopupController):
     def __init__(self, root, data_record):
         super().__init__(root)
         self.data_record = data_record
-        self.pubkey_validator = gpgpubkeyvalidator.GPGPubKeyValidator(self.data_record.gpg_pub_key)
+        self.key_dict = gpgpubkeyvalidator.read_key_dict(self.data_record.gpg_pub_key)
 
-        if self.pubkey_validator.valid:
-            self.view = peercontactview.PeerContactView(self.window, self.pubkey_validator.key_dict)
+        if self.key_dict is not None:
+            self.view = peercontactview.PeerContactView(self.window, self.key_dict)
             self.config_event_bindings()
         else:
             self.handle_invalid_data_record()
@@ -73,8 +73,7 @@ class TestClassBasics(unittest.TestCase):
         self.click_command = "<ButtonRelease-1>"
         self.onion = 'xyz.onion'
         self.root = tkinter.Tk()
-        with patch.object(displaysentrequestcontroller.gpgpubkeyvalidator, 'GPGPubKeyValidator'):
-            self.x = displaysentrequestcontroller.DisplaySentRequestController(self.root, gpg_pub_key_string, self.onion)
+        self.x = displaysentrequestcontroller.DisplaySentRequestController(self.root, gpg_pub_key_string, self.onion)
 
     def test_instance(self):
         self.assertIsInstance(self.x, displaysentrequestcontroller.DisplaySentRequestController)
@@ -95,13 +94,14 @@ class TestClassBasics(unittest.TestCase):
     def test_host_addr_attribute_set(self):
         self.assertEqual(self.x.address, self.onion)
 
-    def test_validator_attribute_is_validator(self):
+    def test_key_dict_attribute_is_parsed_pubkey(self):
         self.x = displaysentrequestcontroller.DisplaySentRequestController(self.root, gpg_pub_key_string, self.onion)
-        self.assertIsInstance(self.x.pubkey_validator, gpgpubkeyvalidator.GPGPubKeyValidator)
+        self.assertEqual(self.x.key_dict, gpgpubkeyvalidator.read_key_dict(gpg_pub_key_string))
 
-    def test_validator_called_with_pubkey(self):
+    @patch.object(displaysentrequestcontroller.gpgpubkeyvalidator, 'read_key_dict')
+    def test_key_dict_parsed_with_pubkey(self, target):
         self.x = displaysentrequestcontroller.DisplaySentRequestController(self.root, gpg_pub_key_string, self.onion)
-        self.assertEqual(self.x.pubkey_validator.target_pubkey, self.x.gpg_pub_key)
+        target.assert_called_with(gpg_pub_key_string)
 
     def test_view_instantiated_if_validator_is_valid(self):
         self.assertIsInstance(self.x.view, displaysentrequestview.DisplaySentRequestView)
@@ -109,7 +109,7 @@ class TestClassBasics(unittest.TestCase):
     def test_view_instantiated_with_window_and_validator_key_dict(self):
         self.assertEqual(self.x.view.window, self.x.window)
         self.assertEqual(self.x.view.address, self.x.address)
-        self.assertEqual(self.x.view.key_dict, self.x.pubkey_validator.key_dict)
+        self.assertEqual(self.x.view.key_dict, self.x.key_dict)
 
     def test_config_event_bindings_calls_bind_on_cancel_button(self):
         self.x.view = MagicMock()
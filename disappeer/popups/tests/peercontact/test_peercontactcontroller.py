@@ -74,8 +74,7 @@ class TestClassBasics(unittest.TestCase):
         self.data_record = types.SimpleNamespace(gpg_pub_key=gpg_pub_key_string)
         self.invalid_record = types.SimpleNamespace(gpg_pub_key='xxx')
         self.root = tkinter.Tk()
-        with patch.object(peercontactcontroller.gpgpubkeyvalidator, 'GPGPubKeyValidator'):
-            self.x = peercontactcontroller.PeerContactController(self.root, self.data_record)
+        self.x = peercontactcontroller.PeerContactController(self.root, self.data_record)
 
     def test_instance(self):
         self.assertIsInstance(self.x, peercontactcontroller.PeerContactController)
@@ -93,20 +92,21 @@ class TestClassBasics(unittest.TestCase):
         target = 'Peer Contact'
         self.assertEqual(target, self.x.title)
 
-    def test_validator_attribute_is_validator(self):
+    def test_key_dict_attribute_is_parsed_pubkey_from_data_record(self):
         self.x = peercontactcontroller.PeerContactController(self.root, self.data_record)
-        self.assertIsInstance(self.x.pubkey_validator, gpgpubkeyvalidator.GPGPubKeyValidator)
+        self.assertEqual(self.x.key_dict, gpgpubkeyvalidator.read_key_dict(self.data_record.gpg_pub_key))
 
-    def test_validator_called_with_pubkey_from_data_record(self):
+    @patch.object(peercontactcontroller.gpgpubkeyvalidator, 'read_key_dict')
+    def test_key_dict_parsed_with_pubkey_from_data_record(self, target):
         self.x = peercontactcontroller.PeerContactController(self.root, self.data_record)
-        self.assertEqual(self.x.pubkey_validator.target_pubkey, self.data_record.gpg_pub_key)
+        target.assert_called_with(self.data_record.gpg_pub_key)
 
     def test_view_instantiated_if_validator_is_valid(self):
         self.assertIsInstance(self.x.view, peercontactview.PeerContactView)
 
     def test_view_instantiated_with_window_and_validator_key_dict(self):
         self.assertEqual(self.x.view.window, self.x.window)
-        self.assertEqual(self.x.view.key_dict, self.x.pubkey_validator.key_dict)
+        self.assertEqual(self.x.view.key_dict, self.x.key_dict)
 
     @patch.object(peercontactcontroller.PeerContactController, 'handle_invalid_data_record')
     def test_init_returns_false_if_invalid_input(self, target):
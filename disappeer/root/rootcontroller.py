@@ -21,6 +21,8 @@ from disappeer.utilities.logger import log
 import functools
 from disappeer.executor import controllermediator
 from disappeer.executor import commandclient
+from disappeer.net.bases import validationservice
+from disappeer.utilities import metrics
 
 
 class RootController(queueconsumer.QueueConsumer):
@@ -62,6 +64,7 @@ class RootController(queueconsumer.QueueConsumer):
                                                                          self.console_controller,
                                                                          self.root_params)
         self.command_client = commandclient.CommandClient(self.controller_mediator)
+        metrics.start_exporter()
 
     def config_event_bindings(self):
         pass
@@ -218,6 +221,8 @@ class RootController(queueconsumer.QueueConsumer):
         except AttributeError as err:
             pass
         self.tornet_controller.tor_proxy_controller.stop_all_proxies()
+        validationservice.service.shutdown(wait=False)
+        metrics.stop_exporter()
         self.root.quit()
 
     ########################################
@@ -69,3 +69,6 @@ class RootParameters:
 
     def add_session_passphrase_observable_callback(self, func):
         self.host_key_session_passphrase_observable.add_callback(func)
+
+    def add_host_key_observable_callback(self, func):
+        self.host_key_observer.add_callback(func)
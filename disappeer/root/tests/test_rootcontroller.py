@@ -160,9 +160,13 @@ class TestRootControllerBasicsAndQueueMethods(RootSetupClass):
         target_net = self.x.tornet_controller.stop_network_services = MagicMock()
         target_tor = self.x.tornet_controller.tor_proxy_controller.stop_all_proxies = MagicMock()
         target_root = self.x.root.quit = MagicMock()
-        self.x.exit()
+        with patch.object(rootcontroller.validationservice, 'service') as target_service, \
+                patch.object(rootcontroller.metrics, 'stop_exporter') as target_metrics:
+            self.x.exit()
         target_net.assert_called_with()
         target_tor.assert_called_with()
+        target_service.shutdown.assert_called_with(wait=False)
+        target_metrics.assert_called_with()
         target_root.assert_called_with()
 
 
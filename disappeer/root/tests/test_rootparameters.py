@@ -132,3 +132,10 @@ class TestClassBasics(unittest.TestCase):
 
         self.x.add_session_passphrase_observable_callback(hello)
         self.assertIn(hello, self.x.host_key_session_passphrase_observable.callbacks)
+
+    def test_add_host_key_observable_callback_adds_callback(self):
+        def hello():
+            pass
+
+        self.x.add_host_key_observable_callback(hello)
+        self.assertIn(hello, self.x.host_key_observer.callbacks)
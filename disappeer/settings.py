@@ -24,6 +24,113 @@ port_contact_request_server = 16661
 port_contact_response_server = 16662
 port_message_server = 16663
 port_tor_controller = 9051
+socks_proxy_host = '127.0.0.1'
+socks_proxy_port = 9050
+# Client transport unless a client's argnamespace sets one: 'socks' (Tor), 'tcp' (LAN, loopback) or 'unix'
+client_transport = 'socks'
+# Unix domain sockets for same-host instances, one per server port, served by the asyncio engine if enabled,
+# the threaded engine refuses to start with it. Clients reach a peer's sockets with host 'unix:<its unix_socket_dir>'
+unix_socket_dir = root_data_dir + 'sockets/'
+unix_socket_listen = False
+
+# Network server backend, 'threaded' (socketserver) or 'asyncio' (single event loop)
+network_server_engine = 'threaded'
+# Worker threads shared by all asyncio servers for request validation
+async_server_max_workers = 8
+
+# Per-server worker pool for the threaded engine, with server_max_queued_requests also the asyncio
+# engine's per-server bound on requests handled or waiting for a worker
+server_max_workers = 8
+# Accepted connections allowed to wait for a free worker before new ones are rejected
+server_max_queued_requests = 16
+# Listen backlog of connections not yet accepted
+server_accept_backlog = 16
+# Seconds a draining or restarted server gives accepted connections to finish before shutting them down
+server_drain_timeout = 10
+
+# Carry several request/ACK exchanges over one peer connection, negotiated through the ACK
+peer_keep_alive = True
+# Seconds an idle kept-alive connection is held open, it waits on a selector thread, not a server worker
+keep_alive_idle_timeout = 30
+# Idle kept-alive connections per server, further connections are closed after their exchange
+server_max_idle_connections = 64
+# Exchanges served over one connection before the server closes it
+keep_alive_max_requests = 100
+# Seconds a peer may take to send a frame header, a frame payload, and a whole request including chunks.
+# Deadlines are absolute, a peer trickling bytes cannot extend them
+header_read_timeout = 30
+payload_read_timeout = 60
+request_read_timeout = 300
+# Accepted connections per server that have not sent request data yet, further connections are dropped.
+# They wait on one selector thread per server, not on pool workers
+max_half_open_connections = 16
+# Inbound admission budgets per server, dimension: (tokens per second, burst), checked before validation.
+# 'request' and 'bytes' are server wide, 'nonce' and 'fingerprint' (claimed public key) per observed value,
+# claimed keys the key parser cannot read share one fingerprint budget
+admission_budgets = dict(contact_request=dict(request=(0.5, 10),
+                                              bytes=(64 * 1024, 1024 * 1024),
+                                              nonce=(1 / 600, 1),
+                                              fingerprint=(1 / 60, 3)),
+                         contact_response=dict(request=(1, 20),
+                                               bytes=(256 * 1024, 4 * 1024 * 1024),
+                                               nonce=(1 / 600, 2)),
+                         message=dict(request=(10, 100),
+                                      bytes=(1024 * 1024, 16 * 1024 * 1024),
+                                      nonce=(1 / 600, 2)))
+# Received messages remembered by nonce and ciphertext digest, a resend is ACKed and dropped without gpg work.
+# Entries kept, seconds each is kept, and a file to persist them across restarts or None for memory only
+replay_cache_max_entries = 10000
+replay_cache_ttl = 7 * 24 * 3600
+replay_cache_path = None
+# Also write the contact response nonces to the server sync db file, the server itself reads an in-memory index
+server_sync_db_persist = True
+# Largest chunked payload accepted from a peer, chunks are spooled to disk while receiving
+max_stream_length = 16 * 1024 * 1024
+# Send binary payload frames to peers that advertised support, JSON otherwise
+binary_payload_codec = True
+# Compress payloads to peers that advertised support: 'zlib', 'lzma', or None to disable
+payload_compression = 'zlib'
+# zlib level or lzma preset
+payload_compression_level = 6
+# Encoded payloads shorter than this many bytes are sent uncompressed
+payload_compression_threshold = 1024
+# Client connection pool: idle connections kept per peer and in total, and the longest idle time in seconds
+connection_pool_max_per_peer = 2
+connection_pool_max_connections = 32
+connection_pool_max_idle = 60
+# Outbound sends running at once across all peers, sends to one peer always run in order
+client_executor_max_workers = 4
+# Outbound sends running at once to one peer host across its servers, a slow peer cannot hold more workers
+client_executor_max_per_host = 1
+# Seconds a client send may take to connect to a peer, including building the Tor circuit,
+# and to wait on each read or write after
+client_connect_timeout = 60
+client_io_timeout = 60
+# Pool for gpg heavy request validation, 'process' (spreads over cores) or 'thread'
+validation_executor = 'process'
+# Validation jobs run at once, and jobs handed to the pool at once, further jobs wait in the service's backlog
+# up to validation_max_backlog, past that a job is rejected with an invalid result
+validation_max_workers = 4
+validation_max_pending = 64
+validation_max_backlog = 256
+# Messages a batch validation keeps submitted at once, the rest are read from the db as these complete
+message_batch_window = 16
+# Metrics snapshot in the Prometheus text format: a file rewritten every interval seconds,
+# and/or a Unix socket answering each connection with a snapshot. None disables either
+metrics_export_path = None
+metrics_export_socket = None
+metrics_export_interval = 15
+# Home dirs whose configured gnupg.GPG object is kept for reuse by gpg agents
+gpg_pool_max_homedirs = 32
+# Home dirs whose indexed key lists are kept, each until its keyring files change
+key_index_max_homedirs = 32
+# Temporary gpg home dirs kept for reuse by key validation and contact/message building, wiped between uses,
+# and whether to create them on tmpfs (/dev/shm) if available
+temp_keyring_pool_size = 8
+temp_keyring_tmpfs = True
+
+# Longest armored public key accepted from peers, checked before gpg sees the key
+max_public_key_length = 64 * 1024
 
 gpg_host_pubkey = root_data_dir + 'host_gpg_pubkey.gpg'
 
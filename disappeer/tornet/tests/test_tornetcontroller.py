@@ -104,9 +104,6 @@ class TestClassBasics(unittest.TestCase):
         self.assertIsInstance(self.x.tor_proxy_controller, torproxycontroller.TorProxyController)
         self.assertEqual(self.x.queue, self.x.tor_proxy_controller.queue)
 
-    def test_init_patches_contact_response_server_get_sync_db_path_with_database_facade_method(self):
-        self.assertEqual(tornetcontroller.networkservers.contactresponseserver.SSLThreadedContactResponseTCPServer.get_sync_db_path, self.x.root_params.database_facade.get_server_sync_db_path)
-
     def test_net_servers_attr_set_with_root_queue(self):
         self.assertIsInstance(self.x.net_servers, networkservers.NetworkServers)
         self.assertEqual(self.x.net_servers.queue, self.x.root_queue)
@@ -154,6 +151,11 @@ class TestClassBasics(unittest.TestCase):
         self.x.config_data_context()
         target_method.assert_called_with(target_arg)
 
+    def test_config_data_context_adds_host_key_observable_callback_to_root_params(self):
+        target_method = self.x.root_params.add_host_key_observable_callback = MagicMock()
+        self.x.config_data_context()
+        target_method.assert_called_with(self.x.host_key_observable_callback)
+
     def test_config_data_context_adds_session_passphrase_observable_callback_to_root_params_session_passphrase_obs(self):
         target_method = self.x.root_params.add_session_passphrase_observable_callback = MagicMock()
         target_arg = self.x.session_passphrase_observable_callback = MagicMock()
@@ -217,7 +219,14 @@ class TestClassBasics(unittest.TestCase):
         self.x.view.get_net_server_radio_var = MagicMock(return_value=0)
         target = self.x.view.set_net_server_status_var = MagicMock()
         self.x.net_server_radio_button_clicked(None)
-        target.assert_called_with('Stopped')
+        target.assert_called_with('Stopping')
+
+    def test_net_server_radio_button_clicked_disables_on_button_until_drained_if_off_clicked(self):
+        sub = self.x.stop_network_services = MagicMock()
+        self.x.view.get_net_server_radio_var = MagicMock(return_value=0)
+        target = self.x.view.disable_net_server_on_button = MagicMock()
+        self.x.net_server_radio_button_clicked(None)
+        target.assert_called_with()
 
     def test_net_server_radio_button_clicked_calls_view_disable_enable_handler_if_off_clicked(self):
         sub = self.x.stop_network_services = MagicMock()
@@ -232,11 +241,55 @@ class TestClassBasics(unittest.TestCase):
         self.x.start_network_services()
         target.assert_called_with()
 
-    def test_stop_network_services_calls_stop_services_on_net_servers(self):
-        target = self.x.net_servers.stop_network_services = MagicMock()
+    @patch('disappeer.tornet.tornetcontroller.threading.Thread')
+    def test_stop_network_services_starts_drain_worker_thread(self, mocked):
         self.x.stop_network_services()
+        mocked.assert_called_with(name=constants.command_list.Network_Servers_Drained,
+                                  target=self.x._drain_network_services_worker)
+        self.assertTrue(mocked.return_value.start.called)
+
+    def test_drain_network_services_worker_drains_with_settings_timeout_and_puts_report_on_queue(self):
+        report = dict(Contact_Request_Server=dict(drained=True, seconds=0, cut_off=[], queued=0))
+        target = self.x.net_servers.drain_network_services = MagicMock(return_value=report)
+        self.x.queue = queue.Queue()
+        self.x._drain_network_services_worker()
+        target.assert_called_with(tornetcontroller.settings.server_drain_timeout)
+        payload = self.x.queue.get_nowait()
+        self.assertEqual(payload, dict(desc=constants.command_list.Network_Servers_Drained, report=report))
+
+    def test_handle_network_servers_drained_sets_status_and_enables_on_button(self):
+        report = dict(Contact_Request_Server=dict(drained=True, seconds=0, cut_off=[], queued=0))
+        status = self.x.view.set_net_server_status_var = MagicMock()
+        button = self.x.view.enable_net_server_on_button = MagicMock()
+        alert = self.x.launch_alert_log = MagicMock()
+        self.x.handle_network_servers_drained(dict(report=report))
+        status.assert_called_with('Stopped')
+        button.assert_called_with()
+        self.assertFalse(alert.called)
+
+    def test_handle_network_servers_drained_alerts_on_cut_off_connections(self):
+        report = dict(Contact_Request_Server=dict(drained=True, seconds=0, cut_off=[], queued=0),
+                      Message_Server=dict(drained=False, seconds=10, cut_off=[('127.0.0.1', 5555)], queued=0))
+        sub = self.x.view.set_net_server_status_var = MagicMock()
+        alert = self.x.launch_alert_log = MagicMock()
+        self.x.handle_network_servers_drained(dict(report=report))
+        msg = alert.call_args[0][0]
+        self.assertIn('Message_Server', msg)
+        self.assertIn('127.0.0.1', msg)
+        self.assertNotIn('Contact_Request_Server', msg)
+
+    def test_host_key_observable_callback_restarts_running_servers(self):
+        sub = self.x.net_servers.are_running = MagicMock(return_value=True)
+        target = self.x.net_servers.restart_network_services = MagicMock()
+        self.x.host_key_observable_callback(MagicMock())
         target.assert_called_with()
 
+    def test_host_key_observable_callback_leaves_stopped_servers_alone(self):
+        sub = self.x.net_servers.are_running = MagicMock(return_value=False)
+        target = self.x.net_servers.restart_network_services = MagicMock()
+        self.x.host_key_observable_callback(MagicMock())
+        self.assertFalse(target.called)
+
     def test_tor_proxy_radio_button_clicked_calls_is_session_passphrase_none_returns_none_if_true(self):
         target = self.x.is_session_passphrase_none = MagicMock(return_value=True)
         result = self.x.tor_proxy_radio_button_clicked(None)
@@ -436,6 +489,12 @@ class TestClassBasics(unittest.TestCase):
         self.x.handle_queue_payload(payload)
         target.assert_called_with(payload)
 
+    def test_handle_queue_payload_calls_handle_network_servers_drained_with_given_payload(self):
+        payload = dict(desc=constants.command_list.Network_Servers_Drained, report=dict())
+        target = self.x.handle_network_servers_drained = MagicMock()
+        self.x.handle_queue_payload(payload)
+        target.assert_called_with(payload)
+
     def test_handle_queue_payload_calls_handle_tor_proxy_error_with_given_payload(self):
         payload = dict(desc=constants.command_list.Tor_Proxy_Error, name='proxy_name', error='proxy_error_object')
         target = self.x.handle_tor_proxy_error = MagicMock()
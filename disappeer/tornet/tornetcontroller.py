@@ -7,6 +7,8 @@ Copyright (C) 2018 Disappeer Labs
 License: GPLv3
 """
 
+import threading
+from disappeer import settings
 from disappeer.utilities import queueconsumer
 from disappeer.net import  networkservers
 from disappeer.torproxy import torproxycontroller
@@ -25,8 +27,6 @@ class TorNetController(queueconsumer.QueueConsumer):
         self.root_queue = root_params.root_queue
         self.tor_datacontext = tor_datacontext
         self.tor_proxy_controller = torproxycontroller.TorProxyController(self.queue)
-        # TODO: refactor this method patch
-        networkservers.contactresponseserver.SSLThreadedContactResponseTCPServer.get_sync_db_path = self.root_params.database_facade.get_server_sync_db_path
         # TODO: should the network servers get the TorNetController queue instead of the root queue for error handling?
         self.net_servers = networkservers.NetworkServers(self.root_queue)
         self.config_data_context()
@@ -37,6 +37,7 @@ class TorNetController(queueconsumer.QueueConsumer):
         self.tor_datacontext.add_tor_response_proxy_addr_observer(self.view.response_onion_entry_var)
         self.tor_datacontext.add_tor_message_proxy_addr_observer(self.view.message_onion_entry_var)
         self.root_params.add_session_passphrase_observable_callback(self.session_passphrase_observable_callback)
+        self.root_params.add_host_key_observable_callback(self.host_key_observable_callback)
 
     def config_event_bindings(self):
         command_button_release_1 = "<ButtonRelease-1>"
@@ -59,6 +60,8 @@ class TorNetController(queueconsumer.QueueConsumer):
             self.handle_tor_proxy_message_server(payload)
         elif desc == constants.command_list.Tor_Proxy_Error:
             self.handle_tor_proxy_error(payload)
+        elif desc == constants.command_list.Network_Servers_Drained:
+            self.handle_network_servers_drained(payload)
         else:
             log.error("TorNetController QUEUE UNHANDLED PAYLOAD: {}".format(payload))
 
@@ -74,14 +77,38 @@ class TorNetController(queueconsumer.QueueConsumer):
         elif current_selection == 0:
             self.proxy_threads_are_alive()
             self.view.handle_net_server_off_clicked_actions()
+            self.view.disable_net_server_on_button()
             self.stop_network_services()
-            self.view.set_net_server_status_var('Stopped')
+            self.view.set_net_server_status_var('Stopping')
 
     def start_network_services(self):
         self.net_servers.start_network_services()
 
     def stop_network_services(self):
-        self.net_servers.stop_network_services()
+        # Draining can take up to server_drain_timeout, keep it off the Tk main loop
+        t = threading.Thread(name=constants.command_list.Network_Servers_Drained,
+                             target=self._drain_network_services_worker)
+        t.start()
+
+    def _drain_network_services_worker(self):
+        report = self.net_servers.drain_network_services(settings.server_drain_timeout)
+        payload = {"desc": constants.command_list.Network_Servers_Drained, "report": report}
+        self.queue.put(payload)
+
+    def handle_network_servers_drained(self, payload):
+        report = payload['report']
+        cut_off = {name: item['cut_off'] for name, item in report.items() if item['cut_off']}
+        self.view.enable_net_server_on_button()
+        self.view.set_net_server_status_var('Stopped')
+        if cut_off:
+            msg = 'Network servers stopped after {} seconds, cutting off connections still open: {}'.format(
+                settings.server_drain_timeout, cut_off)
+            self.launch_alert_log(msg)
+
+    def host_key_observable_callback(self, obs):
+        # Running servers answer with the host key they started with, restart them onto the new one
+        if self.net_servers.are_running():
+            self.net_servers.restart_network_services()
 
     def tor_proxy_radio_button_clicked(self, event):
         if self.is_session_passphrase_none():
@@ -10,6 +10,7 @@ License: GPLv3
 import datetime
 import os
 import pathlib
+from disappeer import settings
 
 
 def get_date_time_stamp(secs):
@@ -36,3 +37,11 @@ def get_images_dir_path():
 
 def get_user_home_dir():
     return pathlib.Path.home()
+
+
+def get_unix_socket_path(port, socket_dir=None):
+    """
+    Same-host instances are told apart by the port they would listen on over TCP,
+    in socket_dir if given, else this instance's unix_socket_dir
+    """
+    return os.path.join(socket_dir or settings.unix_socket_dir, '{}.sock'.format(port))
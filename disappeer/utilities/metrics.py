@@ -0,0 +1,370 @@
+"""
+metrics.py
+
+Module for process wide metrics:
+    - Counter, Gauge, Histogram, metrics with label values given at each update
+    - MetricsRegistry, holds metrics by name and renders them in the Prometheus text format
+    - MetricsExporter, writes snapshots to a file and/or serves them on a Unix socket
+    - timer, context manager observing elapsed seconds into a histogram
+
+Modules get their metrics from the shared registry at import, registering a name again
+returns the existing metric. A worker process takes what its counters and histograms recorded
+with take_deltas, and the parent adds them to its own registry with merge_deltas.
+
+Copyright (C) 2018 Disappeer Labs
+License: GPLv3
+"""
+
+import contextlib
+import os
+import socket
+import threading
+import time
+from disappeer import settings
+from disappeer.utilities.logger import log
+
+
+default_buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def format_value(value):
+    if isinstance(value, float):
+        if value == float('inf'):
+            return '+Inf'
+        return repr(value)
+    return str(value)
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    items = []
+    for key, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        items.append('{}="{}"'.format(key, value))
+    return '{' + ','.join(items) + '}'
+
+
+class Metric:
+
+    type_name = None
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self.lock = threading.Lock()
+        self.values = {}
+
+    @staticmethod
+    def key(labels):
+        return tuple(sorted(labels.items()))
+
+    def get(self, **labels):
+        with self.lock:
+            return self.values.get(self.key(labels), 0)
+
+    def samples(self):
+        with self.lock:
+            return [(self.name, key, value) for key, value in sorted(self.values.items())]
+
+    def take(self):
+        """
+        Return the values recorded so far and start again from none
+        """
+        with self.lock:
+            values, self.values = self.values, {}
+            return values
+
+    def render(self):
+        lines = ['# HELP {} {}'.format(self.name, self.help_text),
+                 '# TYPE {} {}'.format(self.name, self.type_name)]
+        for name, labels, value in self.samples():
+            lines.append('{}{} {}'.format(name, format_labels(labels), format_value(value)))
+        return lines
+
+
+class Counter(Metric):
+
+    type_name = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def merge(self, values):
+        with self.lock:
+            for key, amount in values.items():
+                self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+
+    type_name = 'gauge'
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self.lock:
+            self.values[self.key(labels)] = value
+
+
+class Histogram(Metric):
+    """
+    Values hold [bucket counts, sum, count] per label set, bucket counts are not cumulative until rendered
+    """
+
+    type_name = 'histogram'
+
+    def __init__(self, name, help_text, buckets=default_buckets):
+        super().__init__(name, help_text)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self.key(labels)
+        with self.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][index] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def merge(self, values):
+        with self.lock:
+            for key, (counts, total, count) in values.items():
+                entry = self.values.get(key)
+                if entry is None:
+                    entry = self.values[key] = [[0] * len(self.buckets), 0.0, 0]
+                entry[0] = [mine + theirs for mine, theirs in zip(entry[0], counts)]
+                entry[1] += total
+                entry[2] += count
+
+    def get(self, **labels):
+        """
+        Return (sum, count) for the label values
+        """
+        with self.lock:
+            entry = self.values.get(self.key(labels))
+            if entry is None:
+                return 0.0, 0
+            return entry[1], entry[2]
+
+    def samples(self):
+        result = []
+        with self.lock:
+            for key, (counts, total, count) in sorted(self.values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    result.append((self.name + '_bucket', key + (('le', format_value(float(bound))),), cumulative))
+                result.append((self.name + '_bucket', key + (('le', '+Inf'),), count))
+                result.append((self.name + '_sum', key, total))
+                result.append((self.name + '_count', key, count))
+        return result
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+
+    def register(self, metric_class, name, help_text, **kwargs):
+        """
+        Return the metric registered under name, creating it if needed.
+        Raises ValueError if name is registered as another metric type.
+        """
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = metric_class(name, help_text, **kwargs)
+            elif type(metric) is not metric_class:
+                raise ValueError("Metric {} is already registered as a {}".format(name, metric.type_name))
+            return metric
+
+    def counter(self, name, help_text):
+        return self.register(Counter, name, help_text)
+
+    def gauge(self, name, help_text):
+        return self.register(Gauge, name, help_text)
+
+    def histogram(self, name, help_text, buckets=default_buckets):
+        return self.register(Histogram, name, help_text, buckets=buckets)
+
+    def take_deltas(self):
+        """
+        Return and reset the counter and histogram values recorded so far, by metric name.
+        Gauges are left out, they hold a current level rather than a total.
+        """
+        with self.lock:
+            metrics = list(self.metrics.values())
+        deltas = {}
+        for metric in metrics:
+            if isinstance(metric, (Counter, Histogram)):
+                values = metric.take()
+                if values:
+                    deltas[metric.name] = (metric.type_name, metric.help_text, getattr(metric, 'buckets', None), values)
+        return deltas
+
+    def merge_deltas(self, deltas):
+        """
+        Add deltas taken in another process, registering metrics this process has not seen yet
+        """
+        for name, (type_name, help_text, buckets, values) in deltas.items():
+            if type_name == Histogram.type_name:
+                metric = self.histogram(name, help_text, buckets)
+                if metric.buckets != tuple(buckets):
+                    log.error("Metric {} merged with other buckets, deltas dropped".format(name))
+                    continue
+            else:
+                metric = self.counter(name, help_text)
+            metric.merge(values)
+
+    def render(self):
+        with self.lock:
+            metrics = [self.metrics[name] for name in sorted(self.metrics)]
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+@contextlib.contextmanager
+def timer(histogram, in_flight=None, **labels):
+    """
+    Observe the seconds spent in the block into histogram, and count the block in the in_flight gauge meanwhile
+    """
+    if in_flight is not None:
+        in_flight.inc(**labels)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - start, **labels)
+        if in_flight is not None:
+            in_flight.dec(**labels)
+
+
+class MetricsExporter:
+    """
+    With path, rewrites the file with a snapshot every interval seconds.
+    With socket_path, answers each connection on that Unix socket with a snapshot and closes it.
+    """
+
+    def __init__(self, registry, path=None, socket_path=None, interval=15):
+        self.registry = registry
+        self.path = path
+        self.socket_path = socket_path
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.listener = None
+        self.threads = []
+
+    def start(self):
+        self.stopped.clear()
+        if self.path is not None:
+            self.start_thread(self.run_file_writer, 'Metrics_File_Writer')
+        if self.socket_path is not None:
+            self.listener = self.open_listener()
+            if self.listener is not None:
+                self.start_thread(self.run_socket_server, 'Metrics_Socket_Server')
+
+    def start_thread(self, target, name):
+        thread = threading.Thread(target=target, name=name)
+        thread.daemon = True
+        self.threads.append(thread)
+        thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.listener is not None:
+            self.listener.close()
+            self.listener = None
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+    def write_snapshot(self):
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                f.write(self.registry.render())
+            os.replace(tmp_path, self.path)
+        except OSError as err:
+            log.error("Metrics snapshot could not be written to {}: {}".format(self.path, err))
+
+    def run_file_writer(self):
+        while True:
+            self.write_snapshot()
+            if self.stopped.wait(self.interval):
+                return
+
+    def open_listener(self):
+        try:
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            listener.bind(self.socket_path)
+            listener.listen(5)
+            listener.settimeout(0.5)
+        except OSError as err:
+            log.error("Metrics socket could not be opened at {}: {}".format(self.socket_path, err))
+            return None
+        return listener
+
+    def run_socket_server(self):
+        listener = self.listener
+        while not self.stopped.is_set():
+            try:
+                conn, _ = listener.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            with conn:
+                try:
+                    conn.sendall(bytes(self.registry.render(), 'utf-8'))
+                except OSError:
+                    pass
+
+
+# Shared by all modules reporting metrics
+registry = MetricsRegistry()
+
+# Started from settings by start_exporter
+exporter = None
+
+
+def start_exporter():
+    """
+    Start exporting the shared registry if a metrics export path or socket is configured, return the exporter or None
+    """
+    global exporter
+    if exporter is None and (settings.metrics_export_path or settings.metrics_export_socket):
+        exporter = MetricsExporter(registry,
+                                   path=settings.metrics_export_path,
+                                   socket_path=settings.metrics_export_socket,
+                                   interval=settings.metrics_export_interval)
+        exporter.start()
+    return exporter
+
+
+def stop_exporter():
+    global exporter
+    if exporter is not None:
+        exporter.stop()
+        exporter = None
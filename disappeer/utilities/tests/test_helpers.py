@@ -9,6 +9,7 @@ License: GPLv3
 
 import unittest
 from disappeer.utilities import helpers
+from disappeer import settings
 import datetime
 import os
 import pathlib
@@ -22,6 +23,9 @@ class TestImports(unittest.TestCase):
     def test_os(self):
         self.assertEqual(os, helpers.os)
 
+    def test_settings(self):
+        self.assertEqual(settings, helpers.settings)
+
     def test_pathlib(self):
         self.assertEqual(pathlib, helpers.pathlib)
 
@@ -52,3 +56,10 @@ class TestBasics(unittest.TestCase):
     def test_get_user_home_dir(self):
         self.assertEqual(pathlib.Path.home(), helpers.get_user_home_dir())
 
+
+    def test_get_unix_socket_path(self):
+        expected = os.path.join(settings.unix_socket_dir, '16663.sock')
+        self.assertEqual(expected, helpers.get_unix_socket_path(16663))
+
+    def test_get_unix_socket_path_in_socket_dir(self):
+        self.assertEqual('/peer/sockets/16663.sock', helpers.get_unix_socket_path(16663, '/peer/sockets'))
@@ -0,0 +1,200 @@
+"""
+test_metrics.py
+
+Test suite for the metrics module: registry, Prometheus text rendering and exporter
+
+Copyright (C) 2018 Disappeer Labs
+License: GPLv3
+"""
+
+import unittest
+from unittest.mock import patch
+import os
+import socket
+import tempfile
+import threading
+from disappeer.utilities import metrics
+from disappeer import settings
+
+
+class TestImports(unittest.TestCase):
+
+    def test_os(self):
+        self.assertEqual(os, metrics.os)
+
+    def test_socket(self):
+        self.assertEqual(socket, metrics.socket)
+
+    def test_threading(self):
+        self.assertEqual(threading, metrics.threading)
+
+    def test_settings(self):
+        self.assertEqual(settings, metrics.settings)
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.x = metrics.MetricsRegistry()
+
+    def test_counter_counts_per_label_values(self):
+        counter = self.x.counter('requests_total', 'Requests')
+        counter.inc(server='a')
+        counter.inc(3, server='a')
+        counter.inc(server='b')
+        self.assertEqual(counter.get(server='a'), 4)
+        self.assertEqual(counter.get(server='b'), 1)
+        self.assertEqual(counter.get(server='c'), 0)
+
+    def test_register_returns_existing_metric(self):
+        counter = self.x.counter('requests_total', 'Requests')
+        self.assertIs(self.x.counter('requests_total', 'Requests'), counter)
+
+    def test_register_other_type_raises_value_error(self):
+        self.x.counter('requests_total', 'Requests')
+        with self.assertRaises(ValueError):
+            self.x.gauge('requests_total', 'Requests')
+
+    def test_gauge_inc_dec_set(self):
+        gauge = self.x.gauge('in_flight', 'In flight')
+        gauge.inc()
+        gauge.inc()
+        gauge.dec()
+        self.assertEqual(gauge.get(), 1)
+        gauge.set(7)
+        self.assertEqual(gauge.get(), 7)
+
+    def test_histogram_sum_and_count(self):
+        histogram = self.x.histogram('seconds', 'Seconds', buckets=(1, 5))
+        histogram.observe(0.5, op='x')
+        histogram.observe(2, op='x')
+        self.assertEqual(histogram.get(op='x'), (2.5, 2))
+        self.assertEqual(histogram.get(op='y'), (0.0, 0))
+
+    def test_timer_observes_and_tracks_in_flight(self):
+        histogram = self.x.histogram('seconds', 'Seconds')
+        gauge = self.x.gauge('in_flight', 'In flight')
+        with metrics.timer(histogram, gauge, op='x'):
+            self.assertEqual(gauge.get(op='x'), 1)
+        self.assertEqual(gauge.get(op='x'), 0)
+        self.assertEqual(histogram.get(op='x')[1], 1)
+
+    def test_timer_observes_on_exception(self):
+        histogram = self.x.histogram('seconds', 'Seconds')
+        with self.assertRaises(OSError):
+            with metrics.timer(histogram, op='x'):
+                raise OSError
+        self.assertEqual(histogram.get(op='x')[1], 1)
+
+    def test_render_counter(self):
+        counter = self.x.counter('requests_total', 'Requests seen')
+        counter.inc(2, server='a', result='ok')
+        expected = ('# HELP requests_total Requests seen\n'
+                    '# TYPE requests_total counter\n'
+                    'requests_total{result="ok",server="a"} 2\n')
+        self.assertEqual(self.x.render(), expected)
+
+    def test_render_escapes_label_values(self):
+        counter = self.x.counter('requests_total', 'Requests')
+        counter.inc(path='a"b\\c\nd')
+        self.assertIn('requests_total{path="a\\"b\\\\c\\nd"} 1', self.x.render())
+
+    def test_render_histogram_cumulative_buckets(self):
+        histogram = self.x.histogram('seconds', 'Seconds', buckets=(1, 5))
+        histogram.observe(0.5)
+        histogram.observe(2)
+        histogram.observe(10)
+        lines = self.x.render().splitlines()
+        self.assertIn('# TYPE seconds histogram', lines)
+        self.assertIn('seconds_bucket{le="1.0"} 1', lines)
+        self.assertIn('seconds_bucket{le="5.0"} 2', lines)
+        self.assertIn('seconds_bucket{le="+Inf"} 3', lines)
+        self.assertIn('seconds_sum 12.5', lines)
+        self.assertIn('seconds_count 3', lines)
+
+    def test_take_deltas_returns_and_resets_counters_and_histograms(self):
+        self.x.counter('requests_total', 'Requests').inc(2, server='a')
+        self.x.histogram('seconds', 'Seconds', buckets=(1, 5)).observe(2, op='x')
+        self.x.gauge('in_flight', 'In flight').inc()
+        deltas = self.x.take_deltas()
+        self.assertEqual(sorted(deltas), ['requests_total', 'seconds'])
+        self.assertEqual(deltas['requests_total'], ('counter', 'Requests', None, {(('server', 'a'),): 2}))
+        self.assertEqual(deltas['seconds'], ('histogram', 'Seconds', (1, 5), {(('op', 'x'),): [[0, 1], 2.0, 1]}))
+        self.assertEqual(self.x.counter('requests_total', 'Requests').get(server='a'), 0)
+        self.assertEqual(self.x.gauge('in_flight', 'In flight').get(), 1)
+        self.assertEqual(self.x.take_deltas(), {})
+
+    def test_merge_deltas_adds_to_existing_and_new_metrics(self):
+        worker = metrics.MetricsRegistry()
+        worker.counter('requests_total', 'Requests').inc(2, server='a')
+        worker.histogram('seconds', 'Seconds', buckets=(1, 5)).observe(2, op='x')
+        counter = self.x.counter('requests_total', 'Requests')
+        counter.inc(server='a')
+        self.x.merge_deltas(worker.take_deltas())
+        self.assertEqual(counter.get(server='a'), 3)
+        histogram = self.x.histogram('seconds', 'Seconds', buckets=(1, 5))
+        self.assertEqual(histogram.get(op='x'), (2.0, 1))
+        self.assertIn('seconds_bucket{op="x",le="5.0"} 1', self.x.render().splitlines())
+
+    def test_merge_deltas_drops_histogram_with_other_buckets(self):
+        worker = metrics.MetricsRegistry()
+        worker.histogram('seconds', 'Seconds', buckets=(1, 5)).observe(2)
+        histogram = self.x.histogram('seconds', 'Seconds', buckets=(1, 2, 5))
+        self.x.merge_deltas(worker.take_deltas())
+        self.assertEqual(histogram.get(), (0.0, 0))
+
+
+class TestMetricsExporter(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = metrics.MetricsRegistry()
+        self.registry.counter('requests_total', 'Requests').inc()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+
+    def test_write_snapshot_replaces_file(self):
+        path = os.path.join(self.temp_dir.name, 'metrics.prom')
+        x = metrics.MetricsExporter(self.registry, path=path)
+        x.write_snapshot()
+        with open(path) as f:
+            self.assertEqual(f.read(), self.registry.render())
+        self.assertFalse(os.path.exists(path + '.tmp'))
+
+    def test_file_writer_writes_on_start_and_stops(self):
+        path = os.path.join(self.temp_dir.name, 'metrics.prom')
+        x = metrics.MetricsExporter(self.registry, path=path, interval=60)
+        x.start()
+        x.stop()
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(x.threads, [])
+
+    def test_socket_server_answers_with_snapshot(self):
+        path = os.path.join(self.temp_dir.name, 'metrics.sock')
+        x = metrics.MetricsExporter(self.registry, socket_path=path)
+        x.start()
+        self.addCleanup(x.stop)
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(path)
+            data = b''
+            while True:
+                chunk = client.recv(4096)
+                if not chunk:
+                    break
+                data += chunk
+        self.assertEqual(data.decode(), self.registry.render())
+
+    def test_start_exporter_disabled_without_settings(self):
+        with patch.object(metrics.settings, 'metrics_export_path', None), \
+                patch.object(metrics.settings, 'metrics_export_socket', None):
+            self.assertIsNone(metrics.start_exporter())
+
+    def test_start_and_stop_exporter_from_settings(self):
+        path = os.path.join(self.temp_dir.name, 'metrics.prom')
+        with patch.object(metrics.settings, 'metrics_export_path', path):
+            result = metrics.start_exporter()
+            self.addCleanup(metrics.stop_exporter)
+            self.assertIs(metrics.exporter, result)
+            self.assertEqual(result.path, path)
+            metrics.stop_exporter()
+        self.assertIsNone(metrics.exporter)
+        self.assertTrue(os.path.exists(path))